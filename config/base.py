@@ -102,6 +102,10 @@ class SchedulingConfig(BaseSettings):
     solution_limit: int = Field(default=10, description="解的数量限制")
     time_limit_minutes: int = Field(default=30, description="时间限制(分钟)")
     parallel_threads: int = Field(default=4, description="并行线程数")
+    lease_seconds: int = Field(default=60, description="任务租约时长(秒)")
+    heartbeat_interval: int = Field(default=10, description="心跳间隔(秒)")
+    poll_interval: float = Field(default=1.0, description="队列轮询间隔(秒)")
+    max_attempts: int = Field(default=3, description="任务最大领取次数")
 
 
 class ObservabilityConfig(BaseSettings):
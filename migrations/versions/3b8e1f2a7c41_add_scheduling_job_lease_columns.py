@@ -0,0 +1,33 @@
+"""Add lease and heartbeat columns to scheduling_jobs
+
+Revision ID: 3b8e1f2a7c41
+Revises: 69174d2c9756
+Create Date: 2026-10-16 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "3b8e1f2a7c41"
+down_revision: Union[str, None] = "69174d2c9756"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scheduling_jobs', sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('scheduling_jobs', sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('scheduling_jobs', sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+    op.create_index('idx_scheduling_jobs_lease', 'scheduling_jobs', ['status', 'lease_expires_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_scheduling_jobs_lease', table_name='scheduling_jobs')
+    op.drop_column('scheduling_jobs', 'attempts')
+    op.drop_column('scheduling_jobs', 'lease_expires_at')
+    op.drop_column('scheduling_jobs', 'heartbeat_at')
@@ -0,0 +1,27 @@
+"""Add consecutive_hours to sections
+
+Revision ID: 5d2a9c4e8f13
+Revises: 3b8e1f2a7c41
+Create Date: 2026-10-17 09:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "5d2a9c4e8f13"
+down_revision: Union[str, None] = "3b8e1f2a7c41"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sections', sa.Column('consecutive_hours', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('sections', 'consecutive_hours')
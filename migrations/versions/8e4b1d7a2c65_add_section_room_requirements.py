@@ -0,0 +1,29 @@
+"""Add room requirement columns to sections
+
+Revision ID: 8e4b1d7a2c65
+Revises: 5d2a9c4e8f13
+Create Date: 2026-10-17 11:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "8e4b1d7a2c65"
+down_revision: Union[str, None] = "5d2a9c4e8f13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sections', sa.Column('required_room_type', sa.String(length=50), nullable=True))
+    op.add_column('sections', sa.Column('required_features', sa.JSON(), nullable=False, server_default='[]'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('sections', 'required_features')
+    op.drop_column('sections', 'required_room_type')
@@ -1,16 +1,23 @@
 """调度引擎路由。"""
 
+import logging
+from datetime import datetime, timezone
 from typing import Dict, Any, List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from edusched.domain.models import SchedulingJob, SchedulingStatus
 from edusched.infrastructure.database.connection import get_db
+from edusched.infrastructure.database.models import Assignment as AssignmentTable
 from edusched.infrastructure.database.models import SchedulingJob as SchedulingJobTable
-from edusched.scheduling.engine import SchedulingEngine, ConstraintValidator
+from edusched.infrastructure.database.models import Section as SectionTable
+from edusched.scheduling.engine import ConstraintValidator
+from edusched.scheduling.job_queue import CANCELLED_MESSAGE
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -18,24 +25,24 @@ router = APIRouter()
 @router.post("/start", response_model=Dict[str, Any])
 async def start_scheduling(
     timetable_id: UUID,
-    background_tasks: BackgroundTasks,
     request: Request,
     db: AsyncSession = Depends(get_db)
 ) -> Dict[str, Any]:
-    """启动调度任务。"""
+    """启动调度任务。
+
+    任务以草稿状态写入队列，由调度工作进程（python -m edusched.scheduling.worker）领取执行。
+    """
     tenant_id = getattr(request.state, "tenant_id", "default")
     
     # 验证时间表存在
     # TODO: 实现时间表验证逻辑
     
-    # 创建调度任务
+    # 创建排队中的调度任务
     job = SchedulingJob(
         tenant_id=tenant_id,
         timetable_id=timetable_id,
-        status=SchedulingStatus.RUNNING,
+        status=SchedulingStatus.DRAFT,
         progress=0.0,
-        started_at="2024-01-01T00:00:00Z",  # TODO: 使用当前时间
-        worker_id="worker-1",  # TODO: 动态分配工作进程ID
     )
     
     # 保存到数据库
@@ -45,18 +52,10 @@ async def start_scheduling(
     await db.commit()
     await db.refresh(db_job)
     
-    # 在后台启动调度任务
-    background_tasks.add_task(
-        run_scheduling_task,
-        job_id=db_job.id,
-        tenant_id=tenant_id,
-        timetable_id=timetable_id
-    )
-    
     return {
         "job_id": str(db_job.id),
-        "status": "started",
-        "message": "调度任务已启动",
+        "status": "queued",
+        "message": "调度任务已加入队列",
         "timetable_id": str(timetable_id)
     }
 
@@ -141,17 +140,17 @@ async def cancel_scheduling_job(
             detail="只有草稿或运行中的任务才能取消"
         )
     
-    # 更新状态
+    # 更新状态（运行中的工作进程通过心跳检查感知取消并停止搜索）
     db_job.status = "failed"
-    db_job.error_message = "任务被用户取消"
-    db_job.completed_at = "2024-01-01T00:00:00Z"  # TODO: 使用当前时间
+    db_job.error_message = CANCELLED_MESSAGE
+    db_job.completed_at = datetime.now(timezone.utc)
     
     await db.commit()
     
     return {
         "job_id": str(job_id),
         "status": "cancelled",
-        "message": "调度任务已取消"
+        "message": "调度任务已取消",
     }
 
 
@@ -186,6 +185,8 @@ async def get_job_progress(
         "completed_at": db_job.completed_at,
         "error_message": db_job.error_message,
         "worker_id": db_job.worker_id,
+        "attempts": db_job.attempts,
+        "heartbeat_at": db_job.heartbeat_at,
     }
 
 
@@ -195,42 +196,36 @@ async def validate_constraints(
     request: Request,
     db: AsyncSession = Depends(get_db)
 ) -> Dict[str, Any]:
-    """验证时间表约束。"""
+    """验证时间表约束（教师、班级、教室冲突）。"""
     tenant_id = getattr(request.state, "tenant_id", "default")
     
-    # TODO: 实现约束验证逻辑
-    # 1. 获取时间表的所有分配
-    # 2. 获取相关的教学段、时间段等数据
-    # 3. 调用约束验证器
+    # 获取时间表的所有分配
+    result = await db.execute(
+        select(AssignmentTable).where(
+            AssignmentTable.timetable_id == timetable_id,
+            AssignmentTable.tenant_id == tenant_id,
+        )
+    )
+    assignments = result.scalars().all()
+    
+    # 获取分配引用的教学段
+    section_ids = {assignment.section_id for assignment in assignments}
+    sections = []
+    if section_ids:
+        result = await db.execute(
+            select(SectionTable).where(
+                SectionTable.id.in_(section_ids),
+                SectionTable.tenant_id == tenant_id,
+            )
+        )
+        sections = result.scalars().all()
+    
+    violations = ConstraintValidator.validate_hard_constraints(assignments, sections, [])
     
     return {
         "timetable_id": str(timetable_id),
-        "valid": True,
-        "violations": [],
-        "message": "约束验证功能待实现"
+        "valid": not violations,
+        "violations": violations,
+        "assignments_count": len(assignments),
     }
 
-
-async def run_scheduling_task(job_id: UUID, tenant_id: str, timetable_id: UUID):
-    """在后台运行调度任务。"""
-    # TODO: 实现完整的调度任务逻辑
-    # 1. 获取时间表数据
-    # 2. 创建调度引擎
-    # 3. 构建调度问题
-    # 4. 求解并更新进度
-    # 5. 保存结果
-    
-    print(f"启动调度任务: {job_id} for timetable {timetable_id}")
-    
-    # 模拟调度过程
-    import asyncio
-    import random
-    
-    for i in range(10):
-        await asyncio.sleep(1)  # 模拟计算时间
-        progress = (i + 1) / 10
-        
-        # TODO: 更新数据库中的进度
-        print(f"任务 {job_id} 进度: {progress:.1%}")
-    
-    print(f"调度任务 {job_id} 完成")
\ No newline at end of file
@@ -151,6 +151,10 @@ except ImportError:
         max_iterations: int = Field(default=1000, description="最大迭代次数")
         timeout_seconds: int = Field(default=300, description="调度超时时间(秒)")
         checkpoint_interval: int = Field(default=50, description="检查点间隔")
+        lease_seconds: int = Field(default=60, description="任务租约时长(秒)")
+        heartbeat_interval: int = Field(default=10, description="心跳间隔(秒)")
+        poll_interval: float = Field(default=1.0, description="队列轮询间隔(秒)")
+        max_attempts: int = Field(default=3, description="任务最大领取次数")
 
     class ObservabilitySettings(BaseSettings):
         """可观测性配置。"""
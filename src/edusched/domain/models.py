@@ -200,6 +200,9 @@ class Section(BaseEntity):
     name: str = Field(description="教学段名称")
     code: str = Field(description="教学段代码")
     hours_per_week: int = Field(description="每周课时数")
+    consecutive_hours: int = Field(default=1, ge=1, description="连堂课时数（1表示不连堂）")
+    required_room_type: Optional[str] = Field(default=None, description="要求的教室类型（None表示不限）")
+    required_features: List[str] = Field(default_factory=list, description="要求的教室特性")
     period_type: PeriodType = Field(default=PeriodType.REGULAR, description="课时类型")
     is_locked: bool = Field(default=False, description="是否锁定")
     notes: Optional[str] = Field(default=None, description="备注")
@@ -304,6 +307,9 @@ class SchedulingJob(BaseEntity):
     error_message: Optional[str] = Field(default=None, description="错误信息")
     result_metadata: Dict[str, Any] = Field(default_factory=dict, description="结果元数据")
     worker_id: Optional[str] = Field(default=None, description="工作进程ID")
+    heartbeat_at: Optional[datetime] = Field(default=None, description="最近心跳时间")
+    lease_expires_at: Optional[datetime] = Field(default=None, description="租约到期时间")
+    attempts: int = Field(default=0, description="已领取次数")
 
 
 # 解决循环引用
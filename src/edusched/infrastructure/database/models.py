@@ -303,6 +303,9 @@ class Section(BaseTable):
     name: Mapped[str] = mapped_column(String(200), nullable=False)
     code: Mapped[str] = mapped_column(String(50), nullable=False)
     hours_per_week: Mapped[int] = mapped_column(Integer, nullable=False)
+    consecutive_hours: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    required_room_type: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    required_features: Mapped[List[str]] = mapped_column(JSON, nullable=False, default=list)
     period_type: Mapped[PeriodType] = mapped_column(
         SQLEnum(PeriodType), nullable=False, default=PeriodType.REGULAR
     )
@@ -505,6 +508,9 @@ class SchedulingJob(BaseTable):
     error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     result_metadata: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
     worker_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
 
     # 关系
     timetable: Mapped["Timetable"] = relationship("Timetable", back_populates="scheduling_jobs")
@@ -513,5 +519,6 @@ class SchedulingJob(BaseTable):
         Index("idx_scheduling_jobs_timetable", "timetable_id"),
         Index("idx_scheduling_jobs_status", "tenant_id", "status"),
         Index("idx_scheduling_jobs_worker", "tenant_id", "worker_id"),
+        Index("idx_scheduling_jobs_lease", "status", "lease_expires_at"),
         CheckConstraint("progress >= 0 AND progress <= 1", name="check_progress_range"),
     )
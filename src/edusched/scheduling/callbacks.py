@@ -0,0 +1,285 @@
+"""求解进度回调模块。
+
+在CP-SAT找到每个改进解时发布目标值、下界、间隙和耗时，
+并保存当前最优解快照，使调用方可以随时取用"足够好"的课表。
+配置停止条件时，达到目标间隙、目标值或改进停滞后提前结束搜索并记录停止原因。
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from ortools.sat.python import cp_model
+
+from edusched.scheduling.portfolio import relative_gap
+from edusched.scheduling.solution import SolutionVector
+from edusched.scheduling.solution_pool import SolutionPool
+from edusched.scheduling.variables import SparseAssignmentVars
+
+logger = logging.getLogger(__name__)
+
+# 停止原因：由停止条件触发
+STOP_GAP_REACHED = "gap_reached"
+STOP_OBJECTIVE_REACHED = "objective_reached"
+STOP_PLATEAU_TIME = "plateau_time"
+STOP_PLATEAU_SOLUTIONS = "plateau_solutions"
+# 停止原因：求解器自身结束
+STOP_OPTIMAL = "optimal"
+STOP_TIME_LIMIT = "time_limit"
+STOP_CANCELLED = "cancelled"
+
+# 轮询改进停滞的间隔（秒）
+PLATEAU_POLL_INTERVAL = 0.2
+# 记录首次达到的相对间隙阈值（供求解时间预测）
+GAP_THRESHOLDS = (0.1, 0.05, 0.02, 0.01, 0.0)
+
+
+@dataclass
+class SolutionProgress:
+    """一次改进解的进度信息。"""
+
+    objective: float
+    best_bound: float
+    gap: float
+    elapsed: float
+    solution_count: int
+    progress: float  # 按时间估计的进度（0-1）
+    phase: str = "solve"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可写入JSON的字典。"""
+        return asdict(self)
+
+
+ProgressHandler = Callable[[SolutionProgress], None]
+
+
+@dataclass
+class StoppingCriteria:
+    """提前停止条件，均为可选，任一满足即停止搜索并保留当前最优解。"""
+
+    # 相对间隙不超过该值
+    relative_gap: Optional[float] = None
+    # 目标值不超过该值
+    objective_target: Optional[float] = None
+    # 连续多少秒没有改进（找到第一个解后开始计时）
+    plateau_seconds: Optional[float] = None
+    # 连续多少个解没有改进
+    plateau_solutions: Optional[int] = None
+    # 相对改进小于该值的解不算改进
+    min_improvement: float = 0.0
+
+    def check(self, objective: float, gap: float, solutions_since_improvement: int) -> Optional[str]:
+        """按新解检查停止条件，返回停止原因（不满足时为None）。"""
+        if self.relative_gap is not None and gap <= self.relative_gap:
+            return STOP_GAP_REACHED
+        if self.objective_target is not None and objective <= self.objective_target:
+            return STOP_OBJECTIVE_REACHED
+        if self.plateau_solutions is not None and solutions_since_improvement >= self.plateau_solutions:
+            return STOP_PLATEAU_SOLUTIONS
+        return None
+
+
+class IncumbentStore:
+    """线程安全的当前最优解存储。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._solution: Dict[int, int] = {}
+        self._progress: Optional[SolutionProgress] = None
+
+    def update(self, solution: Dict[int, int], progress: Optional[SolutionProgress]) -> None:
+        """保存新的当前最优解（阶段1构造解没有目标值，进度为None）。"""
+        with self._lock:
+            self._solution = solution
+            self._progress = progress
+
+    def snapshot(self) -> Tuple[Dict[int, int], Optional[SolutionProgress]]:
+        """获取当前最优解 {教学段下标: 时间段下标} 及其进度信息。"""
+        with self._lock:
+            return dict(self._solution), self._progress
+
+    def clear(self) -> None:
+        """清空存储。"""
+        with self._lock:
+            self._solution = {}
+            self._progress = None
+
+
+class SolutionProgressCallback(cp_model.CpSolverSolutionCallback):
+    """CP-SAT改进解回调：保存快照并发布进度。"""
+
+    def __init__(
+        self,
+        vars: SparseAssignmentVars,
+        time_limit: float,
+        store: IncumbentStore,
+        on_progress: Optional[ProgressHandler] = None,
+        phase: str = "solve",
+        stopping: Optional[StoppingCriteria] = None,
+        pool: Optional[SolutionPool] = None,
+    ):
+        """初始化回调。
+
+        Args:
+            vars: 分配变量
+            time_limit: 本次求解的时间限制，用于估计进度
+            store: 当前最优解存储
+            on_progress: 每个改进解的进度处理函数
+            phase: 求解阶段名称
+            stopping: 提前停止条件
+            pool: 收集改进解的多样化解池
+        """
+        super().__init__()
+        self.vars = vars
+        self.time_limit = time_limit
+        self.store = store
+        self.on_progress = on_progress
+        self.phase = phase
+        self.start = time.perf_counter()
+        self.solution_count = 0
+        # 间隙阈值 -> 首次达到该间隙的耗时
+        self.time_to_gap: Dict[float, float] = {}
+        self.stopping = stopping
+        self.pool = pool
+        self.stop_reason: Optional[str] = None
+        # 最近一次改进的目标值、时刻及其后的解数
+        self.best_objective: Optional[float] = None
+        self.last_improvement: Optional[float] = None
+        self.solutions_since_improvement = 0
+
+    def on_solution_callback(self) -> None:
+        self.solution_count += 1
+        elapsed = time.perf_counter() - self.start
+        objective = self.ObjectiveValue()
+        bound = self.BestObjectiveBound()
+        progress = SolutionProgress(
+            objective=objective,
+            best_bound=bound,
+            gap=relative_gap(objective, bound),
+            elapsed=elapsed,
+            solution_count=self.solution_count,
+            progress=estimate_progress(elapsed, self.time_limit),
+            phase=self.phase,
+        )
+        for threshold in GAP_THRESHOLDS:
+            if progress.gap <= threshold and threshold not in self.time_to_gap:
+                self.time_to_gap[threshold] = elapsed
+
+        # 一次读取回调响应中的全部取值，不逐个查询分配变量
+        vector = SolutionVector.from_solver(self, self.vars)
+        self.store.update(vector.as_dict(), progress)
+        if self.pool is not None:
+            self.pool.offer(vector.timeslots, objective)
+        if self.on_progress is not None:
+            self.on_progress(progress)
+        if self.stopping is not None:
+            self._check_stopping(objective, progress.gap)
+
+    def _check_stopping(self, objective: float, gap: float) -> None:
+        """更新改进记录并检查停止条件。"""
+        best = self.best_objective
+        if best is None or best - objective > self.stopping.min_improvement * max(1.0, abs(best)):
+            self.best_objective = objective
+            self.last_improvement = time.perf_counter()
+            self.solutions_since_improvement = 0
+        else:
+            self.solutions_since_improvement += 1
+
+        reason = self.stopping.check(objective, gap, self.solutions_since_improvement)
+        if reason is not None and self.stop_reason is None:
+            logger.info(f"满足停止条件 {reason}（目标值 {objective}，间隙 {gap:.4f}），停止搜索")
+            self.stop_reason = reason
+            self.StopSearch()
+
+    def final_stop_reason(self, solver: cp_model.CpSolver, status: int, cancelled: bool = False) -> str:
+        """求解结束的原因：停止条件、取消、证明最优、时间耗尽或求解器状态。"""
+        if self.stop_reason is not None:
+            return self.stop_reason
+        if cancelled:
+            return STOP_CANCELLED
+        if status == cp_model.OPTIMAL:
+            return STOP_OPTIMAL
+        if status == cp_model.FEASIBLE:
+            return STOP_TIME_LIMIT
+        return solver.StatusName(status).lower()
+
+
+@contextmanager
+def stop_on_plateau(
+    solver: cp_model.CpSolver,
+    callback: SolutionProgressCallback,
+    poll_interval: float = PLATEAU_POLL_INTERVAL,
+) -> Iterator[None]:
+    """求解期间在后台线程检查改进停滞，超过 plateau_seconds 没有改进时停止搜索。
+
+    找到改进解时才会触发回调，因此按时间的停滞只能在回调之外检测。
+    """
+    stopping = callback.stopping
+    if stopping is None or stopping.plateau_seconds is None:
+        yield
+        return
+
+    done = threading.Event()
+
+    def watch() -> None:
+        while not done.wait(poll_interval):
+            last = callback.last_improvement
+            if last is not None and time.perf_counter() - last >= stopping.plateau_seconds:
+                if callback.stop_reason is None:
+                    logger.info(f"{stopping.plateau_seconds}秒没有改进，停止搜索")
+                    callback.stop_reason = STOP_PLATEAU_TIME
+                solver.StopSearch()
+                return
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        yield
+    finally:
+        done.set()
+        watcher.join()
+
+
+def estimate_progress(elapsed: float, time_limit: float) -> float:
+    """按耗时估计进度，完成前最多报告0.99。"""
+    if time_limit <= 0:
+        return 0.99
+    return round(min(elapsed / time_limit, 0.99), 2)
+
+
+class ThrottledProgressHandler:
+    """限制写入频率的进度处理函数。
+
+    两次写入至少间隔 min_interval 秒，期间的更新只保留最新一次，
+    由下一次写入或 flush() 发布。
+    """
+
+    def __init__(self, handler: ProgressHandler, min_interval: float = 2.0):
+        self.handler = handler
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._last_write = float("-inf")
+        self._pending: Optional[SolutionProgress] = None
+
+    def __call__(self, progress: SolutionProgress) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_write < self.min_interval:
+                self._pending = progress
+                return
+            self._last_write = now
+            self._pending = None
+        self.handler(progress)
+
+    def flush(self) -> None:
+        """发布被节流的最新进度。"""
+        with self._lock:
+            pending, self._pending = self._pending, None
+            if pending is not None:
+                self._last_write = time.monotonic()
+        if pending is not None:
+            self.handler(pending)
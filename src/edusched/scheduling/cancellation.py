@@ -0,0 +1,161 @@
+"""求解取消模块。
+
+按任务ID登记运行中的求解，取消请求通过后台线程轮询并调用 StopSearch()，
+使CP-SAT在一秒内释放CPU并保留当前最优解。
+取消状态存放在可替换的后端中，使用跨进程共享的映射或数据库时可在工作进程间生效。
+"""
+
+import logging
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, MutableMapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# 轮询取消状态的间隔（秒）
+DEFAULT_POLL_INTERVAL = 0.2
+
+
+class CancellationBackend(ABC):
+    """取消状态存储后端。"""
+
+    @abstractmethod
+    def request_cancel(self, job_id: str) -> None:
+        """记录取消请求。"""
+
+    @abstractmethod
+    def is_cancelled(self, job_id: str) -> bool:
+        """是否已请求取消。"""
+
+    @abstractmethod
+    def clear(self, job_id: str) -> None:
+        """清除取消记录。"""
+
+
+class InMemoryCancellationBackend(CancellationBackend):
+    """基于映射的取消后端。
+
+    默认使用进程内字典；传入 multiprocessing.Manager().dict() 时可在多个进程间共享。
+    """
+
+    def __init__(self, shared: Optional[MutableMapping[str, bool]] = None):
+        self._cancelled: MutableMapping[str, bool] = shared if shared is not None else {}
+
+    def request_cancel(self, job_id: str) -> None:
+        self._cancelled[job_id] = True
+
+    def is_cancelled(self, job_id: str) -> bool:
+        return bool(self._cancelled.get(job_id, False))
+
+    def clear(self, job_id: str) -> None:
+        self._cancelled.pop(job_id, None)
+
+
+class CancellationToken:
+    """单个求解任务的取消令牌（可序列化，传递给子进程后仍通过后端生效）。"""
+
+    def __init__(self, job_id: str, backend: CancellationBackend):
+        self.job_id = job_id
+        self.backend = backend
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        """请求取消。"""
+        self._event.set()
+        self.backend.request_cancel(self.job_id)
+
+    def is_cancelled(self) -> bool:
+        """是否已取消（本地标记或后端记录）。"""
+        if self._event.is_set():
+            return True
+        if self.backend.is_cancelled(self.job_id):
+            self._event.set()
+            return True
+        return False
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_event"] = None
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._event = threading.Event()
+
+
+class CancellationRegistry:
+    """按任务ID登记取消令牌。"""
+
+    def __init__(self, backend: Optional[CancellationBackend] = None):
+        self.backend = backend or InMemoryCancellationBackend()
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, CancellationToken] = {}
+
+    def register(self, job_id: Any) -> CancellationToken:
+        """登记任务并返回其取消令牌。"""
+        key = str(job_id)
+        with self._lock:
+            token = self._tokens.get(key)
+            if token is None:
+                token = CancellationToken(key, self.backend)
+                self._tokens[key] = token
+            return token
+
+    def unregister(self, job_id: Any) -> None:
+        """任务结束后移除令牌和取消记录。"""
+        key = str(job_id)
+        with self._lock:
+            self._tokens.pop(key, None)
+        self.backend.clear(key)
+
+    def cancel(self, job_id: Any) -> bool:
+        """请求取消任务，返回任务是否在本进程中运行。"""
+        key = str(job_id)
+        with self._lock:
+            token = self._tokens.get(key)
+        if token is not None:
+            token.cancel()
+            return True
+        # 任务可能在其他进程中运行，由后端传递取消请求
+        self.backend.request_cancel(key)
+        return False
+
+    def is_cancelled(self, job_id: Any) -> bool:
+        """任务是否已被请求取消。"""
+        return self.backend.is_cancelled(str(job_id))
+
+
+@contextmanager
+def stop_on_cancel(
+    solver: Any,
+    token: Optional[CancellationToken],
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+) -> Iterator[None]:
+    """求解期间在后台线程轮询取消令牌，取消时调用 solver.StopSearch()。"""
+    if token is None:
+        yield
+        return
+
+    done = threading.Event()
+
+    def watch() -> None:
+        while True:
+            if token.is_cancelled():
+                logger.info(f"任务 {token.job_id} 已取消，停止搜索")
+                solver.StopSearch()
+                return
+            if done.wait(poll_interval):
+                return
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        yield
+    finally:
+        done.set()
+        watcher.join()
+
+
+# 全局取消登记表
+cancellation_registry = CancellationRegistry()
@@ -0,0 +1,280 @@
+"""问题分解模块。
+
+按教学段之间共享教师、班级或教室的关系求连通分量。不同分量之间没有硬约束耦合，
+可以在独立进程中并行求解后合并分配结果。未启用教室分配时，未指定教室的教学段与模型一致
+视为共用同一教室，全部落在同一分量中；只有一个分量时不启动进程池。
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from edusched.domain.models import (
+    Assignment,
+    ClassGroup,
+    Constraint,
+    Room,
+    Section,
+    Teacher,
+    Timeslot,
+)
+from edusched.scheduling.cancellation import CancellationToken
+from edusched.scheduling.engine import SchedulingProblem
+from edusched.scheduling.index import ProblemIndex
+from edusched.scheduling.lns import LNSConfig
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SubproblemSpec:
+    """子问题数据（可序列化，传递给子进程）。"""
+
+    component: int
+    tenant_id: str
+    sections: List[Section]
+    timeslots: List[Timeslot]
+    teachers: List[Teacher] = field(default_factory=list)
+    rooms: List[Room] = field(default_factory=list)
+    class_groups: List[ClassGroup] = field(default_factory=list)
+    constraints: List[Constraint] = field(default_factory=list)
+    existing_assignments: List[Assignment] = field(default_factory=list)
+    # 取消令牌（后端为跨进程共享映射时，子进程也能收到取消请求）
+    cancel_token: Optional[CancellationToken] = None
+    symmetry_breaking: bool = False
+
+    def to_problem(self) -> SchedulingProblem:
+        """重建调度问题。"""
+        problem = SchedulingProblem(self.tenant_id)
+        for section in self.sections:
+            problem.add_section(section)
+        for timeslot in self.timeslots:
+            problem.add_timeslot(timeslot)
+        for teacher in self.teachers:
+            problem.add_teacher(teacher)
+        for room in self.rooms:
+            problem.add_room(room)
+        for class_group in self.class_groups:
+            problem.add_class_group(class_group)
+        for constraint in self.constraints:
+            problem.add_constraint(constraint)
+        for assignment in self.existing_assignments:
+            problem.add_existing_assignment(assignment)
+        problem.cancel_token = self.cancel_token
+        problem.symmetry_breaking = self.symmetry_breaking
+        return problem
+
+
+@dataclass
+class ComponentResult:
+    """子问题求解结果。"""
+
+    component: int
+    num_sections: int
+    success: bool
+    assignments: List[Assignment] = field(default_factory=list)
+    metrics: Dict[str, Any] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+
+def find_components(index: ProblemIndex, num_sections: int) -> List[List[int]]:
+    """用并查集求教学段的连通分量，按规模从大到小返回。"""
+    parent = list(range(num_sections))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for group in index.resource_groups():
+        root = find(group[0])
+        for i in group[1:]:
+            other = find(i)
+            if other != root:
+                parent[other] = root
+
+    components: Dict[int, List[int]] = {}
+    for i in range(num_sections):
+        components.setdefault(find(i), []).append(i)
+    return sorted(components.values(), key=len, reverse=True)
+
+
+def solve_subproblem(
+    spec: SubproblemSpec,
+    phase1_time_limit: int,
+    phase2_time_limit: int,
+    lns_config: Optional[LNSConfig] = None,
+) -> ComponentResult:
+    """在子进程中构建并以两阶段策略求解一个子问题。"""
+    start = time.perf_counter()
+    problem = spec.to_problem()
+    problem.build_model()
+    success, assignments, metrics = problem.solve_two_phase(
+        phase1_time_limit, phase2_time_limit, lns_config=lns_config
+    )
+    return ComponentResult(
+        component=spec.component,
+        num_sections=len(spec.sections),
+        success=success,
+        assignments=assignments,
+        metrics=metrics,
+        elapsed=time.perf_counter() - start,
+    )
+
+
+class DecomposedSolver:
+    """按连通分量并行求解调度问题。"""
+
+    def __init__(self, problem: SchedulingProblem, max_workers: Optional[int] = None):
+        """初始化分解求解器。
+
+        Args:
+            problem: 待求解的调度问题（无需预先构建模型）
+            max_workers: 最大进程数，默认为CPU核数
+        """
+        self.problem = problem
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def components(self) -> List[List[int]]:
+        """获取教学段连通分量。"""
+        return find_components(self.problem._get_index(), len(self.problem.sections))
+
+    def build_subproblems(self) -> List[SubproblemSpec]:
+        """按连通分量拆分子问题。"""
+        problem = self.problem
+        teachers_by_id = {teacher.id: teacher for teacher in problem.teachers}
+
+        specs = []
+        for component, section_indices in enumerate(self.components()):
+            sections = [problem.sections[i] for i in section_indices]
+            section_ids = {section.id for section in sections}
+            teacher_ids = {section.teacher_id for section in sections}
+            class_group_ids = {section.class_group_id for section in sections}
+            specs.append(SubproblemSpec(
+                component=component,
+                tenant_id=problem.tenant_id,
+                sections=sections,
+                timeslots=list(problem.timeslots),
+                teachers=[teachers_by_id[t] for t in teacher_ids if t in teachers_by_id],
+                rooms=list(problem.rooms),
+                class_groups=[c for c in problem.class_groups if c.id in class_group_ids],
+                constraints=list(problem.constraints),
+                existing_assignments=[
+                    a for a in problem.existing_assignments if a.section_id in section_ids
+                ],
+                cancel_token=problem.cancel_token,
+                symmetry_breaking=problem.symmetry_breaking,
+            ))
+        return specs
+
+    def solve(
+        self,
+        phase1_time_limit: int = 60,
+        phase2_time_limit: int = 240,
+        lns_config: Optional[LNSConfig] = None,
+    ) -> Tuple[bool, List[Assignment], Dict[str, Any]]:
+        """并行求解各子问题并合并结果。
+
+        只有所有分量都求解成功才返回成功；失败时仍返回已求解分量的分配。
+        """
+        start = time.perf_counter()
+        specs = self.build_subproblems()
+        logger.info(f"调度问题分解为 {len(specs)} 个独立子问题")
+
+        if len(specs) <= 1:
+            # 只有一个分量时直接在当前进程求解，避免进程开销
+            self._warn_single_component()
+            self.problem.build_model()
+            success, assignments, metrics = self.problem.solve_two_phase(
+                phase1_time_limit, phase2_time_limit, lns_config=lns_config
+            )
+            metrics['num_components'] = len(specs)
+            metrics['decomposition_time'] = time.perf_counter() - start
+            return success, assignments, metrics
+
+        results = self._solve_parallel(specs, phase1_time_limit, phase2_time_limit, lns_config)
+        success, assignments, metrics = self._merge(results, time.perf_counter() - start)
+        if self.problem.rooms:
+            # 不同分量可能使用同一批教室（兼容教室数足够时不构成耦合），合并后统一匹配教室
+            assignments = self.problem._build_assignments(
+                self.problem._assignments_to_solution(assignments)
+            )
+        return success, assignments, metrics
+
+    def _warn_single_component(self) -> None:
+        """提示问题无法分解及可能的原因。"""
+        problem = self.problem
+        if problem.room_index is None and any(section.room_id is None for section in problem.sections):
+            logger.warning("未启用教室分配，未指定教室的教学段共用同一教室，问题无法分解，在当前进程中求解")
+        else:
+            logger.warning("调度问题只有一个连通分量，无法分解，在当前进程中求解")
+
+    def _solve_parallel(
+        self,
+        specs: List[SubproblemSpec],
+        phase1_time_limit: int,
+        phase2_time_limit: int,
+        lns_config: Optional[LNSConfig],
+    ) -> List[ComponentResult]:
+        """在进程池中求解子问题（规模大的先提交）。"""
+        # 使用spawn启动子进程，避免fork继承求解器线程状态
+        context = multiprocessing.get_context("spawn")
+        workers = min(self.max_workers, len(specs))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = [
+                executor.submit(
+                    solve_subproblem, spec, phase1_time_limit, phase2_time_limit, lns_config
+                )
+                for spec in specs
+            ]
+            results = []
+            for spec, future in zip(specs, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logger.error(f"子问题 {spec.component} 求解异常: {e}")
+                    results.append(ComponentResult(
+                        component=spec.component,
+                        num_sections=len(spec.sections),
+                        success=False,
+                        metrics={'error': str(e)},
+                    ))
+        return results
+
+    @staticmethod
+    def _merge(
+        results: List[ComponentResult], elapsed: float
+    ) -> Tuple[bool, List[Assignment], Dict[str, Any]]:
+        """合并各子问题的分配和指标。"""
+        assignments: List[Assignment] = []
+        for result in results:
+            assignments.extend(result.assignments)
+
+        success = all(result.success for result in results)
+        metrics = {
+            'num_components': len(results),
+            'decomposition_time': elapsed,
+            'failed_components': [r.component for r in results if not r.success],
+            'final_objective': sum(
+                r.metrics.get('final_objective', 0) for r in results if r.success
+            ),
+            'components': [
+                {
+                    'component': r.component,
+                    'num_sections': r.num_sections,
+                    'success': r.success,
+                    'elapsed': r.elapsed,
+                    'final_objective': r.metrics.get('final_objective'),
+                    'phase1_method': r.metrics.get('phase1_method'),
+                }
+                for r in results
+            ],
+        }
+        if not success:
+            logger.warning(f"{len(metrics['failed_components'])} 个子问题求解失败")
+        return success, assignments, metrics
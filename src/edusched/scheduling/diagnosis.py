@@ -0,0 +1,267 @@
+"""不可行原因诊断模块。
+
+求解器判定无解时，单独构建一个诊断模型：每组硬约束（每位教师、每个班级、每个教室容量组、
+每条锁定分配等）由一个假设文字控制，求解后通过 SufficientAssumptionsForInfeasibility
+得到导致无解的约束组，再逐个尝试去掉以得到极小冲突子集。
+
+诊断模型不做候选时间段剪枝（教师不可用、锁定分配也作为约束组），否则这些原因会在建模时
+被隐去而无法出现在冲突子集中。诊断结果按问题指纹缓存。
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from ortools.sat.python import cp_model
+from ortools.sat.python.cp_model import CpModel, CpSolver
+
+from edusched.scheduling.cancellation import stop_on_cancel
+from edusched.scheduling.fingerprint import fingerprint_problem
+
+if TYPE_CHECKING:
+    from edusched.scheduling.engine import SchedulingProblem
+    from edusched.scheduling.solution_cache import SolutionCache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ConflictGroup:
+    """一组由同一假设文字控制的硬约束。"""
+
+    # 约束组类型：teacher、teacher_availability、class_group、room、room_requirement、locked
+    kind: str
+    entity_id: str
+    message: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化的字典。"""
+        return {"kind": self.kind, "entity_id": self.entity_id, "message": self.message}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ConflictGroup":
+        """从字典恢复。"""
+        return cls(kind=data["kind"], entity_id=data["entity_id"], message=data["message"])
+
+
+@dataclass
+class InfeasibilityCore:
+    """不可行诊断结果。"""
+
+    # 诊断模型的求解状态：INFEASIBLE 表示找到了冲突子集
+    status: str = "UNKNOWN"
+    conflicts: List[ConflictGroup] = field(default_factory=list)
+    # 冲突子集是否已确认为极小（去掉任何一组都有解）
+    minimal: bool = False
+    num_groups: int = 0
+    elapsed: float = 0.0
+    cached: bool = False
+
+    @property
+    def found(self) -> bool:
+        """是否找到了冲突子集。"""
+        return self.status == "INFEASIBLE"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可JSON序列化的字典。"""
+        return {
+            "status": self.status,
+            "conflicts": [conflict.to_dict() for conflict in self.conflicts],
+            "minimal": self.minimal,
+            "num_groups": self.num_groups,
+            "elapsed": self.elapsed,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "InfeasibilityCore":
+        """从字典恢复。"""
+        return cls(
+            status=data["status"],
+            conflicts=[ConflictGroup.from_dict(c) for c in data.get("conflicts", [])],
+            minimal=data.get("minimal", False),
+            num_groups=data.get("num_groups", 0),
+            elapsed=data.get("elapsed", 0.0),
+        )
+
+    def to_metrics(self) -> Dict[str, Any]:
+        """转换为可序列化的指标。"""
+        return {
+            "infeasibility_status": self.status,
+            "infeasibility_core": [conflict.to_dict() for conflict in self.conflicts],
+            "infeasibility_core_minimal": self.minimal,
+            "infeasibility_cached": self.cached,
+            "infeasibility_elapsed": self.elapsed,
+        }
+
+
+class InfeasibilityDiagnoser:
+    """以假设文字求解诊断模型并提取冲突子集。"""
+
+    def __init__(self, problem: "SchedulingProblem"):
+        """初始化诊断器。
+
+        Args:
+            problem: 调度问题（无需构建模型）
+        """
+        self.problem = problem
+        self.model = CpModel()
+        # 假设文字与对应的约束组
+        self.assumptions: List[cp_model.IntVar] = []
+        self.groups: List[ConflictGroup] = []
+
+    def build(self) -> CpModel:
+        """构建以假设文字控制各约束组的诊断模型。"""
+        problem = self.problem
+        index = problem._get_index()
+        model = self.model
+        usable_slots = [j for j, timeslot in enumerate(problem.timeslots) if not timeslot.is_break]
+
+        # x[i][j]：教学段i安排在可用时间段j；每个教学段必须安排（不作为约束组）
+        x: List[Dict[int, cp_model.IntVar]] = []
+        for i in range(len(problem.sections)):
+            x.append({j: model.NewBoolVar(f"d_{i}_{j}") for j in usable_slots})
+            model.AddExactlyOne(x[i].values())
+
+        for teacher_id, members in index.teacher_sections.items():
+            if len(members) <= 1:
+                continue
+            literal = self._new_group("teacher", teacher_id, f"教师 {teacher_id} 同一时间段只能上一节课")
+            for j in usable_slots:
+                model.Add(sum(x[i][j] for i in members) <= 1).OnlyEnforceIf(literal)
+
+        for teacher in problem.teachers:
+            unavailable = set(teacher.unavailable_time_slots or [])
+            members = index.teacher_sections.get(teacher.id, [])
+            blocked = [x[i][j] for i in members for j in usable_slots
+                       if problem.timeslots[j].start_time in unavailable]
+            if blocked:
+                literal = self._new_group(
+                    "teacher_availability", teacher.id, f"教师 {teacher.id} 的不可用时间段"
+                )
+                model.Add(sum(blocked) == 0).OnlyEnforceIf(literal)
+
+        for class_group_id, members in index.class_group_sections.items():
+            if len(members) <= 1:
+                continue
+            literal = self._new_group("class_group", class_group_id, f"班级 {class_group_id} 同一时间段只能上一节课")
+            for j in usable_slots:
+                model.Add(sum(x[i][j] for i in members) <= 1).OnlyEnforceIf(literal)
+
+        for g, group in enumerate(index.room_groups):
+            room_ids = sorted({str(problem.sections[i].room_id or "未指定教室") for i in group.members})
+            label = ", ".join(room_ids) if problem.room_index is None else f"容量组{g}（{group.capacity}间教室）"
+            literal = self._new_group("room", label, f"教室 {label} 同一时间段最多安排 {group.capacity} 个教学段")
+            for j in usable_slots:
+                model.Add(sum(x[i][j] for i in group.members) <= group.capacity).OnlyEnforceIf(literal)
+
+        if problem.room_index is not None:
+            for i, rooms in enumerate(problem.room_index.compatible):
+                if not rooms:
+                    section = problem.sections[i]
+                    literal = self._new_group(
+                        "room_requirement", section.id, f"教学段 {section.id} 的教室要求没有兼容的教室"
+                    )
+                    model.Add(sum(x[i].values()) == 0).OnlyEnforceIf(literal)
+
+        for assignment in problem.existing_assignments:
+            if not assignment.is_locked:
+                continue
+            i = problem.section_to_idx.get(assignment.section_id)
+            j = problem.timeslot_to_idx.get(assignment.timeslot_id)
+            if i is None or j is None:
+                continue
+            literal = self._new_group(
+                "locked", assignment.section_id,
+                f"教学段 {assignment.section_id} 锁定在时间段 {assignment.timeslot_id}",
+            )
+            if j in x[i]:
+                model.Add(x[i][j] == 1).OnlyEnforceIf(literal)
+            else:
+                # 锁定在休息时间段
+                model.AddBoolOr([literal.Not()])
+
+        return model
+
+    def _new_group(self, kind: str, entity_id: Any, message: str) -> cp_model.IntVar:
+        """创建控制一组约束的假设文字。"""
+        literal = self.model.NewBoolVar(f"assume_{kind}_{len(self.groups)}")
+        self.assumptions.append(literal)
+        self.groups.append(ConflictGroup(kind=kind, entity_id=str(entity_id), message=message))
+        return literal
+
+    def diagnose(self, time_limit: float = 10.0) -> InfeasibilityCore:
+        """求解诊断模型并将冲突子集缩减为极小子集（在时间限制内）。"""
+        start = time.perf_counter()
+        deadline = start + time_limit
+        self.build()
+        result = InfeasibilityCore(num_groups=len(self.groups))
+
+        status, core = self._solve(list(range(len(self.assumptions))), time_limit)
+        result.status = CpSolver().StatusName(status)
+        if status != cp_model.INFEASIBLE:
+            result.elapsed = time.perf_counter() - start
+            logger.info(f"诊断模型状态 {result.status}，未找到硬约束冲突")
+            return result
+
+        # 逐个去掉约束组：仍然无解则丢弃，有解则保留
+        minimal = True
+        k = 0
+        while k < len(core):
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or self.problem.is_cancelled():
+                minimal = False
+                break
+            trial = core[:k] + core[k + 1:]
+            status, reduced = self._solve(trial, remaining)
+            if status == cp_model.INFEASIBLE:
+                core = reduced
+            else:
+                if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                    minimal = False
+                k += 1
+
+        result.conflicts = [self.groups[g] for g in core]
+        result.minimal = minimal
+        result.elapsed = time.perf_counter() - start
+        logger.info(
+            f"诊断出 {len(core)} 组冲突约束（共 {len(self.groups)} 组，{'极小' if minimal else '未确认极小'}），"
+            f"用时 {result.elapsed:.2f}秒"
+        )
+        return result
+
+    def _solve(self, groups: List[int], time_limit: float) -> Any:
+        """以给定约束组为假设求解，无解时返回充分的冲突约束组。"""
+        self.model.ClearAssumptions()
+        self.model.AddAssumptions([self.assumptions[g] for g in groups])
+        solver = CpSolver()
+        solver.parameters.max_time_in_seconds = max(time_limit, 0.01)
+        # 提取假设冲突需要单线程搜索
+        solver.parameters.num_workers = 1
+        with stop_on_cancel(solver, self.problem.cancel_token):
+            status = solver.Solve(self.model)
+        if status != cp_model.INFEASIBLE:
+            return status, groups
+        position = {self.assumptions[g].Index(): g for g in groups}
+        core = [position[literal] for literal in solver.SufficientAssumptionsForInfeasibility()]
+        return status, sorted(core)
+
+
+def diagnose_infeasibility(
+    problem: "SchedulingProblem",
+    time_limit: float = 10.0,
+    cache: Optional["SolutionCache"] = None,
+) -> InfeasibilityCore:
+    """诊断调度问题无解的原因，传入缓存时按问题指纹复用诊断结果。"""
+    fingerprint = fingerprint_problem(problem) if cache is not None else None
+    if cache is not None:
+        cached = cache.lookup_core(fingerprint)
+        if cached is not None:
+            logger.info(f"调度问题 {fingerprint.digest} 命中诊断缓存")
+            cached.cached = True
+            return cached
+
+    result = InfeasibilityDiagnoser(problem).diagnose(time_limit)
+    if cache is not None and result.found:
+        cache.store_core(fingerprint, result)
+    return result
@@ -4,27 +4,77 @@
 """
 
 import logging
+from dataclasses import replace
 from datetime import datetime, time
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
 from uuid import UUID
 
+import numpy as np
 from ortools.sat.python import cp_model
 from ortools.sat.python.cp_model import CpModel, CpSolver
 
 from edusched.domain.models import (
     Assignment,
+    ClassGroup,
     Constraint,
     ConstraintType,
     PeriodType,
+    Room,
     SchedulingStatus,
     Section,
     Teacher,
     Timeslot,
+    Timetable,
     WeekDay,
 )
+from edusched.scheduling.callbacks import (
+    GAP_THRESHOLDS,
+    IncumbentStore,
+    ProgressHandler,
+    SolutionProgress,
+    SolutionProgressCallback,
+    StoppingCriteria,
+    estimate_progress,
+    stop_on_plateau,
+)
+from edusched.scheduling.cancellation import CancellationToken, stop_on_cancel
+from edusched.scheduling.diagnosis import InfeasibilityCore, diagnose_infeasibility
+from edusched.scheduling.evaluator import TimetableEvaluator
+from edusched.scheduling.feasibility import FeasibilityReport, check_feasibility
+from edusched.scheduling.fingerprint import fingerprint_problem
+from edusched.scheduling.heuristics import ConstructionResult, DSaturConstructor
+from edusched.scheduling.incremental import ChangeSet, IncrementalRescheduler
+from edusched.scheduling.index import ProblemIndex
+from edusched.scheduling.lessons import LessonModel
+from edusched.scheduling.lns import LargeNeighborhoodSearch, LNSConfig, LNSResult
+from edusched.scheduling.model_store import ModelSnapshot, ModelStore, load_snapshot, save_model
+from edusched.scheduling.rooms import RoomCompatibilityIndex
+from edusched.scheduling.portfolio import (
+    PortfolioResult,
+    PortfolioSolver,
+    SolverConfig,
+    relative_gap,
+)
+from edusched.scheduling.solution import PLACEHOLDER_ID, SolutionVector, build_assignments, solver_values
+from edusched.scheduling.solution_cache import SolutionCache
+from edusched.scheduling.solution_pool import PoolResult, SolutionPool
+from edusched.scheduling.validation import VectorizedValidator
+from edusched.scheduling.variables import SparseAssignmentVars
 
 logger = logging.getLogger(__name__)
 
+# 软约束权重的整数缩放系数（CP-SAT线性约束只接受整数系数）
+WEIGHT_SCALE = 10
+
+# 软约束权重配置
+SOFT_CONSTRAINT_WEIGHTS = {
+    'teacher_preference': 0.8,
+    'room_preference': 0.6,
+    'balanced_distribution': 0.7,
+    'compact_schedule': 0.5,
+    'consecutive_classes': 0.4
+}
+
 
 class SchedulingProblem:
     """调度问题定义。"""
@@ -37,20 +87,64 @@ class SchedulingProblem:
         self.teachers: List[Teacher] = []
         self.constraints: List[Constraint] = []
         self.existing_assignments: List[Assignment] = []
+        # 可分配的教室及班级（提供教室时启用教室分配）
+        self.rooms: List[Room] = []
+        self.class_groups: List[ClassGroup] = []
         
         # 索引映射
         self.section_to_idx: Dict[UUID, int] = {}
         self.timeslot_to_idx: Dict[UUID, int] = {}
         self.teacher_to_idx: Dict[UUID, int] = {}
+        self.room_to_idx: Dict[UUID, int] = {}
+        self.class_group_to_idx: Dict[UUID, int] = {}
+
+        # 预计算索引（build_model时构建，供所有约束构建器共享）
+        self.index: Optional[ProblemIndex] = None
+        # 教学段与教室的兼容索引（未提供教室时为None，沿用教学段指定的教室）
+        self.room_index: Optional[RoomCompatibilityIndex] = None
+
+        # 诊断模式：求解器判定无解时提取冲突约束组（按问题指纹缓存到 diagnosis_cache）
+        self.diagnose_infeasible: bool = False
+        self.diagnosis_cache: Optional[SolutionCache] = None
+        self.infeasibility_core: Optional[InfeasibilityCore] = None
         
-        # 变量
-        self.assignment_vars: List[List[cp_model.IntVar]] = []
-        self.teacher_timeslot_vars: List[List[cp_model.IntVar]] = []
-        self.room_timeslot_vars: List[List[cp_model.IntVar]] = []
+        # 变量：只为候选时间段创建的稀疏分配变量
+        self.section_domains: List[List[int]] = []
+        self.assignment_vars: SparseAssignmentVars = SparseAssignmentVars(0, 0)
+        self.phase1_vars: Optional[SparseAssignmentVars] = None
         
         # 求解器
         self.model: Optional[CpModel] = None
         self.solver: Optional[CpSolver] = None
+        # 最终解的紧凑表示（求解结束时提取一次，业务指标基于它计算）
+        self.solution: Optional[SolutionVector] = None
+        # 阶段2首次达到各间隙阈值的耗时（秒），供求解时间预测
+        self.time_to_gap: Dict[float, float] = {}
+
+        # 提前停止条件（用于 solve 和阶段2），以及最近一次求解结束的原因
+        self.stopping_criteria: Optional[StoppingCriteria] = None
+        self.stop_reason: Optional[str] = None
+
+        # LNS结果（求解过程中随每次改进更新，可随时读取当前最优解）
+        self.lns_result: Optional[LNSResult] = None
+        # 求解器组合结果（记录胜出的参数配置）
+        self.portfolio_result: Optional[PortfolioResult] = None
+        # 多样化解池结果
+        self.pool_result: Optional[PoolResult] = None
+
+        # 当前最优解快照（求解过程中随每个改进解更新）
+        self.incumbent = IncumbentStore()
+
+        # 取消令牌（取消时停止搜索并返回当前最优解）
+        self.cancel_token: Optional[CancellationToken] = None
+
+        # 软约束权重（模型和课表评估器共用）
+        self.soft_weights: Dict[str, float] = dict(SOFT_CONSTRAINT_WEIGHTS)
+
+        # 对称性破除：对可互换的教学段按时间段下标添加字典序约束。
+        # 效果因实例而异（CP-SAT预处理自身也会检测部分对称性），默认关闭
+        self.symmetry_breaking = False
+        self.symmetry_classes: List[List[int]] = []
     
     def add_section(self, section: Section) -> None:
         """添加教学段。"""
@@ -70,6 +164,18 @@ class SchedulingProblem:
             self.teacher_to_idx[teacher.id] = len(self.teachers)
             self.teachers.append(teacher)
     
+    def add_room(self, room: Room) -> None:
+        """添加教室。"""
+        if room.id not in self.room_to_idx:
+            self.room_to_idx[room.id] = len(self.rooms)
+            self.rooms.append(room)
+
+    def add_class_group(self, class_group: ClassGroup) -> None:
+        """添加班级（用于按班级人数匹配教室容量）。"""
+        if class_group.id not in self.class_group_to_idx:
+            self.class_group_to_idx[class_group.id] = len(self.class_groups)
+            self.class_groups.append(class_group)
+    
     def add_constraint(self, constraint: Constraint) -> None:
         """添加约束。"""
         self.constraints.append(constraint)
@@ -81,105 +187,252 @@ class SchedulingProblem:
     def build_model(self) -> None:
         """构建CP-SAT模型。"""
         self.model = CpModel()
+        self.index = self._build_index()
+        self.incumbent.clear()
         self._create_variables()
+        self.symmetry_classes = self._find_symmetry_classes() if self.symmetry_breaking else []
         self._add_hard_constraints()
         self._add_soft_constraints()
         self._add_objective()
     
+    def build_or_load_model(self, store: ModelStore) -> bool:
+        """按问题指纹从快照恢复模型，没有快照时构建并保存。返回是否从快照恢复。"""
+        fingerprint = fingerprint_problem(self)
+        snapshot = load_snapshot(store, fingerprint, self.symmetry_breaking, self.soft_weights)
+        if snapshot is not None and self.restore_model(snapshot):
+            logger.info(f"调度问题 {fingerprint.digest} 从快照恢复模型")
+            return True
+        self.build_model()
+        save_model(self, store, fingerprint)
+        return False
+
+    def restore_model(self, snapshot: ModelSnapshot) -> bool:
+        """从快照恢复模型及变量映射，教学段或时间段与快照不一致时返回False。"""
+        section_map = [self.section_to_idx.get(UUID(section_id)) for section_id in snapshot.section_ids]
+        timeslot_map = [self.timeslot_to_idx.get(UUID(timeslot_id)) for timeslot_id in snapshot.timeslot_ids]
+        if (
+            len(section_map) != len(self.sections) or None in section_map
+            or len(timeslot_map) != len(self.timeslots) or None in timeslot_map
+        ):
+            return False
+
+        self.model = snapshot.to_model()
+        self.index = self._build_index()
+        self.incumbent.clear()
+
+        # 快照中的下标按构建时的实体顺序，映射到当前问题的下标
+        # 直接按proto下标构造变量句柄，跳过 GetBoolVarFromProtoIndex 的逐个类型检查
+        proto = self.model.Proto()
+        self.assignment_vars = SparseAssignmentVars(len(self.sections), len(self.timeslots))
+        self.section_domains = [[] for _ in self.sections]
+        for i, j, var_index in snapshot.assignment_vars:
+            i, j = section_map[i], timeslot_map[j]
+            self.assignment_vars.add(i, j, cp_model.IntVar(proto, var_index))
+            self.section_domains[i].append(j)
+
+        self.penalty_terms = {
+            name: [(coef, self.model.GetIntVarFromProtoIndex(var_index)) for coef, var_index in terms]
+            for name, terms in snapshot.penalty_terms.items()
+        }
+        self._penalty_upper = dict(snapshot.penalty_upper)
+        self.penalty_vars = {
+            name: self.model.GetIntVarFromProtoIndex(var_index)
+            for name, var_index in snapshot.penalty_vars.items()
+        }
+        self.symmetry_classes = [[section_map[i] for i in members] for members in snapshot.symmetry_classes]
+        return True
+
     def _create_variables(self) -> None:
         """创建决策变量。"""
-        num_sections = len(self.sections)
         num_timeslots = len(self.timeslots)
-        
-        # 分配变量：assignment_vars[i][j] = 1 表示教学段i分配到时间段j
-        self.assignment_vars = []
-        for i in range(num_sections):
-            row = []
-            for j in range(num_timeslots):
-                var = self.model.NewBoolVar(f"assignment_{i}_{j}")
-                row.append(var)
-            self.assignment_vars.append(row)
-        
-        # 教师时间段变量：teacher_timeslot_vars[t][j] = 1 表示教师t在时间段j有课
-        self.teacher_timeslot_vars = []
-        for t in range(len(self.teachers)):
-            row = []
-            for j in range(num_timeslots):
-                var = self.model.NewBoolVar(f"teacher_timeslot_{t}_{j}")
-                row.append(var)
-            self.teacher_timeslot_vars.append(row)
-        
-        # 教室时间段变量：room_timeslot_vars[r][j] = 1 表示教室r在时间段j被使用
-        # 这里简化处理，实际应该考虑教室容量和特性匹配
-        self.room_timeslot_vars = []
-        # TODO: 实现教室分配逻辑
-    
-    def _add_hard_constraints(self) -> None:
-        """添加硬约束。"""
-        num_sections = len(self.sections)
+
+        # 分配变量：只为每个教学段的候选时间段创建，(i, j) = 1 表示教学段i分配到时间段j
+        self.section_domains = self._compute_section_domains()
+        self.assignment_vars = SparseAssignmentVars.create(
+            self.model, self.section_domains, num_timeslots
+        )
+
+        dense_count = len(self.sections) * num_timeslots
+        if dense_count:
+            logger.info(
+                f"创建分配变量 {len(self.assignment_vars)} 个"
+                f"（稠密模型需 {dense_count} 个，剪枝 {1 - len(self.assignment_vars) / dense_count:.1%}）"
+            )
+
+        # 教室不单独建变量：兼容教室由教室容量组约束（见 rooms 模块），求解后再匹配具体教室
+
+    def _compute_section_domains(self) -> List[List[int]]:
+        """计算每个教学段可能分配的时间段下标。
+
+        剪除休息时间段、教师不可用的时间段，以及被锁定分配占用的同一教师、班级或教室的时间段；
+        锁定的教学段只保留其锁定的时间段。
+        """
         num_timeslots = len(self.timeslots)
-        
-        # 约束1：每个教学段必须且只能分配到一个时间段
-        for i in range(num_sections):
-            self.model.AddExactlyOne(self.assignment_vars[i])
-        
-        # 约束2：每个时间段最多只能分配一个教学段（简化处理，实际应该考虑教室）
-        for j in range(num_timeslots):
-            section_vars = [self.assignment_vars[i][j] for i in range(num_sections)]
-            self.model.Add(sum(section_vars) <= 1)
-        
-        # 约束3：教师不能在同一时间段教授多个教学段
-        for t_idx, teacher in enumerate(self.teachers):
-            for j in range(num_timeslots):
-                # 找出该教师的所有教学段
-                teacher_sections = [
-                    i for i, section in enumerate(self.sections)
-                    if section.teacher_id == teacher.id
-                ]
-                if teacher_sections:
-                    teacher_timeslot_vars = [
-                        self.assignment_vars[i][j] for i in teacher_sections
-                    ]
-                    self.model.Add(sum(teacher_timeslot_vars) <= 1)
-        
-        # 约束4：班级不能在同一时间段有多个教学段
-        class_groups = {}
+        usable_slots = [j for j, timeslot in enumerate(self.timeslots) if not timeslot.is_break]
+        self._get_index()
+        room_index = self.room_index
+
+        # 锁定分配：教学段 -> 锁定时间段
+        locked = self._locked_timeslots()
+
+        # 被锁定分配占用的时间段对同一教师、同一班级、同一教室的其他教学段不可用
+        # （启用教室分配时，未指定教室的教学段不共用隐含教室，由教室容量组约束）
+        consumed_slots: Dict[Tuple[str, Optional[UUID]], Set[int]] = {}
+        for i, j in locked.items():
+            section = self.sections[i]
+            consumed_slots.setdefault(("teacher", section.teacher_id), set()).add(j)
+            consumed_slots.setdefault(("class_group", section.class_group_id), set()).add(j)
+            if section.room_id is not None or room_index is None:
+                consumed_slots.setdefault(("room", section.room_id), set()).add(j)
+
+        teacher_slots = self._teacher_available_timeslots(usable_slots)
+
+        domains = []
         for i, section in enumerate(self.sections):
-            if section.class_group_id not in class_groups:
-                class_groups[section.class_group_id] = []
-            class_groups[section.class_group_id].append(i)
-        
-        for class_group_id, section_indices in class_groups.items():
-            for j in range(num_timeslots):
-                class_timeslot_vars = [
-                    self.assignment_vars[i][j] for i in section_indices
-                ]
-                self.model.Add(sum(class_timeslot_vars) <= 1)
-        
-        # 约束5：处理现有分配（锁定的分配）
+            if i in locked:
+                domains.append([locked[i]])
+                continue
+
+            domain = teacher_slots.get(section.teacher_id, usable_slots)
+            consumed = set().union(
+                consumed_slots.get(("teacher", section.teacher_id), ()),
+                consumed_slots.get(("class_group", section.class_group_id), ()),
+                consumed_slots.get(("room", section.room_id), ()),
+            )
+            if room_index is not None and not room_index.compatible[i]:
+                domain = []
+            elif consumed:
+                domain = [j for j in domain if j not in consumed]
+            else:
+                domain = list(domain)
+            if not domain and num_timeslots:
+                logger.warning(f"教学段 {section.id} 没有可用的时间段")
+            domains.append(domain)
+
+        return domains
+
+    def _teacher_available_timeslots(self, usable_slots: List[int]) -> Dict[UUID, List[int]]:
+        """剔除教师不可用时间段（按开始时间匹配），每位教师只计算一次。"""
+        teacher_slots: Dict[UUID, List[int]] = {}
+        for teacher in self.teachers:
+            unavailable = set(teacher.unavailable_time_slots or [])
+            teacher_slots[teacher.id] = [
+                j for j in usable_slots if self.timeslots[j].start_time not in unavailable
+            ]
+        return teacher_slots
+
+    def _find_symmetry_classes(self) -> List[List[int]]:
+        """找出可互换教学段的等价类。
+
+        课程、班级、教师、教室等属性和候选时间段都相同的未锁定教学段（包括为表示每周课时
+        而手工复制的教学段）互相交换后得到等价的课表。
+        """
+        locked = self._locked_timeslots()
+        classes: Dict[Tuple[Any, ...], List[int]] = {}
+        for i, section in enumerate(self.sections):
+            if i in locked:
+                continue
+            key = (
+                section.course_id,
+                section.class_group_id,
+                section.teacher_id,
+                section.room_id,
+                section.period_type,
+                section.hours_per_week,
+                getattr(section, 'consecutive_hours', 1),
+                tuple(self.section_domains[i]),
+            )
+            classes.setdefault(key, []).append(i)
+
+        symmetry_classes = [members for members in classes.values() if len(members) > 1]
+        if symmetry_classes:
+            logger.info(
+                f"对称性破除：{len(symmetry_classes)} 个等价类，"
+                f"涉及 {sum(len(m) for m in symmetry_classes)} 个教学段"
+            )
+        return symmetry_classes
+
+    def _add_symmetry_breaking(self, model: CpModel, vars: SparseAssignmentVars) -> None:
+        """要求可互换教学段的时间段下标严格递增（同一班级的教学段不会共用时间段）。"""
+        for members in self.symmetry_classes:
+            slot_indices = []
+            for i in members:
+                slots = vars.by_section[i]
+                slot_indices.append(
+                    cp_model.LinearExpr.WeightedSum([var for _, var in slots], [j for j, _ in slots])
+                )
+            for previous, current in zip(slot_indices, slot_indices[1:]):
+                model.Add(previous < current)
+
+    def canonicalize_solution(self, solution: Dict[int, int]) -> Dict[int, int]:
+        """在每个等价类内按教学段顺序重新分配时间段，得到满足对称性约束的等价解。"""
+        if not self.symmetry_classes:
+            return solution
+
+        canonical = dict(solution)
+        for members in self.symmetry_classes:
+            assigned = [i for i in members if i in solution]
+            for i, j in zip(assigned, sorted(solution[i] for i in assigned)):
+                canonical[i] = j
+        return canonical
+
+    def _locked_timeslots(self) -> Dict[int, int]:
+        """获取锁定分配的 {教学段下标: 时间段下标}。"""
+        locked: Dict[int, int] = {}
         for assignment in self.existing_assignments:
             if assignment.is_locked:
                 section_idx = self.section_to_idx.get(assignment.section_id)
                 timeslot_idx = self.timeslot_to_idx.get(assignment.timeslot_id)
                 if section_idx is not None and timeslot_idx is not None:
-                    self.model.Add(self.assignment_vars[section_idx][timeslot_idx] == 1)
+                    locked[section_idx] = timeslot_idx
+        return locked
+
+    def diagnose(self, time_limit: float = 10.0) -> InfeasibilityCore:
+        """诊断问题无解的原因（单独的短时求解，结果按问题指纹缓存）。"""
+        self.infeasibility_core = diagnose_infeasibility(self, time_limit, self.diagnosis_cache)
+        return self.infeasibility_core
+
+    def _diagnose_if_enabled(self) -> bool:
+        """诊断模式下诊断无解原因，返回是否进行了诊断。"""
+        if not self.diagnose_infeasible or self.is_cancelled():
+            return False
+        self.diagnose()
+        return True
+
+    def _add_hard_constraints(self) -> None:
+        """添加硬约束。"""
+        self._add_phase1_hard_constraints(self.model, self.assignment_vars)
     
+    def _build_index(self) -> ProblemIndex:
+        """构建预计算索引；提供了教室时先构建教室兼容索引，以其容量组代替按教室ID的分组。"""
+        self.room_index = (
+            RoomCompatibilityIndex.build(self.sections, self.rooms, self.class_groups)
+            if self.rooms else None
+        )
+        room_groups = self.room_index.groups if self.room_index is not None else None
+        return ProblemIndex.build(self.sections, self.timeslots, room_groups)
+
+    def _get_index(self) -> ProblemIndex:
+        """获取预计算索引，未构建时按当前数据构建。"""
+        if self.index is None:
+            self.index = self._build_index()
+        return self.index
+
+    @staticmethod
+    def _scaled_weight(weight: float) -> int:
+        """将浮点权重缩放为整数系数。"""
+        return max(1, int(round(weight * WEIGHT_SCALE)))
+
     def _add_soft_constraints(self) -> None:
-        """添加软约束及其惩罚变量。"""
+        """添加软约束：每处违反对应一个指示变量（或超出量变量），记录在 penalty_terms 中。"""
         if not self.model:
             return
 
-        # 软约束权重配置
-        weights = {
-            'teacher_preference': 0.8,
-            'room_preference': 0.6,
-            'balanced_distribution': 0.7,
-            'compact_schedule': 0.5,
-            'consecutive_classes': 0.4
-        }
+        weights = self.soft_weights
 
-        # 创建惩罚变量
-        self.penalty_vars = {}
+        # 每类软约束的 (整数系数, 违反变量) 列表
+        self.penalty_terms: Dict[str, List[Tuple[int, cp_model.IntVar]]] = {}
+        self._penalty_upper: Dict[str, int] = {}
 
         # 1. 教师偏好时间段约束
         self._add_teacher_preference_constraints(weights['teacher_preference'])
@@ -196,208 +449,174 @@ class SchedulingProblem:
         # 5. 连续课程约束
         self._add_consecutive_classes_constraints(weights['consecutive_classes'])
 
+        # 每类软约束的惩罚变量等于其违反变量的加权和
+        self.penalty_vars = {}
+        for name, terms in self.penalty_terms.items():
+            penalty_var = self.model.NewIntVar(0, self._penalty_upper.get(name, 0), f"{name}_penalty")
+            if terms:
+                self.model.Add(penalty_var == cp_model.LinearExpr.WeightedSum(
+                    [var for _, var in terms], [coef for coef, _ in terms]
+                ))
+            self.penalty_vars[name] = penalty_var
+
+    def _add_penalty(self, name: str, var: cp_model.IntVar, coef: int, upper: int = 1) -> None:
+        """登记一个软约束违反变量（upper 为其取值上界）。"""
+        self.penalty_terms.setdefault(name, []).append((coef, var))
+        self._penalty_upper[name] = self._penalty_upper.get(name, 0) + coef * upper
+
     def _add_teacher_preference_constraints(self, weight: float) -> None:
-        """添加教师偏好时间段软约束。"""
-        penalty_var = self.model.NewIntVar(0, 1000, "teacher_preference_penalty")
-        self.penalty_vars['teacher_preference'] = penalty_var
+        """添加教师偏好时间段软约束：每个安排在非偏好时间段的教学段计一次违反。"""
+        self.penalty_terms.setdefault('teacher_preference', [])
 
-        # 为每个教师的非偏好时间段创建惩罚
-        for t_idx, teacher in enumerate(self.teachers):
+        index = self._get_index()
+        coef = self._scaled_weight(weight)
+
+        for teacher in self.teachers:
             if hasattr(teacher, 'preferred_time_slots') and teacher.preferred_time_slots:
                 preferred_slots = set(teacher.preferred_time_slots)
+                teacher_sections = index.sections_of_teacher(teacher.id)
+                if not teacher_sections:
+                    continue
 
-                for j, timeslot in enumerate(self.timeslots):
-                    # 检查当前时间段是否是教师偏好时间段
-                    timeslot_key = f"{timeslot.day_of_week}_{timeslot.start_time}"
-                    is_preferred = timeslot_key in preferred_slots
-
-                    if not is_preferred:
-                        # 找出该教师在这个时间段的所有教学段
-                        teacher_sections = [
-                            i for i, section in enumerate(self.sections)
-                            if section.teacher_id == teacher.id
-                        ]
-
-                        if teacher_sections:
-                            # 如果在非偏好时间段分配课程，增加惩罚
-                            non_pref_assignments = [
-                                self.assignment_vars[i][j] for i in teacher_sections
-                            ]
-                            if non_pref_assignments:
-                                self.model.Add(penalty_var >= sum(non_pref_assignments) * weight)
+                # 只遍历该教师实际存在变量的时间段，分配变量本身即为违反指示变量
+                slot_vars = self.assignment_vars.vars_by_timeslot(teacher_sections)
+                for j, non_pref_assignments in slot_vars.items():
+                    if self.timeslots[j].start_time not in preferred_slots:
+                        for var in non_pref_assignments:
+                            self._add_penalty('teacher_preference', var, coef)
 
     def _add_room_capacity_constraints(self, weight: float) -> None:
-        """添加教室容量匹配软约束。"""
-        penalty_var = self.model.NewIntVar(0, 1000, "room_capacity_penalty")
-        self.penalty_vars['room_capacity'] = penalty_var
+        """教室容量匹配软约束。
 
-        # 检查教室容量与学生数量的匹配度
-        for i, section in enumerate(self.sections):
-            class_size = section.class_group.student_count if hasattr(section, 'class_group') else 30
+        教室不进入时间段模型：只为兼容（容量足够、类型和特性满足要求）的教室建立关联，
+        求解后的教室分配以最小空余座位数为目标，因此这里不产生惩罚项。
+        """
+        self.penalty_terms.setdefault('room_capacity', [])
 
-            # 寻找合适的教室（容量>=班级人数的最小教室）
-            suitable_rooms = [
-                room for room in getattr(self, 'rooms', [])
-                if room.capacity >= class_size
-            ]
+    def _add_balanced_distribution_constraints(self, weight: float) -> None:
+        """添加课程分布均匀性软约束：每个班级每天超出平均课程数的部分计为违反。"""
+        self.penalty_terms.setdefault('balanced_distribution', [])
 
-            if suitable_rooms:
-                # 最小合适容量
-                min_suitable_capacity = min(room.capacity for room in suitable_rooms)
+        index = self._get_index()
+        coef = self._scaled_weight(weight)
+        num_days = len(index.day_timeslots)
 
-                for j, timeslot in enumerate(self.timeslots):
-                    # 如果分配的教室过大，增加惩罚
-                    # 这里简化处理，实际应该考虑具体的教室分配逻辑
-                    capacity_waste_penalty = max(0, min_suitable_capacity - class_size) * 0.1
-                    self.model.Add(penalty_var >=
-                                   self.assignment_vars[i][j] * capacity_waste_penalty * weight)
+        for class_group_id, section_indices in index.class_group_sections.items():
+            if len(section_indices) > 2 and num_days > 1:
+                # 每个教学段恰好分配一次，因此每天的平均课程数是常量
+                mean_count = -(-len(section_indices) // num_days)
 
-    def _add_balanced_distribution_constraints(self, weight: float) -> None:
-        """添加课程分布均匀性软约束。"""
-        penalty_var = self.model.NewIntVar(0, 1000, "balanced_distribution_penalty")
-        self.penalty_vars['balanced_distribution'] = penalty_var
+                daily_sections: Dict[Any, List[cp_model.IntVar]] = {}
+                for j, slot_vars in self.assignment_vars.vars_by_timeslot(section_indices).items():
+                    daily_sections.setdefault(index.timeslot_day[j], []).extend(slot_vars)
 
-        # 确保每个班级的课程在一周内均匀分布
-        class_groups = {}
-        for i, section in enumerate(self.sections):
-            if section.class_group_id not in class_groups:
-                class_groups[section.class_group_id] = []
-            class_groups[section.class_group_id].append(i)
-
-        for class_group_id, section_indices in class_groups.items():
-            if len(section_indices) > 2:
-                # 计算每天的课程数量偏差
-                daily_counts = {}
-                for day in range(1, 6):  # 周一到周五
-                    daily_sections = []
-                    for i in section_indices:
-                        for j, timeslot in enumerate(self.timeslots):
-                            if timeslot.day_of_week == day:
-                                daily_sections.append(self.assignment_vars[i][j])
-
-                    if daily_sections:
-                        daily_counts[day] = sum(daily_sections)
-
-                if len(daily_counts) > 1:
-                    # 计算标准差作为均匀性度量
-                    mean_count = sum(daily_counts.values()) / len(daily_counts)
-                    variance = sum((count - mean_count) ** 2 for count in daily_counts.values()) / len(daily_counts)
-
-                    # 将方差转换为惩罚
-                    self.model.Add(penalty_var >= variance * weight * 0.1)
+                for day, day_vars in daily_sections.items():
+                    if len(day_vars) > mean_count:
+                        upper = len(day_vars) - mean_count
+                        excess = self.model.NewIntVar(0, upper, f"excess_{class_group_id}_{day}")
+                        self.model.Add(excess >= sum(day_vars) - mean_count)
+                        self._add_penalty('balanced_distribution', excess, coef, upper)
 
     def _add_compact_schedule_constraints(self, weight: float) -> None:
-        """添加紧凑课表软约束（避免过多空档）。"""
-        penalty_var = self.model.NewIntVar(0, 1000, "compact_schedule_penalty")
-        self.penalty_vars['compact_schedule'] = penalty_var
-
-        # 为每个班级计算紧凑性惩罚
-        class_groups = {}
+        """添加紧凑课表软约束：班级相邻时间段有课状态不同时计一次违反。"""
+        self.penalty_terms.setdefault('compact_schedule', [])
+
+        index = self._get_index()
+        coef = self._scaled_weight(weight)
+
+        for class_group_id, section_indices in index.class_group_sections.items():
+            slot_vars = self.assignment_vars.vars_by_timeslot(section_indices)
+
+            # 为每个工作日计算紧凑性（按时间排序的时间段）
+            for day, day_slots in index.day_timeslots.items():
+                if len(day_slots) > 2:
+                    # 班级在当天各时间段是否有课；同一班级每个时间段最多一节课（硬约束4），
+                    # 因此有课指示变量等于该时间段分配变量之和
+                    occupied = []
+                    for j in day_slots:
+                        if j in slot_vars:
+                            occ = self.model.NewBoolVar(f"class_occupied_{class_group_id}_{j}")
+                            self.model.Add(occ == sum(slot_vars[j]))
+                            occupied.append(occ)
+                        else:
+                            occupied.append(None)
+
+                    for k in range(len(day_slots) - 1):
+                        has_current = occupied[k]
+                        has_next = occupied[k + 1]
+                        if has_current is None and has_next is None:
+                            continue
+
+                        gap = self.model.NewBoolVar(f"gap_{class_group_id}_{day}_{k}")
+                        if has_current is None:
+                            self.model.AddImplication(has_next, gap)
+                        elif has_next is None:
+                            self.model.AddImplication(has_current, gap)
+                        else:
+                            # gap >= |has_current - has_next|
+                            self.model.AddBoolOr([has_current.Not(), has_next, gap])
+                            self.model.AddBoolOr([has_current, has_next.Not(), gap])
+                        self._add_penalty('compact_schedule', gap, coef)
+
+    def _consecutive_links(self) -> List[Tuple[int, int]]:
+        """需要连堂的相邻课时 (前一课时教学段下标, 后一课时教学段下标)。
+
+        分配变量模型中每个教学段只占一个时间段，连堂课（consecutive_hours > 1）以课程、班级、
+        教师相同的多个教学段表示每周课时：按下标顺序每 consecutive_hours 个组成一个课块，
+        课块内前后两个教学段构成一条连堂链接。
+        """
+        groups: Dict[Tuple[Any, ...], List[int]] = {}
         for i, section in enumerate(self.sections):
-            if section.class_group_id not in class_groups:
-                class_groups[section.class_group_id] = []
-            class_groups[section.class_group_id].append(i)
-
-        for class_group_id, section_indices in class_groups.items():
-            # 为每个工作日计算紧凑性
-            for day in range(1, 6):  # 周一到周五
-                day_timeslots = [
-                    (j, timeslot) for j, timeslot in enumerate(self.timeslots)
-                    if timeslot.day_of_week == day
-                ]
-
-                if len(day_timeslots) > 2:
-                    # 按时间排序
-                    day_timeslots.sort(key=lambda x: x[1].start_time)
-
-                    # 计算空档惩罚
-                    for k in range(len(day_timeslots) - 1):
-                        current_j, current_timeslot = day_timeslots[k]
-                        next_j, next_timeslot = day_timeslots[k + 1]
-
-                        # 如果有课程在相邻时间段，减少惩罚
-                        has_current = False
-                        has_next = False
-
-                        for i in section_indices:
-                            has_current = has_current or self.assignment_vars[i][current_j]
-                            has_next = has_next or self.assignment_vars[i][next_j]
-
-                        # 如果只有其中一个时间段有课，增加空档惩罚
-                        gap_penalty = self.model.NewBoolVar(f"gap_penalty_{class_group_id}_{day}_{k}")
-                        self.model.AddImplication(has_current & ~has_next, gap_penalty)
-                        self.model.AddImplication(~has_current & has_next, gap_penalty)
-
-                        self.model.Add(penalty_var >= gap_penalty * weight)
+            if section.consecutive_hours > 1:
+                key = (section.course_id, section.class_group_id, section.teacher_id, section.consecutive_hours)
+                groups.setdefault(key, []).append(i)
+
+        links = []
+        for (_, _, _, size), members in groups.items():
+            for k in range(0, len(members), size):
+                block = members[k:k + size]
+                links.extend(zip(block, block[1:]))
+        return links
 
     def _add_consecutive_classes_constraints(self, weight: float) -> None:
-        """添加连续课程软约束。"""
-        penalty_var = self.model.NewIntVar(0, 1000, "consecutive_classes_penalty")
-        self.penalty_vars['consecutive_classes'] = penalty_var
+        """添加连续课程软约束：连堂课块中后一课时没有紧接在前一课时之后时计一次违反。"""
+        self.penalty_terms.setdefault('consecutive_classes', [])
 
-        # 为需要连续安排的课程设置约束
-        for i, section in enumerate(self.sections):
-            # 检查是否需要连续安排（例如：实验课、双课时课程等）
-            needs_consecutive = getattr(section, 'needs_consecutive', False)
-            consecutive_hours = getattr(section, 'consecutive_hours', 1)
-
-            if needs_consecutive and consecutive_hours > 1:
-                # 寻找连续的时间段
-                consecutive_slot_pairs = []
-                for j in range(len(self.timeslots) - 1):
-                    current_timeslot = self.timeslots[j]
-                    next_timeslot = self.timeslots[j + 1]
-
-                    # 检查是否是连续的时间段
-                    if (current_timeslot.day_of_week == next_timeslot.day_of_week and
-                        self._is_times_consecutive(current_timeslot, next_timeslot)):
-                        consecutive_slot_pairs.append((j, j + 1))
-
-                # 如果没有连续分配，增加惩罚
-                if consecutive_slot_pairs:
-                    consecutive_assignment = self.model.NewBoolVar(f"consecutive_{i}")
-
-                    # 至少有一对连续时间段被分配
-                    consecutive_constraints = []
-                    for j1, j2 in consecutive_slot_pairs:
-                        consecutive_constraints.append(
-                            self.assignment_vars[i][j1] & self.assignment_vars[i][j2]
-                        )
-
-                    if consecutive_constraints:
-                        self.model.AddBoolOr(consecutive_constraints).OnlyEnforceIf(consecutive_assignment)
-
-                        # 如果没有连续分配，增加惩罚
-                        self.model.Add(penalty_var >= (1 - consecutive_assignment) * weight * 10)
-
-    def _is_times_consecutive(self, timeslot1: Timeslot, timeslot2: Timeslot) -> bool:
-        """检查两个时间段是否连续。"""
-        try:
-            # 解析时间字符串
-            end_time1 = datetime.strptime(timeslot1.end_time, "%H:%M")
-            start_time2 = datetime.strptime(timeslot2.start_time, "%H:%M")
-
-            # 检查是否连续或相差一个休息时间段（如10分钟）
-            time_diff = (start_time2 - end_time1).total_seconds() / 60  # 分钟差
-
-            # 允许最多30分钟的间隔（考虑课间休息）
-            return 0 <= time_diff <= 30
-        except (ValueError, AttributeError):
-            return False
-    
-    def _add_objective(self) -> None:
-        """添加目标函数：最小化软约束惩罚的总和。"""
-        if not self.model or not hasattr(self, 'penalty_vars'):
+        links = self._consecutive_links()
+        if not links:
             return
 
-        # 计算总惩罚
-        total_penalty = sum(self.penalty_vars.values())
+        # 同一天内前后相接的时间段（由时间段编码表给出）
+        consecutive_slot_pairs = self._get_index().timeslot_table.consecutive_pairs()
+        coef = self._scaled_weight(weight * 10)
+
+        for a, b in links:
+            pair_vars = []
+            for j1, j2 in consecutive_slot_pairs:
+                var1 = self.assignment_vars.get(a, j1)
+                var2 = self.assignment_vars.get(b, j2)
+                if var1 is None or var2 is None:
+                    continue
+                pair_var = self.model.NewBoolVar(f"consecutive_{a}_{b}_{j1}_{j2}")
+                self.model.AddImplication(pair_var, var1)
+                self.model.AddImplication(pair_var, var2)
+                pair_vars.append(pair_var)
+
+            # 没有任何一对连续时间段同时分配给两个课时时违反
+            missing = self.model.NewBoolVar(f"consecutive_missing_{a}_{b}")
+            self.model.AddBoolOr(pair_vars + [missing])
+            self._add_penalty('consecutive_classes', missing, coef)
 
-        # 设置目标函数：最小化总惩罚
-        self.model.Minimize(total_penalty)
+    def _add_objective(self) -> None:
+        """添加目标函数：最小化所有软约束违反的加权和。"""
+        if not self.model or not hasattr(self, 'penalty_terms'):
+            return
 
-        # 可选：也可以设置最大化约束满足的数量
-        # 这里简化处理，只使用惩罚最小化
+        # 直接对违反变量加权求和，使线性松弛能给出有效的下界
+        terms = [term for category in self.penalty_terms.values() for term in category]
+        self.model.Minimize(cp_model.LinearExpr.WeightedSum(
+            [var for _, var in terms], [coef for coef, _ in terms]
+        ))
 
     def get_constraint_violations(self) -> Dict[str, Any]:
         """获取约束违反情况统计。"""
@@ -406,12 +625,18 @@ class SchedulingProblem:
 
         violations = {}
         total_penalty = 0
+        penalty_terms = getattr(self, 'penalty_terms', {})
+        values = solver_values(self.solver)
+        if len(values) == 0:
+            # 求解器没有找到解
+            return {}
 
         for constraint_name, penalty_var in self.penalty_vars.items():
-            penalty_value = self.solver.Value(penalty_var)
+            penalty_value = int(values[penalty_var.Index()])
+            term_indices = [var.Index() for _, var in penalty_terms.get(constraint_name, [])]
             violations[constraint_name] = {
                 'penalty_value': penalty_value,
-                'violations_count': int(penalty_value)  # 简化的违反计数
+                'violations_count': int(values[term_indices].sum()) if term_indices else 0,
             }
             total_penalty += penalty_value
 
@@ -427,14 +652,14 @@ class SchedulingProblem:
 
         # 基本求解器指标
         basic_metrics = {
-            'status': self.solver.StatusName(),
+            'status': self.solver.StatusName(self.solver.response_proto.status),
             'objective_value': self.solver.ObjectiveValue(),
             'best_bound': self.solver.BestObjectiveBound(),
             'wall_time': self.solver.WallTime(),
             'num_conflicts': self.solver.NumConflicts(),
             'num_branches': self.solver.NumBranches(),
             'num_booleans': self.solver.NumBooleans(),
-            'num_propagations': self.solver.NumPropagations()
+            'num_propagations': self.solver.response_proto.num_binary_propagations
         }
 
         # 约束违反情况
@@ -458,12 +683,10 @@ class SchedulingProblem:
         }
 
         # 统计已安排的教学段
-        if hasattr(self, 'assignment_vars') and self.solver:
-            for i, section in enumerate(self.sections):
-                for j, timeslot in enumerate(self.timeslots):
-                    if self.solver.Value(self.assignment_vars[i][j]) == 1:
-                        metrics['scheduled_sections'] += 1
-                        break
+        solution = self.current_solution()
+        if solution is not None:
+            metrics['scheduled_sections'] = solution.num_scheduled
+            scheduled = solution.timeslots >= 0
 
         # 计算教师利用率
         for teacher in self.teachers:
@@ -471,12 +694,10 @@ class SchedulingProblem:
             scheduled_hours = 0
             max_hours = teacher.max_hours_per_week if hasattr(teacher, 'max_hours_per_week') else 20
 
-            if hasattr(self, 'assignment_vars') and self.solver:
-                for i, section in enumerate(self.sections):
-                    if section.teacher_id == teacher.id:
-                        for j, timeslot in enumerate(self.timeslots):
-                            if self.solver.Value(self.assignment_vars[i][j]) == 1:
-                                scheduled_hours += 1  # 每个时间段算1小时
+            if solution is not None:
+                members = self._get_index().sections_of_teacher(teacher.id)
+                # 每个时间段算1小时
+                scheduled_hours = int(np.count_nonzero(scheduled[members])) if members else 0
 
             utilization_rate = (scheduled_hours / max_hours * 100) if max_hours > 0 else 0
             metrics['teacher_utilization'][teacher_id] = {
@@ -496,17 +717,45 @@ class SchedulingProblem:
         ) if metrics['teacher_utilization'] else 0
 
         return metrics
+
+    def current_solution(self) -> Optional[SolutionVector]:
+        """最终解的紧凑表示，尚未提取时从求解器响应中提取。"""
+        if self.solution is None and self.solver is not None:
+            self.solution = SolutionVector.from_solver(self.solver, self.assignment_vars)
+        return self.solution
     
-    def solve(self, time_limit: int = 300) -> Tuple[bool, List[Assignment]]:
-        """求解调度问题。"""
+    def solve(
+        self,
+        time_limit: int = 300,
+        lns_config: Optional[LNSConfig] = None,
+        on_progress: Optional[ProgressHandler] = None,
+    ) -> Tuple[bool, List[Assignment]]:
+        """求解调度问题。
+
+        传入 lns_config 时以贪心构造解为起点执行大邻域搜索，否则整体求解一次。
+        每个改进解都会更新 incumbent 快照，并调用 on_progress 发布进度。
+        """
         if self.model is None:
             raise RuntimeError("模型未构建，请先调用 build_model()")
 
+        self.solution = None
+        self.stop_reason = None
+        if lns_config is not None:
+            initial_solution = self.construct_initial_solution().as_dict()
+            return self._solve_lns(initial_solution, time_limit, lns_config, on_progress)
+
         self.solver = CpSolver()
         self.solver.parameters.max_time_in_seconds = time_limit
+        callback = SolutionProgressCallback(
+            self.assignment_vars, time_limit, self.incumbent, on_progress,
+            stopping=self.stopping_criteria,
+        )
 
         logger.info(f"开始求解调度问题，时间限制: {time_limit}秒")
-        status = self.solver.Solve(self.model)
+        with stop_on_cancel(self.solver, self.cancel_token), stop_on_plateau(self.solver, callback):
+            status = self.solver.Solve(self.model, callback)
+        self.stop_reason = callback.final_stop_reason(self.solver, status, self.is_cancelled())
+        logger.info(f"求解结束，原因: {self.stop_reason}")
 
         if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
             logger.info("找到可行解")
@@ -514,18 +763,31 @@ class SchedulingProblem:
             return True, assignments
         else:
             logger.warning("未找到可行解")
+            if status == cp_model.INFEASIBLE:
+                self._diagnose_if_enabled()
             return False, []
 
-    def solve_two_phase(self, phase1_time_limit: int = 60, phase2_time_limit: int = 240) -> Tuple[bool, List[Assignment], Dict[str, Any]]:
+    def solve_two_phase(
+        self,
+        phase1_time_limit: int = 60,
+        phase2_time_limit: int = 240,
+        lns_config: Optional[LNSConfig] = None,
+        on_progress: Optional[ProgressHandler] = None,
+        warm_start: Optional[List[Assignment]] = None,
+    ) -> Tuple[bool, List[Assignment], Dict[str, Any]]:
         """两阶段求解策略。
 
-        阶段1：快速找到可行解（只考虑硬约束）
-        阶段2：优化软约束（基于可行解进行改进）
+        阶段1：快速找到可行解（只考虑硬约束），优先使用贪心构造，失败时回退到CP-SAT
+        阶段2：优化软约束（基于可行解进行改进），传入 lns_config 时使用大邻域搜索
+        阶段1的解和阶段2的每个改进解都会写入 incumbent 快照。
+        warm_start 为相近问题的已有课表：其中仍然可行的分配保留下来，贪心构造只安排其余教学段。
         """
         if self.model is None:
             raise RuntimeError("模型未构建，请先调用 build_model()")
 
         logger.info("开始两阶段求解策略")
+        self.solution = None
+        self.stop_reason = None
         phase_metrics = {
             'phase1_status': 'not_started',
             'phase2_status': 'not_started',
@@ -540,32 +802,78 @@ class SchedulingProblem:
         logger.info(f"阶段1：寻找可行解，时间限制: {phase1_time_limit}秒")
         phase1_start = datetime.now()
 
-        # 创建只包含硬约束的模型
-        phase1_model = self._create_phase1_model()
-        phase1_solver = CpSolver()
-        phase1_solver.parameters.max_time_in_seconds = phase1_time_limit
-        phase1_solver.parameters.num_search_workers = 4  # 并行搜索加速
-
-        phase1_status = phase1_solver.Solve(phase1_model)
-        phase1_time = (datetime.now() - phase1_start).total_seconds()
-
-        phase_metrics['phase1_time'] = phase1_time
-        phase_metrics['phase1_status'] = phase1_solver.StatusName()
+        # 优先使用贪心构造，毫秒级得到初始解
+        seed = self._compatible_warm_start(warm_start) if warm_start else {}
+        construction = self.construct_initial_solution(seed)
+        if seed and not construction.is_complete:
+            logger.info("热启动课表无法补全，改为从头构造")
+            seed = {}
+            construction = self.construct_initial_solution()
+        phase_metrics['phase1_warm_start_reused'] = len(seed)
+        phase_metrics['phase1_construction_time'] = construction.elapsed
+        phase_metrics['phase1_unassigned'] = len(construction.unassigned)
 
         initial_assignments = []
-        if phase1_status == cp_model.OPTIMAL or phase1_status == cp_model.FEASIBLE:
+        if construction.is_complete:
+            logger.info(f"阶段1：贪心构造找到可行解，用时 {construction.elapsed * 1000:.1f}毫秒")
+            phase_metrics['phase1_method'] = 'greedy'
+            phase_metrics['phase1_status'] = 'FEASIBLE'
+            phase1_ok = True
+            initial_assignments = self._build_assignments(construction.as_dict())
+        else:
+            # 回退：创建只包含硬约束的CP-SAT模型，以贪心部分解作为提示
+            logger.info(f"阶段1：贪心构造有{len(construction.unassigned)}个教学段未安排，回退到CP-SAT")
+            phase_metrics['phase1_method'] = 'cp_sat'
+            phase1_model = self._create_phase1_model()
+            self._add_hints(phase1_model, self.phase1_vars, construction.as_dict())
+            phase1_solver = CpSolver()
+            phase1_solver.parameters.max_time_in_seconds = phase1_time_limit
+            phase1_solver.parameters.num_search_workers = 4  # 并行搜索加速
+
+            with stop_on_cancel(phase1_solver, self.cancel_token):
+                phase1_status = phase1_solver.Solve(phase1_model)
+            phase_metrics['phase1_status'] = phase1_solver.StatusName(phase1_status)
+            phase1_ok = phase1_status == cp_model.OPTIMAL or phase1_status == cp_model.FEASIBLE
+            if phase1_ok:
+                initial_assignments = self._extract_phase1_solution(phase1_solver)
+            elif phase1_status == cp_model.INFEASIBLE and self._diagnose_if_enabled():
+                phase_metrics.update(self.infeasibility_core.to_metrics())
+
+        phase_metrics['phase1_time'] = (datetime.now() - phase1_start).total_seconds()
+
+        if phase1_ok:
             logger.info("阶段1：找到可行解")
             phase_metrics['phase1_solution_found'] = True
-            initial_assignments = self._extract_phase1_solution(phase1_solver)
+            self.incumbent.update(self._assignments_to_solution(initial_assignments), None)
 
             # 阶段2：优化软约束
             logger.info(f"阶段2：优化软约束，时间限制: {phase2_time_limit}秒")
             phase2_start = datetime.now()
 
-            # 基于阶段1的解创建热启动模型
-            phase2_success, optimized_assignments = self._solve_phase2(
-                initial_assignments, phase2_time_limit
-            )
+            if self.is_cancelled():
+                # 已取消：跳过阶段2，直接使用阶段1的解
+                phase_metrics['phase2_method'] = 'skipped'
+                phase2_success, optimized_assignments = False, initial_assignments
+            elif lns_config is not None:
+                # 大邻域搜索：以阶段1的解为当前最优解反复重解局部邻域
+                phase_metrics['phase2_method'] = 'lns'
+                phase2_success, optimized_assignments = self._solve_lns(
+                    self._assignments_to_solution(initial_assignments),
+                    phase2_time_limit,
+                    lns_config,
+                    on_progress,
+                )
+                phase_metrics.update(self.lns_result.to_metrics())
+            else:
+                # 基于阶段1的解创建热启动模型
+                phase_metrics['phase2_method'] = 'cp_sat'
+                phase2_success, optimized_assignments = self._solve_phase2(
+                    initial_assignments, phase2_time_limit, on_progress
+                )
+                phase_metrics['phase2_time_to_gap'] = {
+                    str(threshold): round(elapsed, 3) for threshold, elapsed in self.time_to_gap.items()
+                }
+                phase_metrics['stop_reason'] = self.stop_reason
 
             phase2_time = (datetime.now() - phase2_start).total_seconds()
             phase_metrics['phase2_time'] = phase2_time
@@ -581,13 +889,20 @@ class SchedulingProblem:
         else:
             logger.warning("阶段1：未找到可行解，尝试完整模型")
             # 回退到完整模型求解
-            fallback_success, fallback_assignments = self.solve(phase1_time_limit + phase2_time_limit)
+            fallback_success, fallback_assignments = self.solve(
+                phase1_time_limit + phase2_time_limit, on_progress=on_progress
+            )
+            phase_metrics['stop_reason'] = self.stop_reason
             if fallback_success:
                 final_assignments = fallback_assignments
                 phase_metrics['fallback_success'] = True
             else:
                 return False, [], phase_metrics
 
+        if self.is_cancelled():
+            logger.info("求解已取消，返回当前最优解")
+            phase_metrics['cancelled'] = True
+
         # 计算最终解的质量指标
         if hasattr(self, 'solver') and self.solver:
             phase_metrics['final_objective'] = self.solver.ObjectiveValue()
@@ -595,25 +910,124 @@ class SchedulingProblem:
 
         return True, final_assignments, phase_metrics
 
+    def solve_portfolio(
+        self,
+        time_limit: int = 300,
+        configs: Optional[Sequence[SolverConfig]] = None,
+        target_gap: float = 0.0,
+        max_workers: Optional[int] = None,
+    ) -> Tuple[bool, List[Assignment], Dict[str, Any]]:
+        """以多个不同参数的求解进程并行求解，取最优结果。
+
+        以贪心构造解作为所有进程的提示；达到目标间隙或时间耗尽时停止。
+        """
+        if self.model is None:
+            raise RuntimeError("模型未构建，请先调用 build_model()")
+
+        initial_solution = self.construct_initial_solution().as_dict()
+        portfolio = PortfolioSolver(self, configs, target_gap=target_gap, max_workers=max_workers)
+        self.portfolio_result = portfolio.run(time_limit, initial_solution)
+
+        metrics = self.portfolio_result.to_metrics()
+        if not self.portfolio_result.success:
+            return False, [], metrics
+        return True, self._adopt_solution(self.portfolio_result.solution), metrics
+
+    def solve_pool(
+        self,
+        pool_size: int = 5,
+        time_limit: int = 300,
+        min_distance: Optional[int] = None,
+        on_progress: Optional[ProgressHandler] = None,
+    ) -> Tuple[bool, List[Assignment], Dict[str, Any]]:
+        """一次求解收集最多 pool_size 个互不相同的课表，返回最优课表的分配。
+
+        每轮求解的改进解都提交给解池；下一轮在模型副本上对解池中的每个解添加 no-good 割
+        （已安排的教学段中至少 min_distance 个换到别的时间段），直到解池收满、
+        没有更多不同的解或时间耗尽。各轮平分剩余时间。解池保存在 pool_result 中。
+
+        Args:
+            pool_size: 最多收集的课表数
+            time_limit: 所有轮次合计的时间限制（秒）
+            min_distance: 课表之间至少相差的教学段数，默认为教学段数的10%
+            on_progress: 每个改进解的进度处理函数
+        """
+        if self.model is None:
+            raise RuntimeError("模型未构建，请先调用 build_model()")
+
+        if min_distance is None:
+            min_distance = max(1, len(self.sections) // 10)
+        self.solution = None
+        self.stop_reason = None
+        pool = SolutionPool(pool_size, min_distance)
+        self.pool_result = PoolResult(pool)
+
+        # 割只加在副本上，原模型保持不变
+        model = self.model.clone()
+        self._add_hints(model, self.assignment_vars, self.construct_initial_solution().as_dict())
+        cut_keys: Set[int] = set()
+        start = datetime.now()
+
+        while not pool.is_full and not self.is_cancelled():
+            remaining = time_limit - (datetime.now() - start).total_seconds()
+            if remaining <= 0:
+                break
+            for pooled in pool.solutions:
+                if pooled.key not in cut_keys:
+                    cut_keys.add(pooled.key)
+                    chosen = [self.assignment_vars.get(i, j) for i, j in pooled.pairs()]
+                    model.Add(cp_model.LinearExpr.Sum(chosen) <= len(chosen) - min_distance)
+            if cut_keys:
+                # 提示来自已有的解，必然违反割
+                model.ClearHints()
+
+            round_limit = remaining / (pool_size - len(pool))
+            solver = CpSolver()
+            solver.parameters.max_time_in_seconds = round_limit
+            callback = SolutionProgressCallback(
+                self.assignment_vars, round_limit, self.incumbent, on_progress, phase="pool",
+                stopping=self.stopping_criteria, pool=pool,
+            )
+            with stop_on_cancel(solver, self.cancel_token), stop_on_plateau(solver, callback):
+                status = solver.Solve(model, callback)
+            self.pool_result.rounds += 1
+            self.pool_result.statuses.append(solver.StatusName(status))
+            if status != cp_model.OPTIMAL and status != cp_model.FEASIBLE:
+                # 割排除了所有剩余的课表（或本轮时间内未找到）
+                break
+            pool.offer(SolutionVector.from_solver(solver, self.assignment_vars).timeslots, solver.ObjectiveValue())
+
+        self.pool_result.elapsed = (datetime.now() - start).total_seconds()
+        metrics = self.pool_result.to_metrics()
+        if self.is_cancelled():
+            metrics['cancelled'] = True
+        best = pool.best
+        if best is None:
+            logger.warning("解池求解未找到可行解")
+            return False, [], metrics
+
+        logger.info(
+            f"解池求解完成：{len(pool)} 个课表，{self.pool_result.rounds} 轮，"
+            f"目标值 {metrics['pool_objectives']}"
+        )
+        metrics['final_objective'] = best.objective
+        return True, self._adopt_solution(dict(best.pairs())), metrics
+
     def _create_phase1_model(self) -> CpModel:
         """创建阶段1模型：只包含硬约束，快速找到可行解。"""
         phase1_model = CpModel()
 
-        # 重新创建变量（避免与原模型冲突）
-        num_sections = len(self.sections)
-        num_timeslots = len(self.timeslots)
+        # 重新创建变量（避免与原模型冲突），与主模型共用候选时间段
+        if len(self.section_domains) != len(self.sections):
+            self.section_domains = self._compute_section_domains()
 
-        # 阶段1变量
-        phase1_vars = []
-        for i in range(num_sections):
-            row = []
-            for j in range(num_timeslots):
-                var = phase1_model.NewBoolVar(f"phase1_assignment_{i}_{j}")
-                row.append(var)
-            phase1_vars.append(row)
+        # 阶段1变量（保留引用，用于提取阶段1的解）
+        self.phase1_vars = SparseAssignmentVars.create(
+            phase1_model, self.section_domains, len(self.timeslots), prefix="phase1_assignment"
+        )
 
         # 只添加硬约束
-        self._add_phase1_hard_constraints(phase1_model, phase1_vars)
+        self._add_phase1_hard_constraints(phase1_model, self.phase1_vars)
 
         # 阶段1目标：最小化变量数量（简化目标，快速求解）
         # 实际上我们只需要找到可行解，所以不需要复杂的目标
@@ -621,84 +1035,121 @@ class SchedulingProblem:
 
         return phase1_model
 
-    def _add_phase1_hard_constraints(self, model: CpModel, vars: List[List[cp_model.IntVar]]) -> None:
+    def _add_phase1_hard_constraints(self, model: CpModel, vars: SparseAssignmentVars) -> None:
         """为阶段1模型添加硬约束。"""
-        num_sections = len(self.sections)
-        num_timeslots = len(self.timeslots)
+        index = self._get_index()
 
         # 硬约束1：每个教学段必须且只能分配到一个时间段
-        for i in range(num_sections):
-            model.AddExactlyOne(vars[i])
-
-        # 硬约束2：每个时间段最多只能分配一个教学段
-        for j in range(num_timeslots):
-            section_vars = [vars[i][j] for i in range(num_sections)]
-            model.Add(sum(section_vars) <= 1)
+        for i in range(vars.num_sections):
+            model.AddExactlyOne(vars.section_vars(i))
+
+        # 硬约束2：教室容量组在每个时间段的教学段数不超过其教室数
+        # （未提供教室时每个教室为容量1的组，未指定教室的教学段视为共用同一教室）
+        for group in index.room_groups:
+            for slot_vars in vars.vars_by_timeslot(group.members).values():
+                if len(slot_vars) <= group.capacity:
+                    continue
+                if group.capacity == 1:
+                    model.AddAtMostOne(slot_vars)
+                else:
+                    model.Add(sum(slot_vars) <= group.capacity)
 
         # 硬约束3：教师时间冲突约束
-        for t_idx, teacher in enumerate(self.teachers):
-            for j in range(num_timeslots):
-                teacher_sections = [
-                    i for i, section in enumerate(self.sections)
-                    if section.teacher_id == teacher.id
-                ]
-                if teacher_sections:
-                    teacher_timeslot_vars = [vars[i][j] for i in teacher_sections]
-                    model.Add(sum(teacher_timeslot_vars) <= 1)
+        for teacher_id, teacher_sections in index.teacher_sections.items():
+            if len(teacher_sections) > 1:
+                for slot_vars in vars.vars_by_timeslot(teacher_sections).values():
+                    if len(slot_vars) > 1:
+                        model.AddAtMostOne(slot_vars)
 
         # 硬约束4：班级时间冲突约束
-        class_groups = {}
-        for i, section in enumerate(self.sections):
-            if section.class_group_id not in class_groups:
-                class_groups[section.class_group_id] = []
-            class_groups[section.class_group_id].append(i)
-
-        for class_group_id, section_indices in class_groups.items():
-            for j in range(num_timeslots):
-                class_timeslot_vars = [vars[i][j] for i in section_indices]
-                model.Add(sum(class_timeslot_vars) <= 1)
+        for class_group_id, section_indices in index.class_group_sections.items():
+            if len(section_indices) > 1:
+                for slot_vars in vars.vars_by_timeslot(section_indices).values():
+                    if len(slot_vars) > 1:
+                        model.AddAtMostOne(slot_vars)
 
-        # 硬约束5：现有分配约束
+        # 硬约束5：现有分配约束（锁定的分配）
         for assignment in self.existing_assignments:
             if assignment.is_locked:
                 section_idx = self.section_to_idx.get(assignment.section_id)
                 timeslot_idx = self.timeslot_to_idx.get(assignment.timeslot_id)
                 if section_idx is not None and timeslot_idx is not None:
-                    model.Add(vars[section_idx][timeslot_idx] == 1)
+                    var = vars.get(section_idx, timeslot_idx)
+                    if var is not None:
+                        model.Add(var == 1)
+
+        # 对称性破除
+        self._add_symmetry_breaking(model, vars)
 
     def _extract_phase1_solution(self, phase1_solver: CpSolver) -> List[Assignment]:
         """从阶段1求解结果中提取解。"""
-        assignments = []
+        if self.phase1_vars is None:
+            return []
 
-        # 重新创建变量引用（用于提取值）
-        num_sections = len(self.sections)
-        num_timeslots = len(self.timeslots)
+        solution = SolutionVector.from_solver(phase1_solver, self.phase1_vars).as_dict()
+        return self._build_assignments(solution)
 
-        for i, section in enumerate(self.sections):
-            for j, timeslot in enumerate(self.timeslots):
-                var_name = f"phase1_assignment_{i}_{j}"
-                # 注意：这里需要通过变量名获取值，实际实现可能需要调整
-                # 简化处理：假设我们能够获取到变量值
-                try:
-                    # 在实际实现中，需要正确获取变量值
-                    # 这里简化处理，直接创建分配
-                    if phase1_solver.Value(phase1_solver.IntVar(var_name)) == 1:
-                        assignment = Assignment(
-                            tenant_id=self.tenant_id,
-                            timetable_id=UUID('00000000-0000-0000-0000-000000000000'),
-                            section_id=section.id,
-                            timeslot_id=timeslot.id,
-                            room_id=UUID('00000000-0000-0000-0000-000000000000'),
-                            is_locked=False,
-                        )
-                        assignments.append(assignment)
-                except:
-                    # 如果无法获取变量值，跳过
-                    continue
+    def construct_initial_solution(self, seed: Optional[Dict[int, int]] = None) -> ConstructionResult:
+        """使用DSatur贪心算法构造初始解（只考虑硬约束）。
 
-        return assignments
+        Args:
+            seed: 预先固定的 {教学段下标: 时间段下标}，须互不冲突（见 _compatible_warm_start）
+        """
+        if len(self.section_domains) != len(self.sections):
+            self.section_domains = self._compute_section_domains()
+
+        constructor = DSaturConstructor(
+            self._get_index(),
+            self.section_domains,
+            len(self.timeslots),
+            locked={**(seed or {}), **self._locked_timeslots()},
+        )
+        return constructor.construct()
 
-    def _solve_phase2(self, initial_assignments: List[Assignment], time_limit: int) -> Tuple[bool, List[Assignment]]:
+    def _compatible_warm_start(self, assignments: List[Assignment]) -> Dict[int, int]:
+        """从已有课表中选出与当前问题硬约束相容的分配。
+
+        锁定分配优先占用资源，其余分配按教学段顺序接受：时间段不在候选域内、
+        与已接受的分配共享教师或班级的同一时间段、或所属教室容量组在该时间段已满时丢弃。
+        """
+        if len(self.section_domains) != len(self.sections):
+            self.section_domains = self._compute_section_domains()
+
+        index = self._get_index()
+        locked = self._locked_timeslots()
+        candidates = self._assignments_to_solution(assignments)
+        occupied: Set[Tuple[str, Any, int]] = set()
+        room_load: Dict[Tuple[int, int], int] = {}
+        accepted: Dict[int, int] = {}
+
+        for i, j in [*sorted(locked.items()), *sorted(candidates.items())]:
+            if i in accepted or j not in self.section_domains[i]:
+                continue
+            section = self.sections[i]
+            keys = [
+                ("teacher", section.teacher_id, j),
+                ("class_group", section.class_group_id, j),
+            ]
+            groups = index.section_room_groups[i]
+            if any(key in occupied for key in keys) or any(
+                room_load.get((g, j), 0) >= index.room_groups[g].capacity for g in groups
+            ):
+                continue
+            occupied.update(keys)
+            for g in groups:
+                room_load[(g, j)] = room_load.get((g, j), 0) + 1
+            accepted[i] = j
+
+        for i in locked:
+            accepted.pop(i, None)
+        return accepted
+
+    def _solve_phase2(
+        self,
+        initial_assignments: List[Assignment],
+        time_limit: int,
+        on_progress: Optional[ProgressHandler] = None,
+    ) -> Tuple[bool, List[Assignment]]:
         """阶段2：基于初始解优化软约束。"""
         if not self.model:
             return False, []
@@ -709,14 +1160,28 @@ class SchedulingProblem:
         solver.parameters.num_search_workers = 2  # 使用较少的搜索者，专注于优化
 
         # 添加初始解作为热启动
-        self._add_solution_hint(solver, initial_assignments)
+        self._add_solution_hint(initial_assignments)
 
         # 设置更优的搜索策略
         solver.parameters.search_branching = cp_model.AUTOMATIC_SEARCH
         solver.parameters.use_phase_saving = True
 
+        callback = SolutionProgressCallback(
+            self.assignment_vars, time_limit, self.incumbent, on_progress, phase="phase2",
+            stopping=self.stopping_criteria,
+        )
+
         logger.info("开始阶段2优化")
-        status = solver.Solve(self.model)
+        with stop_on_cancel(solver, self.cancel_token), stop_on_plateau(solver, callback):
+            status = solver.Solve(self.model, callback)
+        self.stop_reason = callback.final_stop_reason(solver, status, self.is_cancelled())
+        logger.info(f"阶段2结束，原因: {self.stop_reason}")
+
+        self.time_to_gap = dict(callback.time_to_gap)
+        if status == cp_model.OPTIMAL:
+            # 证明最优时间隙为0，尚未记录的阈值以求解结束时间计
+            for threshold in GAP_THRESHOLDS:
+                self.time_to_gap.setdefault(threshold, solver.WallTime())
 
         if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
             self.solver = solver  # 保存求解器用于质量评估
@@ -726,49 +1191,111 @@ class SchedulingProblem:
             logger.warning("阶段2优化失败")
             return False, initial_assignments
 
-    def _add_solution_hint(self, solver: CpSolver, initial_assignments: List[Assignment]) -> None:
-        """添加初始解作为求解器提示。"""
-        # 创建解提示映射
-        assignment_hints = {}
+    def _solve_lns(
+        self,
+        initial_solution: Dict[int, int],
+        time_limit: float,
+        config: LNSConfig,
+        on_progress: Optional[ProgressHandler] = None,
+    ) -> Tuple[bool, List[Assignment]]:
+        """以大邻域搜索优化完整模型。"""
+        config = replace(config, time_limit=time_limit)
+
+        def on_improvement(result: LNSResult) -> None:
+            # 每次改进后立即公开当前最优解，保证中途可读取
+            self.lns_result = result
+            self.solver = result.solver
+
+            elapsed = result.trace[-1].elapsed
+            progress = SolutionProgress(
+                objective=result.objective,
+                best_bound=result.best_bound,
+                gap=relative_gap(result.objective, result.best_bound),
+                elapsed=elapsed,
+                solution_count=len(result.trace),
+                progress=estimate_progress(elapsed, time_limit),
+                phase="lns",
+            )
+            self.incumbent.update(dict(result.solution), progress)
+            if on_progress is not None:
+                on_progress(progress)
+
+        logger.info(f"开始大邻域搜索，时间限制: {time_limit}秒")
+        lns = LargeNeighborhoodSearch(self, config, on_improvement=on_improvement)
+        self.lns_result = lns.run(initial_solution)
+
+        if not self.lns_result.success:
+            logger.warning("大邻域搜索未找到可行解")
+            return False, []
+        return True, self._adopt_solution(self.lns_result.solution)
+
+    def is_cancelled(self) -> bool:
+        """求解是否已被取消。"""
+        return self.cancel_token is not None and self.cancel_token.is_cancelled()
 
-        for assignment in initial_assignments:
+    def current_best_assignments(self) -> List[Assignment]:
+        """获取当前最优解的分配（求解过程中可从其他线程调用）。"""
+        solution, _ = self.incumbent.snapshot()
+        return self._build_assignments(solution)
+
+    def _assignments_to_solution(self, assignments: List[Assignment]) -> Dict[int, int]:
+        """将分配记录转换为 {教学段下标: 时间段下标}。"""
+        solution = {}
+        for assignment in assignments:
             section_idx = self.section_to_idx.get(assignment.section_id)
             timeslot_idx = self.timeslot_to_idx.get(assignment.timeslot_id)
 
             if section_idx is not None and timeslot_idx is not None:
-                assignment_hints[section_idx] = timeslot_idx
+                solution[section_idx] = timeslot_idx
+        return solution
 
-        # 为变量添加提示值
-        for i, section in enumerate(self.sections):
-            for j, timeslot in enumerate(self.timeslots):
-                if i in assignment_hints and assignment_hints[i] == j:
-                    # 这个变量在初始解中为1
-                    solver.AddHint(self.assignment_vars[i][j], 1)
-                else:
-                    # 这个变量在初始解中为0
-                    solver.AddHint(self.assignment_vars[i][j], 0)
+    def _add_solution_hint(self, initial_assignments: List[Assignment]) -> None:
+        """添加初始解作为求解器提示。"""
+        assignment_hints = self._assignments_to_solution(initial_assignments)
+        self._add_hints(self.model, self.assignment_vars, assignment_hints)
+
+    def _add_hints(self, model: CpModel, vars: SparseAssignmentVars, hints: Dict[int, int]) -> None:
+        """将 {教学段下标: 时间段下标} 作为提示写入模型（替换已有提示）。
+
+        提示先按对称性约束规范化，避免贪心构造的解因教学段顺序不同而违反字典序约束。
+        """
+        hints = self.canonicalize_solution(hints)
+        model.ClearHints()
+        for (i, j), var in vars.items():
+            if i in hints:
+                # 初始解中该教学段所在时间段为1，其余为0
+                model.AddHint(var, 1 if hints[i] == j else 0)
+
+    def _build_assignments(
+        self, solution: Union[Dict[int, int], Sequence[Tuple[int, int]]]
+    ) -> List[Assignment]:
+        """将 {教学段下标: 时间段下标}（或按课时展开的 (教学段下标, 时间段下标) 列表）转换为分配记录。
+
+        启用教室分配时，逐时间段为教学段匹配兼容教室。
+        """
+        self._get_index()
+        if isinstance(solution, dict):
+            vector = SolutionVector.from_dict(solution, len(self.sections))
+            return vector.assign_rooms(self.room_index).to_assignments(self)
+        pairs = sorted(solution)
+        rooms = self.room_index.assign(pairs) if self.room_index is not None else {}
+        return build_assignments(self, pairs, rooms)
+
+    def _adopt_solution(self, solution: Dict[int, int]) -> List[Assignment]:
+        """将 {教学段下标: 时间段下标} 记为最终解并生成分配记录。"""
+        self._get_index()
+        self.solution = SolutionVector.from_dict(solution, len(self.sections)).assign_rooms(self.room_index)
+        return self.solution.to_assignments(self)
     
     def _extract_solution(self) -> List[Assignment]:
-        """从求解结果中提取分配方案。"""
+        """从求解结果中提取分配方案（一次读取求解器响应，不逐个查询变量）。"""
         if self.solver is None:
             return []
-        
-        assignments = []
-        for i, section in enumerate(self.sections):
-            for j, timeslot in enumerate(self.timeslots):
-                if self.solver.Value(self.assignment_vars[i][j]) == 1:
-                    # 创建分配记录
-                    assignment = Assignment(
-                        tenant_id=self.tenant_id,
-                        timetable_id=UUID('00000000-0000-0000-0000-000000000000'),  # 临时ID
-                        section_id=section.id,
-                        timeslot_id=timeslot.id,
-                        room_id=UUID('00000000-0000-0000-0000-000000000000'),  # 临时ID
-                        is_locked=False,
-                    )
-                    assignments.append(assignment)
-        
-        return assignments
+
+        self._get_index()
+        self.solution = SolutionVector.from_solver(self.solver, self.assignment_vars)
+        self.solution.assign_rooms(self.room_index)
+        return self.solution.to_assignments(self)
 
 
 class SchedulingEngine:
@@ -783,22 +1310,271 @@ class SchedulingEngine:
         """创建调度问题。"""
         self.problem = SchedulingProblem(self.tenant_id)
         return self.problem
+
+    def _check_rooms(
+        self, success: bool, assignments: List[Assignment], metrics: Optional[Dict[str, Any]] = None
+    ) -> Tuple[bool, List[Assignment]]:
+        """启用教室分配时，有教学段未匹配到教室的解视为失败，不返回占位教室ID。
+
+        容量组闭包被截断时模型中缺少部分Hall条件，求解后的逐时间段匹配可能失败。
+        """
+        if not success or self.problem.room_index is None:
+            return success, assignments
+        unmatched = sum(1 for assignment in assignments if assignment.room_id == PLACEHOLDER_ID)
+        if not unmatched:
+            return success, assignments
+        logger.error(f"{unmatched} 个教学段未能匹配到兼容教室，求解结果作废")
+        if metrics is not None:
+            metrics['unmatched_rooms'] = unmatched
+        return False, []
     
-    def solve(self, time_limit: int = 300) -> Tuple[bool, List[Assignment]]:
+    def solve(
+        self,
+        time_limit: int = 300,
+        lns_config: Optional[LNSConfig] = None,
+        on_progress: Optional[ProgressHandler] = None,
+    ) -> Tuple[bool, List[Assignment]]:
         """求解调度问题。"""
         if self.problem is None:
             raise RuntimeError("调度问题未创建")
 
         self.problem.build_model()
-        return self.problem.solve(time_limit)
-
-    def solve_two_phase(self, phase1_time_limit: int = 60, phase2_time_limit: int = 240) -> Tuple[bool, List[Assignment], Dict[str, Any]]:
+        success, assignments = self.problem.solve(time_limit, lns_config=lns_config, on_progress=on_progress)
+        return self._check_rooms(success, assignments)
+
+    def solve_two_phase(
+        self,
+        phase1_time_limit: int = 60,
+        phase2_time_limit: int = 240,
+        lns_config: Optional[LNSConfig] = None,
+        on_progress: Optional[ProgressHandler] = None,
+    ) -> Tuple[bool, List[Assignment], Dict[str, Any]]:
         """使用两阶段策略求解调度问题。"""
         if self.problem is None:
             raise RuntimeError("调度问题未创建")
 
         self.problem.build_model()
-        return self.problem.solve_two_phase(phase1_time_limit, phase2_time_limit)
+        success, assignments, metrics = self.problem.solve_two_phase(
+            phase1_time_limit, phase2_time_limit, lns_config=lns_config, on_progress=on_progress
+        )
+        success, assignments = self._check_rooms(success, assignments, metrics)
+        return success, assignments, metrics
+
+    def solve_cached(
+        self,
+        cache: SolutionCache,
+        phase1_time_limit: int = 60,
+        phase2_time_limit: int = 240,
+        lns_config: Optional[LNSConfig] = None,
+        on_progress: Optional[ProgressHandler] = None,
+        model_store: Optional[ModelStore] = None,
+    ) -> Tuple[bool, List[Assignment], Dict[str, Any]]:
+        """先按问题指纹查找缓存，再以两阶段策略求解。
+
+        指纹完全相同时直接返回缓存的课表；找到相近问题时以其课表作为热启动；
+        求解成功（且未取消）后写入缓存。传入 model_store 时从模型快照恢复模型（没有则构建后保存）。
+        """
+        if self.problem is None:
+            raise RuntimeError("调度问题未创建")
+
+        fingerprint = fingerprint_problem(self.problem)
+        hit = cache.lookup(fingerprint)
+        if hit is not None and hit.exact:
+            logger.info(f"调度问题 {fingerprint.digest} 命中缓存，直接返回已求解课表")
+            metrics = {
+                **hit.solution.metrics,
+                'cache': 'exact',
+                'fingerprint': fingerprint.digest,
+                'final_objective': hit.solution.objective,
+            }
+            success, assignments = self._check_rooms(True, hit.solution.to_assignments(self.problem), metrics)
+            if success:
+                return True, assignments, metrics
+            logger.warning(f"调度问题 {fingerprint.digest} 的缓存课表无法匹配教室，重新求解")
+            hit = None
+
+        model_restored = False
+        if model_store is not None:
+            model_restored = self.problem.build_or_load_model(model_store)
+        else:
+            self.problem.build_model()
+        warm_start = hit.solution.to_assignments(self.problem) if hit is not None else None
+        success, assignments, metrics = self.problem.solve_two_phase(
+            phase1_time_limit,
+            phase2_time_limit,
+            lns_config=lns_config,
+            on_progress=on_progress,
+            warm_start=warm_start,
+        )
+        metrics['cache'] = 'near' if hit is not None else 'miss'
+        metrics['model_restored'] = model_restored
+        metrics['fingerprint'] = fingerprint.digest
+        if hit is not None:
+            metrics['cache_similarity'] = hit.similarity
+        success, assignments = self._check_rooms(success, assignments, metrics)
+
+        if success and not metrics.get('cancelled'):
+            cache.store_solution(
+                fingerprint,
+                assignments,
+                objective=metrics.get('final_objective'),
+                metrics={
+                    key: metrics.get(key)
+                    for key in ('phase1_method', 'phase2_method', 'phase2_improved')
+                },
+            )
+        return success, assignments, metrics
+
+    def reschedule_incremental(
+        self,
+        previous_assignments: List[Assignment],
+        changes: ChangeSet,
+        time_limit: float = 10.0,
+        radius: int = 1,
+        max_radius: int = 3,
+    ) -> Tuple[bool, List[Assignment], Dict[str, Any]]:
+        """局部修改后增量重排。
+
+        将变更集应用到当前问题（替换 self.problem），固定受影响邻域以外的教学段，
+        只重新求解邻域，返回与原课表差异最小的课表。
+        """
+        if self.problem is None:
+            raise RuntimeError("调度问题未创建")
+
+        changed_section_ids = changes.changed_section_ids(self.problem)
+        self.problem = changes.apply(self.problem)
+        self.problem.build_model()
+
+        rescheduler = IncrementalRescheduler(
+            self.problem,
+            previous_assignments,
+            changed_section_ids,
+            radius=radius,
+            max_radius=max_radius,
+        )
+        result = rescheduler.solve(time_limit)
+        metrics = result.to_metrics()
+        metrics['incremental_seed_sections'] = len(rescheduler.seeds)
+        if self.problem.is_cancelled():
+            metrics['cancelled'] = True
+
+        if not result.success:
+            logger.warning("增量重排未找到可行解")
+            return False, [], metrics
+
+        self.problem.solver = result.solver
+        self.problem.incumbent.update(result.solution, None)
+        logger.info(
+            f"增量重排完成：释放 {result.free_sections} 个教学段，"
+            f"移动 {result.moved_sections} 个，用时 {result.elapsed:.2f}秒"
+        )
+        success, assignments = self._check_rooms(True, self.problem._adopt_solution(result.solution), metrics)
+        return success, assignments, metrics
+
+    def create_evaluator(self, assignments: Sequence[Assignment]) -> TimetableEvaluator:
+        """为当前课表创建增量评估器，用于交互式调整时即时评估移动和交换。"""
+        if self.problem is None:
+            raise RuntimeError("调度问题未创建")
+
+        return TimetableEvaluator(self.problem, assignments)
+
+    def solve_portfolio(
+        self,
+        time_limit: int = 300,
+        configs: Optional[Sequence[SolverConfig]] = None,
+        target_gap: float = 0.0,
+        max_workers: Optional[int] = None,
+    ) -> Tuple[bool, List[Assignment], Dict[str, Any]]:
+        """使用并行求解器组合求解调度问题。"""
+        if self.problem is None:
+            raise RuntimeError("调度问题未创建")
+
+        self.problem.build_model()
+        success, assignments, metrics = self.problem.solve_portfolio(
+            time_limit, configs=configs, target_gap=target_gap, max_workers=max_workers
+        )
+        success, assignments = self._check_rooms(success, assignments, metrics)
+        return success, assignments, metrics
+
+    def solve_pool(
+        self,
+        pool_size: int = 5,
+        time_limit: int = 300,
+        min_distance: Optional[int] = None,
+        on_progress: Optional[ProgressHandler] = None,
+    ) -> Tuple[bool, List[Assignment], Dict[str, Any]]:
+        """一次求解收集多个互不相同的高质量课表（见 SchedulingProblem.solve_pool）。"""
+        if self.problem is None:
+            raise RuntimeError("调度问题未创建")
+
+        self.problem.build_model()
+        success, assignments, metrics = self.problem.solve_pool(
+            pool_size, time_limit, min_distance=min_distance, on_progress=on_progress
+        )
+        success, assignments = self._check_rooms(success, assignments, metrics)
+        return success, assignments, metrics
+
+    def pool_timetables(self, calendar_id: UUID, name: str) -> List[Timetable]:
+        """将解池中的课表按目标值排序生成时间表草稿，名称后附排名。"""
+        if self.problem is None or self.problem.pool_result is None:
+            return []
+
+        return [
+            pooled.to_timetable(self.problem, calendar_id, f"{name} #{rank}", rank=rank)
+            for rank, pooled in enumerate(self.problem.pool_result.pool.solutions, start=1)
+        ]
+
+    def solve_decomposed(
+        self,
+        phase1_time_limit: int = 60,
+        phase2_time_limit: int = 240,
+        max_workers: Optional[int] = None,
+        lns_config: Optional[LNSConfig] = None,
+    ) -> Tuple[bool, List[Assignment], Dict[str, Any]]:
+        """将问题按互不共享教师、班级和教室的连通分量拆分，多进程并行求解后合并。"""
+        if self.problem is None:
+            raise RuntimeError("调度问题未创建")
+
+        # 分解模块依赖 SchedulingProblem，在此处导入避免循环引用
+        from edusched.scheduling.decomposition import DecomposedSolver
+
+        solver = DecomposedSolver(self.problem, max_workers=max_workers)
+        success, assignments, metrics = solver.solve(phase1_time_limit, phase2_time_limit, lns_config=lns_config)
+        success, assignments = self._check_rooms(success, assignments, metrics)
+        return success, assignments, metrics
+
+    def check_feasibility(self, weekly_hours: bool = False) -> FeasibilityReport:
+        """求解前检查问题是否满足可解的必要条件（无需构建模型）。"""
+        if self.problem is None:
+            raise RuntimeError("调度问题未创建")
+        return check_feasibility(self.problem, weekly_hours)
+
+    def solve_lessons(
+        self,
+        time_limit: float = 60.0,
+        num_search_workers: int = 8,
+    ) -> Tuple[bool, List[Assignment], Dict[str, Any]]:
+        """按周课时展开教学段，以区间变量和 AddNoOverlap 建模求解。
+
+        每个教学段按 hours_per_week 生成多条分配记录，无需手工复制教学段。
+        """
+        if self.problem is None:
+            raise RuntimeError("调度问题未创建")
+
+        lesson_model = LessonModel(self.problem)
+        lesson_model.build()
+        result = lesson_model.solve(time_limit, num_search_workers=num_search_workers)
+        metrics = result.to_metrics()
+        if self.problem.is_cancelled():
+            metrics['cancelled'] = True
+
+        if not result.success:
+            logger.warning(f"课次模型未找到可行解（{result.status}）")
+            return False, [], metrics
+
+        self.problem.solver = result.solver
+        success, assignments = self._check_rooms(True, lesson_model.to_assignments(result), metrics)
+        return success, assignments, metrics
 
     def get_solution_quality(self) -> Dict[str, Any]:
         """获取解的质量指标。"""
@@ -806,14 +1582,17 @@ class SchedulingEngine:
             return {}
 
         solver = self.problem.solver
-        return {
-            "status": solver.StatusName(solver.Status()),
+        quality = {
+            "status": solver.StatusName(solver.response_proto.status),
             "objective_value": solver.ObjectiveValue(),
             "best_objective_bound": solver.BestObjectiveBound(),
             "num_conflicts": solver.NumConflicts(),
             "num_branches": solver.NumBranches(),
             "wall_time": solver.WallTime(),
         }
+        if self.problem.lns_result is not None:
+            quality.update(self.problem.lns_result.to_metrics())
+        return quality
 
     def get_detailed_solution_quality(self) -> Dict[str, Any]:
         """获取详细的解质量指标，包括业务指标。"""
@@ -878,7 +1657,7 @@ class SchedulingEngine:
 
 
 class ConstraintValidator:
-    """约束验证器。"""
+    """约束验证器（由 VectorizedValidator 以整数编码批量检测冲突）。"""
     
     @staticmethod
     def validate_hard_constraints(
@@ -886,26 +1665,8 @@ class ConstraintValidator:
         sections: List[Section],
         timeslots: List[Timeslot],
     ) -> List[str]:
-        """验证硬约束。"""
-        violations = []
-        
-        # 检查教师冲突
-        teacher_conflicts = ConstraintValidator._check_teacher_conflicts(
-            assignments, sections, timeslots
-        )
-        violations.extend(teacher_conflicts)
-        
-        # 检查班级冲突
-        class_conflicts = ConstraintValidator._check_class_conflicts(
-            assignments, sections, timeslots
-        )
-        violations.extend(class_conflicts)
-        
-        # 检查时间段冲突
-        timeslot_conflicts = ConstraintValidator._check_timeslot_conflicts(assignments)
-        violations.extend(timeslot_conflicts)
-        
-        return violations
+        """验证硬约束：教师冲突、班级冲突、教室冲突。"""
+        return VectorizedValidator(sections, timeslots).validate(assignments)
     
     @staticmethod
     def _check_teacher_conflicts(
@@ -914,25 +1675,8 @@ class ConstraintValidator:
         timeslots: List[Timeslot],
     ) -> List[str]:
         """检查教师冲突。"""
-        violations = []
-        teacher_timeslots: Dict[UUID, Set[UUID]] = {}
-        
-        for assignment in assignments:
-            section = next(s for s in sections if s.id == assignment.section_id)
-            teacher_id = section.teacher_id
-            timeslot_id = assignment.timeslot_id
-            
-            if teacher_id not in teacher_timeslots:
-                teacher_timeslots[teacher_id] = set()
-            
-            if timeslot_id in teacher_timeslots[teacher_id]:
-                violations.append(
-                    f"教师 {teacher_id} 在时间段 {timeslot_id} 有冲突"
-                )
-            else:
-                teacher_timeslots[teacher_id].add(timeslot_id)
-        
-        return violations
+        validator = VectorizedValidator(sections, timeslots)
+        return validator.teacher_conflicts(validator.encode(assignments))
     
     @staticmethod
     def _check_class_conflicts(
@@ -941,42 +1685,11 @@ class ConstraintValidator:
         timeslots: List[Timeslot],
     ) -> List[str]:
         """检查班级冲突。"""
-        violations = []
-        class_timeslots: Dict[UUID, Set[UUID]] = {}
-        
-        for assignment in assignments:
-            section = next(s for s in sections if s.id == assignment.section_id)
-            class_group_id = section.class_group_id
-            timeslot_id = assignment.timeslot_id
-            
-            if class_group_id not in class_timeslots:
-                class_timeslots[class_group_id] = set()
-            
-            if timeslot_id in class_timeslots[class_group_id]:
-                violations.append(
-                    f"班级 {class_group_id} 在时间段 {timeslot_id} 有冲突"
-                )
-            else:
-                class_timeslots[class_group_id].add(timeslot_id)
-        
-        return violations
+        validator = VectorizedValidator(sections, timeslots)
+        return validator.class_conflicts(validator.encode(assignments))
     
     @staticmethod
     def _check_timeslot_conflicts(assignments: List[Assignment]) -> List[str]:
-        """检查时间段冲突。"""
-        violations = []
-        timeslot_assignments: Dict[UUID, List[Assignment]] = {}
-        
-        for assignment in assignments:
-            timeslot_id = assignment.timeslot_id
-            if timeslot_id not in timeslot_assignments:
-                timeslot_assignments[timeslot_id] = []
-            timeslot_assignments[timeslot_id].append(assignment)
-        
-        for timeslot_id, assignments_list in timeslot_assignments.items():
-            if len(assignments_list) > 1:
-                violations.append(
-                    f"时间段 {timeslot_id} 被多个教学段占用"
-                )
-        
-        return violations
\ No newline at end of file
+        """检查教室冲突：同一教室同一时间段只能有一个教学段。"""
+        validator = VectorizedValidator([])
+        return validator.room_conflicts(validator.encode(assignments))
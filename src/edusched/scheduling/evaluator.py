@@ -0,0 +1,364 @@
+"""课表增量评估模块。
+
+规划人员在界面上拖动课程时，需要立即知道新位置是否违反硬约束、软约束得分如何变化。
+TimetableEvaluator 为每个打开的课表维护教师、班级、教室在各时间段的占用计数，
+以及班级每天的课时数和各软约束的当前惩罚。评估一次移动只更新受影响的几个计数，
+整体校验不必重跑，单次评估为微秒级。
+
+软约束的计分与求解模型一致（同样的权重和整数缩放），因此评估器的惩罚之和等于
+模型目标值中对应各项之和。
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from edusched.domain.models import Assignment
+from edusched.scheduling.solution import PLACEHOLDER_ID
+
+if TYPE_CHECKING:
+    from edusched.scheduling.engine import SchedulingProblem
+
+logger = logging.getLogger(__name__)
+
+# 硬约束违反类型
+HARD_KINDS = ("teacher_conflict", "class_conflict", "room_conflict", "unavailable", "room_incompatible", "locked")
+# 增量计分的软约束
+SOFT_KINDS = ("teacher_preference", "balanced_distribution", "compact_schedule", "consecutive_classes")
+
+# 未安排 / 未指定教室
+UNPLACED = -1
+
+
+@dataclass
+class MoveEvaluation:
+    """一次移动（或交换）的评估结果。"""
+
+    # 各类硬约束违反数的变化
+    hard_deltas: Dict[str, int] = field(default_factory=dict)
+    # 各软约束加权惩罚的变化
+    penalty_deltas: Dict[str, int] = field(default_factory=dict)
+    # 移动后的硬约束违反总数
+    hard_violations: int = 0
+
+    @property
+    def hard_delta(self) -> int:
+        """硬约束违反总数的变化。"""
+        return sum(self.hard_deltas.values())
+
+    @property
+    def objective_delta(self) -> int:
+        """软约束目标值的变化（负数为改进）。"""
+        return sum(self.penalty_deltas.values())
+
+    @property
+    def feasible(self) -> bool:
+        """移动后课表是否满足全部硬约束。"""
+        return self.hard_violations == 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化的字典。"""
+        return {
+            "feasible": self.feasible,
+            "hard_violations": self.hard_violations,
+            "hard_delta": self.hard_delta,
+            "hard_deltas": {k: v for k, v in self.hard_deltas.items() if v},
+            "objective_delta": self.objective_delta,
+            "penalty_deltas": {k: v for k, v in self.penalty_deltas.items() if v},
+        }
+
+
+class TimetableEvaluator:
+    """维护课表占用计数和软约束惩罚，增量评估移动和交换。"""
+
+    def __init__(self, problem: "SchedulingProblem", assignments: Sequence[Assignment]):
+        """按问题数据和当前课表初始化。
+
+        Args:
+            problem: 调度问题（无需构建模型）
+            assignments: 当前课表的分配（每个教学段一条）
+        """
+        self.problem = problem
+        index = problem._get_index()
+        sections = problem.sections
+        timeslots = problem.timeslots
+        num_timeslots = len(timeslots)
+
+        # 教学段 -> 教师、班级编码
+        teacher_codes: Dict[Any, int] = {}
+        class_codes: Dict[Any, int] = {}
+        self.section_teacher = [teacher_codes.setdefault(s.teacher_id, len(teacher_codes)) for s in sections]
+        self.section_class = [class_codes.setdefault(s.class_group_id, len(class_codes)) for s in sections]
+
+        # 教室编码：启用教室分配时与兼容索引的教室下标一致
+        room_index = problem.room_index
+        self.room_codes: Dict[Any, int] = {}
+        if room_index is not None:
+            for room_id in room_index.room_ids:
+                self.room_codes.setdefault(room_id, len(self.room_codes))
+        for room in problem.rooms:
+            self.room_codes.setdefault(room.id, len(self.room_codes))
+        self.compatible = room_index.compatible if room_index is not None else None
+
+        # 教师 × 时间段：不可用（休息或教师不可用）、非偏好时间段的惩罚系数
+        teachers = {teacher.id: teacher for teacher in problem.teachers}
+        weights = problem.soft_weights
+        preference_coef = problem._scaled_weight(weights['teacher_preference'])
+        self.blocked: List[List[bool]] = []
+        self.nonpreferred: List[List[int]] = []
+        for teacher_id in teacher_codes:
+            teacher = teachers.get(teacher_id)
+            unavailable = set(teacher.unavailable_time_slots or []) if teacher is not None else set()
+            preferred = set(teacher.preferred_time_slots or []) if teacher is not None else set()
+            self.blocked.append([t.is_break or t.start_time in unavailable for t in timeslots])
+            self.nonpreferred.append([
+                preference_coef if preferred and t.start_time not in preferred else 0 for t in timeslots
+            ])
+
+        # 时间段 -> 星期编号、当天顺序中的前后时间段
+        day_codes = {day: d for d, day in enumerate(index.day_timeslots)}
+        self.slot_day = [day_codes[day] for day in index.timeslot_day]
+        self.slot_neighbors: List[Tuple[int, ...]] = [() for _ in range(num_timeslots)]
+        for slot_indices in index.day_timeslots.values():
+            # 与模型一致：只有超过2个时间段的日子计算紧凑性
+            if len(slot_indices) > 2:
+                for k, j in enumerate(slot_indices):
+                    self.slot_neighbors[j] = tuple(slot_indices[max(0, k - 1):k] + slot_indices[k + 1:k + 2])
+        num_days = len(day_codes)
+
+        # 班级每天平均课时（与模型一致：多于2个教学段且多于1天时计算均衡性）
+        self.balance_mean: List[Optional[int]] = [None] * len(class_codes)
+        for class_group_id, members in index.class_group_sections.items():
+            if len(members) > 2 and num_days > 1:
+                self.balance_mean[class_codes[class_group_id]] = -(-len(members) // num_days)
+        self.balance_coef = problem._scaled_weight(weights['balanced_distribution'])
+        self.compact_coef = problem._scaled_weight(weights['compact_schedule'])
+
+        # 连堂链接：后一课时须紧接在前一课时之后（系数与模型一致）
+        links = problem._consecutive_links()
+        self.section_links: List[List[Tuple[int, int]]] = [[] for _ in sections]
+        for a, b in links:
+            self.section_links[a].append((a, b))
+            self.section_links[b].append((a, b))
+        self.consecutive_pairs = set(index.timeslot_table.consecutive_pairs()) if links else set()
+        self.consecutive_coef = problem._scaled_weight(weights['consecutive_classes'] * 10)
+
+        # 占用计数
+        self.teacher_load = [[0] * num_timeslots for _ in teacher_codes]
+        self.class_load = [[0] * num_timeslots for _ in class_codes]
+        self.room_load = [[0] * num_timeslots for _ in self.room_codes]
+        self.class_day = [[0] * num_days for _ in class_codes]
+
+        self.timeslot_of = [UNPLACED] * len(sections)
+        self.room_of = [UNPLACED] * len(sections)
+        # 锁定时间段：问题中的锁定分配，以及课表中标记锁定的分配
+        self.locked_slot = [UNPLACED] * len(sections)
+        for i, j in problem._locked_timeslots().items():
+            self.locked_slot[i] = j
+        self.hard: Dict[str, int] = {kind: 0 for kind in HARD_KINDS}
+        self.penalties: Dict[str, int] = {kind: 0 for kind in SOFT_KINDS}
+        # 尚未安排任何教学段时全部连堂链接都未满足
+        self.penalties["consecutive_classes"] = len(links) * self.consecutive_coef
+
+        for assignment in assignments:
+            i = self._section_idx(assignment.section_id)
+            j = self._timeslot_idx(assignment.timeslot_id)
+            if assignment.is_locked:
+                self.locked_slot[i] = j
+            if self.timeslot_of[i] != UNPLACED:
+                logger.warning(f"教学段 {assignment.section_id} 有多条分配，只保留第一条")
+                continue
+            self._commit([(i, j, self._room_code(assignment.room_id))])
+
+    @property
+    def hard_violations(self) -> int:
+        """硬约束违反总数。"""
+        return sum(self.hard.values())
+
+    @property
+    def objective(self) -> int:
+        """软约束目标值（加权惩罚之和）。"""
+        return sum(self.penalties.values())
+
+    def evaluate_move(
+        self, assignment: Assignment, new_timeslot_id: UUID, new_room_id: Optional[UUID] = None
+    ) -> MoveEvaluation:
+        """评估把分配移到新时间段（及新教室，不指定时保持原教室），不修改课表。"""
+        return self._evaluate(self._move(assignment, new_timeslot_id, new_room_id), apply=False)
+
+    def apply_move(
+        self, assignment: Assignment, new_timeslot_id: UUID, new_room_id: Optional[UUID] = None
+    ) -> MoveEvaluation:
+        """执行移动并返回其评估结果。"""
+        return self._evaluate(self._move(assignment, new_timeslot_id, new_room_id), apply=True)
+
+    def evaluate_swap(self, first: Assignment, second: Assignment) -> MoveEvaluation:
+        """评估交换两条分配的时间段和教室，不修改课表。"""
+        return self._evaluate(self._swap(first, second), apply=False)
+
+    def apply_swap(self, first: Assignment, second: Assignment) -> MoveEvaluation:
+        """执行交换并返回其评估结果。"""
+        return self._evaluate(self._swap(first, second), apply=True)
+
+    def _move(
+        self, assignment: Assignment, new_timeslot_id: UUID, new_room_id: Optional[UUID]
+    ) -> List[Tuple[int, int, int]]:
+        i = self._section_idx(assignment.section_id)
+        j = self._timeslot_idx(new_timeslot_id)
+        r = self.room_of[i] if new_room_id is None else self._room_code(new_room_id)
+        return [(i, j, r)]
+
+    def _swap(self, first: Assignment, second: Assignment) -> List[Tuple[int, int, int]]:
+        i = self._section_idx(first.section_id)
+        k = self._section_idx(second.section_id)
+        if i == k:
+            return [(i, self.timeslot_of[i], self.room_of[i])]
+        return [(i, self.timeslot_of[k], self.room_of[k]), (k, self.timeslot_of[i], self.room_of[i])]
+
+    def _evaluate(self, moves: List[Tuple[int, int, int]], apply: bool) -> MoveEvaluation:
+        """先移除涉及的教学段再放到新位置，记录变化；只评估时再恢复原状。"""
+        previous = [(i, self.timeslot_of[i], self.room_of[i]) for i, _, _ in moves]
+        delta = self._commit(moves)
+        result = MoveEvaluation(
+            hard_deltas={kind: delta.get(kind, 0) for kind in HARD_KINDS},
+            penalty_deltas={kind: delta.get(kind, 0) for kind in SOFT_KINDS},
+            hard_violations=self.hard_violations,
+        )
+        if not apply:
+            self._commit(previous)
+        return result
+
+    def _commit(self, moves: List[Tuple[int, int, int]]) -> Dict[str, int]:
+        """把教学段放到 (时间段, 教室)，更新计数和惩罚，返回变化量。"""
+        delta: Dict[str, int] = {}
+        for i, _, _ in moves:
+            if self.timeslot_of[i] != UNPLACED:
+                self._update(i, self.timeslot_of[i], self.room_of[i], -1, delta)
+                self.timeslot_of[i] = UNPLACED
+        for i, j, r in moves:
+            if j != UNPLACED:
+                self._update(i, j, r, 1, delta)
+                self.timeslot_of[i] = j
+            self.room_of[i] = r
+        for kind, value in delta.items():
+            if kind in self.hard:
+                self.hard[kind] += value
+            else:
+                self.penalties[kind] += value
+        return delta
+
+    def _update(self, i: int, j: int, r: int, sign: int, delta: Dict[str, int]) -> None:
+        """在 (时间段j, 教室r) 上加入（sign=1）或移除（sign=-1）教学段i。"""
+        t = self.section_teacher[i]
+        c = self.section_class[i]
+
+        # 同一资源同一时间段的第二个及之后的教学段各计一次冲突
+        for kind, loads in (("teacher_conflict", self.teacher_load[t]), ("class_conflict", self.class_load[c])):
+            before = loads[j]
+            if before >= (1 if sign > 0 else 2):
+                delta[kind] = delta.get(kind, 0) + sign
+            loads[j] = before + sign
+        if r != UNPLACED:
+            loads = self.room_load[r]
+            before = loads[j]
+            if before >= (1 if sign > 0 else 2):
+                delta["room_conflict"] = delta.get("room_conflict", 0) + sign
+            loads[j] = before + sign
+            if self.compatible is not None and r not in self.compatible[i]:
+                delta["room_incompatible"] = delta.get("room_incompatible", 0) + sign
+
+        if self.blocked[t][j]:
+            delta["unavailable"] = delta.get("unavailable", 0) + sign
+        if self.locked_slot[i] != UNPLACED and self.locked_slot[i] != j:
+            delta["locked"] = delta.get("locked", 0) + sign
+
+        coef = self.nonpreferred[t][j]
+        if coef:
+            delta["teacher_preference"] = delta.get("teacher_preference", 0) + sign * coef
+
+        # 班级当天课时超出平均值的部分
+        mean = self.balance_mean[c]
+        if mean is not None:
+            day = self.slot_day[j]
+            count = self.class_day[c][day]
+            change = max(0, count + sign - mean) - max(0, count - mean)
+            if change:
+                delta["balanced_distribution"] = delta.get("balanced_distribution", 0) + change * self.balance_coef
+            self.class_day[c][day] = count + sign
+
+        # 班级在该时间段的有课状态翻转时，与当天相邻时间段的空档数变化
+        after = self.class_load[c][j]
+        if (after > 0) != (after - sign > 0):
+            occupied = after > 0
+            change = 0
+            for q in self.slot_neighbors[j]:
+                neighbor = self.class_load[c][q] > 0
+                change += (occupied != neighbor) - ((not occupied) != neighbor)
+            if change:
+                delta["compact_schedule"] = delta.get("compact_schedule", 0) + change * self.compact_coef
+
+        # 加入时满足的连堂链接不再计违反，移除时重新计违反（此时 timeslot_of[i] 尚未更新）
+        for a, b in self.section_links[i]:
+            ja = j if a == i else self.timeslot_of[a]
+            jb = j if b == i else self.timeslot_of[b]
+            if (ja, jb) in self.consecutive_pairs:
+                delta["consecutive_classes"] = delta.get("consecutive_classes", 0) - sign * self.consecutive_coef
+
+    def _section_idx(self, section_id: UUID) -> int:
+        i = self.problem.section_to_idx.get(section_id)
+        if i is None:
+            raise ValueError(f"教学段 {section_id} 不在调度问题中")
+        return i
+
+    def _timeslot_idx(self, timeslot_id: UUID) -> int:
+        j = self.problem.timeslot_to_idx.get(timeslot_id)
+        if j is None:
+            raise ValueError(f"时间段 {timeslot_id} 不在调度问题中")
+        return j
+
+    def _room_code(self, room_id: Optional[UUID]) -> int:
+        """教室编码，首次出现的教室追加一行占用计数。"""
+        if room_id is None or room_id == PLACEHOLDER_ID:
+            return UNPLACED
+        code = self.room_codes.get(room_id)
+        if code is None:
+            code = self.room_codes[room_id] = len(self.room_load)
+            self.room_load.append([0] * len(self.problem.timeslots))
+        return code
+
+
+class EvaluatorRegistry:
+    """按课表ID保存打开的评估器（LRU，超出数量时淘汰最久未使用的）。"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[UUID, TimetableEvaluator]" = OrderedDict()
+
+    def get(self, timetable_id: UUID) -> Optional[TimetableEvaluator]:
+        """获取课表的评估器。"""
+        with self._lock:
+            evaluator = self._items.get(timetable_id)
+            if evaluator is not None:
+                self._items.move_to_end(timetable_id)
+            return evaluator
+
+    def open(
+        self, timetable_id: UUID, problem: "SchedulingProblem", assignments: Sequence[Assignment]
+    ) -> TimetableEvaluator:
+        """为课表创建评估器（已打开时替换）。"""
+        evaluator = TimetableEvaluator(problem, assignments)
+        with self._lock:
+            self._items[timetable_id] = evaluator
+            self._items.move_to_end(timetable_id)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return evaluator
+
+    def close(self, timetable_id: UUID) -> None:
+        """关闭课表的评估器。"""
+        with self._lock:
+            self._items.pop(timetable_id, None)
@@ -0,0 +1,249 @@
+"""求解前可行性检查模块。
+
+在构建模型之前用计数上界快速排除必然无解的问题：班级、教师、教室容量组需要的时间段数
+不能超过其可用时间段数，锁定分配之间不能冲突。检查只遍历一次教学段和分配，
+毫秒级即可完成，无解的任务不必进入求解队列等待超时。
+
+检查只给出必要条件：通过检查不代表一定有解。
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+if TYPE_CHECKING:
+    from edusched.scheduling.engine import SchedulingProblem
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FeasibilityViolation:
+    """一条可行性违反。"""
+
+    # 违反类型：class_group_hours、teacher_hours、teacher_availability、room_capacity、
+    # no_compatible_room、locked_unknown、locked_conflict；
+    # 警告类型：locked_unavailable
+    kind: str
+    message: str
+    entity_id: Optional[UUID] = None
+    # 需要的时间段数与可提供的时间段数
+    demand: int = 0
+    supply: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化的字典。"""
+        return {
+            "kind": self.kind,
+            "message": self.message,
+            "entity_id": str(self.entity_id) if self.entity_id is not None else None,
+            "demand": self.demand,
+            "supply": self.supply,
+        }
+
+
+@dataclass
+class FeasibilityReport:
+    """可行性检查结果。"""
+
+    violations: List[FeasibilityViolation] = field(default_factory=list)
+    # 不影响可解性的问题（模型接受锁定在休息或教师不可用时间段的分配）
+    warnings: List[FeasibilityViolation] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def is_feasible(self) -> bool:
+        """是否未发现违反。"""
+        return not self.violations
+
+    def to_metrics(self) -> Dict[str, Any]:
+        """转换为可序列化的指标。"""
+        return {
+            "feasibility_passed": self.is_feasible,
+            "feasibility_elapsed": self.elapsed,
+            "feasibility_violations": [v.to_dict() for v in self.violations],
+            "feasibility_warnings": [w.to_dict() for w in self.warnings],
+        }
+
+
+class FeasibilityChecker:
+    """基于计数上界的求解前可行性检查。"""
+
+    def __init__(self, problem: "SchedulingProblem", weekly_hours: bool = False):
+        """初始化检查器。
+
+        Args:
+            problem: 调度问题（无需构建模型）
+            weekly_hours: 是否按 hours_per_week 计算教学段需要的时间段数（课次模型），
+                否则每个教学段占用一个时间段（分配变量模型）
+        """
+        self.problem = problem
+        self.weekly_hours = weekly_hours
+
+    def check(self) -> FeasibilityReport:
+        """执行全部检查。"""
+        start = time.perf_counter()
+        problem = self.problem
+        usable_slots = [j for j, timeslot in enumerate(problem.timeslots) if not timeslot.is_break]
+        self._teacher_slots = problem._teacher_available_timeslots(usable_slots)
+        self._usable_slots = usable_slots
+        self._demand = [self._section_demand(section) for section in problem.sections]
+
+        report = FeasibilityReport()
+        report.violations.extend(self._check_class_groups())
+        report.violations.extend(self._check_teachers())
+        report.violations.extend(self._check_rooms())
+        report.violations.extend(self._check_locked(report.warnings))
+        report.elapsed = time.perf_counter() - start
+
+        if report.violations:
+            logger.warning(
+                f"可行性检查发现 {len(report.violations)} 处违反（{report.elapsed * 1000:.1f}毫秒）"
+            )
+        for warning in report.warnings:
+            logger.warning(f"可行性检查警告：{warning.message}")
+        return report
+
+    def _section_demand(self, section: Any) -> int:
+        """教学段需要的时间段数。"""
+        return max(1, section.hours_per_week) if self.weekly_hours else 1
+
+    def _check_class_groups(self) -> List[FeasibilityViolation]:
+        """班级每周课时不超过可用时间段数。"""
+        index = self.problem._get_index()
+        supply = len(self._usable_slots)
+        violations = []
+        for class_group_id, members in index.class_group_sections.items():
+            demand = sum(self._demand[i] for i in members)
+            if demand > supply:
+                violations.append(FeasibilityViolation(
+                    kind="class_group_hours",
+                    message=f"班级 {class_group_id} 每周需要 {demand} 课时，只有 {supply} 个可用时间段",
+                    entity_id=class_group_id,
+                    demand=demand,
+                    supply=supply,
+                ))
+        return violations
+
+    def _check_teachers(self) -> List[FeasibilityViolation]:
+        """教师课时不超过每周最大课时数和可用时间段数。"""
+        index = self.problem._get_index()
+        teachers = {teacher.id: teacher for teacher in self.problem.teachers}
+        violations = []
+        for teacher_id, members in index.teacher_sections.items():
+            demand = sum(self._demand[i] for i in members)
+            available = len(self._teacher_slots.get(teacher_id, self._usable_slots))
+            if demand > available:
+                violations.append(FeasibilityViolation(
+                    kind="teacher_availability",
+                    message=f"教师 {teacher_id} 需要 {demand} 课时，只有 {available} 个可用时间段",
+                    entity_id=teacher_id,
+                    demand=demand,
+                    supply=available,
+                ))
+            teacher = teachers.get(teacher_id)
+            if teacher is not None and demand > teacher.max_hours_per_week:
+                violations.append(FeasibilityViolation(
+                    kind="teacher_hours",
+                    message=f"教师 {teacher_id} 需要 {demand} 课时，超过每周最大课时数 {teacher.max_hours_per_week}",
+                    entity_id=teacher_id,
+                    demand=demand,
+                    supply=teacher.max_hours_per_week,
+                ))
+        return violations
+
+    def _check_rooms(self) -> List[FeasibilityViolation]:
+        """教室容量组的课时不超过 教室数 × 可用时间段数，且每个教学段都有兼容教室。"""
+        problem = self.problem
+        index = problem._get_index()
+        room_index = problem.room_index
+        violations = []
+
+        if room_index is not None:
+            for i, rooms in enumerate(room_index.compatible):
+                if not rooms:
+                    section = problem.sections[i]
+                    violations.append(FeasibilityViolation(
+                        kind="no_compatible_room",
+                        message=f"教学段 {section.id} 没有满足容量、类型和特性要求的教室",
+                        entity_id=section.id,
+                        demand=self._demand[i],
+                    ))
+
+        for group in index.room_groups:
+            demand = sum(self._demand[i] for i in group.members)
+            supply = group.capacity * len(self._usable_slots)
+            if demand > supply:
+                room_ids = self._group_room_ids(group.members)
+                label = ", ".join(str(r) for r in room_ids) if None not in room_ids else "（未指定教室的教学段共用）"
+                violations.append(FeasibilityViolation(
+                    kind="room_capacity",
+                    message=f"教室 {label} 共需承担 {demand} 课时，最多只能安排 {supply} 课时",
+                    entity_id=room_ids[0] if len(room_ids) == 1 else None,
+                    demand=demand,
+                    supply=supply,
+                ))
+        return violations
+
+    def _group_room_ids(self, members: List[int]) -> List[Optional[UUID]]:
+        """容量组对应的教室ID（未启用教室分配时为教学段指定的教室）。"""
+        problem = self.problem
+        room_index = problem.room_index
+        if room_index is None:
+            return sorted({problem.sections[i].room_id for i in members}, key=str)
+        rooms = set().union(*(room_index.compatible[i] for i in members))
+        return [room_index.room_ids[r] for r in sorted(rooms)]
+
+    def _check_locked(self, warnings: List[FeasibilityViolation]) -> List[FeasibilityViolation]:
+        """锁定分配引用的教学段和时间段存在，且相互之间不冲突。
+
+        模型保留锁定分配的时间段，锁定在休息或教师不可用时间段的分配只记入 warnings。
+        """
+        problem = self.problem
+        usable = set(self._usable_slots)
+        teacher_slots = {teacher_id: set(slots) for teacher_id, slots in self._teacher_slots.items()}
+        occupied: Dict[Tuple[str, Any, int], UUID] = {}
+        violations = []
+
+        for assignment in problem.existing_assignments:
+            if not assignment.is_locked:
+                continue
+            i = problem.section_to_idx.get(assignment.section_id)
+            j = problem.timeslot_to_idx.get(assignment.timeslot_id)
+            if i is None or j is None:
+                violations.append(FeasibilityViolation(
+                    kind="locked_unknown",
+                    message=f"锁定分配引用了不存在的教学段 {assignment.section_id} 或时间段 {assignment.timeslot_id}",
+                    entity_id=assignment.section_id,
+                ))
+                continue
+
+            section = problem.sections[i]
+            if j not in teacher_slots.get(section.teacher_id, usable):
+                warnings.append(FeasibilityViolation(
+                    kind="locked_unavailable",
+                    message=f"教学段 {section.id} 锁定在休息或教师不可用的时间段 {assignment.timeslot_id}",
+                    entity_id=section.id,
+                ))
+
+            keys = [("教师", section.teacher_id, j), ("班级", section.class_group_id, j)]
+            if section.room_id is not None or problem.room_index is None:
+                # 未启用教室分配时，未指定教室的教学段与模型一致视为共用同一教室
+                keys.append(("教室", section.room_id, j))
+            for key in keys:
+                other = occupied.setdefault(key, section.id)
+                if other != section.id:
+                    violations.append(FeasibilityViolation(
+                        kind="locked_conflict",
+                        message=f"锁定的教学段 {other} 与 {section.id} 在时间段 {assignment.timeslot_id} "
+                                f"共用{key[0]} {key[1]}",
+                        entity_id=section.id,
+                    ))
+        return violations
+
+
+def check_feasibility(problem: "SchedulingProblem", weekly_hours: bool = False) -> FeasibilityReport:
+    """检查调度问题是否满足可解的必要条件。"""
+    return FeasibilityChecker(problem, weekly_hours).check()
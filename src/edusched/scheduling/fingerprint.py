@@ -0,0 +1,92 @@
+"""调度问题指纹模块。
+
+为 SchedulingProblem 计算与添加顺序无关的规范指纹：每个教学段、时间段、教师、约束和锁定分配
+先按规范JSON单独求摘要，排序后再合并为整体摘要。整体摘要相同即可直接复用已求解的课表；
+元素摘要集合的相似度用于查找只有少量修改的近似问题。
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, FrozenSet, Iterable
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from edusched.scheduling.engine import SchedulingProblem
+
+# 审计字段不影响求解
+AUDIT_FIELDS = frozenset({"created_at", "updated_at", "created_by", "updated_by"})
+# 仅用于展示的描述字段不影响求解
+DESCRIPTIVE_FIELDS = frozenset({
+    "name", "code", "email", "phone", "notes", "description", "title", "employee_id", "department",
+})
+# 约束按内容而非ID比较
+CONSTRAINT_EXCLUDED_FIELDS = AUDIT_FIELDS | DESCRIPTIVE_FIELDS | {"id"}
+
+DIGEST_SIZE = 16
+
+
+def _digest(payload: Any) -> str:
+    """计算规范JSON的摘要。"""
+    text = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=DIGEST_SIZE).hexdigest()
+
+
+def _entity_digest(kind: str, entity: BaseModel, exclude: FrozenSet[str]) -> str:
+    """计算单个实体的摘要（带类型前缀，避免不同类型的实体碰撞）。"""
+    return _digest([kind, entity.model_dump(mode="json", exclude=set(exclude))])
+
+
+def _combine(digests: Iterable[str]) -> str:
+    """合并元素摘要（排序后与顺序无关）。"""
+    return _digest(sorted(digests))
+
+
+@dataclass(frozen=True)
+class ProblemFingerprint:
+    """调度问题指纹。"""
+
+    tenant_id: str
+    # 整体摘要：相同即为同一问题
+    digest: str
+    # 时间段网格摘要：网格相同的问题才可能互相提供热启动
+    grid_digest: str
+    # 所有元素的摘要集合
+    elements: FrozenSet[str]
+
+    def similarity(self, elements: Iterable[str]) -> float:
+        """与另一组元素摘要的Jaccard相似度。"""
+        other = frozenset(elements)
+        union = len(self.elements | other)
+        if union == 0:
+            return 1.0
+        return len(self.elements & other) / union
+
+
+def fingerprint_problem(problem: "SchedulingProblem") -> ProblemFingerprint:
+    """计算调度问题的规范指纹。"""
+    entity_exclude = AUDIT_FIELDS | DESCRIPTIVE_FIELDS
+
+    timeslots = [_entity_digest("timeslot", t, entity_exclude) for t in problem.timeslots]
+    elements = list(timeslots)
+    elements.extend(_entity_digest("section", s, entity_exclude) for s in problem.sections)
+    elements.extend(_entity_digest("teacher", t, entity_exclude) for t in problem.teachers)
+    elements.extend(_entity_digest("room", r, entity_exclude) for r in problem.rooms)
+    elements.extend(_entity_digest("class_group", c, entity_exclude) for c in problem.class_groups)
+    elements.extend(
+        _entity_digest("constraint", c, CONSTRAINT_EXCLUDED_FIELDS) for c in problem.constraints
+    )
+    # 只有锁定的分配参与建模
+    elements.extend(
+        _digest(["locked", str(a.section_id), str(a.timeslot_id), str(a.room_id)])
+        for a in problem.existing_assignments
+        if a.is_locked
+    )
+
+    return ProblemFingerprint(
+        tenant_id=problem.tenant_id,
+        digest=_combine([_digest(["tenant", problem.tenant_id]), *elements]),
+        grid_digest=_combine([_digest(["tenant", problem.tenant_id]), *timeslots]),
+        elements=frozenset(elements),
+    )
@@ -0,0 +1,285 @@
+"""增量重排模块。
+
+局部修改（教师请假、班级新增教学段等）后不必重新求解整个问题：
+根据变更集计算受影响的邻域（变更的教学段及与其共享教师、班级的教学段），
+其余教学段固定在原课表的时间段上，只重新求解邻域，并以移动的教学段数为首要目标，
+得到扰动最小的新课表。邻域无解时逐步扩大半径，最终退化为全部释放。
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set
+from uuid import UUID
+
+from ortools.sat.python import cp_model
+from ortools.sat.python.cp_model import CpSolver
+
+from edusched.domain.models import Assignment, Section, Teacher
+from edusched.scheduling.cancellation import stop_on_cancel
+from edusched.scheduling.solution import SolutionVector, solver_values
+
+if TYPE_CHECKING:
+    from edusched.scheduling.engine import SchedulingProblem
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChangeSet:
+    """对调度问题的局部修改。"""
+
+    added_sections: List[Section] = field(default_factory=list)
+    # 按ID替换的教学段（如更换教师、班级或教室）
+    updated_sections: List[Section] = field(default_factory=list)
+    removed_section_ids: List[UUID] = field(default_factory=list)
+    # 按ID替换的教师（如请假导致不可用时间段变化）
+    updated_teachers: List[Teacher] = field(default_factory=list)
+    removed_timeslot_ids: List[UUID] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        """是否没有任何修改。"""
+        return not (
+            self.added_sections
+            or self.updated_sections
+            or self.removed_section_ids
+            or self.updated_teachers
+            or self.removed_timeslot_ids
+        )
+
+    def apply(self, problem: "SchedulingProblem") -> "SchedulingProblem":
+        """返回应用修改后的新调度问题（原问题不变）。"""
+        from edusched.scheduling.engine import SchedulingProblem
+
+        removed_sections = set(self.removed_section_ids)
+        removed_timeslots = set(self.removed_timeslot_ids)
+        updated_sections = {section.id: section for section in self.updated_sections}
+        updated_teachers = {teacher.id: teacher for teacher in self.updated_teachers}
+
+        changed = SchedulingProblem(problem.tenant_id)
+        for section in problem.sections:
+            if section.id not in removed_sections:
+                changed.add_section(updated_sections.get(section.id, section))
+        for section in self.added_sections:
+            changed.add_section(section)
+        for timeslot in problem.timeslots:
+            if timeslot.id not in removed_timeslots:
+                changed.add_timeslot(timeslot)
+        for teacher in problem.teachers:
+            changed.add_teacher(updated_teachers.get(teacher.id, teacher))
+        for teacher in self.updated_teachers:
+            changed.add_teacher(teacher)
+        for room in problem.rooms:
+            changed.add_room(room)
+        for class_group in problem.class_groups:
+            changed.add_class_group(class_group)
+        for constraint in problem.constraints:
+            changed.add_constraint(constraint)
+        for assignment in problem.existing_assignments:
+            if assignment.section_id not in removed_sections and assignment.timeslot_id not in removed_timeslots:
+                changed.add_existing_assignment(assignment)
+        changed.cancel_token = problem.cancel_token
+        changed.symmetry_breaking = problem.symmetry_breaking
+        return changed
+
+    def changed_section_ids(self, problem: "SchedulingProblem") -> Set[UUID]:
+        """直接受修改影响的教学段ID（新增、更新及所属教师被修改的教学段）。"""
+        section_ids = {section.id for section in self.added_sections}
+        section_ids.update(section.id for section in self.updated_sections)
+        teacher_ids = {teacher.id for teacher in self.updated_teachers}
+        if teacher_ids:
+            section_ids.update(s.id for s in problem.sections if s.teacher_id in teacher_ids)
+        return section_ids
+
+
+@dataclass
+class IncrementalResult:
+    """增量重排结果。"""
+
+    success: bool = False
+    solution: Dict[int, int] = field(default_factory=dict)  # 教学段下标 -> 时间段下标
+    # 重新求解的教学段数
+    free_sections: int = 0
+    # 与原课表相比时间段发生变化的教学段数
+    moved_sections: int = 0
+    # 最终使用的邻域半径，None 表示全部释放
+    radius: Optional[int] = None
+    attempts: int = 0
+    objective: Optional[float] = None
+    elapsed: float = 0.0
+    solver: Optional[CpSolver] = None
+
+    def to_metrics(self) -> Dict[str, Any]:
+        """转换为可序列化的指标。"""
+        return {
+            "incremental_success": self.success,
+            "incremental_free_sections": self.free_sections,
+            "incremental_moved_sections": self.moved_sections,
+            "incremental_radius": self.radius,
+            "incremental_attempts": self.attempts,
+            "incremental_elapsed": self.elapsed,
+            "final_objective": self.objective,
+        }
+
+
+class IncrementalRescheduler:
+    """在原课表基础上只重新求解受影响邻域。"""
+
+    def __init__(
+        self,
+        problem: "SchedulingProblem",
+        previous_assignments: List[Assignment],
+        changed_section_ids: Set[UUID],
+        radius: int = 1,
+        max_radius: int = 3,
+        move_weight: int = 100,
+        num_search_workers: int = 4,
+    ):
+        """初始化增量重排器。
+
+        Args:
+            problem: 应用修改后并已调用 build_model() 的调度问题
+            previous_assignments: 修改前的课表
+            changed_section_ids: 直接受修改影响的教学段ID
+            radius: 初始邻域半径（沿共享教师、班级扩展的层数）
+            max_radius: 邻域无解时扩展到的最大半径，超过后释放全部教学段
+            move_weight: 每移动一个教学段的目标惩罚，远大于软约束惩罚以优先保持原课表
+            num_search_workers: 并行搜索数
+        """
+        if problem.model is None:
+            raise RuntimeError("模型未构建，请先调用 build_model()")
+
+        self.problem = problem
+        # 可互换教学段之间的交换不算移动，按对称性约束规范化原课表
+        self.previous = problem.canonicalize_solution(
+            problem._assignments_to_solution(previous_assignments)
+        )
+        self.radius = radius
+        self.max_radius = max(radius, max_radius)
+        self.move_weight = move_weight
+        self.num_search_workers = num_search_workers
+
+        # 直接受影响的教学段：被修改的、原课表中没有的、原时间段已不可用的
+        seeds = {
+            problem.section_to_idx[section_id]
+            for section_id in changed_section_ids
+            if section_id in problem.section_to_idx
+        }
+        for i in range(len(problem.sections)):
+            j = self.previous.get(i)
+            if j is None or j not in problem.section_domains[i]:
+                seeds.add(i)
+        self.seeds = seeds
+
+    def neighborhood(self, radius: int) -> Set[int]:
+        """沿共享教师、班级扩展 radius 层，并加入在原时间段占满其教室容量组的教学段。"""
+        problem = self.problem
+        index = problem._get_index()
+        sections = problem.sections
+
+        free = set(self.seeds)
+        frontier = set(self.seeds)
+        for _ in range(radius):
+            reached: Set[int] = set()
+            for i in frontier:
+                reached.update(index.teacher_sections.get(sections[i].teacher_id, ()))
+                reached.update(index.class_group_sections.get(sections[i].class_group_id, ()))
+            frontier = reached - free
+            free |= frontier
+            if not frontier:
+                break
+
+        # 原时间段上占满同一教室容量组的教学段也需让出位置
+        occupants: Dict[Any, List[int]] = {}
+        for i, j in self.previous.items():
+            if i not in free:
+                for g in index.section_room_groups[i]:
+                    occupants.setdefault((g, j), []).append(i)
+        for i in list(self.seeds):
+            j = self.previous.get(i)
+            if j is None:
+                continue
+            for g in index.section_room_groups[i]:
+                members = occupants.get((g, j), [])
+                if len(members) >= index.room_groups[g].capacity:
+                    free.update(members)
+
+        # 可互换教学段之间有顺序约束，需整体释放
+        for members in problem.symmetry_classes:
+            if free.intersection(members):
+                free.update(members)
+        return free
+
+    def solve(self, time_limit: float = 10.0) -> IncrementalResult:
+        """求解受影响邻域，无解时扩大邻域直至全部释放。"""
+        start = time.perf_counter()
+        deadline = start + time_limit
+        result = IncrementalResult()
+
+        radii: List[Optional[int]] = list(range(self.radius, self.max_radius + 1)) + [None]
+        for radius in radii:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or self.problem.is_cancelled():
+                break
+
+            free = set(range(len(self.problem.sections))) if radius is None else self.neighborhood(radius)
+            result.attempts += 1
+            solver, status = self._solve(free, remaining)
+            logger.info(
+                f"增量重排：半径 {radius if radius is not None else '全部'}，"
+                f"释放 {len(free)} 个教学段，状态 {solver.StatusName(status)}"
+            )
+            if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                self._accept(result, solver, free, radius)
+                break
+            if status != cp_model.INFEASIBLE:
+                # 超时或取消：不再扩大邻域
+                break
+            if len(free) == len(self.problem.sections):
+                break
+
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def _solve(self, free: Set[int], time_limit: float) -> Any:
+        """固定邻域外的教学段，以移动数和软约束惩罚为目标求解模型副本。"""
+        problem = self.problem
+        model = problem.model.Clone()
+        vars = problem.assignment_vars
+
+        stay_vars = []
+        for i, j in self.previous.items():
+            var = vars.get(i, j)
+            if var is None:
+                continue
+            if i in free:
+                stay_vars.append(var)
+            else:
+                model.Add(var == 1)
+
+        # 移动数 = 可留在原时间段的教学段数 - 实际留下的数量
+        penalties = sum(getattr(problem, 'penalty_vars', {}).values())
+        model.Minimize(self.move_weight * (len(stay_vars) - sum(stay_vars)) + penalties)
+        problem._add_hints(model, vars, self.previous)
+
+        solver = CpSolver()
+        solver.parameters.max_time_in_seconds = max(time_limit, 0.01)
+        solver.parameters.num_search_workers = self.num_search_workers
+        with stop_on_cancel(solver, problem.cancel_token):
+            status = solver.Solve(model)
+        return solver, status
+
+    def _accept(self, result: IncrementalResult, solver: CpSolver, free: Set[int], radius: Optional[int]) -> None:
+        """记录求解结果。"""
+        problem = self.problem
+        result.success = True
+        result.solver = solver
+        result.radius = radius
+        result.free_sections = len(free)
+        values = solver_values(solver)
+        result.solution = SolutionVector.from_values(values, problem.assignment_vars).as_dict()
+        result.moved_sections = sum(
+            1 for i, j in result.solution.items() if i in self.previous and self.previous[i] != j
+        )
+        penalty_vars = getattr(problem, 'penalty_vars', {})
+        result.objective = float(sum(int(values[var.Index()]) for var in penalty_vars.values()))
@@ -0,0 +1,108 @@
+"""调度问题索引模块。
+
+在构建模型前一次性预计算教学段、教师、班级和时间段之间的索引关系，
+供各约束构建器共享，避免在时间段循环中重复扫描教学段列表。
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from edusched.domain.models import Section, Timeslot
+from edusched.scheduling.timeslot_table import TimeslotTable
+
+
+@dataclass
+class RoomGroup:
+    """教室容量组：同一时间段内 members 中最多 capacity 个教学段上课。"""
+
+    # 教学段下标列表
+    members: List[int]
+    capacity: int = 1
+
+
+@dataclass
+class ProblemIndex:
+    """调度问题预计算索引。"""
+
+    # 教师ID -> 教学段下标列表
+    teacher_sections: Dict[UUID, List[int]] = field(default_factory=dict)
+    # 班级ID -> 教学段下标列表
+    class_group_sections: Dict[UUID, List[int]] = field(default_factory=dict)
+    # 教室ID -> 教学段下标列表（未指定教室的教学段共用键None）
+    room_sections: Dict[Optional[UUID], List[int]] = field(default_factory=dict)
+    # 星期 -> 按开始时间排序的时间段下标列表
+    day_timeslots: Dict[Any, List[int]] = field(default_factory=dict)
+    # 时间段下标 -> 所在星期
+    timeslot_day: List[Any] = field(default_factory=list)
+    # 教室容量组（只保留可能超出容量的组）
+    room_groups: List[RoomGroup] = field(default_factory=list)
+    # 教学段下标 -> 所属教室容量组下标
+    section_room_groups: List[List[int]] = field(default_factory=list)
+    # 时间段列表（用于按需构建整数编码表）
+    timeslots: Sequence[Timeslot] = field(default=(), repr=False)
+    _timeslot_table: Optional[TimeslotTable] = field(default=None, repr=False)
+
+    @classmethod
+    def build(
+        cls,
+        sections: Sequence[Section],
+        timeslots: Sequence[Timeslot],
+        room_groups: Optional[List[RoomGroup]] = None,
+    ) -> "ProblemIndex":
+        """一次遍历构建索引。
+
+        未提供 room_groups 时，每个教室（含未指定教室的隐含共用教室）为容量1的组。
+        """
+        index = cls(timeslots=timeslots)
+
+        for i, section in enumerate(sections):
+            index.teacher_sections.setdefault(section.teacher_id, []).append(i)
+            index.class_group_sections.setdefault(section.class_group_id, []).append(i)
+            index.room_sections.setdefault(section.room_id, []).append(i)
+
+        if room_groups is None:
+            room_groups = [RoomGroup(members) for members in index.room_sections.values()]
+        index.room_groups = [group for group in room_groups if len(group.members) > group.capacity]
+        index.section_room_groups = [[] for _ in sections]
+        for g, group in enumerate(index.room_groups):
+            for i in group.members:
+                index.section_room_groups[i].append(g)
+
+        for j, timeslot in enumerate(timeslots):
+            day = timeslot.week_day
+            index.timeslot_day.append(day)
+            index.day_timeslots.setdefault(day, []).append(j)
+
+        # 每天的时间段按开始时间排序
+        for day, slot_indices in index.day_timeslots.items():
+            if len(slot_indices) > 1:
+                slot_indices.sort(key=lambda j: timeslots[j].start_time)
+
+        return index
+
+    @property
+    def timeslot_table(self) -> TimeslotTable:
+        """时间段的整数编码表（首次访问时构建）。"""
+        if self._timeslot_table is None:
+            self._timeslot_table = TimeslotTable.build(self.timeslots, self.day_timeslots)
+        return self._timeslot_table
+
+    def sections_of_teacher(self, teacher_id: UUID) -> List[int]:
+        """获取教师的教学段下标。"""
+        return self.teacher_sections.get(teacher_id, [])
+
+    def resource_groups(self) -> List[List[int]]:
+        """获取共享教师、班级或教室容量组的教学段分组。"""
+        return (
+            list(self.teacher_sections.values())
+            + list(self.class_group_sections.values())
+            + [group.members for group in self.room_groups]
+        )
+
+    def adjacent_timeslot_pairs(self) -> List[Tuple[int, int]]:
+        """获取同一天内按顺序相邻的时间段下标对。"""
+        pairs = []
+        for slot_indices in self.day_timeslots.values():
+            pairs.extend(zip(slot_indices, slot_indices[1:]))
+        return pairs
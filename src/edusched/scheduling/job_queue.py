@@ -0,0 +1,339 @@
+"""调度任务队列模块。
+
+调度任务以 SchedulingJob 行的形式持久化：状态为 DRAFT 的任务等待领取，
+工作进程领取后写入 worker_id 并持有租约，通过心跳续约。
+租约过期（工作进程崩溃）的任务会被重新放回队列，超过最大领取次数则标记失败。
+"""
+
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import Session
+
+from edusched.domain.models import SchedulingStatus
+from edusched.infrastructure.database.models import SchedulingJob as SchedulingJobTable
+from edusched.scheduling.callbacks import SolutionProgress
+
+logger = logging.getLogger(__name__)
+
+CANCELLED_MESSAGE = "任务被用户取消"
+LEASE_EXPIRED_MESSAGE = "工作进程失联，超过最大领取次数"
+
+
+@dataclass
+class QueuedJob:
+    """已领取的调度任务。"""
+
+    job_id: str
+    tenant_id: str
+    timetable_id: str
+    attempts: int = 0
+
+
+@dataclass
+class JobOutcome:
+    """调度任务的执行结果。"""
+
+    status: SchedulingStatus
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    error_message: Optional[str] = None
+
+
+class JobQueue(ABC):
+    """调度任务队列接口。"""
+
+    @abstractmethod
+    def enqueue(self, job_id: Any, tenant_id: str, timetable_id: Any) -> None:
+        """加入待领取的任务。"""
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[QueuedJob]:
+        """领取最早的待处理任务，没有任务时返回None。"""
+
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """续约，返回任务是否仍由该工作进程持有（已取消或被收回时为False）。"""
+
+    @abstractmethod
+    def is_active(self, job_id: str, worker_id: str) -> bool:
+        """任务是否仍在运行且由该工作进程持有。"""
+
+    @abstractmethod
+    def update_progress(self, job_id: str, worker_id: str, progress: SolutionProgress) -> None:
+        """写入求解进度。"""
+
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str, outcome: JobOutcome) -> None:
+        """记录结果。已被取消的任务只补写结果元数据，不覆盖状态。"""
+
+    @abstractmethod
+    def requeue_expired(self, max_attempts: int) -> int:
+        """收回租约过期的任务，返回处理的任务数。"""
+
+
+@dataclass
+class _JobRecord:
+    """内存队列中的任务状态。"""
+
+    job: QueuedJob
+    status: SchedulingStatus = SchedulingStatus.DRAFT
+    worker_id: Optional[str] = None
+    progress: float = 0.0
+    result_metadata: Dict[str, Any] = field(default_factory=dict)
+    error_message: Optional[str] = None
+    heartbeat_at: Optional[float] = None
+    lease_expires_at: Optional[float] = None
+
+    @property
+    def id(self) -> str:
+        return self.job.job_id
+
+    @property
+    def attempts(self) -> int:
+        return self.job.attempts
+
+
+class InMemoryJobQueue(JobQueue):
+    """进程内任务队列（用于测试和单进程开发环境，工作者需以线程方式运行）。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._records: Dict[str, _JobRecord] = {}
+
+    def enqueue(self, job_id: Any, tenant_id: str, timetable_id: Any) -> None:
+        key = str(job_id)
+        with self._lock:
+            self._records[key] = _JobRecord(
+                job=QueuedJob(job_id=key, tenant_id=tenant_id, timetable_id=str(timetable_id))
+            )
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[QueuedJob]:
+        now = time.time()
+        with self._lock:
+            for record in self._records.values():
+                if record.status == SchedulingStatus.DRAFT:
+                    record.status = SchedulingStatus.RUNNING
+                    record.worker_id = worker_id
+                    record.heartbeat_at = now
+                    record.lease_expires_at = now + lease_seconds
+                    record.job.attempts += 1
+                    return replace(record.job)
+        return None
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        now = time.time()
+        with self._lock:
+            record = self._owned(job_id, worker_id)
+            if record is None:
+                return False
+            record.heartbeat_at = now
+            record.lease_expires_at = now + lease_seconds
+            return True
+
+    def is_active(self, job_id: str, worker_id: str) -> bool:
+        with self._lock:
+            return self._owned(job_id, worker_id) is not None
+
+    def update_progress(self, job_id: str, worker_id: str, progress: SolutionProgress) -> None:
+        with self._lock:
+            record = self._owned(job_id, worker_id)
+            if record is not None:
+                record.progress = progress.progress
+                record.result_metadata["incumbent"] = progress.to_dict()
+
+    def complete(self, job_id: str, worker_id: str, outcome: JobOutcome) -> None:
+        with self._lock:
+            record = self._records.get(job_id)
+            if record is None or record.worker_id != worker_id:
+                return
+            record.result_metadata.update(outcome.metadata)
+            record.lease_expires_at = None
+            if record.status == SchedulingStatus.RUNNING:
+                record.status = outcome.status
+                record.progress = 1.0
+                record.error_message = outcome.error_message
+
+    def requeue_expired(self, max_attempts: int) -> int:
+        now = time.time()
+        count = 0
+        with self._lock:
+            for record in self._records.values():
+                if (
+                    record.status == SchedulingStatus.RUNNING
+                    and record.lease_expires_at is not None
+                    and record.lease_expires_at < now
+                ):
+                    _expire(record, max_attempts)
+                    count += 1
+        return count
+
+    def cancel(self, job_id: Any, error_message: str = CANCELLED_MESSAGE) -> None:
+        """模拟取消接口：将任务标记为失败。"""
+        with self._lock:
+            record = self._records.get(str(job_id))
+            if record is not None and record.status in (SchedulingStatus.DRAFT, SchedulingStatus.RUNNING):
+                record.status = SchedulingStatus.FAILED
+                record.error_message = error_message
+
+    def get(self, job_id: Any) -> Optional[_JobRecord]:
+        """获取任务状态副本。"""
+        with self._lock:
+            record = self._records.get(str(job_id))
+            return replace(record, job=replace(record.job), result_metadata=dict(record.result_metadata)) if record else None
+
+    def _owned(self, job_id: str, worker_id: str) -> Optional[_JobRecord]:
+        """获取由该工作进程持有的运行中任务。"""
+        record = self._records.get(job_id)
+        if record is None or record.worker_id != worker_id or record.status != SchedulingStatus.RUNNING:
+            return None
+        return record
+
+
+def _expire(record: Any, max_attempts: int) -> None:
+    """收回租约过期的任务：未超过次数则重新排队，否则标记失败。"""
+    logger.warning(f"任务 {record.id} 的租约已过期（工作进程 {record.worker_id}）")
+    record.worker_id = None
+    record.lease_expires_at = None
+    if record.attempts >= max_attempts:
+        record.status = SchedulingStatus.FAILED
+        record.error_message = LEASE_EXPIRED_MESSAGE
+    else:
+        record.status = SchedulingStatus.DRAFT
+        record.progress = 0.0
+
+
+class DatabaseJobQueue(JobQueue):
+    """基于 scheduling_jobs 表的持久化任务队列。
+
+    领取使用 SELECT ... FOR UPDATE SKIP LOCKED，多个主机上的工作进程可安全并发领取。
+    每个进程惰性创建自己的同步数据库连接，实例本身可以传递给子进程。
+    """
+
+    def __init__(self, database_url: Optional[str] = None):
+        self.database_url = database_url
+        self._engine = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_engine"] = None
+        return state
+
+    def _session(self) -> Session:
+        """创建数据库会话。"""
+        if self._engine is None:
+            url = self.database_url
+            if url is None:
+                from edusched.core.config import get_settings
+
+                url = get_settings().database.url
+            self._engine = create_engine(url.replace("+asyncpg", ""), pool_pre_ping=True)
+        return Session(self._engine)
+
+    def enqueue(self, job_id: Any, tenant_id: str, timetable_id: Any) -> None:
+        table = SchedulingJobTable
+        with self._session() as db, db.begin():
+            db.add(table(
+                id=UUID(str(job_id)),
+                tenant_id=tenant_id,
+                timetable_id=UUID(str(timetable_id)),
+                status=SchedulingStatus.DRAFT,
+                progress=0.0,
+                result_metadata={},
+                attempts=0,
+            ))
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[QueuedJob]:
+        table = SchedulingJobTable
+        now = datetime.now(timezone.utc)
+        with self._session() as db, db.begin():
+            row = db.execute(
+                select(table)
+                .where(table.status == SchedulingStatus.DRAFT)
+                .order_by(table.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            ).scalar_one_or_none()
+            if row is None:
+                return None
+
+            row.status = SchedulingStatus.RUNNING
+            row.worker_id = worker_id
+            row.started_at = now
+            row.heartbeat_at = now
+            row.lease_expires_at = now + timedelta(seconds=lease_seconds)
+            row.attempts = (row.attempts or 0) + 1
+            return QueuedJob(
+                job_id=str(row.id),
+                tenant_id=row.tenant_id,
+                timetable_id=str(row.timetable_id),
+                attempts=row.attempts,
+            )
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        table = SchedulingJobTable
+        now = datetime.now(timezone.utc)
+        with self._session() as db, db.begin():
+            result = db.execute(
+                update(table)
+                .where(
+                    table.id == UUID(job_id),
+                    table.worker_id == worker_id,
+                    table.status == SchedulingStatus.RUNNING,
+                )
+                .values(heartbeat_at=now, lease_expires_at=now + timedelta(seconds=lease_seconds))
+            )
+            return result.rowcount == 1
+
+    def is_active(self, job_id: str, worker_id: str) -> bool:
+        table = SchedulingJobTable
+        with self._session() as db:
+            row = db.execute(
+                select(table.status, table.worker_id).where(table.id == UUID(job_id))
+            ).one_or_none()
+            return row is not None and row.worker_id == worker_id and row.status == SchedulingStatus.RUNNING
+
+    def update_progress(self, job_id: str, worker_id: str, progress: SolutionProgress) -> None:
+        table = SchedulingJobTable
+        with self._session() as db, db.begin():
+            row = db.get(table, UUID(job_id))
+            if row is None or row.worker_id != worker_id or row.status != SchedulingStatus.RUNNING:
+                return
+            row.progress = progress.progress
+            # JSON列需要整体赋值才能被检测为已修改
+            row.result_metadata = {**(row.result_metadata or {}), "incumbent": progress.to_dict()}
+
+    def complete(self, job_id: str, worker_id: str, outcome: JobOutcome) -> None:
+        table = SchedulingJobTable
+        with self._session() as db, db.begin():
+            row = db.get(table, UUID(job_id), with_for_update=True)
+            if row is None or row.worker_id != worker_id:
+                return
+            row.result_metadata = {**(row.result_metadata or {}), **outcome.metadata}
+            row.lease_expires_at = None
+            if row.status == SchedulingStatus.RUNNING:
+                row.status = outcome.status
+                row.progress = 1.0
+                row.completed_at = datetime.now(timezone.utc)
+                row.error_message = outcome.error_message
+
+    def requeue_expired(self, max_attempts: int) -> int:
+        table = SchedulingJobTable
+        now = datetime.now(timezone.utc)
+        with self._session() as db, db.begin():
+            rows: List[Any] = db.execute(
+                select(table)
+                .where(table.status == SchedulingStatus.RUNNING, table.lease_expires_at < now)
+                .with_for_update(skip_locked=True)
+            ).scalars().all()
+            for row in rows:
+                _expire(row, max_attempts)
+                if row.status == SchedulingStatus.FAILED:
+                    row.completed_at = now
+            return len(rows)
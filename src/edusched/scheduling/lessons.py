@@ -0,0 +1,363 @@
+"""按周课时展开的区间变量模型。
+
+基础模型中每个教学段只占用一个时间段，学校需要手工复制教学段来表示每周课时，模型随之膨胀。
+本模块把每个教学段按 hours_per_week 展开为若干课次：连堂课（consecutive_hours > 1）
+按 consecutive_hours 组成课块，每个课次在每个工作日对应一个可选区间变量，
+教师、班级的时间冲突由 AddNoOverlap 表示，教室容量组由 AddNoOverlap/AddCumulative 表示，
+不再需要逐时间段的分配变量和求和约束。
+
+时间段映射到一条整数时间轴：同一天相邻且连续的时间段位置相邻，不连续的时间段之间及各天之间
+留出空位，因此连堂课块只能落在一天内连续的时间段上。
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+from ortools.sat.python import cp_model
+from ortools.sat.python.cp_model import CpModel, CpSolver
+
+from edusched.domain.models import Assignment, Section
+from edusched.scheduling.cancellation import stop_on_cancel
+from edusched.scheduling.index import ProblemIndex
+
+if TYPE_CHECKING:
+    from edusched.scheduling.engine import SchedulingProblem
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Lesson:
+    """教学段的一个课次（连堂课为一个课块）。"""
+
+    section_idx: int
+    # 占用的连续时间段数
+    size: int
+    # 在所属教学段内的序号
+    ordinal: int
+
+
+def expand_lessons(sections: List[Section]) -> List[Lesson]:
+    """按每周课时展开课次：课时数不能整除课块大小时，余数组成一个较短的课块。"""
+    lessons = []
+    for i, section in enumerate(sections):
+        block = max(1, section.consecutive_hours)
+        hours = max(0, section.hours_per_week)
+        sizes = [block] * (hours // block)
+        if hours % block:
+            sizes.append(hours % block)
+        lessons.extend(Lesson(i, size, k) for k, size in enumerate(sizes))
+    return lessons
+
+
+@dataclass
+class WeekGrid:
+    """时间段在整数时间轴上的位置。"""
+
+    # 时间段下标 -> 位置
+    position_of: Dict[int, int] = field(default_factory=dict)
+    # 位置 -> 时间段下标（空位不在其中）
+    slot_at: Dict[int, int] = field(default_factory=dict)
+    # 星期 -> 当天按时间排序的时间段位置
+    day_positions: Dict[Any, List[int]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, index: ProblemIndex) -> "WeekGrid":
+        """按每天的时间顺序排列时间段，不连续处和各天之间留出空位。"""
+        grid = cls()
+        table = index.timeslot_table
+        position = 0
+        for day, slot_indices in index.day_timeslots.items():
+            positions = []
+            for k, j in enumerate(slot_indices):
+                if k > 0 and not table.adjacent[slot_indices[k - 1], j]:
+                    position += 1
+                grid.position_of[j] = position
+                grid.slot_at[position] = j
+                positions.append(position)
+                position += 1
+            grid.day_positions[day] = positions
+            position += 1
+        return grid
+
+    def block_starts(self, allowed: Set[int], size: int) -> Dict[Any, List[int]]:
+        """每天可作为课块起点的位置：课块覆盖的位置都是允许的时间段。"""
+        starts: Dict[Any, List[int]] = {}
+        for day, positions in self.day_positions.items():
+            day_starts = [
+                p for p in positions
+                if all(self.slot_at.get(p + k) in allowed for k in range(size))
+            ]
+            if day_starts:
+                starts[day] = day_starts
+        return starts
+
+    def fits(self, start: int, size: int) -> bool:
+        """课块是否完整落在一天内连续的时间段上。"""
+        return all(self.slot_at.get(start + k) is not None for k in range(size))
+
+    def covered_slots(self, start: int, size: int) -> List[int]:
+        """课块覆盖的时间段下标。"""
+        return [self.slot_at[start + k] for k in range(size)]
+
+    def starts_by_day(self, starts: Set[int]) -> Dict[Any, List[int]]:
+        """按星期分组起点位置。"""
+        by_day: Dict[Any, List[int]] = {}
+        for day, positions in self.day_positions.items():
+            day_starts = [p for p in positions if p in starts]
+            if day_starts:
+                by_day[day] = day_starts
+        return by_day
+
+
+@dataclass
+class LessonResult:
+    """课次模型求解结果。"""
+
+    success: bool = False
+    status: str = "UNKNOWN"
+    # (教学段下标, 时间段下标)，每个课时一项
+    solution: List[Tuple[int, int]] = field(default_factory=list)
+    objective: Optional[float] = None
+    best_bound: Optional[float] = None
+    elapsed: float = 0.0
+    num_lessons: int = 0
+    num_intervals: int = 0
+    num_variables: int = 0
+    num_constraints: int = 0
+    solver: Optional[CpSolver] = None
+
+    def to_metrics(self) -> Dict[str, Any]:
+        """转换为可序列化的指标。"""
+        return {
+            "lesson_success": self.success,
+            "lesson_status": self.status,
+            "lesson_count": self.num_lessons,
+            "lesson_intervals": self.num_intervals,
+            "lesson_model_variables": self.num_variables,
+            "lesson_model_constraints": self.num_constraints,
+            "lesson_elapsed": self.elapsed,
+            "final_objective": self.objective,
+        }
+
+
+class LessonModel:
+    """按周课时展开的区间变量模型。"""
+
+    def __init__(self, problem: "SchedulingProblem", spread_weight: int = 10):
+        """初始化课次模型。
+
+        Args:
+            problem: 调度问题（不需要先调用 build_model()）
+            spread_weight: 同一教学段在同一天安排多个课块时，每多一个课块的目标惩罚
+        """
+        self.problem = problem
+        self.spread_weight = spread_weight
+
+        self.model: Optional[CpModel] = None
+        self.lessons: List[Lesson] = []
+        self.grid = WeekGrid()
+        # 每个课次的起点位置变量
+        self.starts: List[cp_model.IntVar] = []
+        # 每个课次 {星期: 是否安排在当天}
+        self.day_literals: List[Dict[Any, cp_model.IntVar]] = []
+        self.intervals: List[Tuple[int, cp_model.IntervalVar]] = []
+        self.spread_vars: List[cp_model.IntVar] = []
+
+    def build(self) -> CpModel:
+        """构建模型。"""
+        problem = self.problem
+        index = problem._get_index()
+        room_index = problem.room_index
+        self.model = CpModel()
+        self.lessons = expand_lessons(problem.sections)
+        self.grid = WeekGrid.build(index)
+        self.starts, self.day_literals, self.intervals, self.spread_vars = [], [], [], []
+
+        usable_slots = [j for j, timeslot in enumerate(problem.timeslots) if not timeslot.is_break]
+        teacher_slots = problem._teacher_available_timeslots(usable_slots)
+        pinned = self._pin_locked_lessons()
+
+        for l, lesson in enumerate(self.lessons):
+            section = problem.sections[lesson.section_idx]
+            if l in pinned:
+                self._add_lesson(l, lesson, self.grid.starts_by_day(pinned[l]))
+                continue
+            if room_index is not None and not room_index.compatible[lesson.section_idx]:
+                allowed = set()
+            else:
+                allowed = set(teacher_slots.get(section.teacher_id, usable_slots))
+            self._add_lesson(l, lesson, self.grid.block_starts(allowed, lesson.size))
+
+        self._add_no_overlap(index)
+        self._add_lesson_order(pinned)
+        self._add_spread_objective()
+
+        logger.info(
+            f"课次模型：{len(problem.sections)} 个教学段展开为 {len(self.lessons)} 个课次，"
+            f"{len(self.intervals)} 个可选区间"
+        )
+        return self.model
+
+    def _pin_locked_lessons(self) -> Dict[int, Set[int]]:
+        """将锁定分配依次固定到教学段的课次上，返回 {课次下标: 可选起点位置}。
+
+        锁定的时间段可能是课块中的任意一个课时：课次的起点限定为覆盖该时间段、
+        且课块整体落在当天连续时间段上的位置（优先同时覆盖后续锁定时间段的起点）。
+        无法放入任何剩余课次的锁定分配记录警告后忽略。
+        """
+        problem = self.problem
+        grid = self.grid
+        locked_positions: Dict[int, List[int]] = {}
+        for assignment in problem.existing_assignments:
+            if assignment.is_locked:
+                i = problem.section_to_idx.get(assignment.section_id)
+                j = problem.timeslot_to_idx.get(assignment.timeslot_id)
+                if i is not None and j is not None and j in grid.position_of:
+                    locked_positions.setdefault(i, []).append(grid.position_of[j])
+
+        section_lessons: Dict[int, List[int]] = {}
+        for l, lesson in enumerate(self.lessons):
+            section_lessons.setdefault(lesson.section_idx, []).append(l)
+
+        pinned: Dict[int, Set[int]] = {}
+        for i, positions in locked_positions.items():
+            remaining = list(section_lessons.get(i, []))
+            positions = sorted(set(positions))
+            covered: Set[int] = set()
+            for position in positions:
+                if position in covered:
+                    continue
+                for l in remaining:
+                    size = self.lessons[l].size
+                    starts = [p for p in range(position - size + 1, position + 1) if grid.fits(p, size)]
+                    if starts:
+                        break
+                else:
+                    logger.warning(
+                        f"教学段 {problem.sections[i].id} 的锁定时间段 {grid.slot_at[position]} "
+                        f"无法放入剩余课次，已忽略"
+                    )
+                    continue
+                # 起点越晚覆盖的后续锁定时间段越多，保留覆盖最多的起点
+                reach = {p: sum(1 for q in positions if p <= q < p + size) for p in starts}
+                best = max(reach.values())
+                pinned[l] = {p for p in starts if reach[p] == best}
+                covered.update(q for q in positions if max(pinned[l]) <= q < min(pinned[l]) + size)
+                remaining.remove(l)
+        return pinned
+
+    def _add_lesson(self, l: int, lesson: Lesson, day_starts: Dict[Any, List[int]]) -> None:
+        """创建课次的起点变量，以及每个可安排工作日的可选区间。"""
+        model = self.model
+        all_starts = sorted(p for starts in day_starts.values() for p in starts)
+        if not all_starts:
+            logger.warning(f"教学段 {self.problem.sections[lesson.section_idx].id} 的课次 {lesson.ordinal} 没有可用的时间段")
+            # 无处安排：模型不可行
+            model.AddBoolOr([])
+            all_starts = [0]
+
+        start = model.NewIntVarFromDomain(cp_model.Domain.FromValues(all_starts), f"lesson_start_{l}")
+        literals: Dict[Any, cp_model.IntVar] = {}
+        for day, starts in day_starts.items():
+            present = model.NewBoolVar(f"lesson_{l}_on_{day}")
+            model.AddLinearExpressionInDomain(start, cp_model.Domain.FromValues(starts)).OnlyEnforceIf(present)
+            interval = model.NewOptionalFixedSizeIntervalVar(start, lesson.size, present, f"lesson_{l}_{day}")
+            literals[day] = present
+            self.intervals.append((l, interval))
+        if literals:
+            model.AddExactlyOne(literals.values())
+
+        self.starts.append(start)
+        self.day_literals.append(literals)
+
+    def _add_no_overlap(self, index: ProblemIndex) -> None:
+        """同一教师、班级的课次互不重叠；教室容量组同时进行的课次数不超过其教室数。"""
+        sections = self.problem.sections
+        groups: Dict[Tuple[str, Any], List[cp_model.IntervalVar]] = {}
+        room_intervals: List[List[cp_model.IntervalVar]] = [[] for _ in index.room_groups]
+        for l, interval in self.intervals:
+            i = self.lessons[l].section_idx
+            section = sections[i]
+            groups.setdefault(("teacher", section.teacher_id), []).append(interval)
+            groups.setdefault(("class_group", section.class_group_id), []).append(interval)
+            for g in index.section_room_groups[i]:
+                room_intervals[g].append(interval)
+
+        for intervals in groups.values():
+            if len(intervals) > 1:
+                self.model.AddNoOverlap(intervals)
+        for group, intervals in zip(index.room_groups, room_intervals):
+            if len(intervals) <= group.capacity:
+                continue
+            if group.capacity == 1:
+                self.model.AddNoOverlap(intervals)
+            else:
+                self.model.AddCumulative(intervals, [1] * len(intervals), group.capacity)
+
+    def _add_lesson_order(self, pinned: Dict[int, Set[int]]) -> None:
+        """同一教学段内大小相同的未锁定课次可互换，按起点位置递增排列。"""
+        previous: Dict[Tuple[int, int], int] = {}
+        for l, lesson in enumerate(self.lessons):
+            if l in pinned:
+                continue
+            key = (lesson.section_idx, lesson.size)
+            if key in previous:
+                self.model.Add(self.starts[previous[key]] < self.starts[l])
+            previous[key] = l
+
+    def _add_spread_objective(self) -> None:
+        """同一教学段每天最多一个课块，超出的课块计入目标。"""
+        section_days: Dict[Tuple[int, Any], List[cp_model.IntVar]] = {}
+        for l, literals in enumerate(self.day_literals):
+            for day, present in literals.items():
+                section_days.setdefault((self.lessons[l].section_idx, day), []).append(present)
+
+        for (i, day), literals in section_days.items():
+            if len(literals) > 1:
+                excess = self.model.NewIntVar(0, len(literals) - 1, f"spread_{i}_{day}")
+                self.model.Add(excess >= sum(literals) - 1)
+                self.spread_vars.append(excess)
+
+        if self.spread_vars:
+            self.model.Minimize(self.spread_weight * sum(self.spread_vars))
+
+    def solve(self, time_limit: float = 60.0, num_search_workers: int = 8) -> LessonResult:
+        """求解模型（未构建时先构建）。"""
+        if self.model is None:
+            self.build()
+
+        proto = self.model.Proto()
+        result = LessonResult(
+            num_lessons=len(self.lessons),
+            num_intervals=len(self.intervals),
+            num_variables=len(proto.variables),
+            num_constraints=len(proto.constraints),
+        )
+
+        solver = CpSolver()
+        solver.parameters.max_time_in_seconds = time_limit
+        solver.parameters.num_search_workers = num_search_workers
+        start = time.perf_counter()
+        with stop_on_cancel(solver, self.problem.cancel_token):
+            status = solver.Solve(self.model)
+        result.elapsed = time.perf_counter() - start
+        result.status = solver.StatusName(status)
+        result.solver = solver
+
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            result.success = True
+            result.objective = solver.ObjectiveValue()
+            result.best_bound = solver.BestObjectiveBound()
+            result.solution = [
+                (lesson.section_idx, j)
+                for l, lesson in enumerate(self.lessons)
+                for j in self.grid.covered_slots(solver.Value(self.starts[l]), lesson.size)
+            ]
+        return result
+
+    def to_assignments(self, result: LessonResult) -> List[Assignment]:
+        """转换为分配记录（每个课时一条）。"""
+        return self.problem._build_assignments(result.solution)
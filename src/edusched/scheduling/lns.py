@@ -0,0 +1,271 @@
+"""大邻域搜索（LNS）模块。
+
+围绕已构建的CP-SAT模型反复固定当前最优解的大部分教学段，
+只释放一个邻域（一个班级、一位教师或一个工作日）并以较短时间限制重新求解。
+任意时刻都持有可用的最优解，适合大规模学校的长时间优化。
+"""
+
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Tuple
+
+from ortools.sat.python import cp_model
+from ortools.sat.python.cp_model import CpSolver
+
+from edusched.scheduling.cancellation import stop_on_cancel
+from edusched.scheduling.solution import SolutionVector
+
+if TYPE_CHECKING:
+    from edusched.scheduling.engine import SchedulingProblem
+
+logger = logging.getLogger(__name__)
+
+# 支持的邻域类型
+NEIGHBORHOOD_CLASS_GROUP = "class_group"
+NEIGHBORHOOD_TEACHER = "teacher"
+NEIGHBORHOOD_WEEKDAY = "weekday"
+
+
+@dataclass
+class LNSConfig:
+    """LNS配置。"""
+
+    time_limit: float = 240.0  # 总时间限制（秒）
+    initial_time_limit: float = 10.0  # 初始解求解时间限制（秒）
+    neighborhood_time_limit: float = 2.0  # 每个邻域的求解时间限制（秒）
+    max_iterations: int = 1000  # 最大迭代次数
+    min_neighborhood_size: int = 4  # 邻域最少释放的教学段数
+    neighborhoods: Tuple[str, ...] = (
+        NEIGHBORHOOD_CLASS_GROUP,
+        NEIGHBORHOOD_TEACHER,
+        NEIGHBORHOOD_WEEKDAY,
+    )
+    num_search_workers: int = 1  # 每个邻域求解的并行搜索数
+    seed: int = 0
+
+
+@dataclass
+class LNSTraceEntry:
+    """改进轨迹记录。"""
+
+    iteration: int
+    elapsed: float
+    objective: float
+    neighborhood: str
+    neighborhood_size: int
+
+
+@dataclass
+class LNSResult:
+    """LNS求解结果。"""
+
+    success: bool = False
+    solution: Dict[int, int] = field(default_factory=dict)  # 教学段下标 -> 时间段下标
+    objective: float = float("inf")
+    best_bound: float = float("-inf")
+    iterations: int = 0
+    improvements: int = 0
+    elapsed: float = 0.0
+    trace: List[LNSTraceEntry] = field(default_factory=list)
+    solver: Optional[CpSolver] = None
+
+    def to_metrics(self) -> Dict[str, Any]:
+        """转换为可序列化的指标。"""
+        return {
+            "lns_success": self.success,
+            "lns_objective": self.objective,
+            "lns_iterations": self.iterations,
+            "lns_improvements": self.improvements,
+            "lns_elapsed": self.elapsed,
+            "lns_trace": [
+                {
+                    "iteration": entry.iteration,
+                    "elapsed": entry.elapsed,
+                    "objective": entry.objective,
+                    "neighborhood": entry.neighborhood,
+                    "neighborhood_size": entry.neighborhood_size,
+                }
+                for entry in self.trace
+            ],
+        }
+
+
+class LargeNeighborhoodSearch:
+    """基于CP-SAT的大邻域搜索驱动器。"""
+
+    def __init__(
+        self,
+        problem: "SchedulingProblem",
+        config: Optional[LNSConfig] = None,
+        on_improvement: Optional[Callable[[LNSResult], None]] = None,
+    ):
+        """初始化LNS驱动器。
+
+        Args:
+            problem: 已调用 build_model() 的调度问题
+            config: LNS配置
+            on_improvement: 每次找到更优解时的回调，参数为当前结果
+        """
+        if problem.model is None:
+            raise RuntimeError("模型未构建，请先调用 build_model()")
+
+        self.problem = problem
+        self.config = config or LNSConfig()
+        self.on_improvement = on_improvement
+        self._random = random.Random(self.config.seed)
+
+    def run(self, initial_solution: Optional[Dict[int, int]] = None) -> LNSResult:
+        """执行LNS。
+
+        Args:
+            initial_solution: 初始解 {教学段下标: 时间段下标}，用作首次求解的提示
+        """
+        config = self.config
+        start = time.perf_counter()
+        deadline = start + config.time_limit
+        result = LNSResult()
+
+        # 初始解：以提示求解完整模型，得到第一个可行的当前最优解
+        initial_limit = min(config.initial_time_limit, config.time_limit)
+        solver, status = self._solve(
+            fixed={}, hint=initial_solution or {}, time_limit=initial_limit
+        )
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            logger.warning("LNS：未找到初始可行解")
+            result.elapsed = time.perf_counter() - start
+            return result
+
+        self._accept(result, solver, 0, start, "initial", len(self.problem.sections))
+        if status == cp_model.OPTIMAL:
+            logger.info("LNS：初始解已是最优解")
+            result.elapsed = time.perf_counter() - start
+            return result
+
+        neighborhoods = self._neighborhood_groups()
+        if not neighborhoods:
+            result.elapsed = time.perf_counter() - start
+            return result
+
+        for iteration in range(1, config.max_iterations + 1):
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or self.problem.is_cancelled():
+                break
+
+            kind, free_sections = self._select_neighborhood(neighborhoods, result.solution)
+            fixed = {
+                i: j for i, j in result.solution.items() if i not in free_sections
+            }
+            solver, status = self._solve(
+                fixed=fixed,
+                hint=result.solution,
+                time_limit=min(config.neighborhood_time_limit, remaining),
+            )
+            result.iterations = iteration
+
+            if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                if solver.ObjectiveValue() < result.objective:
+                    self._accept(result, solver, iteration, start, kind, len(free_sections))
+
+        result.elapsed = time.perf_counter() - start
+        logger.info(
+            f"LNS完成：{result.iterations}次迭代，{result.improvements}次改进，"
+            f"目标值 {result.objective}"
+        )
+        return result
+
+    def _solve(
+        self,
+        fixed: Dict[int, int],
+        hint: Dict[int, int],
+        time_limit: float,
+    ) -> Tuple[CpSolver, Any]:
+        """固定部分教学段后求解模型副本。"""
+        problem = self.problem
+        model = problem.model.Clone()
+        vars = problem.assignment_vars
+
+        for i, j in fixed.items():
+            var = vars.get(i, j)
+            if var is not None:
+                model.Add(var == 1)
+
+        problem._add_hints(model, vars, hint)
+
+        solver = CpSolver()
+        solver.parameters.max_time_in_seconds = max(time_limit, 0.01)
+        solver.parameters.num_search_workers = self.config.num_search_workers
+        solver.parameters.random_seed = self._random.randint(0, 2**31 - 1)
+        with stop_on_cancel(solver, problem.cancel_token):
+            status = solver.Solve(model)
+        return solver, status
+
+    def _accept(
+        self,
+        result: LNSResult,
+        solver: CpSolver,
+        iteration: int,
+        start: float,
+        kind: str,
+        size: int,
+    ) -> None:
+        """接受新的当前最优解并记录轨迹。"""
+        result.success = True
+        result.solver = solver
+        result.solution = SolutionVector.from_solver(solver, self.problem.assignment_vars).as_dict()
+        result.objective = solver.ObjectiveValue()
+        result.best_bound = solver.BestObjectiveBound()
+        if iteration > 0:
+            result.improvements += 1
+        result.trace.append(LNSTraceEntry(
+            iteration=iteration,
+            elapsed=time.perf_counter() - start,
+            objective=result.objective,
+            neighborhood=kind,
+            neighborhood_size=size,
+        ))
+
+        if self.on_improvement is not None:
+            self.on_improvement(result)
+
+    def _neighborhood_groups(self) -> Dict[str, List[List[int]]]:
+        """根据问题结构生成班级和教师邻域候选。"""
+        index = self.problem._get_index()
+        kinds = self.config.neighborhoods
+        groups: Dict[str, List[List[int]]] = {}
+        if NEIGHBORHOOD_CLASS_GROUP in kinds and index.class_group_sections:
+            groups[NEIGHBORHOOD_CLASS_GROUP] = list(index.class_group_sections.values())
+        if NEIGHBORHOOD_TEACHER in kinds and index.teacher_sections:
+            groups[NEIGHBORHOOD_TEACHER] = list(index.teacher_sections.values())
+        if NEIGHBORHOOD_WEEKDAY in kinds and index.day_timeslots:
+            # 工作日邻域依赖当前解，选择时再计算
+            groups[NEIGHBORHOOD_WEEKDAY] = []
+        return groups
+
+    def _select_neighborhood(
+        self,
+        neighborhoods: Dict[str, List[List[int]]],
+        incumbent: Dict[int, int],
+    ) -> Tuple[str, Set[int]]:
+        """随机选择邻域，过小时合并同类邻域直至达到最小规模。"""
+        kind = self._random.choice(sorted(neighborhoods))
+        free: Set[int] = set()
+
+        if kind == NEIGHBORHOOD_WEEKDAY:
+            index = self.problem._get_index()
+            days = list(index.day_timeslots)
+            self._random.shuffle(days)
+            for day in days:
+                free.update(i for i, j in incumbent.items() if index.timeslot_day[j] == day)
+                if len(free) >= self.config.min_neighborhood_size:
+                    break
+        else:
+            candidates = list(neighborhoods[kind])
+            self._random.shuffle(candidates)
+            for members in candidates:
+                free.update(members)
+                if len(free) >= self.config.min_neighborhood_size:
+                    break
+
+        return kind, free
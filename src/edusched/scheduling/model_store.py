@@ -0,0 +1,290 @@
+"""CP-SAT模型持久化模块。
+
+按问题指纹保存已构建的模型：序列化的模型proto（base64编码）连同分配变量、
+软约束惩罚变量在proto中的下标以及构建时的软约束权重一起压缩保存。重试或复现时直接解析proto恢复模型，
+跳过Python端逐个添加变量和约束的构建循环；保存的模型也可以离线用任意求解参数重放
+（python -m edusched.scheduling.replay）。
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from ortools.sat.python.cp_model import CpModel
+
+from edusched.scheduling.fingerprint import ProblemFingerprint
+
+if TYPE_CHECKING:
+    from edusched.scheduling.engine import SchedulingProblem
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "edusched/models"
+# 快照格式版本，格式变化时递增以忽略旧快照
+FORMAT_VERSION = 2
+
+
+# 模型proto的序列化格式
+MODEL_FORMAT_BINARY = "binary"
+MODEL_FORMAT_TEXT = "text"
+
+
+def serialize_model(model: CpModel) -> Tuple[str, bytes]:
+    """序列化模型proto，返回 (格式, 字节)。
+
+    proto为protobuf消息时使用二进制格式；ortools 9.14 起 Proto() 是C++端的封装，
+    没有二进制序列化接口，退回文本格式。
+    """
+    proto = model.Proto()
+    if hasattr(proto, "SerializeToString"):
+        return MODEL_FORMAT_BINARY, proto.SerializeToString()
+    return MODEL_FORMAT_TEXT, str(proto).encode("utf-8")
+
+
+def deserialize_model(model_format: str, data: bytes) -> CpModel:
+    """按 serialize_model 的格式解析为CP-SAT模型。"""
+    model = CpModel()
+    if model_format == MODEL_FORMAT_BINARY:
+        model.Proto().ParseFromString(data)
+    else:
+        model.Proto().parse_text_format(data.decode("utf-8"))
+    return model
+
+
+def model_key(fingerprint: ProblemFingerprint, symmetry_breaking: bool = False) -> str:
+    """模型快照的存储键（对称性破除改变模型，单独保存）。"""
+    variant = "sb" if symmetry_breaking else "base"
+    return f"{KEY_PREFIX}/{fingerprint.tenant_id}/{fingerprint.digest}.{variant}.cpsat.z"
+
+
+@dataclass
+class ModelSnapshot:
+    """已构建模型的快照。"""
+
+    digest: str
+    # 序列化的模型proto及其格式（见 serialize_model）
+    model_data: bytes
+    model_format: str = MODEL_FORMAT_TEXT
+    # 构建时的教学段、时间段ID顺序（用于映射到当前问题的下标）
+    section_ids: List[str] = field(default_factory=list)
+    timeslot_ids: List[str] = field(default_factory=list)
+    # (教学段下标, 时间段下标, proto变量下标)
+    assignment_vars: List[Tuple[int, int, int]] = field(default_factory=list)
+    # 软约束名 -> [(系数, proto变量下标)]
+    penalty_terms: Dict[str, List[Tuple[int, int]]] = field(default_factory=dict)
+    penalty_upper: Dict[str, int] = field(default_factory=dict)
+    # 软约束名 -> 惩罚变量的proto下标
+    penalty_vars: Dict[str, int] = field(default_factory=dict)
+    symmetry_classes: List[List[int]] = field(default_factory=list)
+    # 构建时的软约束权重（权重是目标函数的系数，不同权重的模型不能复用）
+    soft_weights: Dict[str, float] = field(default_factory=dict)
+    version: int = FORMAT_VERSION
+
+    @classmethod
+    def capture(cls, problem: "SchedulingProblem", digest: str) -> "ModelSnapshot":
+        """从已构建模型的调度问题生成快照。"""
+        if problem.model is None:
+            raise RuntimeError("模型未构建，请先调用 build_model()")
+        model_format, model_data = serialize_model(problem.model)
+        return cls(
+            digest=digest,
+            model_data=model_data,
+            model_format=model_format,
+            section_ids=[str(section.id) for section in problem.sections],
+            timeslot_ids=[str(timeslot.id) for timeslot in problem.timeslots],
+            assignment_vars=[(i, j, var.Index()) for (i, j), var in problem.assignment_vars.items()],
+            penalty_terms={
+                name: [(coef, var.Index()) for coef, var in terms]
+                for name, terms in getattr(problem, 'penalty_terms', {}).items()
+            },
+            penalty_upper=dict(getattr(problem, '_penalty_upper', {})),
+            penalty_vars={name: var.Index() for name, var in getattr(problem, 'penalty_vars', {}).items()},
+            symmetry_classes=[list(members) for members in problem.symmetry_classes],
+            soft_weights=dict(problem.soft_weights),
+        )
+
+    def to_model(self) -> CpModel:
+        """解析为CP-SAT模型。"""
+        return deserialize_model(self.model_format, self.model_data)
+
+    def to_bytes(self) -> bytes:
+        """序列化为压缩字节。"""
+        payload = {
+            "version": self.version,
+            "digest": self.digest,
+            "section_ids": self.section_ids,
+            "timeslot_ids": self.timeslot_ids,
+            "assignment_vars": self.assignment_vars,
+            "penalty_terms": self.penalty_terms,
+            "penalty_upper": self.penalty_upper,
+            "penalty_vars": self.penalty_vars,
+            "symmetry_classes": self.symmetry_classes,
+            "soft_weights": self.soft_weights,
+            "model_format": self.model_format,
+            "model_data": base64.b64encode(self.model_data).decode("ascii"),
+        }
+        return zlib.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8"), 1)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Optional["ModelSnapshot"]:
+        """从压缩字节恢复，格式版本不符时返回None。"""
+        payload = json.loads(zlib.decompress(data).decode("utf-8"))
+        if payload.get("version") != FORMAT_VERSION:
+            return None
+        return cls(
+            digest=payload["digest"],
+            model_data=base64.b64decode(payload["model_data"]),
+            model_format=payload["model_format"],
+            section_ids=payload["section_ids"],
+            timeslot_ids=payload["timeslot_ids"],
+            assignment_vars=[tuple(item) for item in payload["assignment_vars"]],
+            penalty_terms={
+                name: [tuple(term) for term in terms] for name, terms in payload["penalty_terms"].items()
+            },
+            penalty_upper=payload["penalty_upper"],
+            penalty_vars=payload["penalty_vars"],
+            symmetry_classes=payload["symmetry_classes"],
+            soft_weights=payload["soft_weights"],
+        )
+
+
+class ModelStore(ABC):
+    """模型快照存储接口（值为字节）。"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """读取快照。"""
+
+    @abstractmethod
+    def put(self, key: str, data: bytes) -> None:
+        """写入快照。"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """删除快照。"""
+
+
+class InMemoryModelStore(ModelStore):
+    """进程内LRU快照存储。"""
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self._items[key] = data
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+
+class LocalModelStore(ModelStore):
+    """本地目录快照存储（离线重放时使用）。"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再替换，避免并发读取到不完整的快照
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class StorageServiceModelStore(ModelStore):
+    """基于文件存储服务（StorageServiceInterface）的快照存储。
+
+    存储服务是异步接口，而工作进程中的求解是同步执行的，因此在独立的事件循环中调用。
+    """
+
+    def __init__(self, storage: Any):
+        self.storage = storage
+
+    @staticmethod
+    def _run(coroutine: Any) -> Any:
+        return asyncio.run(coroutine)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._run(self.storage.download_bytes(key))
+
+    def put(self, key: str, data: bytes) -> None:
+        result = self._run(self.storage.upload_bytes(data, key, content_type="application/octet-stream"))
+        if not getattr(result, "success", True):
+            raise RuntimeError(getattr(result, "error_message", None) or "上传模型快照失败")
+
+    def delete(self, key: str) -> None:
+        self._run(self.storage.delete_file(key))
+
+
+def save_model(problem: "SchedulingProblem", store: ModelStore, fingerprint: ProblemFingerprint) -> bool:
+    """保存已构建的模型，存储故障只记录警告。"""
+    try:
+        snapshot = ModelSnapshot.capture(problem, fingerprint.digest)
+        store.put(model_key(fingerprint, problem.symmetry_breaking), snapshot.to_bytes())
+        return True
+    except Exception as e:
+        logger.warning(f"保存模型快照失败: {e}")
+        return False
+
+
+def load_snapshot(
+    store: ModelStore,
+    fingerprint: ProblemFingerprint,
+    symmetry_breaking: bool = False,
+    soft_weights: Optional[Dict[str, float]] = None,
+) -> Optional[ModelSnapshot]:
+    """读取与问题指纹对应的模型快照，不存在、读取失败或软约束权重不一致时返回None。"""
+    try:
+        data = store.get(model_key(fingerprint, symmetry_breaking))
+        if data is None:
+            return None
+        snapshot = ModelSnapshot.from_bytes(data)
+        if snapshot is None or snapshot.digest != fingerprint.digest:
+            return None
+        if soft_weights is not None and snapshot.soft_weights != soft_weights:
+            logger.info(f"模型快照 {fingerprint.digest} 的软约束权重与当前问题不一致，重新构建")
+            return None
+        return snapshot
+    except Exception as e:
+        logger.warning(f"读取模型快照失败: {e}")
+        return None
@@ -0,0 +1,345 @@
+"""并行求解器组合（portfolio）模块。
+
+在多个进程中以不同参数（随机种子、分支策略、LNS开关、线性化级别）求解同一模型，
+各进程通过共享的当前最优解协作：共享目标值和下界，达到目标间隙或时间耗尽时全部停止；
+共享最优解的分配向量，排队较晚开始的配置以它作为提示。
+取目标值最优（相同时最早找到）的配置作为胜出者。
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+
+from ortools.sat.python import cp_model
+from ortools.sat.python.cp_model import CpModel, CpSolver
+
+from edusched.scheduling.cancellation import stop_on_cancel
+from edusched.scheduling.model_store import deserialize_model, serialize_model
+
+if TYPE_CHECKING:
+    from edusched.scheduling.engine import SchedulingProblem
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SolverConfig:
+    """单个求解进程的参数配置。"""
+
+    name: str
+    random_seed: int = 0
+    search_branching: int = cp_model.AUTOMATIC_SEARCH
+    use_lns: bool = True
+    linearization_level: int = 1
+    num_search_workers: int = 1
+
+    def apply(self, parameters: Any) -> None:
+        """写入CP-SAT求解参数。"""
+        parameters.random_seed = self.random_seed
+        parameters.search_branching = self.search_branching
+        parameters.use_lns = self.use_lns
+        parameters.linearization_level = self.linearization_level
+        parameters.num_search_workers = self.num_search_workers
+
+
+# 默认组合：覆盖不同的分支策略、LNS开关和线性化级别
+DEFAULT_PORTFOLIO = (
+    SolverConfig("automatic", random_seed=0),
+    SolverConfig("fixed_search", random_seed=1, search_branching=cp_model.FIXED_SEARCH, linearization_level=0),
+    SolverConfig("portfolio_no_lns", random_seed=2, search_branching=cp_model.PORTFOLIO_SEARCH, use_lns=False),
+    SolverConfig("full_linearization", random_seed=3, linearization_level=2),
+    SolverConfig("pseudo_cost", random_seed=4, search_branching=cp_model.PSEUDO_COST_SEARCH),
+)
+
+
+@dataclass
+class PortfolioRun:
+    """单个配置的求解结果。"""
+
+    name: str
+    status: str
+    objective: Optional[float] = None
+    best_bound: Optional[float] = None
+    wall_time: float = 0.0
+    # 找到该配置最终解的时间（秒）
+    found_at: Optional[float] = None
+    # 分配变量的取值（按传入的变量下标顺序）
+    values: Optional[List[int]] = None
+
+
+@dataclass
+class PortfolioResult:
+    """组合求解结果。"""
+
+    success: bool = False
+    solution: Dict[int, int] = field(default_factory=dict)  # 教学段下标 -> 时间段下标
+    objective: float = float("inf")
+    best_bound: float = float("-inf")
+    winner: Optional[str] = None
+    runs: List[PortfolioRun] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def gap(self) -> float:
+        """相对间隙。"""
+        if not self.success:
+            return float("inf")
+        return relative_gap(self.objective, self.best_bound)
+
+    def to_metrics(self) -> Dict[str, Any]:
+        """转换为可序列化的指标。"""
+        return {
+            "portfolio_success": self.success,
+            "portfolio_winner": self.winner,
+            "portfolio_objective": self.objective,
+            "portfolio_best_bound": self.best_bound,
+            "portfolio_gap": self.gap,
+            "portfolio_elapsed": self.elapsed,
+            "portfolio_runs": [
+                {
+                    "name": run.name,
+                    "status": run.status,
+                    "objective": run.objective,
+                    "best_bound": run.best_bound,
+                    "wall_time": run.wall_time,
+                    "found_at": run.found_at,
+                }
+                for run in self.runs
+            ],
+        }
+
+
+def relative_gap(objective: float, bound: float) -> float:
+    """计算最小化问题的相对间隙。"""
+    return max(0.0, objective - bound) / max(1.0, abs(objective))
+
+
+# 配置在截止时间前未开始求解时的状态
+SKIPPED_STATUS = "SKIPPED"
+
+# 子进程共享状态（由进程池初始化函数设置）
+_stop_event = None
+_shared_objective = None
+_shared_bound = None
+# 当前最优解的分配变量取值（与目标值共用 _shared_objective 的锁）
+_shared_values = None
+
+
+def _init_worker(stop_event: Any, shared_objective: Any, shared_bound: Any, shared_values: Any) -> None:
+    """进程池初始化：保存共享的停止事件和当前最优解。"""
+    global _stop_event, _shared_objective, _shared_bound, _shared_values
+    _stop_event = stop_event
+    _shared_objective = shared_objective
+    _shared_bound = shared_bound
+    _shared_values = shared_values
+
+
+def _hint_shared_incumbent(model: CpModel, var_indices: List[int]) -> bool:
+    """其他进程已找到解时，用共享的最优解替换模型提示。返回是否写入提示。"""
+    with _shared_objective.get_lock():
+        if _shared_objective.value == float("inf"):
+            return False
+        values = list(_shared_values)
+
+    model.ClearHints()
+    proto = model.Proto()
+    for var_index, value in zip(var_indices, values):
+        model.AddHint(cp_model.IntVar(proto, var_index), value)
+    return True
+
+
+class _SharedIncumbentCallback(cp_model.CpSolverSolutionCallback):
+    """发布本进程的改进解，并在全局间隙达标时停止所有进程。"""
+
+    def __init__(self, target_gap: float, start: float, var_indices: List[int]):
+        super().__init__()
+        self.target_gap = target_gap
+        self.start = start
+        self.var_indices = var_indices
+        self.found_at: Optional[float] = None
+
+    def on_solution_callback(self) -> None:
+        self.found_at = time.perf_counter() - self.start
+        objective = self.ObjectiveValue()
+        bound = self.BestObjectiveBound()
+
+        with _shared_objective.get_lock():
+            if objective < _shared_objective.value:
+                _shared_objective.value = objective
+                solution = self.response_proto.solution
+                _shared_values[:] = [solution[k] for k in self.var_indices]
+            if bound > _shared_bound.value:
+                _shared_bound.value = bound
+            gap = relative_gap(_shared_objective.value, _shared_bound.value)
+
+        if gap <= self.target_gap:
+            _stop_event.set()
+            self.StopSearch()
+
+
+def _run_config(
+    model_format: str,
+    model_data: bytes,
+    config: SolverConfig,
+    deadline: float,
+    target_gap: float,
+    var_indices: List[int],
+) -> PortfolioRun:
+    """在子进程中以指定配置求解模型，只使用到全局截止时间（time.time()）为止的剩余时间。
+
+    进程数少于配置数时，排队的配置开始得较晚，以其他进程共享的最优解作为提示；
+    截止时间已过或其他进程已达到目标时直接跳过。
+    """
+    start = time.perf_counter()
+    remaining = deadline - time.time()
+    if remaining <= 0 or _stop_event.is_set():
+        return PortfolioRun(name=config.name, status=SKIPPED_STATUS)
+
+    model = deserialize_model(model_format, model_data)
+    if _hint_shared_incumbent(model, var_indices):
+        logger.debug(f"求解配置 {config.name} 以共享的最优解作为提示")
+
+    solver = CpSolver()
+    solver.parameters.max_time_in_seconds = deadline - time.time()
+    solver.parameters.relative_gap_limit = target_gap
+    config.apply(solver.parameters)
+
+    # 其他进程达到目标或找到最优解时停止本进程
+    done = threading.Event()
+
+    def watch_stop() -> None:
+        while not done.is_set():
+            if _stop_event.wait(0.05):
+                solver.StopSearch()
+                return
+
+    watcher = threading.Thread(target=watch_stop, daemon=True)
+    watcher.start()
+    callback = _SharedIncumbentCallback(target_gap, start, var_indices)
+    try:
+        status = solver.Solve(model, callback)
+    finally:
+        done.set()
+        watcher.join()
+
+    if status == cp_model.OPTIMAL:
+        _stop_event.set()
+
+    run = PortfolioRun(
+        name=config.name,
+        status=solver.StatusName(status),
+        wall_time=time.perf_counter() - start,
+        found_at=callback.found_at,
+    )
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        solution = solver.response_proto.solution
+        run.objective = solver.ObjectiveValue()
+        run.best_bound = solver.BestObjectiveBound()
+        run.values = [int(solution[k]) for k in var_indices]
+    return run
+
+
+class PortfolioSolver:
+    """多进程求解器组合。"""
+
+    def __init__(
+        self,
+        problem: "SchedulingProblem",
+        configs: Optional[Sequence[SolverConfig]] = None,
+        target_gap: float = 0.0,
+        max_workers: Optional[int] = None,
+    ):
+        """初始化求解器组合。
+
+        Args:
+            problem: 已调用 build_model() 的调度问题
+            configs: 参与竞争的配置，默认使用 DEFAULT_PORTFOLIO
+            target_gap: 目标相对间隙，达到后提前停止
+            max_workers: 最大进程数，默认为配置数与CPU核数的较小值
+        """
+        if problem.model is None:
+            raise RuntimeError("模型未构建，请先调用 build_model()")
+
+        self.problem = problem
+        self.configs = list(configs or DEFAULT_PORTFOLIO)
+        self.target_gap = target_gap
+        self.max_workers = max_workers or min(len(self.configs), os.cpu_count() or 1)
+
+    def run(self, time_limit: float, initial_solution: Optional[Dict[int, int]] = None) -> PortfolioResult:
+        """并行运行所有配置，返回最优结果。
+
+        Args:
+            time_limit: 所有配置共用的时间限制（秒），从调用时开始计算
+            initial_solution: 初始解 {教学段下标: 时间段下标}，作为进程的提示（已有共享最优解时改用共享解）
+        """
+        start = time.perf_counter()
+        # 子进程之间只能比较系统时间
+        deadline = time.time() + time_limit
+        problem = self.problem
+        # 提示写入副本，调用方的模型保持不变
+        model = problem.model.clone()
+        if initial_solution:
+            problem._add_hints(model, problem.assignment_vars, initial_solution)
+
+        keys = []
+        var_indices = []
+        for key, var in problem.assignment_vars.items():
+            keys.append(key)
+            var_indices.append(var.Index())
+        model_format, model_data = serialize_model(model)
+
+        logger.info(f"启动求解器组合：{len(self.configs)} 个配置，{self.max_workers} 个进程")
+        context = multiprocessing.get_context("spawn")
+        stop_event = context.Event()
+        shared_objective = context.Value("d", float("inf"))
+        shared_bound = context.Value("d", float("-inf"))
+        shared_values = context.Array("b", len(var_indices), lock=False)
+
+        # 任务取消时通过共享停止事件停止所有进程
+        stopper = SimpleNamespace(StopSearch=stop_event.set)
+
+        runs: List[PortfolioRun] = []
+        with stop_on_cancel(stopper, problem.cancel_token), ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(stop_event, shared_objective, shared_bound, shared_values),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _run_config, model_format, model_data, config, deadline, self.target_gap, var_indices
+                )
+                for config in self.configs
+            ]
+            for config, future in zip(self.configs, futures):
+                try:
+                    runs.append(future.result())
+                except Exception as e:
+                    logger.error(f"求解配置 {config.name} 异常: {e}")
+                    runs.append(PortfolioRun(name=config.name, status="ERROR"))
+
+        result = PortfolioResult(runs=runs, elapsed=time.perf_counter() - start)
+        feasible = [run for run in runs if run.values is not None]
+        if feasible:
+            # 目标值最优者胜出，相同时取最早找到的
+            best = min(
+                feasible,
+                key=lambda run: (run.objective, run.found_at if run.found_at is not None else float("inf")),
+            )
+            result.success = True
+            result.winner = best.name
+            result.objective = best.objective
+            result.best_bound = max(run.best_bound for run in feasible)
+            result.solution = {
+                keys[k][0]: keys[k][1] for k, value in enumerate(best.values) if value == 1
+            }
+            logger.info(f"求解器组合完成：配置 {best.name} 胜出，目标值 {best.objective}")
+        else:
+            logger.warning("求解器组合未找到可行解")
+        return result
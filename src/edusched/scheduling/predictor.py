@@ -0,0 +1,323 @@
+"""求解时间预测模块。
+
+从调度问题中提取规模、候选时间段密度、锁定比例和冲突图度数等特征，
+用历史任务（SchedulingJob.result_metadata 中记录的特征和耗时）训练岭回归模型，
+预测找到第一个可行解的时间和达到目标间隙的时间，据此为每个任务分配求解时间：
+小问题很快结束，大问题获得足够的时间。历史样本不足时使用固定的默认时间限制。
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from edusched.domain.models import SchedulingStatus
+from edusched.infrastructure.database.models import SchedulingJob as SchedulingJobTable
+
+if TYPE_CHECKING:
+    from edusched.scheduling.engine import SchedulingProblem
+
+logger = logging.getLogger(__name__)
+
+# 默认时间限制（与 solve_two_phase 的默认值一致）
+DEFAULT_PHASE1_TIME_LIMIT = 60
+DEFAULT_PHASE2_TIME_LIMIT = 240
+
+
+@dataclass
+class ProblemFeatures:
+    """调度问题的特征。"""
+
+    num_sections: int = 0
+    num_timeslots: int = 0
+    num_teachers: int = 0
+    num_class_groups: int = 0
+    num_rooms: int = 0
+    # 平均候选时间段数 / 可用时间段数
+    domain_density: float = 0.0
+    # 锁定的教学段比例
+    lock_ratio: float = 0.0
+    # 冲突图（共用教师或班级的教学段相连）的平均、最大度数
+    mean_conflict_degree: float = 0.0
+    max_conflict_degree: int = 0
+    # 课时最多的教师、班级占可用时间段的比例
+    max_teacher_load: float = 0.0
+    max_class_load: float = 0.0
+
+    def to_vector(self) -> np.ndarray:
+        """回归输入：计数取对数，比例保持原值。"""
+        return np.array([
+            math.log1p(self.num_sections),
+            math.log1p(self.num_timeslots),
+            math.log1p(self.num_teachers),
+            math.log1p(self.num_class_groups),
+            math.log1p(self.num_rooms),
+            self.domain_density,
+            self.lock_ratio,
+            math.log1p(self.mean_conflict_degree),
+            math.log1p(self.max_conflict_degree),
+            self.max_teacher_load,
+            self.max_class_load,
+        ])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可写入JSON的字典。"""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "ProblemFeatures":
+        """从字典恢复（忽略未知字段）。"""
+        names = cls.__dataclass_fields__
+        return cls(**{key: value for key, value in data.items() if key in names})
+
+
+def extract_features(problem: "SchedulingProblem") -> ProblemFeatures:
+    """提取调度问题的特征（无需构建模型）。"""
+    sections = problem.sections
+    num_sections = len(sections)
+    usable = sum(1 for timeslot in problem.timeslots if not timeslot.is_break)
+    features = ProblemFeatures(
+        num_sections=num_sections,
+        num_timeslots=len(problem.timeslots),
+        num_teachers=len({section.teacher_id for section in sections}),
+        num_class_groups=len({section.class_group_id for section in sections}),
+        num_rooms=len(problem.rooms) or len({section.room_id for section in sections if section.room_id}),
+    )
+    if num_sections == 0:
+        return features
+
+    domains = problem.section_domains or problem._compute_section_domains()
+    features.domain_density = sum(len(domain) for domain in domains) / num_sections / max(1, usable)
+    features.lock_ratio = len(problem._locked_timeslots()) / num_sections
+
+    # 度数 = 同教师的其他教学段 + 同班级的其他教学段 - 两者都相同的其他教学段
+    teacher_counts = Counter(section.teacher_id for section in sections)
+    class_counts = Counter(section.class_group_id for section in sections)
+    pair_counts = Counter((section.teacher_id, section.class_group_id) for section in sections)
+    degrees = [
+        teacher_counts[s.teacher_id] + class_counts[s.class_group_id] - pair_counts[(s.teacher_id, s.class_group_id)] - 1
+        for s in sections
+    ]
+    features.mean_conflict_degree = sum(degrees) / num_sections
+    features.max_conflict_degree = max(degrees)
+    features.max_teacher_load = max(teacher_counts.values()) / max(1, usable)
+    features.max_class_load = max(class_counts.values()) / max(1, usable)
+    return features
+
+
+@dataclass
+class TimeBudget:
+    """分配给一个任务的求解时间。"""
+
+    phase1_time_limit: int
+    phase2_time_limit: int
+    # 预测的首个可行解时间、达到目标间隙的时间（秒，没有模型时为None）
+    predicted_first_feasible: Optional[float] = None
+    predicted_target: Optional[float] = None
+    # 'model' 为回归预测，'default' 为默认时间限制
+    source: str = "default"
+
+    def to_metrics(self) -> Dict[str, Any]:
+        """转换为任务结果元数据。"""
+        return {
+            "phase1_time_limit": self.phase1_time_limit,
+            "phase2_time_limit": self.phase2_time_limit,
+            "predicted_first_feasible": self.predicted_first_feasible,
+            "predicted_target": self.predicted_target,
+            "time_budget_source": self.source,
+        }
+
+
+class _RidgeRegression:
+    """标准化输入上的岭回归。"""
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.mean: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+        self.coef: Optional[np.ndarray] = None
+        self.intercept = 0.0
+
+    def fit(self, x: np.ndarray, y: np.ndarray) -> None:
+        self.mean = x.mean(axis=0)
+        self.scale = x.std(axis=0)
+        self.scale[self.scale == 0] = 1.0
+        z = (x - self.mean) / self.scale
+        self.intercept = float(y.mean())
+        gram = z.T @ z + self.alpha * np.eye(z.shape[1])
+        self.coef = np.linalg.solve(gram, z.T @ (y - self.intercept))
+
+    def predict(self, x: np.ndarray) -> float:
+        return float(((x - self.mean) / self.scale) @ self.coef + self.intercept)
+
+
+class SolveTimePredictor:
+    """基于历史任务的求解时间预测器。"""
+
+    def __init__(
+        self,
+        target_gap: float = 0.01,
+        min_samples: int = 20,
+        alpha: float = 1.0,
+        safety_factor: float = 2.0,
+        min_time_limit: int = 5,
+        max_time_limit: int = DEFAULT_PHASE1_TIME_LIMIT + DEFAULT_PHASE2_TIME_LIMIT,
+        refresh_interval: float = 3600.0,
+    ):
+        """初始化预测器。
+
+        Args:
+            target_gap: 目标相对间隙（需为 GAP_THRESHOLDS 中的值）
+            min_samples: 训练所需的最少历史任务数，不足时使用默认时间限制
+            alpha: 岭回归正则化系数
+            safety_factor: 预测时间的放大倍数
+            min_time_limit: 每个阶段的最短时间限制（秒）
+            max_time_limit: 两个阶段合计的最长时间限制（秒）
+            refresh_interval: refresh() 重新训练的最短间隔（秒）
+        """
+        self.target_gap = target_gap
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self.safety_factor = safety_factor
+        self.min_time_limit = min_time_limit
+        self.max_time_limit = max_time_limit
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._models: Optional[Tuple[_RidgeRegression, _RidgeRegression]] = None
+        self._fitted_at: Optional[float] = None
+        self.num_samples = 0
+
+    @property
+    def is_fitted(self) -> bool:
+        """是否已训练。"""
+        return self._models is not None
+
+    def training_sample(self, metadata: Mapping[str, Any]) -> Optional[Tuple[ProblemFeatures, float, float]]:
+        """从任务结果元数据中取出 (特征, 首个可行解时间, 达到目标间隙时间)，缺少数据时返回None。
+
+        未达到目标间隙的任务以实际总耗时作为目标时间（低估，样本仍有参考价值）。
+        """
+        features = metadata.get("features")
+        phase1_time = metadata.get("phase1_time")
+        if not features or phase1_time is None or not metadata.get("success"):
+            return None
+        time_to_gap = metadata.get("phase2_time_to_gap") or {}
+        reached = time_to_gap.get(str(self.target_gap))
+        if reached is None:
+            reached = metadata.get("phase2_time") or 0.0
+        return ProblemFeatures.from_dict(features), float(phase1_time), float(phase1_time) + float(reached)
+
+    def fit(self, history: Iterable[Mapping[str, Any]]) -> int:
+        """用历史任务的结果元数据训练，返回使用的样本数（不足 min_samples 时不更新模型）。"""
+        samples = [sample for sample in map(self.training_sample, history) if sample is not None]
+        if len(samples) < self.min_samples:
+            logger.info(f"求解时间预测：历史样本 {len(samples)} 个，不足 {self.min_samples} 个，使用默认时间限制")
+            return len(samples)
+
+        x = np.array([features.to_vector() for features, _, _ in samples])
+        # 对数时间上回归，避免大任务主导误差
+        first = np.log(np.maximum([s[1] for s in samples], 1e-3))
+        target = np.log(np.maximum([s[2] for s in samples], 1e-3))
+        first_model = _RidgeRegression(self.alpha)
+        first_model.fit(x, first)
+        target_model = _RidgeRegression(self.alpha)
+        target_model.fit(x, target)
+
+        with self._lock:
+            self._models = (first_model, target_model)
+            self._fitted_at = time.monotonic()
+            self.num_samples = len(samples)
+        logger.info(f"求解时间预测：以 {len(samples)} 个历史任务训练完成")
+        return len(samples)
+
+    def refresh(self, history: "JobHistory", tenant_id: Optional[str] = None) -> None:
+        """距上次训练超过 refresh_interval 时从任务历史重新训练（失败时保留原模型）。"""
+        with self._lock:
+            if self._fitted_at is not None and time.monotonic() - self._fitted_at < self.refresh_interval:
+                return
+            # 失败或样本不足时也等待一个间隔再重试
+            self._fitted_at = time.monotonic()
+        try:
+            self.fit(history.load(tenant_id))
+        except Exception as e:
+            logger.warning(f"求解时间预测：加载任务历史失败: {e}")
+
+    def predict(self, features: ProblemFeatures) -> Optional[Tuple[float, float]]:
+        """预测 (首个可行解时间, 达到目标间隙时间)（秒），未训练时返回None。"""
+        with self._lock:
+            models = self._models
+        if models is None:
+            return None
+        x = features.to_vector()
+        first = math.exp(models[0].predict(x))
+        target = math.exp(models[1].predict(x))
+        return first, max(first, target)
+
+    def allocate(self, features: ProblemFeatures) -> TimeBudget:
+        """按预测时间分配两个阶段的时间限制，总时间不超过 max_time_limit。"""
+        predicted = self.predict(features)
+        if predicted is None:
+            return TimeBudget(DEFAULT_PHASE1_TIME_LIMIT, DEFAULT_PHASE2_TIME_LIMIT)
+
+        first, target = predicted
+        low, high = self.min_time_limit, self.max_time_limit
+        phase1 = min(max(low, math.ceil(first * self.safety_factor)), high - low)
+        phase2 = min(max(low, math.ceil((target - first) * self.safety_factor)), high - phase1)
+        return TimeBudget(
+            phase1_time_limit=phase1,
+            phase2_time_limit=phase2,
+            predicted_first_feasible=round(first, 3),
+            predicted_target=round(target, 3),
+            source="model",
+        )
+
+
+class JobHistory:
+    """从数据库读取已完成调度任务的结果元数据。"""
+
+    def __init__(self, database_url: Optional[str] = None, limit: int = 1000):
+        """初始化。
+
+        Args:
+            database_url: 数据库连接URL，默认读取配置
+            limit: 最多读取的最近任务数
+        """
+        self.database_url = database_url
+        self.limit = limit
+        self._engine: Any = None
+
+    def _session(self) -> Session:
+        if self._engine is None:
+            url = self.database_url
+            if url is None:
+                from edusched.core.config import get_settings
+
+                url = get_settings().database.url
+            self._engine = create_engine(url.replace("+asyncpg", ""), pool_pre_ping=True)
+        return Session(self._engine)
+
+    def load(self, tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """最近成功完成的任务的结果元数据（指定租户时只读取该租户）。"""
+        table = SchedulingJobTable
+        query = (
+            select(table.result_metadata)
+            .where(table.status.in_([SchedulingStatus.FEASIBLE, SchedulingStatus.OPTIMIZED]))
+            .order_by(table.completed_at.desc())
+            .limit(self.limit)
+        )
+        if tenant_id is not None:
+            query = query.where(table.tenant_id == tenant_id)
+        with self._session() as db:
+            return [metadata for metadata in db.execute(query).scalars() if metadata]
+
+
+# 全局任务历史与预测器（工作进程内共享，定期从任务历史重新训练）
+job_history = JobHistory()
+solve_time_predictor = SolveTimePredictor()
@@ -0,0 +1,199 @@
+"""教室分配模块。
+
+教室维度不展开为（教学段, 教室, 时间段）三元变量。预先按教室容量、类型和特性与班级人数、
+教学段的教室要求计算兼容索引，每个教学段只与兼容的教室关联；要求相同的教学段共享同一个兼容集合，
+因此教室数量增加时索引规模只随不同的要求数增长。
+
+时间段模型中，对每个兼容集合（以及相交集合的并集）添加稀疏计数约束：同一时间段内
+只能使用该集合教室的教学段数不超过集合中的教室数（Hall条件）。教学段数不可能超过教室数的集合
+不产生约束。求解后逐时间段以最小费用匹配为教学段分配具体教室，优先选择容量最接近班级人数的教室。
+"""
+
+import bisect
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+from uuid import UUID
+
+from ortools.graph.python import min_cost_flow
+
+from edusched.domain.models import ClassGroup, Room, Section
+from edusched.scheduling.index import RoomGroup
+
+logger = logging.getLogger(__name__)
+
+# 兼容集合并集闭包的最大规模，超过后不再添加并集约束（求解后匹配失败时引擎将求解视为失败）
+MAX_ROOM_GROUPS = 256
+
+
+def room_features(room: Room) -> FrozenSet[str]:
+    """教室具备的特性。"""
+    return frozenset(name for name, value in room.features.items() if value)
+
+
+@dataclass
+class RoomCompatibilityIndex:
+    """教学段与教室的兼容索引。"""
+
+    # 教室ID（含教学段指定但未登记的教室）
+    room_ids: List[UUID] = field(default_factory=list)
+    # 教室容量，未登记的教室为None
+    capacities: List[Optional[int]] = field(default_factory=list)
+    # 教学段下标 -> 兼容教室下标集合
+    compatible: List[FrozenSet[int]] = field(default_factory=list)
+    # 教学段下标 -> 班级人数
+    class_sizes: List[int] = field(default_factory=list)
+    groups: List[RoomGroup] = field(default_factory=list)
+
+    @classmethod
+    def build(
+        cls,
+        sections: Sequence[Section],
+        rooms: Sequence[Room],
+        class_groups: Sequence[ClassGroup] = (),
+        max_groups: int = MAX_ROOM_GROUPS,
+    ) -> "RoomCompatibilityIndex":
+        """构建兼容索引和教室容量组。
+
+        指定了教室的教学段只兼容该教室；其余教学段兼容容量不小于班级人数、
+        类型和特性满足要求的可用教室。
+        """
+        index = cls()
+        room_to_idx: Dict[UUID, int] = {}
+        for room in rooms:
+            if room.is_active and room.id not in room_to_idx:
+                room_to_idx[room.id] = len(index.room_ids)
+                index.room_ids.append(room.id)
+                index.capacities.append(room.capacity)
+
+        # 按（类型, 特性）分组，组内按容量排序，便于二分查找
+        room_classes: Dict[Tuple[str, FrozenSet[str]], List[Tuple[int, int]]] = {}
+        for room in rooms:
+            if room.is_active:
+                key = (room.room_type, room_features(room))
+                room_classes.setdefault(key, []).append((room.capacity, room_to_idx[room.id]))
+        for members in room_classes.values():
+            members.sort()
+
+        sizes = {class_group.id: class_group.student_count for class_group in class_groups}
+        cache: Dict[Tuple[Optional[str], FrozenSet[str], int], FrozenSet[int]] = {}
+
+        for section in sections:
+            size = sizes.get(section.class_group_id, 0)
+            index.class_sizes.append(size)
+
+            if section.room_id is not None:
+                if section.room_id not in room_to_idx:
+                    room_to_idx[section.room_id] = len(index.room_ids)
+                    index.room_ids.append(section.room_id)
+                    index.capacities.append(None)
+                index.compatible.append(frozenset({room_to_idx[section.room_id]}))
+                continue
+
+            key = (section.required_room_type, frozenset(section.required_features), size)
+            if key not in cache:
+                compatible: Set[int] = set()
+                for (room_type, features), members in room_classes.items():
+                    if key[0] is not None and room_type != key[0]:
+                        continue
+                    if not key[1] <= features:
+                        continue
+                    start = bisect.bisect_left(members, (size, -1))
+                    compatible.update(r for _, r in members[start:])
+                cache[key] = frozenset(compatible)
+            if not cache[key]:
+                logger.warning(f"教学段 {section.id} 没有兼容的教室")
+            index.compatible.append(cache[key])
+
+        index.groups = index._build_groups(max_groups)
+        logger.info(
+            f"教室兼容索引：{len(index.room_ids)} 间教室，{len(cache)} 种教室要求，"
+            f"{len(index.groups)} 个容量组"
+        )
+        return index
+
+    def _build_groups(self, max_groups: int) -> List[RoomGroup]:
+        """对兼容集合求相交并集的闭包，生成可能超出容量的教室容量组。"""
+        sections_by_set: Dict[FrozenSet[int], List[int]] = {}
+        for i, rooms in enumerate(self.compatible):
+            if rooms:
+                sections_by_set.setdefault(rooms, []).append(i)
+
+        closure = list(sections_by_set)
+        seen = set(closure)
+        k = 0
+        while k < len(closure) and len(closure) < max_groups:
+            current = closure[k]
+            for other in closure[:k]:
+                if current & other and not (current <= other or other <= current):
+                    union = current | other
+                    if union not in seen:
+                        seen.add(union)
+                        closure.append(union)
+            k += 1
+        if k < len(closure):
+            logger.warning(f"教室容量组超过 {max_groups} 个，部分并集约束未添加（求解后的匹配可能失败）")
+
+        groups = []
+        for rooms in closure:
+            members = sorted(
+                i for subset, indices in sections_by_set.items() if subset <= rooms for i in indices
+            )
+            if len(members) > len(rooms):
+                groups.append(RoomGroup(members, len(rooms)))
+        return groups
+
+    def assign(self, pairs: Sequence[Tuple[int, int]]) -> Dict[Tuple[int, int], Optional[UUID]]:
+        """逐时间段以最小费用匹配为 (教学段下标, 时间段下标) 分配教室，无法分配的为None。"""
+        return {
+            pair: self.room_ids[r] if r is not None else None
+            for pair, r in self.assign_indices(pairs).items()
+        }
+
+    def assign_indices(self, pairs: Sequence[Tuple[int, int]]) -> Dict[Tuple[int, int], Optional[int]]:
+        """同 assign，返回教室下标。"""
+        by_timeslot: Dict[int, List[int]] = {}
+        for i, j in pairs:
+            by_timeslot.setdefault(j, []).append(i)
+
+        rooms: Dict[Tuple[int, int], Optional[int]] = {}
+        for j, section_indices in by_timeslot.items():
+            matched = self._match(section_indices)
+            for i in section_indices:
+                rooms[(i, j)] = matched.get(i)
+            if len(matched) < len(section_indices):
+                logger.warning(f"时间段 {j} 有 {len(section_indices) - len(matched)} 个教学段未能分配教室")
+        return rooms
+
+    def _match(self, section_indices: List[int]) -> Dict[int, int]:
+        """同一时间段内教学段与兼容教室的最小费用最大匹配（费用为空余座位数）。"""
+        room_nodes: Dict[int, int] = {}
+        arcs: List[Tuple[int, int, int]] = []
+        n = len(section_indices)
+        for s, i in enumerate(section_indices):
+            for r in self.compatible[i]:
+                node = room_nodes.setdefault(r, 1 + n + len(room_nodes))
+                capacity = self.capacities[r]
+                waste = capacity - self.class_sizes[i] if capacity is not None else 0
+                arcs.append((1 + s, node, max(0, waste)))
+        if not arcs:
+            return {}
+
+        flow = min_cost_flow.SimpleMinCostFlow()
+        sink = 1 + n + len(room_nodes)
+        for s in range(n):
+            flow.add_arc_with_capacity_and_unit_cost(0, 1 + s, 1, 0)
+        section_arcs = [flow.add_arc_with_capacity_and_unit_cost(u, v, 1, cost) for u, v, cost in arcs]
+        for node in room_nodes.values():
+            flow.add_arc_with_capacity_and_unit_cost(node, sink, 1, 0)
+        flow.set_node_supply(0, n)
+        flow.set_node_supply(sink, -n)
+        if flow.solve_max_flow_with_min_cost() != flow.OPTIMAL:
+            return {}
+
+        room_of_node = {node: r for r, node in room_nodes.items()}
+        return {
+            section_indices[flow.tail(arc) - 1]: room_of_node[flow.head(arc)]
+            for arc in section_arcs
+            if flow.flow(arc) > 0
+        }
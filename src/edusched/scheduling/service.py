@@ -4,8 +4,9 @@
 """
 
 import logging
+from datetime import time
 from typing import Dict, List, Any, Optional
-from uuid import UUID
+from uuid import NAMESPACE_URL, UUID, uuid5
 
 from edusched.domain.models import (
     Assignment,
@@ -20,7 +21,7 @@ from edusched.domain.models import (
     Room,
     Campus
 )
-from edusched.scheduling.engine import SchedulingEngine, SchedulingProblem
+from edusched.scheduling.engine import ConstraintValidator, SchedulingEngine, SchedulingProblem
 
 logger = logging.getLogger(__name__)
 
@@ -74,15 +75,14 @@ class SchedulingService:
         # 创建示例时间段
         timeslots = []
         for day in [WeekDay.MONDAY, WeekDay.TUESDAY, WeekDay.WEDNESDAY, WeekDay.THURSDAY, WeekDay.FRIDAY]:
-            for hour in ["09:00", "10:00", "11:00", "14:00", "15:00", "16:00"]:
+            for period, hour in enumerate([9, 10, 11, 14, 15, 16], start=1):
                 timeslot = Timeslot(
-                    id=UUID(f'{day.value}_{hour.replace(":", "")}'),
+                    id=uuid5(NAMESPACE_URL, f'timeslot/{day.value}/{hour:02d}00'),
                     tenant_id=self.tenant_id,
-                    day_of_week=day,
-                    start_time=hour,
-                    end_time=f"{int(hour.split(':')[0]) + 1}:00",
-                    period_type=PeriodType.CLASS,
-                    is_active=True
+                    week_day=day,
+                    start_time=time(hour, 0),
+                    end_time=time(hour + 1, 0),
+                    period_number=period,
                 )
                 timeslots.append(timeslot)
 
@@ -295,47 +295,7 @@ class SchedulingService:
             return []
 
         problem = self.engine.problem
-        violations = []
-
-        # 检查教师冲突
-        teacher_schedule = {}
-        for assignment in assignments:
-            # 找到对应的教师
-            teacher_id = None
-            for section in problem.sections:
-                if section.id == assignment.section_id:
-                    teacher_id = section.teacher_id
-                    break
-
-            if teacher_id:
-                if teacher_id not in teacher_schedule:
-                    teacher_schedule[teacher_id] = []
-
-                if assignment.timeslot_id in teacher_schedule[teacher_id]:
-                    violations.append(f"教师{teacher_id}在时间段{assignment.timeslot_id}有冲突")
-                else:
-                    teacher_schedule[teacher_id].append(assignment.timeslot_id)
-
-        # 检查班级冲突
-        class_schedule = {}
-        for assignment in assignments:
-            # 找到对应的班级
-            class_group_id = None
-            for section in problem.sections:
-                if section.id == assignment.section_id:
-                    class_group_id = section.class_group_id
-                    break
-
-            if class_group_id:
-                if class_group_id not in class_schedule:
-                    class_schedule[class_group_id] = []
-
-                if assignment.timeslot_id in class_schedule[class_group_id]:
-                    violations.append(f"班级{class_group_id}在时间段{assignment.timeslot_id}有冲突")
-                else:
-                    class_schedule[class_group_id].append(assignment.timeslot_id)
-
-        return violations
+        return ConstraintValidator.validate_hard_constraints(assignments, problem.sections, problem.timeslots)
 
 
 def demo_scheduling_strategies():
@@ -0,0 +1,140 @@
+"""紧凑解表示模块。
+
+求解结束后从求解器响应中一次性读出全部变量取值，压缩为 int32 的
+“教学段 → 时间段（→ 教室）”向量，不再对每个分配变量调用 solver.Value。
+业务指标和约束统计都基于该向量计算，Assignment 对象只在需要返回或持久化时批量生成。
+"""
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+from uuid import UUID
+
+import numpy as np
+from ortools.sat.python.cp_model import CpSolver, CpSolverSolutionCallback
+
+from edusched.domain.models import Assignment
+from edusched.scheduling.variables import SparseAssignmentVars
+
+if TYPE_CHECKING:
+    from edusched.scheduling.engine import SchedulingProblem
+    from edusched.scheduling.rooms import RoomCompatibilityIndex
+
+# 未安排的教学段 / 未匹配教室
+UNASSIGNED = -1
+# 临时ID：时间表尚未创建、教学段未指定教室
+PLACEHOLDER_ID = UUID('00000000-0000-0000-0000-000000000000')
+
+
+def solver_values(solver: Union[CpSolver, CpSolverSolutionCallback]) -> np.ndarray:
+    """求解器响应中全部变量的取值（按proto变量下标）；在解回调中为当前解的取值。"""
+    return np.asarray(solver.response_proto.solution, dtype=np.int64)
+
+
+@dataclass
+class SolutionVector:
+    """以数组表示的解。"""
+
+    # 教学段下标 -> 时间段下标，未安排为 UNASSIGNED
+    timeslots: np.ndarray
+    # 教学段下标 -> 教室兼容索引中的教室下标，未启用教室分配或未匹配为 UNASSIGNED
+    rooms: np.ndarray
+
+    @classmethod
+    def empty(cls, num_sections: int) -> "SolutionVector":
+        """全部未安排的解。"""
+        return cls(
+            timeslots=np.full(num_sections, UNASSIGNED, dtype=np.int32),
+            rooms=np.full(num_sections, UNASSIGNED, dtype=np.int32),
+        )
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, vars: SparseAssignmentVars) -> "SolutionVector":
+        """从按proto变量下标排列的取值中提取解（求解器没有解时取值为空，返回全部未安排）。"""
+        vector = cls.empty(vars.num_sections)
+        if len(values) == 0:
+            return vector
+        sections, timeslots, indices = vars.arrays()
+        chosen = values[indices] == 1
+        vector.timeslots[sections[chosen]] = timeslots[chosen]
+        return vector
+
+    @classmethod
+    def from_solver(
+        cls, solver: Union[CpSolver, CpSolverSolutionCallback], vars: SparseAssignmentVars
+    ) -> "SolutionVector":
+        """从求解器（或解回调）的当前解中提取。"""
+        return cls.from_values(solver_values(solver), vars)
+
+    @classmethod
+    def from_dict(cls, solution: Mapping[int, int], num_sections: int) -> "SolutionVector":
+        """从 {教学段下标: 时间段下标} 构造。"""
+        vector = cls.empty(num_sections)
+        if solution:
+            keys = np.fromiter(solution.keys(), dtype=np.int32, count=len(solution))
+            vector.timeslots[keys] = np.fromiter(solution.values(), dtype=np.int32, count=len(solution))
+        return vector
+
+    @property
+    def num_sections(self) -> int:
+        """教学段数。"""
+        return len(self.timeslots)
+
+    @property
+    def scheduled(self) -> np.ndarray:
+        """已安排的教学段下标。"""
+        return np.flatnonzero(self.timeslots != UNASSIGNED)
+
+    @property
+    def num_scheduled(self) -> int:
+        """已安排的教学段数。"""
+        return int(np.count_nonzero(self.timeslots != UNASSIGNED))
+
+    def as_dict(self) -> Dict[int, int]:
+        """转换为 {教学段下标: 时间段下标}。"""
+        scheduled = self.scheduled
+        return dict(zip(scheduled.tolist(), self.timeslots[scheduled].tolist()))
+
+    def pairs(self) -> List[Tuple[int, int]]:
+        """按教学段下标排序的 (教学段下标, 时间段下标)。"""
+        scheduled = self.scheduled
+        return list(zip(scheduled.tolist(), self.timeslots[scheduled].tolist()))
+
+    def assign_rooms(self, room_index: Optional["RoomCompatibilityIndex"]) -> "SolutionVector":
+        """逐时间段为已安排的教学段匹配教室（未启用教室分配时不变）。"""
+        if room_index is not None:
+            self.rooms[:] = UNASSIGNED
+            for (i, _), r in room_index.assign_indices(self.pairs()).items():
+                if r is not None:
+                    self.rooms[i] = r
+        return self
+
+    def to_assignments(self, problem: "SchedulingProblem") -> List[Assignment]:
+        """批量生成分配记录。"""
+        room_index = problem.room_index
+        rooms: Dict[Tuple[int, int], Optional[UUID]] = {}
+        if room_index is not None:
+            for i, j in self.pairs():
+                r = int(self.rooms[i])
+                rooms[(i, j)] = room_index.room_ids[r] if r != UNASSIGNED else None
+        return build_assignments(problem, self.pairs(), rooms)
+
+
+def build_assignments(
+    problem: "SchedulingProblem",
+    pairs: Sequence[Tuple[int, int]],
+    rooms: Mapping[Tuple[int, int], Optional[UUID]],
+) -> List[Assignment]:
+    """将 (教学段下标, 时间段下标) 与匹配的教室转换为分配记录。"""
+    sections = problem.sections
+    timeslots = problem.timeslots
+    return [
+        Assignment(
+            tenant_id=problem.tenant_id,
+            timetable_id=PLACEHOLDER_ID,
+            section_id=sections[i].id,
+            timeslot_id=timeslots[j].id,
+            room_id=rooms.get((i, j)) or sections[i].room_id or PLACEHOLDER_ID,
+            is_locked=False,
+        )
+        for i, j in pairs
+    ]
@@ -0,0 +1,288 @@
+"""已求解课表缓存模块。
+
+按问题指纹保存求解结果：指纹完全相同时直接返回缓存的课表；
+同一时间段网格下相似度足够高的问题返回最相近的课表，作为热启动提示。
+"""
+
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from edusched.domain.models import Assignment
+from edusched.scheduling.diagnosis import InfeasibilityCore
+from edusched.scheduling.fingerprint import ProblemFingerprint
+
+if TYPE_CHECKING:
+    from edusched.scheduling.engine import SchedulingProblem
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "edusched:solution"
+# 每个时间段网格保留的候选数量
+MAX_CANDIDATES = 20
+
+
+@dataclass
+class CachedSolution:
+    """缓存的求解结果。"""
+
+    digest: str
+    elements: List[str]
+    # (教学段ID, 时间段ID)
+    pairs: List[Tuple[str, str]]
+    objective: Optional[float] = None
+    metrics: Dict[str, Any] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+
+    def to_solution(self, problem: "SchedulingProblem") -> Dict[int, int]:
+        """映射为 {教学段下标: 时间段下标}，忽略当前问题中已不存在的教学段或时间段。"""
+        solution = {}
+        for section_id, timeslot_id in self.pairs:
+            i = problem.section_to_idx.get(UUID(section_id))
+            j = problem.timeslot_to_idx.get(UUID(timeslot_id))
+            if i is not None and j is not None:
+                solution[i] = j
+        return solution
+
+    def to_assignments(self, problem: "SchedulingProblem") -> List[Assignment]:
+        """转换为当前问题的分配记录。"""
+        return problem._build_assignments(self.to_solution(problem))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可JSON序列化的字典。"""
+        return {
+            "digest": self.digest,
+            "elements": self.elements,
+            "pairs": [list(pair) for pair in self.pairs],
+            "objective": self.objective,
+            "metrics": self.metrics,
+            "created_at": self.created_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CachedSolution":
+        """从字典恢复。"""
+        return cls(
+            digest=data["digest"],
+            elements=list(data["elements"]),
+            pairs=[(pair[0], pair[1]) for pair in data["pairs"]],
+            objective=data.get("objective"),
+            metrics=data.get("metrics", {}),
+            created_at=data.get("created_at", 0.0),
+        )
+
+
+@dataclass
+class CacheLookup:
+    """缓存查找结果。"""
+
+    solution: CachedSolution
+    exact: bool
+    similarity: float
+
+
+class SolutionStore(ABC):
+    """缓存存储接口（值为可JSON序列化的对象）。"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存值。"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """写入缓存值。"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """删除缓存值。"""
+
+
+class InMemorySolutionStore(SolutionStore):
+    """进程内LRU缓存存储。"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            text, expires_at = item
+            if expires_at is not None and expires_at < time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return json.loads(text)
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        # 以JSON文本保存，与Redis存储的序列化行为一致
+        text = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._items[key] = (text, time.time() + ttl if ttl else None)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+
+class RedisSolutionStore(SolutionStore):
+    """基于Redis的缓存存储（与缓存层共用Redis实例，可在多个工作进程间共享）。
+
+    工作进程中的求解是同步执行的，因此使用同步客户端；实例本身可以传递给子进程。
+    """
+
+    def __init__(self, url: Optional[str] = None):
+        self.url = url
+        self._client = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_client"] = None
+        return state
+
+    def _get_client(self) -> Any:
+        """惰性创建Redis客户端。"""
+        if self._client is None:
+            import redis
+
+            from edusched.core.config import get_settings
+
+            settings = get_settings().redis
+            self._client = redis.Redis.from_url(
+                self.url or settings.url,
+                socket_timeout=settings.timeout,
+                socket_connect_timeout=settings.timeout,
+            )
+        return self._client
+
+    def get(self, key: str) -> Optional[Any]:
+        data = self._get_client().get(key)
+        return json.loads(data) if data is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self._get_client().set(key, json.dumps(value, ensure_ascii=False), ex=ttl)
+
+    def delete(self, key: str) -> None:
+        self._get_client().delete(key)
+
+
+class SolutionCache:
+    """按问题指纹缓存已求解的课表。
+
+    缓存故障只记录警告并按未命中处理，不影响求解。
+    """
+
+    def __init__(
+        self,
+        store: SolutionStore,
+        ttl: Optional[int] = 7 * 24 * 3600,
+        min_similarity: float = 0.8,
+    ):
+        """初始化缓存。
+
+        Args:
+            store: 缓存存储
+            ttl: 缓存有效期（秒）
+            min_similarity: 作为热启动提示的最低相似度
+        """
+        self.store = store
+        self.ttl = ttl
+        self.min_similarity = min_similarity
+
+    @staticmethod
+    def _solution_key(fingerprint: ProblemFingerprint, digest: str) -> str:
+        return f"{KEY_PREFIX}:{fingerprint.tenant_id}:exact:{digest}"
+
+    @staticmethod
+    def _grid_key(fingerprint: ProblemFingerprint) -> str:
+        return f"{KEY_PREFIX}:{fingerprint.tenant_id}:grid:{fingerprint.grid_digest}"
+
+    def lookup(self, fingerprint: ProblemFingerprint) -> Optional[CacheLookup]:
+        """查找完全匹配或最相近的缓存结果。"""
+        try:
+            data = self.store.get(self._solution_key(fingerprint, fingerprint.digest))
+            if data is not None:
+                return CacheLookup(CachedSolution.from_dict(data), exact=True, similarity=1.0)
+
+            best: Optional[CacheLookup] = None
+            for digest in self.store.get(self._grid_key(fingerprint)) or []:
+                data = self.store.get(self._solution_key(fingerprint, digest))
+                if data is None:
+                    continue
+                candidate = CachedSolution.from_dict(data)
+                similarity = fingerprint.similarity(candidate.elements)
+                if similarity >= self.min_similarity and (best is None or similarity > best.similarity):
+                    best = CacheLookup(candidate, exact=False, similarity=similarity)
+            return best
+        except Exception as e:
+            logger.warning(f"读取课表缓存失败: {e}")
+            return None
+
+    def store_solution(
+        self,
+        fingerprint: ProblemFingerprint,
+        assignments: List[Assignment],
+        objective: Optional[float] = None,
+        metrics: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """保存求解结果，并登记到所在时间段网格的候选列表。"""
+        solution = CachedSolution(
+            digest=fingerprint.digest,
+            elements=sorted(fingerprint.elements),
+            pairs=[(str(a.section_id), str(a.timeslot_id)) for a in assignments],
+            objective=objective,
+            metrics=metrics or {},
+        )
+        try:
+            self.store.set(self._solution_key(fingerprint, fingerprint.digest), solution.to_dict(), self.ttl)
+
+            # 候选列表按最近使用排序，读改写的竞争只会丢失个别候选
+            grid_key = self._grid_key(fingerprint)
+            candidates = [d for d in self.store.get(grid_key) or [] if d != fingerprint.digest]
+            candidates = [fingerprint.digest, *candidates][:MAX_CANDIDATES]
+            self.store.set(grid_key, candidates, self.ttl)
+        except Exception as e:
+            logger.warning(f"写入课表缓存失败: {e}")
+
+    @staticmethod
+    def _core_key(fingerprint: ProblemFingerprint) -> str:
+        return f"{KEY_PREFIX}:{fingerprint.tenant_id}:core:{fingerprint.digest}"
+
+    def lookup_core(self, fingerprint: ProblemFingerprint) -> Optional[InfeasibilityCore]:
+        """查找相同问题的不可行诊断结果。"""
+        try:
+            data = self.store.get(self._core_key(fingerprint))
+            return InfeasibilityCore.from_dict(data) if data is not None else None
+        except Exception as e:
+            logger.warning(f"读取诊断缓存失败: {e}")
+            return None
+
+    def store_core(self, fingerprint: ProblemFingerprint, core: InfeasibilityCore) -> None:
+        """保存不可行诊断结果。"""
+        try:
+            self.store.set(self._core_key(fingerprint), core.to_dict(), self.ttl)
+        except Exception as e:
+            logger.warning(f"写入诊断缓存失败: {e}")
+
+    def invalidate(self, fingerprint: ProblemFingerprint) -> None:
+        """删除指定问题的缓存结果。"""
+        try:
+            self.store.delete(self._solution_key(fingerprint, fingerprint.digest))
+        except Exception as e:
+            logger.warning(f"删除课表缓存失败: {e}")
+
+
+# 全局课表缓存（工作进程共享Redis）
+solution_cache = SolutionCache(RedisSolutionStore())
@@ -0,0 +1,169 @@
+"""多样化解池模块。
+
+一次求解收集K个互不相同的高质量课表，供规划人员比较。
+求解回调把搜索过程中的改进解交给解池；每轮求解结束后，对解池中的每个解添加
+no-good 割（至少 min_distance 个教学段换到别的时间段），再继续求解下一个不同的课表。
+解以 int32 的“教学段 → 时间段”向量保存，按目标值排序，需要时再生成分配和时间表草稿。
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+import numpy as np
+
+from edusched.domain.models import Assignment, SchedulingStatus, Timetable
+from edusched.scheduling.solution import UNASSIGNED, SolutionVector
+
+if TYPE_CHECKING:
+    from edusched.scheduling.engine import SchedulingProblem
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PooledSolution:
+    """解池中的一个解。"""
+
+    # 教学段下标 -> 时间段下标，未安排为 UNASSIGNED
+    timeslots: np.ndarray
+    objective: float
+    # 解池内的唯一编号（按加入顺序）
+    key: int = 0
+
+    def pairs(self) -> List[Tuple[int, int]]:
+        """已安排教学段的 (教学段下标, 时间段下标)。"""
+        scheduled = np.flatnonzero(self.timeslots != UNASSIGNED)
+        return list(zip(scheduled.tolist(), self.timeslots[scheduled].tolist()))
+
+    def distance(self, timeslots: np.ndarray) -> int:
+        """与另一个解的汉明距离（时间段不同的教学段数）。"""
+        return int(np.count_nonzero(self.timeslots != timeslots))
+
+    def to_vector(self, problem: "SchedulingProblem") -> SolutionVector:
+        """转换为解向量（启用教室分配时逐时间段匹配教室）。"""
+        vector = SolutionVector.empty(len(self.timeslots))
+        vector.timeslots[:] = self.timeslots
+        return vector.assign_rooms(problem.room_index)
+
+    def to_assignments(self, problem: "SchedulingProblem") -> List[Assignment]:
+        """生成分配记录。"""
+        return self.to_vector(problem).to_assignments(problem)
+
+    def to_timetable(
+        self,
+        problem: "SchedulingProblem",
+        calendar_id: UUID,
+        name: str,
+        rank: int = 1,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Timetable:
+        """生成草稿状态的时间表（分配已指向新时间表），由调用方持久化。"""
+        timetable_id = uuid4()
+        assignments = [
+            assignment.model_copy(update={"timetable_id": timetable_id})
+            for assignment in self.to_assignments(problem)
+        ]
+        return Timetable(
+            id=timetable_id,
+            tenant_id=problem.tenant_id,
+            calendar_id=calendar_id,
+            name=name,
+            status=SchedulingStatus.DRAFT,
+            assignments=assignments,
+            metadata={**(metadata or {}), "pool_rank": rank, "objective": self.objective},
+        )
+
+
+class SolutionPool:
+    """按目标值排序、两两距离不小于 min_distance 的解池。"""
+
+    def __init__(self, size: int, min_distance: int = 1):
+        """初始化解池。
+
+        Args:
+            size: 最多保留的解数
+            min_distance: 解之间至少相差的教学段数
+        """
+        self.size = size
+        self.min_distance = max(1, min_distance)
+        self._lock = threading.Lock()
+        self._solutions: List[PooledSolution] = []
+        self._next_key = 0
+
+    def offer(self, timeslots: np.ndarray, objective: float) -> bool:
+        """提交一个解，返回是否加入解池。
+
+        与已有解过于接近时只在它比所有接近的解都好的情况下替换它们；
+        解池已满时替换目标值最差的解。
+        """
+        timeslots = np.asarray(timeslots, dtype=np.int32)
+        with self._lock:
+            close = [s for s in self._solutions if s.distance(timeslots) < self.min_distance]
+            if any(s.objective <= objective for s in close):
+                return False
+            if not close and len(self._solutions) >= self.size and self._solutions[-1].objective <= objective:
+                return False
+
+            for s in close:
+                self._solutions.remove(s)
+            self._solutions.append(PooledSolution(timeslots.copy(), objective, self._next_key))
+            self._next_key += 1
+            self._solutions.sort(key=lambda s: s.objective)
+            del self._solutions[self.size:]
+            return True
+
+    def offer_solution(self, solution: Dict[int, int], num_sections: int, objective: float) -> bool:
+        """提交 {教学段下标: 时间段下标} 形式的解。"""
+        return self.offer(SolutionVector.from_dict(solution, num_sections).timeslots, objective)
+
+    @property
+    def solutions(self) -> List[PooledSolution]:
+        """按目标值从好到差排列的解。"""
+        with self._lock:
+            return list(self._solutions)
+
+    @property
+    def best(self) -> Optional[PooledSolution]:
+        """目标值最好的解。"""
+        with self._lock:
+            return self._solutions[0] if self._solutions else None
+
+    @property
+    def is_full(self) -> bool:
+        """是否已收集到 size 个解。"""
+        with self._lock:
+            return len(self._solutions) >= self.size
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._solutions)
+
+
+@dataclass
+class PoolResult:
+    """解池求解结果。"""
+
+    pool: SolutionPool
+    rounds: int = 0
+    elapsed: float = 0.0
+    # 每轮求解结束的状态
+    statuses: List[str] = field(default_factory=list)
+
+    def to_metrics(self) -> Dict[str, Any]:
+        """转换为指标字典。"""
+        solutions = self.pool.solutions
+        return {
+            "pool_size": len(solutions),
+            "pool_rounds": self.rounds,
+            "pool_time": self.elapsed,
+            "pool_statuses": self.statuses,
+            "pool_objectives": [s.objective for s in solutions],
+            "pool_min_distance": min(
+                (a.distance(b.timeslots) for k, a in enumerate(solutions) for b in solutions[k + 1:]),
+                default=None,
+            ),
+        }
+
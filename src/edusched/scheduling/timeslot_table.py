@@ -0,0 +1,87 @@
+"""时间段整数编码模块。
+
+把每个时间段的起止时刻编码为周内分钟数（星期序号 × 1440 + 当天分钟数），
+并一次性预计算每天按开始时间排序的时间段顺序、前后相接关系和时间重叠关系。
+约束构建器和校验器共用这张表，热循环中只做数组查找，不再解析或比较时刻。
+"""
+
+from dataclasses import dataclass, field
+from datetime import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from edusched.domain.models import Timeslot, WeekDay
+
+MINUTES_PER_DAY = 24 * 60
+# 相邻时间段之间允许的最大间隔（分钟，课间休息），超过则不视为连续
+MAX_BREAK_MINUTES = 30
+
+_DAY_ORDINALS = {day: k for k, day in enumerate(WeekDay)}
+
+
+def minute_of_day(value: time) -> int:
+    """时刻转换为当天的分钟数。"""
+    return value.hour * 60 + value.minute
+
+
+@dataclass
+class TimeslotTable:
+    """时间段的整数编码表。"""
+
+    # 时间段下标 -> 开始、结束的周内分钟数
+    start: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int32))
+    end: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int32))
+    # 时间段下标 -> 星期序号（周一为0）
+    day: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int32))
+    # 星期 -> 当天按开始时间排序的时间段下标
+    day_order: Dict[Any, List[int]] = field(default_factory=dict)
+    # adjacent[j1, j2]：同一天内 j2 紧接在 j1 之后（间隔不超过课间休息）
+    adjacent: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=bool))
+    # overlap[j1, j2]：两个时间段的时间区间相交（含 j1 == j2）
+    overlap: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=bool))
+
+    @classmethod
+    def build(
+        cls,
+        timeslots: Sequence[Timeslot],
+        day_order: Dict[Any, List[int]],
+        max_break: int = MAX_BREAK_MINUTES,
+    ) -> "TimeslotTable":
+        """编码时间段。
+
+        Args:
+            timeslots: 时间段列表
+            day_order: 星期 -> 当天按开始时间排序的时间段下标（见 ProblemIndex.day_timeslots）
+            max_break: 视为连续的最大间隔分钟数
+        """
+        n = len(timeslots)
+        table = cls(day_order=day_order)
+        table.day = np.fromiter((_DAY_ORDINALS[t.week_day] for t in timeslots), dtype=np.int32, count=n)
+        offset = table.day * MINUTES_PER_DAY
+        table.start = offset + np.fromiter((minute_of_day(t.start_time) for t in timeslots), dtype=np.int32, count=n)
+        table.end = offset + np.fromiter((minute_of_day(t.end_time) for t in timeslots), dtype=np.int32, count=n)
+
+        table.adjacent = np.zeros((n, n), dtype=bool)
+        for slot_indices in day_order.values():
+            if len(slot_indices) > 1:
+                previous = np.asarray(slot_indices[:-1])
+                current = np.asarray(slot_indices[1:])
+                gap = table.start[current] - table.end[previous]
+                keep = (gap >= 0) & (gap <= max_break)
+                table.adjacent[previous[keep], current[keep]] = True
+
+        table.overlap = (table.start[:, None] < table.end[None, :]) & (table.start[None, :] < table.end[:, None])
+        return table
+
+    def consecutive_pairs(self) -> List[Tuple[int, int]]:
+        """同一天内前后相接的时间段下标对。"""
+        return [(int(j1), int(j2)) for j1, j2 in np.argwhere(self.adjacent)]
+
+    def is_consecutive(self, j1: int, j2: int) -> bool:
+        """时间段 j2 是否紧接在 j1 之后。"""
+        return bool(self.adjacent[j1, j2])
+
+    def overlaps(self, j1: int, j2: int) -> bool:
+        """两个时间段的时间区间是否相交。"""
+        return bool(self.overlap[j1, j2])
@@ -0,0 +1,206 @@
+"""时间表数据存取模块。
+
+调度工作者按任务的时间表从数据库加载调度问题（教学段、时间段、教师、教室、班级、
+约束和锁定分配），求解后用新的分配替换时间表中未锁定的分配。
+"""
+
+import logging
+from typing import TYPE_CHECKING, Any, List, Optional, Union
+from uuid import UUID
+
+from sqlalchemy import create_engine, delete, select
+from sqlalchemy.orm import Session
+
+from edusched.domain.models import (
+    Assignment,
+    ClassGroup,
+    Constraint,
+    Room,
+    Section,
+    Teacher,
+    Timeslot,
+)
+from edusched.infrastructure.database.models import Assignment as AssignmentTable
+from edusched.infrastructure.database.models import ClassGroup as ClassGroupTable
+from edusched.infrastructure.database.models import Constraint as ConstraintTable
+from edusched.infrastructure.database.models import Room as RoomTable
+from edusched.infrastructure.database.models import Section as SectionTable
+from edusched.infrastructure.database.models import Teacher as TeacherTable
+from edusched.infrastructure.database.models import Timeslot as TimeslotTable
+from edusched.infrastructure.database.models import Timetable as TimetableTable
+from edusched.scheduling.solution import PLACEHOLDER_ID
+
+if TYPE_CHECKING:
+    from edusched.scheduling.engine import SchedulingProblem
+
+logger = logging.getLogger(__name__)
+
+
+class TimetableDataError(Exception):
+    """时间表数据无法加载或保存。"""
+
+
+def _as_uuid(value: Union[str, UUID]) -> UUID:
+    return value if isinstance(value, UUID) else UUID(str(value))
+
+
+class TimetableStore:
+    """从数据库加载调度问题并保存求解得到的分配。"""
+
+    def __init__(self, database_url: Optional[str] = None):
+        """初始化。
+
+        Args:
+            database_url: 数据库连接URL，默认读取配置
+        """
+        self.database_url = database_url
+        self._engine: Any = None
+
+    def _session(self) -> Session:
+        if self._engine is None:
+            url = self.database_url
+            if url is None:
+                from edusched.core.config import get_settings
+
+                url = get_settings().database.url
+            self._engine = create_engine(url.replace("+asyncpg", ""), pool_pre_ping=True)
+        return Session(self._engine)
+
+    def load_problem(
+        self, problem: "SchedulingProblem", timetable_id: Union[str, UUID]
+    ) -> None:
+        """用时间表所属租户的数据填充调度问题。
+
+        加载租户的全部教学段与时间段，以及教学段引用的教师、教室和班级；
+        时间表中锁定的分配作为现有分配固定。缺少时间表、教学段或时间段时抛出
+        TimetableDataError。
+        """
+        tenant_id = problem.tenant_id
+        timetable_id = _as_uuid(timetable_id)
+        with self._session() as db:
+            timetable = db.execute(
+                select(TimetableTable).where(
+                    TimetableTable.id == timetable_id, TimetableTable.tenant_id == tenant_id
+                )
+            ).scalar_one_or_none()
+            if timetable is None:
+                raise TimetableDataError(f"时间表 {timetable_id} 不存在")
+
+            sections = db.execute(
+                select(SectionTable)
+                .where(SectionTable.tenant_id == tenant_id)
+                .order_by(SectionTable.code)
+            ).scalars().all()
+            timeslots = db.execute(
+                select(TimeslotTable)
+                .where(TimeslotTable.tenant_id == tenant_id)
+                .order_by(TimeslotTable.week_day, TimeslotTable.period_number)
+            ).scalars().all()
+            if not sections:
+                raise TimetableDataError(f"时间表 {timetable_id} 没有可安排的教学段")
+            if not timeslots:
+                raise TimetableDataError(f"时间表 {timetable_id} 没有可用的时间段")
+
+            teacher_ids = {s.teacher_id for s in sections}
+            class_group_ids = {s.class_group_id for s in sections}
+            teachers = db.execute(
+                select(TeacherTable).where(
+                    TeacherTable.tenant_id == tenant_id, TeacherTable.id.in_(teacher_ids)
+                )
+            ).scalars().all()
+            class_groups = db.execute(
+                select(ClassGroupTable).where(
+                    ClassGroupTable.tenant_id == tenant_id, ClassGroupTable.id.in_(class_group_ids)
+                )
+            ).scalars().all()
+            rooms = db.execute(
+                select(RoomTable).where(RoomTable.tenant_id == tenant_id, RoomTable.is_active.is_(True))
+            ).scalars().all()
+            constraints: List[Any] = []
+            if timetable.constraints:
+                constraint_ids = [_as_uuid(c) for c in timetable.constraints]
+                constraints = db.execute(
+                    select(ConstraintTable).where(
+                        ConstraintTable.tenant_id == tenant_id,
+                        ConstraintTable.id.in_(constraint_ids),
+                        ConstraintTable.is_active.is_(True),
+                    )
+                ).scalars().all()
+            locked = db.execute(
+                select(AssignmentTable).where(
+                    AssignmentTable.timetable_id == timetable_id,
+                    AssignmentTable.tenant_id == tenant_id,
+                    AssignmentTable.is_locked.is_(True),
+                )
+            ).scalars().all()
+
+            for row in sections:
+                problem.add_section(Section.model_validate(row, from_attributes=True))
+            for row in timeslots:
+                problem.add_timeslot(Timeslot.model_validate(row, from_attributes=True))
+            for row in teachers:
+                problem.add_teacher(Teacher.model_validate(row, from_attributes=True))
+            for row in rooms:
+                problem.add_room(Room.model_validate(row, from_attributes=True))
+            for row in class_groups:
+                problem.add_class_group(ClassGroup.model_validate(row, from_attributes=True))
+            for row in constraints:
+                problem.add_constraint(Constraint.model_validate(row, from_attributes=True))
+            for row in locked:
+                problem.add_existing_assignment(Assignment.model_validate(row, from_attributes=True))
+
+        logger.info(
+            f"时间表 {timetable_id} 已加载：{len(problem.sections)} 个教学段，"
+            f"{len(problem.timeslots)} 个时间段，{len(problem.existing_assignments)} 个锁定分配"
+        )
+
+    def save_assignments(
+        self, tenant_id: str, timetable_id: Union[str, UUID], assignments: List[Assignment]
+    ) -> int:
+        """在一个事务中用求解结果替换时间表的未锁定分配，返回写入的分配数。
+
+        锁定分配保持不变，求解结果中已锁定教学段的分配不再重复写入。
+        分配缺少教室时抛出 TimetableDataError，不修改时间表。
+        """
+        timetable_id = _as_uuid(timetable_id)
+        missing_room = [a.section_id for a in assignments if a.room_id == PLACEHOLDER_ID]
+        if missing_room:
+            raise TimetableDataError(f"{len(missing_room)} 个分配没有教室，未保存")
+        with self._session() as db, db.begin():
+            locked_sections = set(
+                db.execute(
+                    select(AssignmentTable.section_id).where(
+                        AssignmentTable.timetable_id == timetable_id,
+                        AssignmentTable.tenant_id == tenant_id,
+                        AssignmentTable.is_locked.is_(True),
+                    )
+                ).scalars()
+            )
+            db.execute(
+                delete(AssignmentTable).where(
+                    AssignmentTable.timetable_id == timetable_id,
+                    AssignmentTable.tenant_id == tenant_id,
+                    AssignmentTable.is_locked.is_(False),
+                )
+            )
+            rows = [
+                AssignmentTable(
+                    id=assignment.id,
+                    tenant_id=tenant_id,
+                    timetable_id=timetable_id,
+                    section_id=assignment.section_id,
+                    timeslot_id=assignment.timeslot_id,
+                    room_id=assignment.room_id,
+                    week_pattern_id=assignment.week_pattern_id,
+                    is_locked=False,
+                    notes=assignment.notes,
+                )
+                for assignment in assignments
+                if assignment.section_id not in locked_sections
+            ]
+            db.add_all(rows)
+        return len(rows)
+
+
+# 全局时间表存取（工作进程内共享数据库连接池）
+timetable_store = TimetableStore()
@@ -0,0 +1,144 @@
+"""向量化硬约束校验模块。
+
+一次性把教学段、教师、班级、教室和时间段编码为稠密整数ID，再在
+（教师, 时间段）、（班级, 时间段）、（教室, 时间段）组合键上用 np.unique 和稳定排序检测冲突。
+逐条分配扫描教学段列表的 O(分配数 × 教学段数) 校验因此降为 O(n log n)。
+违反描述与逐条检查的结果一致，顺序也相同。
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Sequence
+
+import numpy as np
+
+# 分配引用了不存在的教学段
+UNKNOWN = -1
+
+
+def _encode(values: Sequence[Hashable], codes: Dict[Hashable, int], ids: List[Any]) -> np.ndarray:
+    """把值编码为稠密整数ID，遇到新值时追加到 codes/ids。"""
+    encoded = np.empty(len(values), dtype=np.int32)
+    for k, value in enumerate(values):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(ids)
+            ids.append(value)
+        encoded[k] = code
+    return encoded
+
+
+def _repeated_positions(keys: np.ndarray) -> np.ndarray:
+    """组合键在之前已出现过的位置（按原顺序）。"""
+    if len(keys) < 2:
+        return np.zeros(0, dtype=np.intp)
+    order = np.argsort(keys, kind="stable")
+    ordered = keys[order]
+    repeated = np.zeros(len(keys), dtype=bool)
+    repeated[1:] = ordered[1:] == ordered[:-1]
+    return np.sort(order[repeated])
+
+
+def _shared_positions(keys: np.ndarray) -> np.ndarray:
+    """出现不止一次的组合键首次出现的位置（按首次出现顺序）。"""
+    if len(keys) < 2:
+        return np.zeros(0, dtype=np.intp)
+    _, first, counts = np.unique(keys, return_index=True, return_counts=True)
+    return np.sort(first[counts > 1])
+
+
+@dataclass
+class EncodedAssignments:
+    """整数编码后的分配。"""
+
+    # 分配 -> 教学段编码，不存在的教学段为 UNKNOWN
+    section: np.ndarray
+    # 分配 -> 时间段、教室编码
+    timeslot: np.ndarray
+    room: np.ndarray
+    # 编码 -> 原ID
+    timeslot_ids: List[Any] = field(default_factory=list)
+    room_ids: List[Any] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.section)
+
+
+class VectorizedValidator:
+    """基于整数编码的硬约束校验器。"""
+
+    def __init__(self, sections: Sequence[Any], timeslots: Sequence[Any] = ()):
+        """编码教学段及其教师、班级。
+
+        Args:
+            sections: 教学段（需要 id、teacher_id、class_group_id）
+            timeslots: 时间段，预先登记编码（分配引用的其他时间段按出现顺序追加）
+        """
+        # 重复ID的教学段以第一次出现为准
+        self.section_codes: Dict[Any, int] = {}
+        unique_sections = []
+        for section in sections:
+            if section.id not in self.section_codes:
+                self.section_codes[section.id] = len(unique_sections)
+                unique_sections.append(section)
+        # 教学段编码 -> 教师、班级编码
+        self.teacher_ids: List[Any] = []
+        self.class_group_ids: List[Any] = []
+        self.section_teacher = _encode([s.teacher_id for s in unique_sections], {}, self.teacher_ids)
+        self.section_class_group = _encode([s.class_group_id for s in unique_sections], {}, self.class_group_ids)
+        self._timeslot_ids = [timeslot.id for timeslot in timeslots]
+
+    def encode(self, assignments: Sequence[Any]) -> EncodedAssignments:
+        """编码分配。"""
+        timeslot_ids: List[Any] = []
+        timeslot_codes: Dict[Any, int] = {}
+        _encode(self._timeslot_ids, timeslot_codes, timeslot_ids)
+        room_ids: List[Any] = []
+        return EncodedAssignments(
+            section=np.fromiter(
+                (self.section_codes.get(a.section_id, UNKNOWN) for a in assignments),
+                dtype=np.int32, count=len(assignments),
+            ),
+            timeslot=_encode([a.timeslot_id for a in assignments], timeslot_codes, timeslot_ids),
+            room=_encode([a.room_id for a in assignments], {}, room_ids),
+            timeslot_ids=timeslot_ids,
+            room_ids=room_ids,
+        )
+
+    def validate(self, assignments: Sequence[Any]) -> List[str]:
+        """校验教师、班级和教室冲突。"""
+        encoded = self.encode(assignments)
+        return (
+            self.teacher_conflicts(encoded)
+            + self.class_conflicts(encoded)
+            + self.room_conflicts(encoded)
+        )
+
+    def teacher_conflicts(self, encoded: EncodedAssignments) -> List[str]:
+        """同一教师在同一时间段的第二个及之后的分配各计一次冲突。"""
+        return self._resource_conflicts(encoded, self.section_teacher, self.teacher_ids, "教师")
+
+    def class_conflicts(self, encoded: EncodedAssignments) -> List[str]:
+        """同一班级在同一时间段的第二个及之后的分配各计一次冲突。"""
+        return self._resource_conflicts(encoded, self.section_class_group, self.class_group_ids, "班级")
+
+    @staticmethod
+    def room_conflicts(encoded: EncodedAssignments) -> List[str]:
+        """同一教室同一时间段被多个教学段占用时计一次冲突。"""
+        keys = encoded.room.astype(np.int64) * max(1, len(encoded.timeslot_ids)) + encoded.timeslot
+        return [
+            f"时间段 {encoded.timeslot_ids[encoded.timeslot[k]]} 的教室 {encoded.room_ids[encoded.room[k]]} 被多个教学段占用"
+            for k in _shared_positions(keys)
+        ]
+
+    @staticmethod
+    def _resource_conflicts(
+        encoded: EncodedAssignments, section_resource: np.ndarray, resource_ids: List[Any], label: str
+    ) -> List[str]:
+        known = np.flatnonzero(encoded.section != UNKNOWN)
+        resources = section_resource[encoded.section[known]]
+        timeslots = encoded.timeslot[known]
+        keys = resources.astype(np.int64) * max(1, len(encoded.timeslot_ids)) + timeslots
+        return [
+            f"{label} {resource_ids[resources[k]]} 在时间段 {encoded.timeslot_ids[timeslots[k]]} 有冲突"
+            for k in _repeated_positions(keys)
+        ]
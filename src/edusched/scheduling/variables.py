@@ -0,0 +1,84 @@
+"""稀疏决策变量模块。
+
+只为可能取值为1的（教学段, 时间段）组合创建布尔变量，
+并按教学段和时间段两个方向建立索引，供约束构建器和解提取共享。
+"""
+
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from ortools.sat.python import cp_model
+from ortools.sat.python.cp_model import CpModel
+
+
+class SparseAssignmentVars:
+    """稀疏分配变量存储。"""
+
+    def __init__(self, num_sections: int, num_timeslots: int):
+        """初始化空的变量存储。"""
+        self.num_sections = num_sections
+        self.num_timeslots = num_timeslots
+        self._vars: Dict[Tuple[int, int], cp_model.IntVar] = {}
+        self.by_section: List[List[Tuple[int, cp_model.IntVar]]] = [[] for _ in range(num_sections)]
+        self.by_timeslot: List[List[Tuple[int, cp_model.IntVar]]] = [[] for _ in range(num_timeslots)]
+        self._arrays: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def create(
+        cls,
+        model: CpModel,
+        domains: Sequence[Sequence[int]],
+        num_timeslots: int,
+        prefix: str = "assignment",
+    ) -> "SparseAssignmentVars":
+        """根据每个教学段的候选时间段创建变量。"""
+        store = cls(len(domains), num_timeslots)
+        for i, domain in enumerate(domains):
+            for j in domain:
+                store.add(i, j, model.NewBoolVar(f"{prefix}_{i}_{j}"))
+        return store
+
+    def add(self, i: int, j: int, var: cp_model.IntVar) -> None:
+        """登记一个变量。"""
+        self._vars[(i, j)] = var
+        self._arrays = None
+        self.by_section[i].append((j, var))
+        self.by_timeslot[j].append((i, var))
+
+    def get(self, i: int, j: int) -> Optional[cp_model.IntVar]:
+        """获取变量，被剪枝的组合返回None。"""
+        return self._vars.get((i, j))
+
+    def section_vars(self, i: int) -> List[cp_model.IntVar]:
+        """获取教学段的全部变量。"""
+        return [var for _, var in self.by_section[i]]
+
+    def timeslot_vars(self, j: int) -> List[cp_model.IntVar]:
+        """获取时间段的全部变量。"""
+        return [var for _, var in self.by_timeslot[j]]
+
+    def vars_by_timeslot(self, section_indices: Sequence[int]) -> Dict[int, List[cp_model.IntVar]]:
+        """将一组教学段的变量按时间段分桶。"""
+        buckets: Dict[int, List[cp_model.IntVar]] = {}
+        for i in section_indices:
+            for j, var in self.by_section[i]:
+                buckets.setdefault(j, []).append(var)
+        return buckets
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(教学段下标, 时间段下标, proto变量下标) 三个 int32 数组，用于按响应批量读取取值。"""
+        if self._arrays is None:
+            keys = np.array(list(self._vars), dtype=np.int32).reshape(-1, 2)
+            indices = np.fromiter((var.Index() for var in self._vars.values()), dtype=np.int32, count=len(self._vars))
+            self._arrays = (keys[:, 0].copy(), keys[:, 1].copy(), indices)
+        return self._arrays
+
+    def items(self) -> Iterator[Tuple[Tuple[int, int], cp_model.IntVar]]:
+        """遍历 ((教学段, 时间段), 变量)。"""
+        return iter(self._vars.items())
+
+    def __contains__(self, key: Tuple[int, int]) -> bool:
+        return key in self._vars
+
+    def __len__(self) -> int:
+        return len(self._vars)
@@ -0,0 +1,363 @@
+"""调度工作进程模块。
+
+在API进程之外运行CP-SAT求解：每个工作者从任务队列领取 SchedulingJob，
+在后台线程中发送心跳续约并检查任务是否已被取消，求解进度经节流后写回队列。
+工作者池按主机并发上限启动N个工作进程。
+
+启动方式：python -m edusched.scheduling.worker
+"""
+
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from edusched.domain.models import SchedulingStatus
+from edusched.scheduling.callbacks import (
+    STOP_CANCELLED,
+    ProgressHandler,
+    StoppingCriteria,
+    ThrottledProgressHandler,
+)
+from edusched.scheduling.cancellation import CancellationToken, cancellation_registry
+from edusched.scheduling.engine import SchedulingEngine
+from edusched.scheduling.job_queue import (
+    CANCELLED_MESSAGE,
+    DatabaseJobQueue,
+    JobOutcome,
+    JobQueue,
+    QueuedJob,
+)
+from edusched.scheduling.predictor import extract_features, job_history, solve_time_predictor
+from edusched.scheduling.solution_cache import solution_cache
+from edusched.scheduling.timetable_store import TimetableDataError, timetable_store
+
+logger = logging.getLogger(__name__)
+
+JobRunner = Callable[[QueuedJob, CancellationToken, ProgressHandler], JobOutcome]
+
+# 连续多少秒没有改进时提前结束优化
+PLATEAU_SECONDS = 60
+
+
+def run_scheduling_job(
+    job: QueuedJob, cancel_token: CancellationToken, on_progress: ProgressHandler
+) -> JobOutcome:
+    """求解一个调度任务。"""
+    engine = SchedulingEngine(job.tenant_id)
+    problem = engine.create_problem()
+    problem.cancel_token = cancel_token
+    problem.diagnose_infeasible = True
+    problem.diagnosis_cache = solution_cache
+    # 达到预测器的目标间隙或改进停滞时提前结束，不必耗尽时间限制
+    problem.stopping_criteria = StoppingCriteria(
+        relative_gap=solve_time_predictor.target_gap, plateau_seconds=PLATEAU_SECONDS
+    )
+    # 加载失败的任务不进入求解，避免以空问题报告成功并污染预测器的任务历史
+    try:
+        timetable_store.load_problem(problem, job.timetable_id)
+    except TimetableDataError as e:
+        return JobOutcome(
+            status=SchedulingStatus.FAILED,
+            metadata={"success": False, "cancelled": False},
+            error_message=f"加载时间表数据失败：{e}",
+        )
+
+    # 必然无解的问题不进入求解，直接返回违反项
+    report = engine.check_feasibility()
+    if not report.is_feasible:
+        return JobOutcome(
+            status=SchedulingStatus.FAILED,
+            metadata={"success": False, "cancelled": False, **report.to_metrics()},
+            error_message=f"可行性检查未通过：{report.violations[0].message}",
+        )
+
+    # 按历史任务预测的求解时间分配时间限制（样本不足时使用默认值）
+    features = extract_features(problem)
+    solve_time_predictor.refresh(job_history)
+    budget = solve_time_predictor.allocate(features)
+
+    # 问题未修改时直接复用缓存的课表，修改较少时以缓存课表热启动
+    success, assignments, metrics = engine.solve_cached(
+        solution_cache,
+        phase1_time_limit=budget.phase1_time_limit,
+        phase2_time_limit=budget.phase2_time_limit,
+        on_progress=on_progress,
+    )
+
+    cancelled = cancel_token.is_cancelled()
+    if cancelled:
+        metrics['stop_reason'] = STOP_CANCELLED
+    # 被取消的任务也保存取消前找到的最优课表
+    save_error = None
+    saved = False
+    if success:
+        try:
+            timetable_store.save_assignments(job.tenant_id, job.timetable_id, assignments)
+            saved = True
+        except TimetableDataError as e:
+            save_error = f"保存分配失败：{e}"
+            success = False
+
+    if not success or cancelled:
+        status = SchedulingStatus.FAILED
+    elif metrics.get('phase2_improved'):
+        status = SchedulingStatus.OPTIMIZED
+    else:
+        status = SchedulingStatus.FEASIBLE
+
+    metadata = {
+        "success": success,
+        "cancelled": cancelled,
+        "saved": saved,
+        "num_assignments": len(assignments),
+        "phase1_method": metrics.get('phase1_method'),
+        "phase2_method": metrics.get('phase2_method'),
+        "phase1_time": metrics.get('phase1_time'),
+        "phase2_time": metrics.get('phase2_time'),
+        "final_objective": metrics.get('final_objective'),
+        "cache": metrics.get('cache'),
+        "phase2_time_to_gap": metrics.get('phase2_time_to_gap'),
+        "stop_reason": metrics.get('stop_reason'),
+        "unmatched_rooms": metrics.get('unmatched_rooms'),
+        "features": features.to_dict(),
+        **budget.to_metrics(),
+    }
+    if problem.infeasibility_core is not None:
+        metadata.update(problem.infeasibility_core.to_metrics())
+    # 节流期间未写入的最后一个改进解
+    _, last_progress = problem.incumbent.snapshot()
+    if last_progress is not None:
+        metadata["incumbent"] = last_progress.to_dict()
+
+    if cancelled:
+        error_message = CANCELLED_MESSAGE
+    elif success:
+        error_message = None
+    elif save_error is not None:
+        error_message = save_error
+    elif metrics.get('unmatched_rooms'):
+        error_message = f"{metrics['unmatched_rooms']} 个教学段未能匹配到兼容教室"
+    else:
+        core = problem.infeasibility_core
+        error_message = "未找到可行解"
+        if core is not None and core.conflicts:
+            error_message += "，冲突约束：" + "；".join(c.message for c in core.conflicts)
+    return JobOutcome(status=status, metadata=metadata, error_message=error_message)
+
+
+class SchedulingWorker:
+    """调度工作者：逐个领取并执行任务。"""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        worker_id: str,
+        runner: JobRunner = run_scheduling_job,
+        lease_seconds: float = 60,
+        heartbeat_interval: float = 10,
+        cancel_poll_interval: float = 1.0,
+        progress_interval: float = 2.0,
+        max_attempts: int = 3,
+    ):
+        """初始化工作者。
+
+        Args:
+            queue: 任务队列
+            worker_id: 写入 SchedulingJob.worker_id 的标识
+            runner: 任务执行函数
+            lease_seconds: 租约时长，超过未续约的任务会被其他工作者收回
+            heartbeat_interval: 心跳（续约）间隔
+            cancel_poll_interval: 检查任务是否被取消的间隔
+            progress_interval: 进度写入的最小间隔
+            max_attempts: 任务最大领取次数
+        """
+        self.queue = queue
+        self.worker_id = worker_id
+        self.runner = runner
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.cancel_poll_interval = cancel_poll_interval
+        self.progress_interval = progress_interval
+        self.max_attempts = max_attempts
+
+    def run_once(self) -> bool:
+        """收回过期任务后领取并执行一个任务，没有任务时返回False。"""
+        self.queue.requeue_expired(self.max_attempts)
+        job = self.queue.claim(self.worker_id, self.lease_seconds)
+        if job is None:
+            return False
+
+        self._run_job(job)
+        return True
+
+    def run_forever(self, stop_event: Any, poll_interval: float = 1.0) -> None:
+        """循环领取任务直至 stop_event 被设置。"""
+        logger.info(f"调度工作者 {self.worker_id} 已启动")
+        while not stop_event.is_set():
+            try:
+                if not self.run_once():
+                    stop_event.wait(poll_interval)
+            except Exception as e:
+                logger.error(f"调度工作者 {self.worker_id} 领取任务失败: {e}")
+                stop_event.wait(poll_interval)
+        logger.info(f"调度工作者 {self.worker_id} 已停止")
+
+    def _run_job(self, job: QueuedJob) -> None:
+        """执行任务：心跳线程续约并在任务失去持有权时取消求解。"""
+        logger.info(f"工作者 {self.worker_id} 领取任务 {job.job_id}（第{job.attempts}次）")
+        token = cancellation_registry.register(job.job_id)
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(job, token, done), daemon=True)
+        heartbeat.start()
+
+        publisher = ThrottledProgressHandler(
+            lambda progress: self.queue.update_progress(job.job_id, self.worker_id, progress),
+            min_interval=self.progress_interval,
+        )
+        try:
+            outcome = self.runner(job, token, publisher)
+        except Exception as e:
+            logger.exception(f"调度任务 {job.job_id} 失败")
+            outcome = JobOutcome(status=SchedulingStatus.FAILED, error_message=str(e))
+        finally:
+            done.set()
+            heartbeat.join()
+            cancellation_registry.unregister(job.job_id)
+
+        self.queue.complete(job.job_id, self.worker_id, outcome)
+        logger.info(f"调度任务 {job.job_id} 完成，状态: {outcome.status.value}")
+
+    def _heartbeat_loop(self, job: QueuedJob, token: CancellationToken, done: threading.Event) -> None:
+        """定期续约；任务被取消或租约被收回时通知求解停止。"""
+        last_heartbeat = time.monotonic()
+        while not done.wait(self.cancel_poll_interval):
+            try:
+                if time.monotonic() - last_heartbeat >= self.heartbeat_interval:
+                    active = self.queue.heartbeat(job.job_id, self.worker_id, self.lease_seconds)
+                    last_heartbeat = time.monotonic()
+                else:
+                    active = self.queue.is_active(job.job_id, self.worker_id)
+            except Exception as e:
+                # 队列暂时不可用时继续求解，租约到期前恢复即可
+                logger.warning(f"任务 {job.job_id} 心跳失败: {e}")
+                continue
+
+            if not active:
+                logger.info(f"任务 {job.job_id} 已被取消或收回，停止求解")
+                token.cancel()
+                return
+
+
+def _worker_main(
+    queue: JobQueue,
+    worker_id: str,
+    runner: JobRunner,
+    options: Dict[str, Any],
+    stop_event: Any,
+    poll_interval: float,
+) -> None:
+    """工作进程入口。"""
+    if multiprocessing.parent_process() is not None:
+        # 由池统一处理中断信号，子进程在当前任务结束后退出
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+    SchedulingWorker(queue, worker_id, runner, **options).run_forever(stop_event, poll_interval)
+
+
+class SchedulingWorkerPool:
+    """调度工作者池：在本主机上启动有限数量的工作进程。"""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        concurrency: int = 2,
+        runner: JobRunner = run_scheduling_job,
+        use_processes: bool = True,
+        host_id: Optional[str] = None,
+        poll_interval: float = 1.0,
+        **worker_options: Any,
+    ):
+        """初始化工作者池。
+
+        Args:
+            queue: 任务队列（进程模式下需可序列化，如 DatabaseJobQueue）
+            concurrency: 本主机同时运行的任务数上限
+            runner: 任务执行函数（进程模式下需为模块级函数）
+            use_processes: 是否以独立进程运行，False时以线程运行（配合 InMemoryJobQueue 测试）
+            host_id: 主机标识，默认为主机名
+            poll_interval: 队列为空时的轮询间隔
+            worker_options: 传递给 SchedulingWorker 的其他参数
+        """
+        self.queue = queue
+        self.concurrency = max(1, concurrency)
+        self.runner = runner
+        self.use_processes = use_processes
+        self.host_id = host_id or socket.gethostname()
+        self.poll_interval = poll_interval
+        self.worker_options = worker_options
+
+        context = multiprocessing.get_context("spawn")
+        self._context = context
+        self._stop_event = context.Event() if use_processes else threading.Event()
+        self._workers: List[Any] = []
+
+    @property
+    def worker_ids(self) -> List[str]:
+        """工作者标识列表。"""
+        return [f"{self.host_id}-{os.getpid()}-{k}" for k in range(self.concurrency)]
+
+    def start(self) -> None:
+        """启动全部工作者。"""
+        for worker_id in self.worker_ids:
+            args = (self.queue, worker_id, self.runner, self.worker_options, self._stop_event, self.poll_interval)
+            if self.use_processes:
+                worker = self._context.Process(target=_worker_main, args=args, name=worker_id)
+            else:
+                worker = threading.Thread(target=_worker_main, args=args, name=worker_id, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        logger.info(f"调度工作者池已启动：{self.concurrency} 个工作者（主机 {self.host_id}）")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """通知工作者在当前任务结束后退出并等待。"""
+        self._stop_event.set()
+        self.join(timeout)
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """等待工作者退出。"""
+        for worker in self._workers:
+            worker.join(timeout)
+
+
+def main() -> None:
+    """按配置启动数据库队列的工作者池。"""
+    from edusched.core.config import get_settings
+
+    settings = get_settings().scheduling
+    logging.basicConfig(level=logging.INFO)
+
+    pool = SchedulingWorkerPool(
+        DatabaseJobQueue(),
+        concurrency=settings.worker_count,
+        poll_interval=settings.poll_interval,
+        lease_seconds=settings.lease_seconds,
+        heartbeat_interval=settings.heartbeat_interval,
+        max_attempts=settings.max_attempts,
+    )
+
+    def shutdown(signum: int, frame: Any) -> None:
+        logger.info("收到停止信号，等待当前任务结束")
+        pool._stop_event.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    pool.start()
+    pool.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""调度求解性能基准测试。"""
+
+from datetime import time
+from time import perf_counter
+from uuid import uuid4
+
+import pytest
+from ortools.sat.python import cp_model
+from ortools.sat.python.cp_model import CpSolver
+
+from edusched.domain.models import Assignment, ClassGroup, Room, Section, Teacher, Timeslot, WeekDay
+from edusched.scheduling.engine import ConstraintValidator, SchedulingProblem
+from edusched.scheduling.evaluator import TimetableEvaluator
+from edusched.scheduling.lessons import LessonModel
+
+
+def build_weekly_hours_problem(
+    num_classes: int,
+    courses_per_class: int,
+    hours_per_week: int,
+    num_teachers: int,
+    days: int = 5,
+    periods_per_day: int = 6,
+    duplicated: bool = True,
+) -> SchedulingProblem:
+    """构建每个班级使用固定教室的调度问题。
+
+    duplicated 为True时按每周课时复制教学段（每个教学段1课时），否则每门课程一个教学段。
+    """
+    problem = SchedulingProblem("bench_tenant")
+    teachers = [
+        Teacher(
+            tenant_id="bench_tenant",
+            employee_id=f"T{t:03d}",
+            name=f"教师{t}",
+            email=f"teacher{t}@school.edu",
+            department="教务处",
+        )
+        for t in range(num_teachers)
+    ]
+    for teacher in teachers:
+        problem.add_teacher(teacher)
+
+    for day in list(WeekDay)[:days]:
+        for period in range(periods_per_day):
+            problem.add_timeslot(Timeslot(
+                tenant_id="bench_tenant",
+                week_day=day,
+                start_time=time(8 + period, 0),
+                end_time=time(8 + period, 45),
+                period_number=period + 1,
+            ))
+
+    for c in range(num_classes):
+        class_group_id, room_id = uuid4(), uuid4()
+        for k in range(courses_per_class):
+            course_id = uuid4()
+            teacher = teachers[(c * courses_per_class + k) % num_teachers]
+            for h in range(hours_per_week if duplicated else 1):
+                problem.add_section(Section(
+                    tenant_id="bench_tenant",
+                    course_id=course_id,
+                    class_group_id=class_group_id,
+                    teacher_id=teacher.id,
+                    room_id=room_id,
+                    name=f"班级{c}-课程{k}",
+                    code=f"C{c}K{k}H{h}",
+                    hours_per_week=1 if duplicated else hours_per_week,
+                ))
+    return problem
+
+
+def solve_full_model(problem: SchedulingProblem, time_limit: float) -> dict:
+    """求解带软约束的完整模型，返回耗时、目标值和下界。"""
+    problem.build_model()
+    solver = CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_search_workers = 8
+    start = perf_counter()
+    status = solver.Solve(problem.model)
+    return {
+        "status": solver.StatusName(status),
+        "elapsed": perf_counter() - start,
+        "objective": solver.ObjectiveValue(),
+        "bound": solver.BestObjectiveBound(),
+        "feasible": status in (cp_model.OPTIMAL, cp_model.FEASIBLE),
+    }
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+class TestSymmetryBreakingBenchmark:
+    """对比开启和关闭对称性破除时的求解表现。"""
+
+    @pytest.mark.parametrize("num_classes,courses,hours,num_teachers,time_limit", [
+        (3, 4, 3, 4, 60),
+        (6, 5, 4, 8, 60),
+    ])
+    def test_symmetry_breaking(self, num_classes, courses, hours, num_teachers, time_limit):
+        results = {}
+        for enabled in (False, True):
+            problem = build_weekly_hours_problem(num_classes, courses, hours, num_teachers)
+            problem.symmetry_breaking = enabled
+            results[enabled] = solve_full_model(problem, time_limit)
+            print(f"symmetry_breaking={enabled}: {results[enabled]}")
+
+        assert results[False]["feasible"] and results[True]["feasible"]
+        # 两种模型的最优值相同
+        if results[False]["status"] == results[True]["status"] == "OPTIMAL":
+            assert results[False]["objective"] == results[True]["objective"]
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+class TestLessonModelBenchmark:
+    """对比手工复制教学段的分配变量模型与按课时展开的区间变量模型。"""
+
+    @pytest.mark.parametrize("num_classes,courses,hours,num_teachers,time_limit", [
+        (6, 5, 4, 8, 30),
+    ])
+    def test_lesson_model(self, num_classes, courses, hours, num_teachers, time_limit):
+        duplicated = build_weekly_hours_problem(num_classes, courses, hours, num_teachers)
+        baseline = solve_full_model(duplicated, time_limit)
+        proto = duplicated.model.Proto()
+        baseline.update(variables=len(proto.variables), constraints=len(proto.constraints))
+        print(f"duplicated sections: {baseline}")
+
+        problem = build_weekly_hours_problem(num_classes, courses, hours, num_teachers, duplicated=False)
+        result = LessonModel(problem).solve(time_limit)
+        print(f"lesson model: {result.to_metrics()}")
+
+        assert result.success
+        assert len(result.solution) == num_classes * courses * hours
+        assert result.num_variables < baseline["variables"]
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+class TestRoomAssignmentBenchmark:
+    """教室数量很多时，教室分配不应显著增加模型规模。"""
+
+    @pytest.mark.parametrize("num_classes,num_rooms,time_limit", [(40, 220, 60)])
+    def test_many_rooms(self, num_classes, num_rooms, time_limit):
+        problem = build_weekly_hours_problem(num_classes, 5, 4, num_classes * 5 // 4)
+        baseline = solve_full_model(problem, time_limit)
+        baseline_vars = len(problem.model.Proto().variables)
+
+        # 取消固定教室，改为从全校教室中分配
+        class_group_ids = list(dict.fromkeys(section.class_group_id for section in problem.sections))
+        for section in problem.sections:
+            section.room_id = None
+        for c, class_group_id in enumerate(class_group_ids):
+            problem.add_class_group(ClassGroup(
+                id=class_group_id, tenant_id="bench_tenant", grade_id=class_group_id,
+                name=f"班级{c}", code=f"G{c}", student_count=30 + c % 20,
+            ))
+        for r in range(num_rooms):
+            problem.add_room(Room(
+                tenant_id="bench_tenant", building_id=class_group_ids[0], name=f"教室{r}",
+                code=f"R{r}", floor=1 + r % 5, capacity=30 + r % 25,
+            ))
+        start = perf_counter()
+        roomed = solve_full_model(problem, time_limit)
+        roomed.update(
+            variables=len(problem.model.Proto().variables),
+            room_groups=len(problem.room_index.groups),
+            build_and_solve=perf_counter() - start,
+        )
+        print(f"fixed rooms: {baseline}, vars={baseline_vars}")
+        print(f"room assignment: {roomed}")
+
+        assert roomed["feasible"]
+        assert roomed["variables"] <= 2 * baseline_vars
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+class TestValidatorBenchmark:
+    """区县规模课表的硬约束校验应在毫秒级完成。"""
+
+    @pytest.mark.parametrize("num_assignments", [10000])
+    def test_validate_district_timetable(self, num_assignments):
+        problem = build_weekly_hours_problem(num_assignments // 20, 5, 4, num_assignments // 16)
+        assignments = [
+            Assignment(
+                tenant_id="bench_tenant",
+                timetable_id=uuid4(),
+                section_id=section.id,
+                timeslot_id=problem.timeslots[i % len(problem.timeslots)].id,
+                room_id=section.room_id,
+            )
+            for i, section in enumerate(problem.sections)
+        ]
+
+        start = perf_counter()
+        violations = ConstraintValidator.validate_hard_constraints(assignments, problem.sections, problem.timeslots)
+        elapsed = perf_counter() - start
+        print(f"validated {len(assignments)} assignments in {elapsed * 1000:.1f}ms, {len(violations)} violations")
+
+        assert len(assignments) == num_assignments
+        assert violations
+        assert elapsed < 1.0
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+class TestTimetableEvaluatorBenchmark:
+    """交互式调整时单次移动评估应在毫秒以内完成。"""
+
+    @pytest.mark.parametrize("num_classes,num_moves", [(8, 1000)])
+    def test_evaluate_move(self, num_classes, num_moves):
+        problem = build_weekly_hours_problem(num_classes, 3, 1, 4, days=5, periods_per_day=4)
+        problem.build_model()
+        success, assignments = problem.solve(time_limit=5)
+        assert success
+
+        evaluator = TimetableEvaluator(problem, assignments)
+        timeslot_ids = [t.id for t in problem.timeslots]
+        start = perf_counter()
+        for k in range(num_moves):
+            evaluator.evaluate_move(assignments[k % len(assignments)], timeslot_ids[k % len(timeslot_ids)])
+        per_move = (perf_counter() - start) / num_moves
+        print(f"evaluated {num_moves} moves, {per_move * 1e6:.1f}us per move")
+
+        assert per_move < 1e-3
@@ -1,11 +1,52 @@
 """调度引擎单元测试。"""
 
+import numpy as np
 import pytest
+from datetime import time
+from time import perf_counter, sleep
 from unittest.mock import Mock, patch
 from uuid import uuid4
 
 from edusched.scheduling.engine import SchedulingEngine, SchedulingProblem, ConstraintValidator
+from edusched.scheduling.callbacks import (
+    STOP_GAP_REACHED,
+    STOP_OBJECTIVE_REACHED,
+    STOP_OPTIMAL,
+    STOP_PLATEAU_SOLUTIONS,
+    STOP_PLATEAU_TIME,
+    IncumbentStore,
+    SolutionProgress,
+    SolutionProgressCallback,
+    StoppingCriteria,
+    ThrottledProgressHandler,
+    stop_on_plateau,
+)
+from edusched.scheduling.cancellation import CancellationRegistry, InMemoryCancellationBackend
+from edusched.scheduling.decomposition import DecomposedSolver, find_components
+from edusched.scheduling.diagnosis import diagnose_infeasibility
+from edusched.scheduling.evaluator import TimetableEvaluator
+from edusched.scheduling.feasibility import check_feasibility
+from edusched.scheduling.fingerprint import fingerprint_problem
+from edusched.scheduling.incremental import ChangeSet, IncrementalRescheduler
+from edusched.scheduling.index import ProblemIndex
+from edusched.scheduling.job_queue import InMemoryJobQueue, JobOutcome, LEASE_EXPIRED_MESSAGE
+from edusched.scheduling.lessons import LessonModel, expand_lessons
+from edusched.scheduling.lns import LargeNeighborhoodSearch, LNSConfig
+from edusched.scheduling.model_store import InMemoryModelStore, ModelSnapshot
+from edusched.scheduling.portfolio import SolverConfig, relative_gap
+from edusched.scheduling.predictor import ProblemFeatures, SolveTimePredictor, extract_features
+from edusched.scheduling.replay import main as replay_main
+from edusched.scheduling.rooms import RoomCompatibilityIndex
+from edusched.scheduling.solution import UNASSIGNED, SolutionVector
+from edusched.scheduling.timeslot_table import MINUTES_PER_DAY
+from edusched.scheduling.solution_cache import InMemorySolutionStore, SolutionCache
+from edusched.scheduling.solution_pool import SolutionPool
+from edusched.scheduling.validation import VectorizedValidator
+from edusched.scheduling.variables import SparseAssignmentVars
+from edusched.scheduling import worker as worker_module
+from edusched.scheduling.worker import SchedulingWorker, SchedulingWorkerPool
 from edusched.domain.models import (
+    Room,
     Teacher,
     Section,
     Timeslot,
@@ -13,10 +54,61 @@ from edusched.domain.models import (
     WeekDay,
     PeriodType,
     ClassGroup,
-    Course
+    Course,
+    SchedulingStatus
 )
 
 
+def build_real_problem(
+    num_classes: int = 2,
+    courses_per_class: int = 3,
+    num_teachers: int = 3,
+    days=(WeekDay.MONDAY, WeekDay.TUESDAY, WeekDay.WEDNESDAY),
+    periods_per_day: int = 4,
+) -> SchedulingProblem:
+    """使用真实领域模型构建一个小型调度问题。"""
+    problem = SchedulingProblem("test_tenant")
+
+    teachers = [
+        Teacher(
+            tenant_id="test_tenant",
+            employee_id=f"T{t:03d}",
+            name=f"教师{t}",
+            email=f"teacher{t}@school.edu",
+            department="教务处",
+        )
+        for t in range(num_teachers)
+    ]
+    for teacher in teachers:
+        problem.add_teacher(teacher)
+
+    # 故意倒序添加，验证索引会按开始时间排序
+    for day in days:
+        for period in reversed(range(periods_per_day)):
+            problem.add_timeslot(Timeslot(
+                tenant_id="test_tenant",
+                week_day=day,
+                start_time=time(8 + period, 0),
+                end_time=time(8 + period, 45),
+                period_number=period + 1,
+            ))
+
+    for c in range(num_classes):
+        class_group_id = uuid4()
+        for k in range(courses_per_class):
+            problem.add_section(Section(
+                tenant_id="test_tenant",
+                course_id=uuid4(),
+                class_group_id=class_group_id,
+                teacher_id=teachers[(c + k) % num_teachers].id,
+                name=f"班级{c}-课程{k}",
+                code=f"C{c}K{k}",
+                hours_per_week=1,
+            ))
+
+    return problem
+
+
 class TestSchedulingEngine:
     """调度引擎测试类。"""
 
@@ -262,7 +354,7 @@ class TestSchedulingProblem:
         from ortools.sat.python import cp_model
 
         model = cp_model.CpModel()
-        vars = [[model.NewBoolVar(f"test_{i}_{j}") for j in range(3)] for i in range(2)]
+        vars = SparseAssignmentVars.create(model, [[0, 1, 2], [0, 2]], 3, prefix="test")
 
         # 添加测试数据
         teacher = Mock()
@@ -304,10 +396,10 @@ class TestConstraintValidator:
 
     def test_check_timeslot_conflicts_with_multiple_assignments(self):
         """测试检查时间段冲突（多个分配到同一时间段）。"""
-        timeslot_id = uuid4()
-        assignment1 = Mock(timeslot_id=timeslot_id)
-        assignment2 = Mock(timeslot_id=timeslot_id)
-        assignment3 = Mock(timeslot_id=uuid4())  # 不同的时间段
+        timeslot_id, room_id = uuid4(), uuid4()
+        assignment1 = Mock(timeslot_id=timeslot_id, room_id=room_id)
+        assignment2 = Mock(timeslot_id=timeslot_id, room_id=room_id)
+        assignment3 = Mock(timeslot_id=uuid4(), room_id=room_id)  # 不同的时间段
 
         assignments = [assignment1, assignment2, assignment3]
         violations = ConstraintValidator._check_timeslot_conflicts(assignments)
@@ -316,6 +408,13 @@ class TestConstraintValidator:
         assert "时间段" in violations[0]
         assert "被多个教学段占用" in violations[0]
 
+    def test_check_timeslot_conflicts_different_rooms(self):
+        """测试同一时间段使用不同教室不算冲突。"""
+        timeslot_id = uuid4()
+        assignments = [Mock(timeslot_id=timeslot_id, room_id=uuid4()) for _ in range(3)]
+
+        assert ConstraintValidator._check_timeslot_conflicts(assignments) == []
+
     def test_check_timeslot_conflicts_no_conflicts(self):
         """测试检查时间段冲突（无冲突）。"""
         assignment1 = Mock(timeslot_id=uuid4())
@@ -349,4 +448,1917 @@ class TestConstraintValidator:
         assert len(violations) == 1
         assert "教师" in violations[0]
         assert "在时间段" in violations[0]
-        assert "有冲突" in violations[0]
\ No newline at end of file
+        assert "有冲突" in violations[0]
+
+
+class TestProblemIndex:
+    """预计算索引测试类。"""
+
+    def test_build_index(self):
+        """测试一次遍历构建索引。"""
+        problem = build_real_problem()
+        index = ProblemIndex.build(problem.sections, problem.timeslots)
+
+        assert sum(len(v) for v in index.teacher_sections.values()) == len(problem.sections)
+        assert sum(len(v) for v in index.class_group_sections.values()) == len(problem.sections)
+        assert set(index.day_timeslots) == {WeekDay.MONDAY, WeekDay.TUESDAY, WeekDay.WEDNESDAY}
+
+        for slot_indices in index.day_timeslots.values():
+            start_times = [problem.timeslots[j].start_time for j in slot_indices]
+            assert start_times == sorted(start_times)
+
+        for teacher_id, section_indices in index.teacher_sections.items():
+            assert all(problem.sections[i].teacher_id == teacher_id for i in section_indices)
+
+    def test_adjacent_timeslot_pairs(self):
+        """测试同一天内相邻时间段对。"""
+        problem = build_real_problem(days=(WeekDay.MONDAY,), periods_per_day=4)
+        index = ProblemIndex.build(problem.sections, problem.timeslots)
+
+        pairs = index.adjacent_timeslot_pairs()
+        assert len(pairs) == 3
+        for j1, j2 in pairs:
+            assert problem.timeslots[j1].end_time < problem.timeslots[j2].start_time
+
+    def test_build_model_shares_index(self):
+        """测试build_model构建索引并能求解真实数据。"""
+        problem = build_real_problem()
+        problem.build_model()
+
+        assert problem.index is not None
+        assert len(problem.index.class_group_sections) == 2
+
+        success, assignments = problem.solve(time_limit=10)
+        assert success is True
+        assert len(assignments) == len(problem.sections)
+        assert ConstraintValidator.validate_hard_constraints(
+            assignments, problem.sections, problem.timeslots
+        ) == []
+
+
+
+class TestSparseAssignmentVars:
+    """稀疏分配变量测试类。"""
+
+    def test_domain_pruning(self):
+        """测试剪除休息、教师不可用和锁定占用的时间段。"""
+        problem = build_real_problem(days=(WeekDay.MONDAY,), periods_per_day=4)
+        slots = sorted(range(len(problem.timeslots)), key=lambda j: problem.timeslots[j].start_time)
+
+        # 第一节为休息时间
+        problem.timeslots[slots[0]].is_break = True
+        # 第一位教师第二节不可用
+        problem.teachers[0].unavailable_time_slots = [problem.timeslots[slots[1]].start_time]
+        # 锁定一个教学段到第四节
+        locked_section = problem.sections[-1]
+        problem.add_existing_assignment(Assignment(
+            tenant_id="test_tenant",
+            timetable_id=uuid4(),
+            section_id=locked_section.id,
+            timeslot_id=problem.timeslots[slots[3]].id,
+            room_id=uuid4(),
+            is_locked=True,
+        ))
+
+        problem.build_model()
+        vars = problem.assignment_vars
+
+        assert len(vars) < len(problem.sections) * len(problem.timeslots)
+        assert problem.section_domains[-1] == [slots[3]]
+        for i, section in enumerate(problem.sections):
+            domain = problem.section_domains[i]
+            assert slots[0] not in domain
+            if i != len(problem.sections) - 1:
+                assert slots[3] not in domain
+            if section.teacher_id == problem.teachers[0].id and i != len(problem.sections) - 1:
+                assert slots[1] not in domain
+            assert [j for j, _ in vars.by_section[i]] == domain
+
+    def test_locked_slot_pruned_for_shared_teacher_and_class(self):
+        """测试锁定时间段从同一教师或同一班级的其他教学段中剪除。"""
+        problem = build_real_problem()
+        # 每个教学段使用各自的教室，只按教师和班级剪除
+        for section in problem.sections:
+            section.room_id = uuid4()
+        locked_section = problem.sections[0]
+        problem.add_existing_assignment(Assignment(
+            tenant_id="test_tenant",
+            timetable_id=uuid4(),
+            section_id=locked_section.id,
+            timeslot_id=problem.timeslots[0].id,
+            room_id=locked_section.room_id,
+            is_locked=True,
+        ))
+        problem.build_model()
+
+        assert problem.section_domains[0] == [0]
+        shared = unrelated = 0
+        for i, section in enumerate(problem.sections[1:], start=1):
+            if (section.teacher_id == locked_section.teacher_id
+                    or section.class_group_id == locked_section.class_group_id):
+                assert 0 not in problem.section_domains[i]
+                shared += 1
+            else:
+                assert 0 in problem.section_domains[i]
+                unrelated += 1
+        assert shared and unrelated
+
+    def test_solve_with_sparse_vars(self):
+        """测试稀疏变量模型求解结果满足锁定分配。"""
+        problem = build_real_problem()
+        locked_section = problem.sections[0]
+        locked_timeslot = problem.timeslots[5]
+        problem.add_existing_assignment(Assignment(
+            tenant_id="test_tenant",
+            timetable_id=uuid4(),
+            section_id=locked_section.id,
+            timeslot_id=locked_timeslot.id,
+            room_id=uuid4(),
+            is_locked=True,
+        ))
+        problem.build_model()
+
+        success, assignments = problem.solve(time_limit=10)
+        assert success is True
+        by_section = {a.section_id: a.timeslot_id for a in assignments}
+        assert by_section[locked_section.id] == locked_timeslot.id
+        assert len(by_section) == len(problem.sections)
+
+
+
+class TestGreedyConstruction:
+    """贪心构造阶段1测试类。"""
+
+    def test_construct_initial_solution(self):
+        """测试DSatur构造满足硬约束的完整初始解。"""
+        problem = build_real_problem(num_classes=3, courses_per_class=4, num_teachers=4)
+        problem.build_model()
+
+        result = problem.construct_initial_solution()
+
+        assert result.is_complete
+        assert result.solution.dtype.name == "int32"
+        assignments = problem._build_assignments(result.as_dict())
+        assert len(assignments) == len(problem.sections)
+        assert ConstraintValidator.validate_hard_constraints(
+            assignments, problem.sections, problem.timeslots
+        ) == []
+
+    def test_construct_reports_unassigned(self):
+        """测试时间段不足时报告未安排的教学段。"""
+        problem = build_real_problem(
+            num_classes=2, courses_per_class=3, days=(WeekDay.MONDAY,), periods_per_day=4
+        )
+        problem.build_model()
+
+        result = problem.construct_initial_solution()
+
+        assert not result.is_complete
+        assert len(result.unassigned) == len(problem.sections) - len(problem.timeslots)
+
+    def test_solve_two_phase_uses_greedy(self):
+        """测试两阶段求解优先使用贪心构造。"""
+        problem = build_real_problem()
+        problem.build_model()
+
+        success, assignments, metrics = problem.solve_two_phase(
+            phase1_time_limit=5, phase2_time_limit=5
+        )
+
+        assert success is True
+        assert metrics['phase1_method'] == 'greedy'
+        assert metrics['phase1_solution_found'] is True
+        assert len(assignments) == len(problem.sections)
+
+    def test_extract_phase1_solution(self):
+        """测试CP-SAT阶段1回退路径能读取变量值。"""
+        from ortools.sat.python import cp_model
+
+        problem = build_real_problem()
+        problem.build_model()
+        phase1_model = problem._create_phase1_model()
+
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = 5
+        assert solver.Solve(phase1_model) in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+
+        assignments = problem._extract_phase1_solution(solver)
+        assert len(assignments) == len(problem.sections)
+
+
+class TestSoftObjective:
+    """测试软约束目标函数。"""
+
+    def test_each_violation_has_its_own_indicator(self):
+        """测试每处违反单独计数，目标值为整数加权和。"""
+        problem = build_real_problem()
+        teacher = problem.teachers[0]
+        # 偏好一个不存在的时间段：该教师的每个教学段都违反偏好
+        teacher.preferred_time_slots = [time(23, 0)]
+        problem.build_model()
+
+        taught = len(problem._get_index().sections_of_teacher(teacher.id))
+        assert len(problem.penalty_terms['teacher_preference']) == sum(
+            len(problem.assignment_vars.by_section[i])
+            for i in problem._get_index().sections_of_teacher(teacher.id)
+        )
+        assert all(isinstance(coef, int) for terms in problem.penalty_terms.values() for coef, _ in terms)
+
+        success, _ = problem.solve(time_limit=10)
+        assert success is True
+
+        violations = problem.get_constraint_violations()
+        coef = problem._scaled_weight(0.8)
+        assert violations['teacher_preference']['violations_count'] == taught
+        assert violations['teacher_preference']['penalty_value'] == taught * coef
+        assert problem.solver.ObjectiveValue() == violations['total_penalty']
+
+    @pytest.mark.parametrize("adjacent", [True, False])
+    def test_consecutive_penalty_follows_placement(self, adjacent):
+        """测试连堂课块的两个课时相邻时不计违反，分在两天时计一次违反。"""
+        problem = build_duplicated_problem(hours=2)
+        for section in problem.sections:
+            section.consecutive_hours = 2
+        problem.build_model()
+
+        links = problem._consecutive_links()
+        assert len(links) == 2
+        a, b = links[0]
+        table = problem._get_index().timeslot_table
+        j1, j2 = table.consecutive_pairs()[0]
+        if not adjacent:
+            j2 = next(j for j, t in enumerate(problem.timeslots)
+                      if t.week_day != problem.timeslots[j1].week_day)
+        problem.model.Add(problem.assignment_vars.get(a, j1) == 1)
+        problem.model.Add(problem.assignment_vars.get(b, j2) == 1)
+
+        success, _ = problem.solve(time_limit=10)
+        assert success is True
+
+        violations = problem.get_constraint_violations()
+        assert violations['consecutive_classes']['violations_count'] == (0 if adjacent else 1)
+
+
+def build_duplicated_problem(hours: int = 3) -> SchedulingProblem:
+    """构建按每周课时复制教学段的调度问题（同一课程的教学段可互换）。"""
+    problem = build_real_problem(num_classes=1, courses_per_class=2, num_teachers=2)
+    for section in list(problem.sections):
+        for h in range(1, hours):
+            problem.add_section(section.model_copy(update={"id": uuid4(), "code": f"{section.code}-{h}"}))
+    return problem
+
+
+class TestSymmetryBreaking:
+    """测试可互换教学段的对称性破除。"""
+
+    def test_duplicated_sections_are_ordered(self):
+        """测试复制的教学段组成等价类，求解结果按时间段下标递增。"""
+        problem = build_duplicated_problem()
+        problem.symmetry_breaking = True
+        problem.build_model()
+
+        assert sorted(len(members) for members in problem.symmetry_classes) == [3, 3]
+
+        success, assignments = problem.solve(time_limit=10)
+        assert success is True
+        solution = problem._assignments_to_solution(assignments)
+        for members in problem.symmetry_classes:
+            slots = [solution[i] for i in members]
+            assert slots == sorted(slots)
+            assert len(set(slots)) == len(slots)
+
+    def test_disabled_by_default(self):
+        """测试默认关闭对称性破除，不生成等价类。"""
+        problem = build_duplicated_problem()
+        problem.build_model()
+
+        assert problem.symmetry_classes == []
+
+        success, _ = problem.solve(time_limit=10)
+        assert success is True
+
+    def test_canonicalize_solution(self):
+        """测试规范化只在等价类内部重新排列时间段。"""
+        problem = build_duplicated_problem()
+        problem.symmetry_breaking = True
+        problem.build_model()
+        members = problem.symmetry_classes[0]
+        solution = {i: 10 - k for k, i in enumerate(members)}
+
+        canonical = problem.canonicalize_solution(solution)
+
+        assert [canonical[i] for i in members] == sorted(solution.values())
+        assert sorted(canonical.values()) == sorted(solution.values())
+
+
+class TestLargeNeighborhoodSearch:
+    """大邻域搜索测试类。"""
+
+    def test_lns_run_records_trace(self):
+        """测试LNS从初始解出发并记录改进轨迹。"""
+        problem = build_real_problem(num_classes=3, courses_per_class=4, num_teachers=4)
+        problem.build_model()
+        initial = problem.construct_initial_solution().as_dict()
+
+        config = LNSConfig(time_limit=3, initial_time_limit=1, neighborhood_time_limit=0.2, max_iterations=5)
+        result = LargeNeighborhoodSearch(problem, config).run(initial)
+
+        assert result.success is True
+        assert result.trace and result.trace[0].neighborhood == "initial"
+        objectives = [entry.objective for entry in result.trace]
+        assert objectives == sorted(objectives, reverse=True)
+        assignments = problem._build_assignments(result.solution)
+        assert len(assignments) == len(problem.sections)
+        assert ConstraintValidator.validate_hard_constraints(
+            assignments, problem.sections, problem.timeslots
+        ) == []
+
+    def test_lns_requires_model(self):
+        """测试未构建模型时拒绝运行。"""
+        problem = build_real_problem()
+        with pytest.raises(RuntimeError, match="模型未构建"):
+            LargeNeighborhoodSearch(problem)
+
+    def test_neighborhood_respects_min_size(self):
+        """测试邻域过小时合并至最小规模。"""
+        problem = build_real_problem()
+        problem.build_model()
+        config = LNSConfig(neighborhoods=("class_group",), min_neighborhood_size=4)
+        lns = LargeNeighborhoodSearch(problem, config)
+
+        kind, free = lns._select_neighborhood(lns._neighborhood_groups(), {})
+
+        assert kind == "class_group"
+        assert len(free) >= 4
+
+    def test_solve_two_phase_with_lns(self):
+        """测试两阶段求解可按调用启用LNS并返回轨迹指标。"""
+        problem = build_real_problem()
+        problem.build_model()
+        config = LNSConfig(initial_time_limit=1, neighborhood_time_limit=0.2, max_iterations=3)
+
+        success, assignments, metrics = problem.solve_two_phase(
+            phase1_time_limit=5, phase2_time_limit=2, lns_config=config
+        )
+
+        assert success is True
+        assert metrics['phase2_method'] == 'lns'
+        assert metrics['lns_trace']
+        assert problem.lns_result is not None
+        assert len(assignments) == len(problem.sections)
+
+
+def build_independent_grades(num_grades: int = 2) -> SchedulingProblem:
+    """构建各年级不共享教师和教室的调度问题。"""
+    problem = build_real_problem(
+        num_classes=num_grades, courses_per_class=3, num_teachers=3 * num_grades
+    )
+    rooms = [uuid4() for _ in range(num_grades)]
+    class_ids = list(dict.fromkeys(s.class_group_id for s in problem.sections))
+    for i, section in enumerate(problem.sections):
+        grade = class_ids.index(section.class_group_id)
+        section.teacher_id = problem.teachers[grade * 3 + i % 3].id
+        section.room_id = rooms[grade]
+    return problem
+
+
+class TestDecomposition:
+    """问题分解测试类。"""
+
+    def test_find_components_independent_grades(self):
+        """测试不共享教师和教室的年级被拆分为独立分量。"""
+        problem = build_independent_grades(3)
+        index = ProblemIndex.build(problem.sections, problem.timeslots)
+
+        components = find_components(index, len(problem.sections))
+
+        assert len(components) == 3
+        assert sorted(i for c in components for i in c) == list(range(len(problem.sections)))
+
+    def test_shared_implicit_room_couples_sections(self):
+        """测试未指定教室的教学段共用隐含教室，不会被拆分。"""
+        problem = build_independent_grades(2)
+        for section in problem.sections:
+            section.room_id = None
+        index = ProblemIndex.build(problem.sections, problem.timeslots)
+
+        assert len(find_components(index, len(problem.sections))) == 1
+
+    def test_single_component_skips_pool(self):
+        """测试未指定教室的教学段耦合为一个分量时给出警告，不启动进程池。"""
+        engine = SchedulingEngine("test_tenant")
+        engine.problem = build_independent_grades(2)
+        for section in engine.problem.sections:
+            section.room_id = None
+
+        with patch.object(DecomposedSolver, '_solve_parallel') as solve_parallel, \
+                patch('edusched.scheduling.decomposition.logger') as log:
+            success, assignments, metrics = engine.solve_decomposed(phase1_time_limit=5, phase2_time_limit=1)
+
+        solve_parallel.assert_not_called()
+        assert success is True
+        assert metrics['num_components'] == 1
+        assert "未指定教室的教学段共用同一教室" in log.warning.call_args[0][0]
+
+    def test_rooms_allow_parallel_sections(self):
+        """测试不同教室的教学段可以安排在同一时间段。"""
+        problem = build_independent_grades(2)
+        problem.build_model()
+
+        result = problem.construct_initial_solution()
+
+        assert result.is_complete
+        assert len(set(result.solution.tolist())) < len(problem.sections)
+
+    def test_solve_decomposed_merges_components(self):
+        """测试多进程求解各分量并合并分配。"""
+        engine = SchedulingEngine("test_tenant")
+        engine.problem = build_independent_grades(2)
+
+        success, assignments, metrics = engine.solve_decomposed(
+            phase1_time_limit=5, phase2_time_limit=2, max_workers=2
+        )
+
+        assert success is True
+        assert metrics['num_components'] == 2
+        assert metrics['failed_components'] == []
+        assert {a.section_id for a in assignments} == {s.id for s in engine.problem.sections}
+
+
+class TestSolverPortfolio:
+    """求解器组合测试类。"""
+
+    def test_solver_config_apply(self):
+        """测试配置写入求解参数。"""
+        from ortools.sat.python import cp_model
+
+        config = SolverConfig("fixed", random_seed=7, search_branching=cp_model.FIXED_SEARCH,
+                              use_lns=False, linearization_level=2)
+        solver = cp_model.CpSolver()
+        config.apply(solver.parameters)
+
+        assert solver.parameters.random_seed == 7
+        assert solver.parameters.search_branching == cp_model.FIXED_SEARCH
+        assert solver.parameters.use_lns is False
+        assert solver.parameters.linearization_level == 2
+
+    def test_relative_gap(self):
+        """测试相对间隙计算。"""
+        assert relative_gap(100, 90) == pytest.approx(0.1)
+        assert relative_gap(0, 0) == 0
+        assert relative_gap(10, 12) == 0
+
+    def test_solve_portfolio_reports_winner(self):
+        """测试组合求解返回可行解并报告胜出配置。"""
+        problem = build_real_problem()
+        problem.build_model()
+        configs = [SolverConfig("seed_a", random_seed=1), SolverConfig("seed_b", random_seed=2, use_lns=False)]
+
+        success, assignments, metrics = problem.solve_portfolio(
+            time_limit=5, configs=configs, max_workers=2
+        )
+
+        assert success is True
+        assert metrics['portfolio_winner'] in {"seed_a", "seed_b"}
+        assert len(metrics['portfolio_runs']) == 2
+        assert len(assignments) == len(problem.sections)
+        assert ConstraintValidator.validate_hard_constraints(
+            assignments, problem.sections, problem.timeslots
+        ) == []
+        # 提示只写入模型副本
+        assert len(problem.model.Proto().solution_hint.vars) == 0
+
+    def test_queued_config_skipped_after_deadline(self):
+        """测试排队的配置在全局截止时间之后开始时直接跳过，而不是重新获得完整的时间限制。"""
+        import threading
+        from time import time as wall_time
+        from multiprocessing import Array, Value
+
+        from edusched.scheduling import portfolio
+        from edusched.scheduling.model_store import serialize_model
+
+        problem = build_real_problem()
+        problem.build_model()
+        model_format, model_data = serialize_model(problem.model)
+        portfolio._init_worker(
+            threading.Event(), Value("d", float("inf")), Value("d", float("-inf")), Array("b", 0, lock=False)
+        )
+
+        skipped = portfolio._run_config(model_format, model_data, SolverConfig("late"), wall_time() - 1, 0.0, [])
+        assert skipped.status == portfolio.SKIPPED_STATUS
+        assert skipped.values is None
+
+        run = portfolio._run_config(model_format, model_data, SolverConfig("on_time"), wall_time() + 5, 0.0, [])
+        assert run.status in ("OPTIMAL", "FEASIBLE")
+        assert run.wall_time < 5
+
+    def test_late_config_hinted_with_shared_incumbent(self):
+        """测试其他进程找到解后，晚开始的配置以共享的最优解作为提示。"""
+        import threading
+        from multiprocessing import Array, Value
+
+        from edusched.scheduling import portfolio
+        from edusched.scheduling.model_store import deserialize_model, serialize_model
+
+        problem = build_real_problem()
+        problem.build_model()
+        var_indices = [var.Index() for _, var in problem.assignment_vars.items()]
+        shared_objective = Value("d", float("inf"))
+        shared_values = Array("b", len(var_indices), lock=False)
+        portfolio._init_worker(threading.Event(), shared_objective, Value("d", float("-inf")), shared_values)
+
+        model = deserialize_model(*serialize_model(problem.model))
+        assert portfolio._hint_shared_incumbent(model, var_indices) is False
+        assert len(model.Proto().solution_hint.vars) == 0
+
+        # 模拟其他进程发布的最优解
+        success, _ = problem.solve(time_limit=5)
+        assert success is True
+        best = [
+            1 if problem.solution.as_dict().get(i) == j else 0 for (i, j), _ in problem.assignment_vars.items()
+        ]
+        shared_objective.value = 0.0
+        shared_values[:] = best
+
+        assert portfolio._hint_shared_incumbent(model, var_indices) is True
+        hint = model.Proto().solution_hint
+        assert dict(zip(hint.vars, hint.values)) == dict(zip(var_indices, best))
+
+
+class TestSolutionProgress:
+    """改进解进度发布测试类。"""
+
+    def test_solve_publishes_progress_and_snapshot(self):
+        """测试求解时发布进度并保存当前最优解快照。"""
+        problem = build_real_problem()
+        problem.build_model()
+        updates = []
+
+        success, assignments = problem.solve(time_limit=5, on_progress=updates.append)
+
+        assert success is True
+        assert updates
+        assert all(0 <= u.progress <= 0.99 for u in updates)
+        assert updates[-1].gap >= 0
+        assert len(problem.current_best_assignments()) == len(problem.sections)
+        # 回调从响应中批量读取的最后一个解即最终解
+        assert problem.incumbent.snapshot()[0] == problem.solution.as_dict()
+
+    def test_two_phase_snapshot_available_after_phase1(self):
+        """测试阶段1的解写入快照，阶段2发布的进度带有阶段名称。"""
+        problem = build_real_problem()
+        problem.build_model()
+        phases = []
+
+        problem.solve_two_phase(
+            phase1_time_limit=5, phase2_time_limit=5,
+            on_progress=lambda progress: phases.append(progress.phase),
+        )
+
+        assert phases and set(phases) == {"phase2"}
+        solution, progress = problem.incumbent.snapshot()
+        assert len(solution) == len(problem.sections)
+
+    def test_throttled_handler_keeps_latest(self):
+        """测试节流只发布间隔内的第一次和flush时的最新进度。"""
+        written = []
+        handler = ThrottledProgressHandler(written.append, min_interval=60)
+
+        for count in range(1, 4):
+            handler(SolutionProgress(
+                objective=10 - count, best_bound=0, gap=1, elapsed=count,
+                solution_count=count, progress=0.1,
+            ))
+        handler.flush()
+
+        assert [p.solution_count for p in written] == [1, 3]
+
+
+class TestCancellation:
+    """求解取消测试类。"""
+
+    def test_registry_cancel_registered_job(self):
+        """测试取消已登记的任务。"""
+        registry = CancellationRegistry()
+        job_id = uuid4()
+        token = registry.register(job_id)
+
+        assert registry.cancel(job_id) is True
+        assert token.is_cancelled()
+
+        registry.unregister(job_id)
+        assert not registry.is_cancelled(job_id)
+
+    def test_cancel_through_shared_backend(self):
+        """测试通过共享后端取消其他进程中的任务。"""
+        import multiprocessing
+        import pickle
+
+        with multiprocessing.Manager() as manager:
+            shared = manager.dict()
+            worker_registry = CancellationRegistry(InMemoryCancellationBackend(shared))
+            api_registry = CancellationRegistry(InMemoryCancellationBackend(shared))
+            token = pickle.loads(pickle.dumps(worker_registry.register("job-1")))
+
+            assert api_registry.cancel("job-1") is False
+            assert token.is_cancelled()
+
+    def test_cancelled_solve_stops_early(self):
+        """测试取消后停止搜索并仍返回当前最优解。"""
+        problem = build_real_problem(num_classes=6, courses_per_class=5, num_teachers=8,
+                                     days=tuple(WeekDay)[:5], periods_per_day=8)
+        problem.build_model()
+        registry = CancellationRegistry()
+        problem.cancel_token = registry.register("job-2")
+        registry.cancel("job-2")
+
+        start = perf_counter()
+        success, assignments, metrics = problem.solve_two_phase(
+            phase1_time_limit=30, phase2_time_limit=30
+        )
+
+        assert perf_counter() - start < 5
+        assert success is True
+        assert metrics['cancelled'] is True
+        assert metrics['phase2_method'] == 'skipped'
+        assert len(assignments) == len(problem.sections)
+
+    def test_stop_on_cancel_interrupts_running_search(self):
+        """测试运行中的搜索在取消后一秒内停止。"""
+        import threading
+
+        problem = build_real_problem(num_classes=6, courses_per_class=5, num_teachers=8,
+                                     days=tuple(WeekDay)[:5], periods_per_day=8)
+        problem.build_model()
+        registry = CancellationRegistry()
+        problem.cancel_token = registry.register("job-3")
+        threading.Timer(0.5, registry.cancel, args=("job-3",)).start()
+
+        start = perf_counter()
+        problem.solve(time_limit=30)
+
+        assert perf_counter() - start < 2
+
+
+class TestSchedulingWorker:
+    """测试调度工作进程和任务队列。"""
+
+    def test_claim_assigns_worker_and_lease(self):
+        """测试领取任务时记录工作进程和租约。"""
+        queue = InMemoryJobQueue()
+        queue.enqueue("job-1", "tenant", uuid4())
+
+        job = queue.claim("worker-a", lease_seconds=60)
+
+        assert job.job_id == "job-1"
+        assert job.attempts == 1
+        record = queue.get("job-1")
+        assert record.status == SchedulingStatus.RUNNING
+        assert record.worker_id == "worker-a"
+        assert queue.claim("worker-b", lease_seconds=60) is None
+
+    def test_expired_lease_is_requeued_then_failed(self):
+        """测试租约过期的任务被重新排队，超过最大次数后标记失败。"""
+        queue = InMemoryJobQueue()
+        queue.enqueue("job-1", "tenant", uuid4())
+
+        queue.claim("worker-a", lease_seconds=-1)
+        assert queue.requeue_expired(max_attempts=2) == 1
+        assert queue.get("job-1").status == SchedulingStatus.DRAFT
+        assert queue.heartbeat("job-1", "worker-a", 60) is False
+
+        job = queue.claim("worker-b", lease_seconds=-1)
+        assert job.attempts == 2
+        queue.requeue_expired(max_attempts=2)
+        record = queue.get("job-1")
+        assert record.status == SchedulingStatus.FAILED
+        assert record.error_message == LEASE_EXPIRED_MESSAGE
+
+    def test_cancelled_job_stops_runner(self):
+        """测试任务在队列中被取消后，心跳线程取消运行中的求解。"""
+        queue = InMemoryJobQueue()
+        queue.enqueue("job-1", "tenant", uuid4())
+        observed = {}
+
+        def runner(job, token, on_progress):
+            queue.cancel(job.job_id)
+            start = perf_counter()
+            while not token.is_cancelled() and perf_counter() - start < 5:
+                pass
+            observed["cancelled"] = token.is_cancelled()
+            return JobOutcome(status=SchedulingStatus.FAILED, metadata={"cancelled": True})
+
+        worker = SchedulingWorker(queue, "worker-a", runner, cancel_poll_interval=0.05)
+        assert worker.run_once() is True
+
+        record = queue.get("job-1")
+        assert observed["cancelled"] is True
+        assert record.status == SchedulingStatus.FAILED
+        assert record.error_message == "任务被用户取消"
+        assert record.result_metadata["cancelled"] is True
+
+    def test_pool_limits_concurrency(self):
+        """测试工作者池同时运行的任务不超过并发上限。"""
+        import threading
+
+        queue = InMemoryJobQueue()
+        for k in range(5):
+            queue.enqueue(f"job-{k}", "tenant", uuid4())
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0, "done": 0}
+
+        def runner(job, token, on_progress):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            threading.Event().wait(0.1)
+            with lock:
+                state["running"] -= 1
+                state["done"] += 1
+            return JobOutcome(status=SchedulingStatus.FEASIBLE)
+
+        pool = SchedulingWorkerPool(queue, concurrency=2, runner=runner, use_processes=False,
+                                    host_id="host", poll_interval=0.02)
+        pool.start()
+        start = perf_counter()
+        while state["done"] < 5 and perf_counter() - start < 10:
+            threading.Event().wait(0.02)
+        pool.stop(timeout=5)
+
+        assert state["done"] == 5
+        assert state["peak"] == 2
+        assert all(queue.get(f"job-{k}").status == SchedulingStatus.FEASIBLE for k in range(5))
+        assert {queue.get(f"job-{k}").worker_id for k in range(5)} <= set(pool.worker_ids)
+
+    def test_default_runner_completes_job(self, tmp_path, monkeypatch):
+        """测试默认执行函数从数据库加载时间表并保存分配，锁定分配保持不变。"""
+        from sqlalchemy import select
+        from edusched.infrastructure.database.models import Assignment as AssignmentTable
+
+        store, timetable_id, locked_id = seed_timetable_db(tmp_path)
+        monkeypatch.setattr(worker_module, "timetable_store", store)
+        queue = InMemoryJobQueue()
+        queue.enqueue("job-1", "tenant", timetable_id)
+
+        assert SchedulingWorker(queue, "worker-a").run_once() is True
+
+        record = queue.get("job-1")
+        assert record.status in (SchedulingStatus.FEASIBLE, SchedulingStatus.OPTIMIZED)
+        assert record.progress == 1.0
+        assert record.result_metadata["num_assignments"] == 6
+        with store._session() as db:
+            rows = db.execute(select(AssignmentTable)).scalars().all()
+        assert len(rows) == 6
+        assert len({row.section_id for row in rows}) == 6
+        assert all(row.timetable_id == timetable_id for row in rows)
+        assert [row.id for row in rows if row.is_locked] == [locked_id]
+
+    def test_cancelled_job_saves_incumbent(self, tmp_path, monkeypatch):
+        """测试求解中被取消的任务仍保存取消前找到的课表。"""
+        from sqlalchemy import select
+        from edusched.infrastructure.database.models import Assignment as AssignmentTable
+        from edusched.scheduling.cancellation import cancellation_registry
+
+        class CancellingQueue(InMemoryJobQueue):
+            """收到第一个改进解时取消任务。"""
+
+            def update_progress(self, job_id, worker_id, progress):
+                super().update_progress(job_id, worker_id, progress)
+                self.cancel(job_id)
+                cancellation_registry.cancel(job_id)
+
+        store, timetable_id, _ = seed_timetable_db(tmp_path)
+        monkeypatch.setattr(worker_module, "timetable_store", store)
+        queue = CancellingQueue()
+        queue.enqueue("job-1", "tenant", timetable_id)
+
+        assert SchedulingWorker(queue, "worker-a").run_once() is True
+
+        record = queue.get("job-1")
+        assert record.status == SchedulingStatus.FAILED
+        assert record.error_message == "任务被用户取消"
+        assert record.result_metadata["cancelled"] is True
+        assert record.result_metadata["saved"] is True
+        assert record.result_metadata["stop_reason"] == "cancelled"
+        with store._session() as db:
+            rows = db.execute(select(AssignmentTable)).scalars().all()
+        assert len({row.section_id for row in rows}) == 6
+
+    def test_default_runner_fails_without_timetable(self, tmp_path, monkeypatch):
+        """测试时间表不存在时任务失败，不以空问题报告成功。"""
+        store, _, _ = seed_timetable_db(tmp_path)
+        monkeypatch.setattr(worker_module, "timetable_store", store)
+        queue = InMemoryJobQueue()
+        queue.enqueue("job-1", "tenant", uuid4())
+
+        assert SchedulingWorker(queue, "worker-a").run_once() is True
+
+        record = queue.get("job-1")
+        assert record.status == SchedulingStatus.FAILED
+        assert record.error_message.startswith("加载时间表数据失败")
+        assert record.result_metadata["success"] is False
+        assert "num_assignments" not in record.result_metadata
+
+
+def seed_timetable_db(tmp_path):
+    """在SQLite中写入一个小型时间表（2个班级×3门课、3个教师、2个教室、1个锁定分配）。"""
+    from datetime import datetime
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session as DbSession
+    from edusched.infrastructure.database import models as tables
+    from edusched.scheduling.timetable_store import TimetableStore
+
+    url = f"sqlite:///{tmp_path / 'edusched.db'}"
+    tables.Base.metadata.create_all(create_engine(url))
+    timetable_id, locked_id = uuid4(), uuid4()
+    problem = build_real_problem()
+    with DbSession(create_engine(url)) as db:
+        for teacher in problem.teachers:
+            db.add(tables.Teacher(**teacher.model_dump(include={
+                "id", "employee_id", "name", "email", "department"}), tenant_id="tenant"))
+        for timeslot in problem.timeslots:
+            db.add(tables.Timeslot(**timeslot.model_dump(include={
+                "id", "week_day", "start_time", "end_time", "period_number"}), tenant_id="tenant"))
+        for section in problem.sections:
+            db.add(tables.Section(**section.model_dump(include={
+                "id", "course_id", "class_group_id", "teacher_id", "name", "code", "hours_per_week"}),
+                tenant_id="tenant"))
+        for class_group_id in {s.class_group_id for s in problem.sections}:
+            db.add(tables.ClassGroup(id=class_group_id, tenant_id="tenant", grade_id=uuid4(),
+                                     name="班级", code=str(class_group_id)[:8], student_count=30))
+        room_ids = [uuid4(), uuid4()]
+        for k, room_id in enumerate(room_ids):
+            db.add(tables.Room(id=room_id, tenant_id="tenant", building_id=uuid4(), name=f"教室{k}",
+                               code=f"R{k}", floor=1, capacity=40))
+        db.add(tables.Timetable(id=timetable_id, tenant_id="tenant", calendar_id=uuid4(), name="课表"))
+        db.add(tables.Assignment(id=locked_id, tenant_id="tenant", timetable_id=timetable_id,
+                                 section_id=problem.sections[0].id, timeslot_id=problem.timeslots[0].id,
+                                 room_id=room_ids[0], is_locked=True))
+        # 上一次求解留下的未锁定分配应被替换
+        db.add(tables.Assignment(id=uuid4(), tenant_id="tenant", timetable_id=timetable_id,
+                                 section_id=problem.sections[1].id, timeslot_id=problem.timeslots[1].id,
+                                 room_id=room_ids[1], is_locked=False))
+        db.commit()
+    return TimetableStore(url), timetable_id, locked_id
+
+
+def copy_problem(problem: SchedulingProblem) -> SchedulingProblem:
+    """以相反顺序复制调度问题的实体。"""
+    copied = SchedulingProblem(problem.tenant_id)
+    for section in reversed(problem.sections):
+        copied.add_section(section.model_copy())
+    for timeslot in reversed(problem.timeslots):
+        copied.add_timeslot(timeslot.model_copy())
+    for teacher in reversed(problem.teachers):
+        copied.add_teacher(teacher.model_copy())
+    for constraint in reversed(problem.constraints):
+        copied.add_constraint(constraint.model_copy())
+    return copied
+
+
+class TestSolutionCache:
+    """测试问题指纹和课表缓存。"""
+
+    def test_fingerprint_is_order_independent(self):
+        """测试指纹与添加顺序和描述字段无关，但随求解相关字段变化。"""
+        problem = build_real_problem()
+        copied = copy_problem(problem)
+        copied.teachers[0].email = "changed@school.edu"
+
+        assert fingerprint_problem(copied).digest == fingerprint_problem(problem).digest
+
+        copied.sections[0].teacher_id = copied.teachers[1].id
+        changed = fingerprint_problem(copied)
+        assert changed.digest != fingerprint_problem(problem).digest
+        assert changed.grid_digest == fingerprint_problem(problem).grid_digest
+
+    def test_exact_match_returns_cached_solution(self):
+        """测试未修改的问题直接返回缓存的课表。"""
+        cache = SolutionCache(InMemorySolutionStore())
+        engine = SchedulingEngine("test_tenant")
+        engine.problem = build_real_problem(num_classes=3, num_teachers=4)
+
+        success, assignments, metrics = engine.solve_cached(cache, phase1_time_limit=5, phase2_time_limit=1)
+        assert success is True
+        assert metrics['cache'] == 'miss'
+
+        engine.problem = copy_problem(engine.problem)
+        cached_success, cached_assignments, cached_metrics = engine.solve_cached(cache)
+
+        assert cached_success is True
+        assert cached_metrics['cache'] == 'exact'
+        assert engine.problem.model is None
+        assert {(a.section_id, a.timeslot_id) for a in cached_assignments} == \
+            {(a.section_id, a.timeslot_id) for a in assignments}
+
+    def test_near_match_warm_starts_solve(self):
+        """测试修改较少的问题以缓存课表作为热启动。"""
+        cache = SolutionCache(InMemorySolutionStore(), min_similarity=0.5)
+        engine = SchedulingEngine("test_tenant")
+        engine.problem = build_real_problem(num_classes=3, num_teachers=4)
+        engine.solve_cached(cache, phase1_time_limit=5, phase2_time_limit=1)
+
+        edited = copy_problem(engine.problem)
+        edited.add_section(Section(
+            tenant_id="test_tenant",
+            course_id=uuid4(),
+            class_group_id=edited.sections[0].class_group_id,
+            teacher_id=edited.teachers[0].id,
+            name="新增课程",
+            code="NEW",
+            hours_per_week=1,
+        ))
+        engine.problem = edited
+        success, assignments, metrics = engine.solve_cached(cache, phase1_time_limit=5, phase2_time_limit=1)
+
+        assert success is True
+        assert metrics['cache'] == 'near'
+        assert metrics['cache_similarity'] >= 0.5
+        assert metrics['phase1_warm_start_reused'] > 0
+        assert len(assignments) == len(edited.sections)
+
+    def test_warm_start_drops_conflicting_assignments(self):
+        """测试热启动只保留与硬约束相容的分配。"""
+        problem = build_real_problem()
+        problem.build_model()
+        same_slot = [
+            Assignment(
+                tenant_id="test_tenant",
+                timetable_id=uuid4(),
+                section_id=section.id,
+                timeslot_id=problem.timeslots[0].id,
+                room_id=uuid4(),
+            )
+            for section in problem.sections
+        ]
+
+        # 不指定教室时所有教学段共用一个教室，同一时间段只能保留一个
+        assert len(problem._compatible_warm_start(same_slot)) == 1
+
+
+def build_roomed_problem(num_classes: int = 4) -> SchedulingProblem:
+    """构建每个班级使用固定教室的调度问题。"""
+    problem = build_real_problem(num_classes=num_classes, courses_per_class=3, num_teachers=4,
+                                 days=tuple(WeekDay)[:5], periods_per_day=4)
+    rooms = {}
+    for section in problem.sections:
+        section.room_id = rooms.setdefault(section.class_group_id, uuid4())
+    return problem
+
+
+class TestIncrementalRescheduling:
+    """测试局部修改后的增量重排。"""
+
+    def _solve(self, problem):
+        engine = SchedulingEngine("test_tenant")
+        engine.problem = problem
+        success, assignments, _ = engine.solve_two_phase(phase1_time_limit=5, phase2_time_limit=1)
+        assert success is True
+        return engine, {a.section_id: a.timeslot_id for a in assignments}, assignments
+
+    def test_teacher_leave_only_moves_affected_sections(self):
+        """测试教师请假后只重排受影响的邻域，并避开不可用时间段。"""
+        engine, previous, assignments = self._solve(build_roomed_problem())
+        teacher = engine.problem.teachers[0]
+        taught = {s.id for s in engine.problem.sections if s.teacher_id == teacher.id}
+        busy_starts = {engine.problem.timeslots[engine.problem.timeslot_to_idx[previous[i]]].start_time
+                       for i in taught}
+        on_leave = teacher.model_copy(update={"unavailable_time_slots": sorted(busy_starts)})
+
+        success, new_assignments, metrics = engine.reschedule_incremental(
+            assignments, ChangeSet(updated_teachers=[on_leave])
+        )
+
+        assert success is True
+        assert len(new_assignments) == len(engine.problem.sections)
+        assert metrics['incremental_radius'] == 1
+        assert metrics['incremental_free_sections'] < len(engine.problem.sections)
+
+        problem = engine.problem
+        rescheduler = IncrementalRescheduler(problem, assignments, taught)
+        free_ids = {problem.sections[i].id for i in rescheduler.neighborhood(1)}
+        for a in new_assignments:
+            if a.section_id in taught:
+                slot = problem.timeslots[problem.timeslot_to_idx[a.timeslot_id]]
+                assert slot.start_time not in busy_starts
+            if a.section_id not in free_ids:
+                assert a.timeslot_id == previous[a.section_id]
+        assert metrics['incremental_moved_sections'] >= len(taught)
+
+    def test_added_section_keeps_rest_of_timetable(self):
+        """测试班级新增教学段时其他班级的课表不变。"""
+        engine, previous, assignments = self._solve(build_roomed_problem())
+        template = engine.problem.sections[0]
+        added = template.model_copy(update={"id": uuid4(), "course_id": uuid4(), "code": "NEW"})
+
+        success, new_assignments, metrics = engine.reschedule_incremental(
+            assignments, ChangeSet(added_sections=[added])
+        )
+
+        assert success is True
+        assert metrics['incremental_seed_sections'] == 1
+        placed = {a.section_id: a.timeslot_id for a in new_assignments}
+        assert added.id in placed
+        assert metrics['incremental_moved_sections'] == sum(
+            1 for section_id, slot in previous.items() if placed[section_id] != slot
+        )
+        sections, timeslots = engine.problem.sections, engine.problem.timeslots
+        assert ConstraintValidator._check_teacher_conflicts(new_assignments, sections, timeslots) == []
+        assert ConstraintValidator._check_class_conflicts(new_assignments, sections, timeslots) == []
+
+    def test_change_set_apply_removes_sections(self):
+        """测试变更集删除教学段和时间段并保留原问题。"""
+        problem = build_real_problem()
+        changes = ChangeSet(
+            removed_section_ids=[problem.sections[0].id],
+            removed_timeslot_ids=[problem.timeslots[0].id],
+        )
+
+        changed = changes.apply(problem)
+
+        assert len(changed.sections) == len(problem.sections) - 1
+        assert len(changed.timeslots) == len(problem.timeslots) - 1
+        assert problem.sections[0].id not in changed.section_to_idx
+
+
+class TestLessonModel:
+    """测试按周课时展开的区间变量模型。"""
+
+    def _weekly_problem(self, hours: int = 3, consecutive_hours: int = 1) -> SchedulingProblem:
+        problem = build_real_problem(num_classes=2, courses_per_class=3, num_teachers=3,
+                                     days=tuple(WeekDay)[:5], periods_per_day=4)
+        for section in problem.sections:
+            section.hours_per_week = hours
+            section.consecutive_hours = consecutive_hours
+        return problem
+
+    def test_expand_lessons(self):
+        """测试按课时和连堂课块展开课次。"""
+        problem = self._weekly_problem(hours=5, consecutive_hours=2)
+        lessons = expand_lessons(problem.sections)
+
+        assert len(lessons) == 3 * len(problem.sections)
+        assert [lesson.size for lesson in lessons[:3]] == [2, 2, 1]
+
+    def test_weekly_hours_without_duplicated_sections(self):
+        """测试每个教学段按课时数得到多条分配，且无教师和班级冲突。"""
+        problem = self._weekly_problem(hours=3)
+        engine = SchedulingEngine("test_tenant")
+        engine.problem = problem
+
+        success, assignments, metrics = engine.solve_lessons(time_limit=10, num_search_workers=4)
+
+        assert success is True
+        assert metrics['lesson_count'] == 3 * len(problem.sections)
+        assert len(assignments) == 3 * len(problem.sections)
+        assert ConstraintValidator._check_teacher_conflicts(assignments, problem.sections, problem.timeslots) == []
+        assert ConstraintValidator._check_class_conflicts(assignments, problem.sections, problem.timeslots) == []
+        # 有足够的工作日时每个教学段每天最多一节
+        assert metrics['final_objective'] == 0
+        days = {}
+        for a in assignments:
+            days.setdefault(a.section_id, []).append(
+                problem.timeslots[problem.timeslot_to_idx[a.timeslot_id]].week_day
+            )
+        assert all(len(set(section_days)) == 3 for section_days in days.values())
+
+    def test_double_periods_are_adjacent(self):
+        """测试连堂课安排在同一天相邻的时间段，并避开教师不可用时间段。"""
+        problem = self._weekly_problem(hours=2, consecutive_hours=2)
+        problem.teachers[0].unavailable_time_slots = [time(9, 0)]
+        lesson_model = LessonModel(problem)
+
+        result = lesson_model.solve(time_limit=10, num_search_workers=4)
+
+        assert result.success is True
+        slots = {}
+        for i, j in result.solution:
+            slots.setdefault(i, []).append(problem.timeslots[j])
+        for i, section_slots in slots.items():
+            first, second = sorted(section_slots, key=lambda t: t.start_time)
+            assert first.week_day == second.week_day
+            assert second.period_number == first.period_number + 1
+            if problem.sections[i].teacher_id == problem.teachers[0].id:
+                assert time(9, 0) not in (first.start_time, second.start_time)
+
+    def test_locked_assignment_is_kept(self):
+        """测试锁定分配固定为教学段的一个课次。"""
+        problem = self._weekly_problem(hours=2)
+        section, timeslot = problem.sections[0], problem.timeslots[5]
+        problem.add_existing_assignment(Assignment(
+            tenant_id="test_tenant", timetable_id=uuid4(), section_id=section.id,
+            timeslot_id=timeslot.id, room_id=uuid4(), is_locked=True,
+        ))
+
+        result = LessonModel(problem).solve(time_limit=10, num_search_workers=4)
+
+        assert result.success is True
+        assert (0, 5) in result.solution
+        assert sum(1 for i, _ in result.solution if i == 0) == 2
+
+    def test_locked_last_period_pins_block_ending_there(self):
+        """测试锁定在当天最后一节的连堂课固定为以该节结束的课块。"""
+        problem = self._weekly_problem(hours=2, consecutive_hours=2)
+        last = next(j for j, t in enumerate(problem.timeslots)
+                    if t.week_day == WeekDay.MONDAY and t.period_number == 4)
+        problem.add_existing_assignment(Assignment(
+            tenant_id="test_tenant", timetable_id=uuid4(), section_id=problem.sections[0].id,
+            timeslot_id=problem.timeslots[last].id, room_id=uuid4(), is_locked=True,
+        ))
+
+        result = LessonModel(problem).solve(time_limit=10, num_search_workers=4)
+
+        assert result.success is True
+        slots = sorted((problem.timeslots[j] for i, j in result.solution if i == 0),
+                       key=lambda t: t.start_time)
+        assert [(t.week_day, t.period_number) for t in slots] == [(WeekDay.MONDAY, 3), (WeekDay.MONDAY, 4)]
+
+
+def make_room(capacity: int, room_type: str = "classroom", **features) -> Room:
+    """创建教室。"""
+    return Room(
+        tenant_id="test_tenant", building_id=uuid4(), name=f"{room_type}-{capacity}",
+        code=f"R{capacity}", floor=1, capacity=capacity, room_type=room_type, features=features,
+    )
+
+
+def add_class_groups(problem: SchedulingProblem, sizes) -> None:
+    """按教学段的班级ID登记班级人数。"""
+    class_group_ids = list(dict.fromkeys(section.class_group_id for section in problem.sections))
+    for class_group_id, size in zip(class_group_ids, sizes):
+        problem.add_class_group(ClassGroup(
+            id=class_group_id, tenant_id="test_tenant", grade_id=uuid4(),
+            name=f"班级{size}", code=f"G{size}", student_count=size,
+        ))
+
+
+class TestRoomAssignment:
+    """测试教室兼容索引和教室分配。"""
+
+    def test_compatibility_by_capacity_type_and_features(self):
+        """测试只有容量、类型和特性都满足的教室兼容。"""
+        problem = build_real_problem(num_classes=2, courses_per_class=2)
+        add_class_groups(problem, [40, 20])
+        small, large = make_room(30), make_room(45)
+        lab = make_room(50, "lab", computer=True)
+        problem.sections[1].required_room_type = "lab"
+        problem.sections[3].required_features = ["computer"]
+        fixed = uuid4()
+        problem.sections[2].room_id = fixed
+
+        index = RoomCompatibilityIndex.build(
+            problem.sections, [small, large, lab, make_room(60).model_copy(update={"is_active": False})], problem.class_groups
+        )
+
+        compatible = [{index.room_ids[r] for r in rooms} for rooms in index.compatible]
+        assert compatible[0] == {large.id, lab.id}
+        assert compatible[1] == {lab.id}
+        assert compatible[2] == {fixed}
+        assert compatible[3] == {lab.id}
+
+    def test_many_rooms_keep_model_small(self):
+        """测试教室数量很多时只生成少量容量组，不增加分配变量。"""
+        problem = build_real_problem(num_classes=8, courses_per_class=3, num_teachers=6,
+                                     days=tuple(WeekDay)[:5], periods_per_day=4)
+        add_class_groups(problem, [30 + 2 * c for c in range(8)])
+        problem.build_model()
+        baseline = len(problem.assignment_vars)
+
+        for k in range(240):
+            problem.add_room(make_room(25 + k % 30))
+        problem.add_room(make_room(40, "lab", lab_equipment=True))
+        problem.sections[0].required_room_type = "lab"
+        problem.build_model()
+
+        assert len(problem.room_index.room_ids) == 241
+        assert len(problem.room_index.groups) <= len(problem.sections)
+        assert len(problem.assignment_vars) == baseline
+        assert all(group.capacity >= 1 for group in problem.index.room_groups)
+
+    def test_solution_uses_distinct_compatible_rooms(self):
+        """测试求解结果为每个教学段分配兼容教室，且同一时间段教室不冲突。"""
+        problem = build_real_problem(num_classes=4, courses_per_class=3, num_teachers=4,
+                                     days=(WeekDay.MONDAY, WeekDay.TUESDAY), periods_per_day=4)
+        add_class_groups(problem, [35, 35, 20, 20])
+        rooms = [make_room(40), make_room(25), make_room(25)]
+        for room in rooms:
+            problem.add_room(room)
+        engine = SchedulingEngine("test_tenant")
+        engine.problem = problem
+
+        success, assignments, _ = engine.solve_two_phase(phase1_time_limit=5, phase2_time_limit=1)
+
+        assert success is True
+        assert ConstraintValidator._check_timeslot_conflicts(assignments) == []
+        capacities = {room.id: room.capacity for room in rooms}
+        sizes = {c.id: c.student_count for c in problem.class_groups}
+        for a in assignments:
+            section = problem.sections[problem.section_to_idx[a.section_id]]
+            assert capacities[a.room_id] >= sizes[section.class_group_id]
+
+    def test_failed_room_matching_fails_solve(self):
+        """测试求解后的教室匹配失败时求解视为失败，不返回占位教室。"""
+        problem = build_real_problem(num_classes=2, courses_per_class=2,
+                                     days=(WeekDay.MONDAY,), periods_per_day=4)
+        add_class_groups(problem, [30, 30])
+        problem.add_room(make_room(40))
+        problem.add_room(make_room(40))
+        engine = SchedulingEngine("test_tenant")
+        engine.problem = problem
+
+        # 模拟容量组闭包被截断后某个时间段无法完成匹配
+        with patch.object(RoomCompatibilityIndex, "_match", return_value={}):
+            success, assignments, metrics = engine.solve_two_phase(phase1_time_limit=5, phase2_time_limit=1)
+
+        assert success is False
+        assert assignments == []
+        assert metrics['unmatched_rooms'] == len(problem.sections)
+
+
+class TestFeasibilityChecker:
+    """测试求解前可行性检查。"""
+
+    def test_solvable_problem_passes(self):
+        """测试可解的问题没有违反。"""
+        report = check_feasibility(build_roomed_problem())
+
+        assert report.is_feasible
+        assert report.elapsed < 1.0
+
+    def test_class_and_teacher_overload(self):
+        """测试班级课时超过时间段数、教师超过最大课时数和可用时间段数。"""
+        problem = build_real_problem(num_classes=1, courses_per_class=3, num_teachers=1,
+                                     days=(WeekDay.MONDAY,), periods_per_day=4)
+        teacher = problem.teachers[0]
+        teacher.max_hours_per_week = 5
+        teacher.unavailable_time_slots = [time(8, 0), time(9, 0)]
+        for section in problem.sections:
+            section.hours_per_week = 2
+
+        report = check_feasibility(problem, weekly_hours=True)
+
+        kinds = {v.kind: v for v in report.violations}
+        assert kinds["class_group_hours"].demand == 6 and kinds["class_group_hours"].supply == 4
+        assert kinds["teacher_hours"].supply == 5
+        assert kinds["teacher_availability"].supply == 2
+        # 分配变量模型中每个教学段只占一个时间段
+        assert check_feasibility(problem).violations[0].kind == "teacher_availability"
+
+    def test_room_type_shortage(self):
+        """测试指定类型的教室不足或不存在。"""
+        problem = build_real_problem(num_classes=2, courses_per_class=3,
+                                     days=(WeekDay.MONDAY,), periods_per_day=2)
+        add_class_groups(problem, [30, 30])
+        problem.add_room(make_room(40))
+        problem.add_room(make_room(40, "lab"))
+        for section in problem.sections[:3]:
+            section.required_room_type = "lab"
+        problem.sections[3].required_room_type = "gym"
+
+        kinds = [v.kind for v in check_feasibility(problem).violations]
+
+        assert "no_compatible_room" in kinds
+        assert "room_capacity" in kinds
+
+    def test_locked_assignments_collide(self):
+        """测试同一班级的两个锁定分配在同一时间段冲突。"""
+        problem = build_real_problem()
+        timeslot = problem.timeslots[0]
+        for section in problem.sections[:2]:
+            problem.add_existing_assignment(Assignment(
+                tenant_id="test_tenant", timetable_id=uuid4(), section_id=section.id,
+                timeslot_id=timeslot.id, room_id=uuid4(), is_locked=True,
+            ))
+
+        report = check_feasibility(problem)
+
+        conflicts = [v for v in report.violations if v.kind == "locked_conflict"]
+        assert conflicts and conflicts[0].entity_id == problem.sections[1].id
+
+    def test_locked_on_break_is_warning(self):
+        """测试锁定在休息时间段只产生警告，与模型一样接受该锁定。"""
+        problem = build_real_problem()
+        timeslot = problem.timeslots[0]
+        timeslot.is_break = True
+        problem.add_existing_assignment(Assignment(
+            tenant_id="test_tenant", timetable_id=uuid4(), section_id=problem.sections[0].id,
+            timeslot_id=timeslot.id, room_id=uuid4(), is_locked=True,
+        ))
+
+        report = check_feasibility(problem)
+
+        assert report.is_feasible
+        assert [w.kind for w in report.warnings] == ["locked_unavailable"]
+        assert report.to_metrics()["feasibility_warnings"][0]["entity_id"] == str(problem.sections[0].id)
+
+
+class TestInfeasibilityDiagnosis:
+    """测试无解时的冲突约束诊断。"""
+
+    def _overloaded_teacher(self) -> SchedulingProblem:
+        """教师可用时间段少于其课时数的问题。"""
+        problem = build_real_problem(num_classes=2, courses_per_class=2, num_teachers=2,
+                                     days=(WeekDay.MONDAY,), periods_per_day=4)
+        problem.teachers[0].unavailable_time_slots = [time(8, 0)]
+        for section in problem.sections:
+            section.teacher_id = problem.teachers[0].id
+            section.room_id = uuid4()
+        return problem
+
+    def test_minimal_core(self):
+        """测试冲突子集只包含教师冲突和教师不可用时间段。"""
+        core = diagnose_infeasibility(self._overloaded_teacher(), time_limit=10)
+
+        assert core.found and core.minimal
+        assert sorted(c.kind for c in core.conflicts) == ["teacher", "teacher_availability"]
+
+    def test_locked_conflict_in_core(self):
+        """测试两条锁定分配冲突时冲突子集指向锁定分配。"""
+        problem = build_real_problem()
+        for section in problem.sections[:2]:
+            problem.add_existing_assignment(Assignment(
+                tenant_id="test_tenant", timetable_id=uuid4(), section_id=section.id,
+                timeslot_id=problem.timeslots[0].id, room_id=uuid4(), is_locked=True,
+            ))
+
+        core = diagnose_infeasibility(problem, time_limit=10)
+
+        kinds = sorted(c.kind for c in core.conflicts)
+        assert kinds.count("locked") == 2
+        assert "class_group" in kinds or "room" in kinds
+
+    def test_solve_diagnoses_and_caches(self):
+        """测试诊断模式下求解无解时记录冲突子集，相同问题命中缓存。"""
+        cache = SolutionCache(InMemorySolutionStore())
+        problem = self._overloaded_teacher()
+        problem.diagnose_infeasible = True
+        problem.diagnosis_cache = cache
+        problem.build_model()
+
+        success, _, metrics = problem.solve_two_phase(phase1_time_limit=5, phase2_time_limit=1)
+
+        assert success is False
+        assert metrics['infeasibility_status'] == "INFEASIBLE"
+        assert len(metrics['infeasibility_core']) == 2
+
+        again = copy_problem(problem)
+        again.diagnosis_cache = cache
+        assert again.diagnose().cached is True
+
+
+class TestModelSnapshot:
+    """测试模型快照的保存、恢复和重放。"""
+
+    def _solve(self, problem: SchedulingProblem):
+        success, assignments, metrics = problem.solve_two_phase(phase1_time_limit=5, phase2_time_limit=5)
+        assert success is True
+        return assignments, metrics
+
+    def test_restore_skips_build(self):
+        """测试实体顺序不同的相同问题从快照恢复模型，求解结果与重新构建一致。"""
+        store = InMemoryModelStore()
+        problem = build_roomed_problem()
+        assert problem.build_or_load_model(store) is False
+        _, built_metrics = self._solve(problem)
+
+        copied = copy_problem(problem)
+        with patch.object(SchedulingProblem, '_add_hard_constraints') as add_hard:
+            assert copied.build_or_load_model(store) is True
+        add_hard.assert_not_called()
+
+        assert len(copied.assignment_vars) == len(problem.assignment_vars)
+        assert set(copied.penalty_vars) == set(problem.penalty_vars)
+        assignments, metrics = self._solve(copied)
+        assert metrics['final_objective'] == built_metrics['final_objective']
+        sections, timeslots = copied.sections, copied.timeslots
+        assert ConstraintValidator._check_teacher_conflicts(assignments, sections, timeslots) == []
+        assert ConstraintValidator._check_class_conflicts(assignments, sections, timeslots) == []
+
+    def test_snapshot_bytes_round_trip(self):
+        """测试快照字节往返后模型proto和软约束权重保持不变。"""
+        problem = build_real_problem()
+        problem.build_model()
+        snapshot = ModelSnapshot.capture(problem, "digest")
+
+        restored = ModelSnapshot.from_bytes(snapshot.to_bytes())
+
+        assert restored.model_data == snapshot.model_data
+        assert restored.model_format == snapshot.model_format
+        assert restored.soft_weights == problem.soft_weights
+        assert str(restored.to_model().Proto()) == str(problem.model.Proto())
+
+    def test_changed_soft_weights_rebuild(self):
+        """测试软约束权重变化时不复用快照，而是重新构建模型。"""
+        store = InMemoryModelStore()
+        problem = build_real_problem()
+        assert problem.build_or_load_model(store) is False
+
+        copied = copy_problem(problem)
+        copied.soft_weights = dict(problem.soft_weights)
+        name = next(iter(copied.soft_weights))
+        copied.soft_weights[name] += 1
+        assert copied.build_or_load_model(store) is False
+
+        # 重新构建的模型覆盖快照，相同权重的问题再次复用
+        again = copy_problem(problem)
+        again.soft_weights = dict(copied.soft_weights)
+        assert again.build_or_load_model(store) is True
+
+    def test_replay_cli(self, tmp_path, capsys):
+        """测试命令行以指定参数重放快照。"""
+        problem = build_real_problem()
+        problem.build_model()
+        path = tmp_path / "model.cpsat.z"
+        path.write_bytes(ModelSnapshot.capture(problem, "digest").to_bytes())
+
+        exit_code = replay_main([str(path), "--param", "max_time_in_seconds=5", "--param", "num_workers=1"])
+
+        assert exit_code == 0
+        output = capsys.readouterr().out
+        assert '"status": "OPTIMAL"' in output
+        assert '"num_workers": 1' in output
+
+
+class TestSolutionVector:
+    """测试紧凑解表示。"""
+
+    def test_extract_matches_solver_values(self):
+        """测试从求解器响应批量提取的解与逐个查询变量一致，指标不再逐个查询变量。"""
+        problem = build_roomed_problem()
+        problem.build_model()
+        success, assignments = problem.solve(time_limit=5)
+        assert success is True
+
+        expected = {
+            i: j for (i, j), var in problem.assignment_vars.items() if problem.solver.Value(var) == 1
+        }
+        assert problem.solution.as_dict() == expected
+        assert problem.solution.timeslots.dtype == np.int32
+        assert len(assignments) == len(expected)
+
+        with patch.object(type(problem.solver), 'Value', side_effect=AssertionError("逐个查询变量")):
+            metrics = problem.get_solution_quality_metrics()
+        assert metrics['scheduled_sections'] == len(problem.sections)
+        assert sum(info['scheduled_hours'] for info in metrics['teacher_utilization'].values()) == len(expected)
+
+    def test_dict_round_trip(self):
+        """测试与 {教学段下标: 时间段下标} 互相转换，未安排的教学段为 UNASSIGNED。"""
+        vector = SolutionVector.from_dict({0: 3, 2: 1}, 4)
+
+        assert vector.timeslots.tolist() == [3, UNASSIGNED, 1, UNASSIGNED]
+        assert vector.num_scheduled == 2
+        assert vector.as_dict() == {0: 3, 2: 1}
+        assert vector.pairs() == [(0, 3), (2, 1)]
+
+
+class TestTimeslotTable:
+    """测试时间段整数编码表。"""
+
+    def _problem(self) -> SchedulingProblem:
+        problem = build_real_problem(days=(WeekDay.MONDAY, WeekDay.TUESDAY), periods_per_day=3)
+        # 午休后的时间段与上午不连续，另加一个与第一节重叠的时间段
+        problem.add_timeslot(Timeslot(
+            tenant_id="test_tenant", week_day=WeekDay.MONDAY,
+            start_time=time(14, 0), end_time=time(14, 45), period_number=5,
+        ))
+        problem.add_timeslot(Timeslot(
+            tenant_id="test_tenant", week_day=WeekDay.TUESDAY,
+            start_time=time(8, 30), end_time=time(9, 15), period_number=6,
+        ))
+        return problem
+
+    def test_minute_of_week_and_day_order(self):
+        """测试按周内分钟数编码，每天按开始时间排序。"""
+        problem = self._problem()
+        table = problem._get_index().timeslot_table
+        tuesday_first = next(
+            j for j, t in enumerate(problem.timeslots)
+            if t.week_day == WeekDay.TUESDAY and t.start_time == time(8, 0)
+        )
+
+        assert table.start[tuesday_first] == MINUTES_PER_DAY + 8 * 60
+        assert table.end[tuesday_first] == MINUTES_PER_DAY + 8 * 60 + 45
+        for slot_indices in table.day_order.values():
+            assert list(table.start[slot_indices]) == sorted(table.start[slot_indices])
+
+    def test_adjacency_and_overlap(self):
+        """测试相接关系跳过午休，重叠关系只在时间区间相交时成立。"""
+        problem = self._problem()
+        table = problem._get_index().timeslot_table
+        slot = {(t.week_day, t.start_time): j for j, t in enumerate(problem.timeslots)}
+
+        assert table.is_consecutive(slot[(WeekDay.MONDAY, time(8, 0))], slot[(WeekDay.MONDAY, time(9, 0))])
+        assert not table.is_consecutive(slot[(WeekDay.MONDAY, time(10, 0))], slot[(WeekDay.MONDAY, time(14, 0))])
+        assert not table.is_consecutive(slot[(WeekDay.MONDAY, time(10, 0))], slot[(WeekDay.TUESDAY, time(8, 0))])
+        assert table.overlaps(slot[(WeekDay.TUESDAY, time(8, 0))], slot[(WeekDay.TUESDAY, time(8, 30))])
+        assert not table.overlaps(slot[(WeekDay.MONDAY, time(8, 0))], slot[(WeekDay.TUESDAY, time(8, 0))])
+        # 星期一 8:00-9:00-10:00 两对；星期二按顺序 8:00、8:30、9:00 两两重叠，只有 9:00-10:00 一对
+        assert len(table.consecutive_pairs()) == 3
+
+
+def sequential_conflicts(assignments, sections):
+    """逐条检查的参考实现（教师、班级、教室冲突）。"""
+    by_id = {}
+    for section in sections:
+        by_id.setdefault(section.id, section)
+    violations = []
+    for label, attr in (("教师", "teacher_id"), ("班级", "class_group_id")):
+        seen = set()
+        for a in assignments:
+            section = by_id.get(a.section_id)
+            if section is None:
+                continue
+            key = (getattr(section, attr), a.timeslot_id)
+            if key in seen:
+                violations.append(f"{label} {key[0]} 在时间段 {a.timeslot_id} 有冲突")
+            seen.add(key)
+    rooms = {}
+    for a in assignments:
+        rooms.setdefault((a.room_id, a.timeslot_id), []).append(a)
+    violations.extend(
+        f"时间段 {timeslot_id} 的教室 {room_id} 被多个教学段占用"
+        for (room_id, timeslot_id), items in rooms.items() if len(items) > 1
+    )
+    return violations
+
+
+class TestVectorizedValidator:
+    """测试整数编码的向量化校验器。"""
+
+    def test_matches_sequential_checks(self):
+        """测试随机课表上的违反描述及顺序与逐条检查一致。"""
+        rng = np.random.default_rng(7)
+        teachers = [uuid4() for _ in range(6)]
+        class_groups = [uuid4() for _ in range(5)]
+        rooms = [uuid4() for _ in range(4)]
+        timeslots = [Mock(id=uuid4()) for _ in range(8)]
+        sections = [
+            Mock(id=uuid4(), teacher_id=teachers[rng.integers(6)], class_group_id=class_groups[rng.integers(5)])
+            for _ in range(40)
+        ]
+        assignments = [
+            Mock(
+                section_id=sections[k % len(sections)].id,
+                timeslot_id=timeslots[rng.integers(8)].id,
+                room_id=rooms[rng.integers(4)],
+            )
+            for k in range(60)
+        ]
+        # 引用不存在的教学段的分配只参与教室冲突检查
+        assignments.append(Mock(section_id=uuid4(), timeslot_id=timeslots[0].id, room_id=rooms[0]))
+
+        expected = sequential_conflicts(assignments, sections)
+        assert expected
+        assert VectorizedValidator(sections, timeslots).validate(assignments) == expected
+        assert ConstraintValidator.validate_hard_constraints(assignments, sections, timeslots) == expected
+
+    def test_solved_timetable_is_valid(self):
+        """测试求解得到的课表没有冲突。"""
+        problem = build_roomed_problem()
+        problem.build_model()
+        success, assignments = problem.solve(time_limit=5)
+
+        assert success is True
+        assert ConstraintValidator.validate_hard_constraints(assignments, problem.sections, problem.timeslots) == []
+
+
+class TestTimetableEvaluator:
+    """测试课表增量评估器。"""
+
+    def test_penalties_match_solver(self):
+        """测试已求解课表上的各项惩罚与模型中的惩罚变量一致。"""
+        problem = build_real_problem(num_classes=2, courses_per_class=4)
+        problem.teachers[0].preferred_time_slots = [time(8, 0)]
+        problem.build_model()
+        success, assignments = problem.solve(time_limit=10)
+        assert success is True
+
+        engine = SchedulingEngine("test_tenant")
+        engine.problem = problem
+        evaluator = engine.create_evaluator(assignments)
+        assert evaluator.hard_violations == 0
+        for name, penalty in evaluator.penalties.items():
+            assert penalty == problem.solver.Value(problem.penalty_vars[name])
+        assert evaluator.objective == problem.solver.ObjectiveValue()
+
+    def test_deltas_match_full_rebuild(self):
+        """测试随机移动和交换的增量结果与重新构建评估器一致，只评估时课表不变。"""
+        rng = np.random.default_rng(11)
+        problem = build_roomed_problem()
+        problem.teachers[1].preferred_time_slots = [time(9, 0), time(10, 0)]
+        problem.teachers[2].unavailable_time_slots = [time(8, 0)]
+        problem.timeslots[3].is_break = True
+        problem.build_model()
+        success, assignments = problem.solve(time_limit=5)
+        assert success is True
+        problem.add_existing_assignment(assignments[0].model_copy(update={"is_locked": True}))
+
+        evaluator = TimetableEvaluator(problem, assignments)
+        rooms = [a.room_id for a in assignments]
+        for step in range(200):
+            k = int(rng.integers(len(assignments)))
+            before = (evaluator.hard_violations, evaluator.objective)
+            if step % 3 == 0:
+                other = int(rng.integers(len(assignments)))
+                preview = evaluator.evaluate_swap(assignments[k], assignments[other])
+                assert (evaluator.hard_violations, evaluator.objective) == before
+                result = evaluator.apply_swap(assignments[k], assignments[other])
+                first, second = assignments[k], assignments[other]
+                assignments[k] = first.model_copy(update={"timeslot_id": second.timeslot_id, "room_id": second.room_id})
+                assignments[other] = second.model_copy(update={"timeslot_id": first.timeslot_id, "room_id": first.room_id})
+            else:
+                timeslot_id = problem.timeslots[int(rng.integers(len(problem.timeslots)))].id
+                room_id = rooms[int(rng.integers(len(rooms)))] if step % 2 else None
+                preview = evaluator.evaluate_move(assignments[k], timeslot_id, room_id)
+                assert (evaluator.hard_violations, evaluator.objective) == before
+                result = evaluator.apply_move(assignments[k], timeslot_id, room_id)
+                update = {"timeslot_id": timeslot_id}
+                if room_id is not None:
+                    update["room_id"] = room_id
+                assignments[k] = assignments[k].model_copy(update=update)
+
+            assert result == preview
+            rebuilt = TimetableEvaluator(problem, assignments)
+            assert evaluator.hard == rebuilt.hard
+            assert evaluator.penalties == rebuilt.penalties
+            assert result.hard_delta == rebuilt.hard_violations - before[0]
+            assert result.objective_delta == rebuilt.objective - before[1]
+            assert result.feasible == (rebuilt.hard_violations == 0)
+
+        # 随机移动后课表中的冲突与校验器一致
+        conflicts = ConstraintValidator.validate_hard_constraints(assignments, problem.sections, problem.timeslots)
+        assert sum(evaluator.hard[kind] for kind in ("teacher_conflict", "class_conflict")) == sum(
+            not message.startswith("时间段") for message in conflicts
+        )
+
+    def test_move_reports_conflicts(self):
+        """测试移到同班级已占用的时间段时报告冲突，移回后恢复可行。"""
+        problem = build_real_problem()
+        problem.build_model()
+        success, assignments = problem.solve(time_limit=5)
+        assert success is True
+
+        evaluator = TimetableEvaluator(problem, assignments)
+        by_section = {a.section_id: a for a in assignments}
+        first, second = (by_section[s.id] for s in problem.sections[:2])
+        result = evaluator.apply_move(first, second.timeslot_id)
+        assert result.feasible is False
+        assert result.hard_deltas["class_conflict"] == 1
+        assert result.to_dict()["hard_deltas"]["class_conflict"] == 1
+
+        back = evaluator.apply_move(first, first.timeslot_id)
+        assert back.feasible is True
+        assert back.hard_delta == -result.hard_delta
+        assert back.objective_delta == -result.objective_delta
+
+        with pytest.raises(ValueError):
+            evaluator.evaluate_move(first, uuid4())
+
+    def test_consecutive_link_broken_and_restored(self):
+        """测试把连堂课的一个课时移到另一天计入连堂惩罚，移回后恢复。"""
+        problem = build_duplicated_problem(hours=2)
+        for section in problem.sections:
+            section.consecutive_hours = 2
+        problem.build_model()
+        success, assignments = problem.solve(time_limit=10)
+        assert success is True
+
+        evaluator = TimetableEvaluator(problem, assignments)
+        assert evaluator.penalties['consecutive_classes'] == problem.solver.Value(
+            problem.penalty_vars['consecutive_classes']
+        ) == 0
+
+        a, b = problem._consecutive_links()[0]
+        by_section = {x.section_id: x for x in assignments}
+        second = by_section[problem.sections[b].id]
+        current = problem.timeslots[problem.timeslot_to_idx[second.timeslot_id]]
+        other_day = next(t for t in problem.timeslots if t.week_day != current.week_day)
+        coef = problem._scaled_weight(problem.soft_weights['consecutive_classes'] * 10)
+
+        broken = evaluator.apply_move(second, other_day.id)
+        assert broken.penalty_deltas['consecutive_classes'] == coef
+        assert evaluator.penalties['consecutive_classes'] == coef
+
+        moved = second.model_copy(update={"timeslot_id": other_day.id})
+        restored = evaluator.apply_move(moved, second.timeslot_id)
+        assert restored.penalty_deltas['consecutive_classes'] == -coef
+        assert evaluator.penalties['consecutive_classes'] == 0
+
+    def test_roomed_moves_leave_timetable_unchanged(self):
+        """测试固定教室课表上逐个评估移动不修改课表，移回原时间段的增量为零。"""
+        problem = build_roomed_problem(num_classes=8)
+        problem.build_model()
+        success, assignments = problem.solve(time_limit=5)
+        assert success is True
+
+        evaluator = TimetableEvaluator(problem, assignments)
+        hard, objective = evaluator.hard_violations, evaluator.objective
+        for k, assignment in enumerate(assignments):
+            evaluator.evaluate_move(assignment, problem.timeslots[k % len(problem.timeslots)].id)
+            stay = evaluator.evaluate_move(assignment, assignment.timeslot_id)
+            assert stay.hard_delta == 0 and stay.objective_delta == 0
+
+        assert evaluator.hard_violations == hard
+        assert evaluator.objective == objective
+
+
+def job_metadata(features, phase1_time: float, time_to_target: float) -> dict:
+    """构造一条历史任务的结果元数据。"""
+    return {
+        "success": True,
+        "features": features.to_dict(),
+        "phase1_time": phase1_time,
+        "phase2_time": time_to_target * 2,
+        "phase2_time_to_gap": {"0.01": time_to_target},
+    }
+
+
+class TestSolveTimePredictor:
+    """测试求解时间预测和时间限制分配。"""
+
+    def test_extract_features(self):
+        """测试规模、锁定比例和冲突图度数。"""
+        problem = build_real_problem(num_classes=2, courses_per_class=3, num_teachers=3)
+        problem.timeslots[0].is_break = True
+        solved = problem.sections[0]
+        problem.add_existing_assignment(Assignment(
+            tenant_id="test_tenant", timetable_id=uuid4(), section_id=solved.id,
+            timeslot_id=problem.timeslots[1].id, room_id=uuid4(), is_locked=True,
+        ))
+
+        features = extract_features(problem)
+        assert (features.num_sections, features.num_timeslots, features.num_teachers) == (6, 12, 3)
+        assert features.num_class_groups == 2
+        assert features.lock_ratio == pytest.approx(1 / 6)
+        # 每个教学段：同班级2个 + 同教师1个
+        assert features.mean_conflict_degree == 3
+        assert features.max_conflict_degree == 3
+        assert features.max_class_load == pytest.approx(3 / 11)
+        assert 0 < features.domain_density <= 1
+        assert ProblemFeatures.from_dict({**features.to_dict(), "unknown": 1}) == features
+
+    def test_defaults_without_enough_history(self):
+        """测试历史样本不足时使用默认时间限制。"""
+        predictor = SolveTimePredictor(min_samples=5)
+        features = extract_features(build_real_problem())
+        assert predictor.fit([job_metadata(features, 1.0, 2.0)] * 4 + [{"success": False}]) == 4
+        assert predictor.is_fitted is False
+
+        budget = predictor.allocate(features)
+        assert (budget.phase1_time_limit, budget.phase2_time_limit) == (60, 240)
+        assert budget.to_metrics()["time_budget_source"] == "default"
+
+    def test_budget_scales_with_problem_size(self):
+        """测试小问题分配的时间少于大问题，且总时间不超过上限。"""
+        history = []
+        for num_classes in (1, 2, 4, 8, 16):
+            for courses in (2, 3, 4):
+                features = extract_features(build_real_problem(num_classes=num_classes, courses_per_class=courses))
+                sections = features.num_sections
+                history.append(job_metadata(features, 0.01 * sections, 0.2 * sections))
+        predictor = SolveTimePredictor(min_samples=10, min_time_limit=1, max_time_limit=30)
+        assert predictor.fit(history) == len(history)
+
+        small = predictor.allocate(extract_features(build_real_problem(num_classes=1, courses_per_class=2)))
+        large = predictor.allocate(extract_features(build_real_problem(num_classes=16, courses_per_class=4)))
+        assert small.source == "model"
+        assert small.predicted_first_feasible < large.predicted_first_feasible
+        assert small.phase1_time_limit + small.phase2_time_limit < large.phase1_time_limit + large.phase2_time_limit
+        assert large.phase1_time_limit + large.phase2_time_limit <= 30
+
+    def test_two_phase_records_time_to_gap(self):
+        """测试两阶段求解记录阶段2首次达到各间隙阈值的耗时，可作为训练样本。"""
+        problem = build_real_problem()
+        problem.build_model()
+        success, _, metrics = problem.solve_two_phase(5, 10)
+        assert success is True
+
+        assert metrics['phase2_time_to_gap']['0.01'] <= metrics['phase2_time']
+        sample = SolveTimePredictor().training_sample({
+            "success": True, "features": extract_features(problem).to_dict(), **metrics,
+        })
+        assert sample is not None
+        assert sample[2] >= sample[1]
+
+
+class TestStoppingCriteria:
+    """测试基于间隙、目标值和改进停滞的提前停止。"""
+
+    def test_check(self):
+        """测试各停止条件。"""
+        criteria = StoppingCriteria(relative_gap=0.05, objective_target=10, plateau_solutions=3)
+        assert criteria.check(100, 0.04, 0) == STOP_GAP_REACHED
+        assert criteria.check(10, 0.5, 0) == STOP_OBJECTIVE_REACHED
+        assert criteria.check(100, 0.5, 3) == STOP_PLATEAU_SOLUTIONS
+        assert criteria.check(100, 0.5, 2) is None
+        assert StoppingCriteria().check(0, 0.0, 100) is None
+
+    def test_plateau_counts_only_significant_improvements(self):
+        """测试相对改进小于 min_improvement 的解计入停滞。"""
+        vars = SparseAssignmentVars(0, 0)
+        callback = SolutionProgressCallback(
+            vars, 10, IncumbentStore(), stopping=StoppingCriteria(plateau_solutions=2, min_improvement=0.1)
+        )
+        with patch.object(callback, "StopSearch") as stop:
+            for objective in (100, 95, 80, 79):
+                callback._check_stopping(objective, 0.5)
+            assert stop.call_count == 0
+            callback._check_stopping(78, 0.5)
+
+        assert stop.call_count == 1
+        assert callback.stop_reason == STOP_PLATEAU_SOLUTIONS
+        assert callback.best_objective == 80
+
+    def test_plateau_time_stops_search(self):
+        """测试找到解后超过 plateau_seconds 没有改进时停止搜索。"""
+        from ortools.sat.python import cp_model
+
+        callback = SolutionProgressCallback(
+            SparseAssignmentVars(0, 0), 10, IncumbentStore(), stopping=StoppingCriteria(plateau_seconds=0.05)
+        )
+        solver = Mock()
+        with stop_on_plateau(solver, callback, poll_interval=0.01):
+            sleep(0.05)
+            # 没有解时不计时
+            assert solver.StopSearch.call_count == 0
+            callback.last_improvement = perf_counter()
+            sleep(0.2)
+
+        assert solver.StopSearch.call_count == 1
+        assert callback.final_stop_reason(solver, cp_model.FEASIBLE) == STOP_PLATEAU_TIME
+
+    def test_solve_records_stop_reason(self):
+        """测试目标值达到后在第一个解处停止，未配置时记录求解器自身的结束原因。"""
+        problem = build_real_problem(num_classes=3, courses_per_class=4)
+        problem.build_model()
+        success, _ = problem.solve(time_limit=10)
+        assert success is True
+        assert problem.stop_reason == STOP_OPTIMAL
+
+        problem.stopping_criteria = StoppingCriteria(objective_target=10 ** 9)
+        success, assignments = problem.solve(time_limit=10)
+        assert success is True
+        assert len(assignments) == len(problem.sections)
+        assert problem.stop_reason == STOP_OBJECTIVE_REACHED
+
+        success, _, metrics = problem.solve_two_phase(5, 10)
+        assert success is True
+        assert metrics['stop_reason'] == STOP_OBJECTIVE_REACHED
+
+
+class TestSolutionPool:
+    """测试多样化解池。"""
+
+    def test_offer_keeps_distinct_solutions_ranked(self):
+        """测试解池按目标值排序，过近的解只保留较好的一个，已满时替换最差的解。"""
+        pool = SolutionPool(size=2, min_distance=2)
+        assert pool.offer(np.array([0, 1, 2, 3]), 50) is True
+        # 只差一个教学段且更差：拒绝
+        assert pool.offer(np.array([0, 1, 2, 0]), 60) is False
+        # 只差一个教学段但更好：替换
+        assert pool.offer(np.array([0, 1, 2, 0]), 40) is True
+        assert len(pool) == 1
+        assert pool.offer(np.array([3, 2, 1, 0]), 70) is True
+        assert pool.offer(np.array([1, 0, 3, 2]), 80) is False
+        assert pool.offer(np.array([1, 0, 3, 2]), 45) is True
+        assert [s.objective for s in pool.solutions] == [40, 45]
+        assert pool.is_full is True
+
+    def test_solve_pool_returns_distinct_timetables(self):
+        """测试一次求解得到多个两两距离不小于 min_distance 的可行课表。"""
+        problem = build_real_problem(num_classes=2, courses_per_class=4)
+        problem.teachers[0].preferred_time_slots = [time(8, 0), time(9, 0)]
+        problem.build_model()
+        constraints_before = len(problem.model.Proto().constraints)
+
+        success, assignments, metrics = problem.solve_pool(pool_size=3, time_limit=20, min_distance=3)
+        assert success is True
+        assert len(assignments) == len(problem.sections)
+        assert len(problem.model.Proto().constraints) == constraints_before
+
+        solutions = problem.pool_result.pool.solutions
+        assert len(solutions) == 3
+        assert metrics['pool_size'] == 3
+        assert metrics['pool_min_distance'] >= 3
+        assert metrics['pool_objectives'] == sorted(metrics['pool_objectives'])
+        assert metrics['final_objective'] == solutions[0].objective
+        for pooled in solutions:
+            timetable = pooled.to_assignments(problem)
+            assert ConstraintValidator.validate_hard_constraints(timetable, problem.sections, problem.timeslots) == []
+
+    def test_pool_timetables_are_drafts(self):
+        """测试解池中的每个课表生成独立的时间表草稿。"""
+        engine = SchedulingEngine("test_tenant")
+        engine.problem = build_real_problem()
+        assert engine.pool_timetables(uuid4(), "方案") == []
+
+        success, _, _ = engine.solve_pool(pool_size=2, time_limit=10, min_distance=2)
+        assert success is True
+
+        timetables = engine.pool_timetables(uuid4(), "方案")
+        assert [t.name for t in timetables] == ["方案 #1", "方案 #2"]
+        assert len({t.id for t in timetables}) == 2
+        for timetable in timetables:
+            assert timetable.status == SchedulingStatus.DRAFT
+            assert all(a.timetable_id == timetable.id for a in timetable.assignments)
+            assert len(timetable.assignments) == len(engine.problem.sections)